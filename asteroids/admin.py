@@ -2,7 +2,7 @@
 Asteroid Admin Configuration
 """
 from django.contrib import admin
-from .models import ThreatScenario, ThreatAssessment, DestructionZone
+from .models import ThreatScenario, ThreatAssessment, DestructionZone, UncertaintyRun, CalculationJob
 
 
 @admin.register(ThreatScenario)
@@ -35,3 +35,19 @@ class DestructionZoneAdmin(admin.ModelAdmin):
     ]
     list_filter = ['zone_type']
 
+
+
+@admin.register(UncertaintyRun)
+class UncertaintyRunAdmin(admin.ModelAdmin):
+    list_display = [
+        'scenario', 'num_samples', 'deaths_p05', 'deaths_p50', 'deaths_p95',
+        'calculated_at'
+    ]
+    readonly_fields = ['calculated_at']
+
+
+@admin.register(CalculationJob)
+class CalculationJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'kind', 'status', 'result_id', 'created_at', 'completed_at']
+    list_filter = ['kind', 'status']
+    readonly_fields = ['params_hash', 'task_id', 'created_at', 'started_at', 'completed_at']
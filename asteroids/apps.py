@@ -5,4 +5,10 @@ class AsteroidsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'asteroids'
     verbose_name = 'Asteroid Threat Assessment'
+    
+    def ready(self):
+        # Open an installed threat table before the first estimate needs it;
+        # a missing one is tabulated on first use, not in every process here
+        from .lookup import load_installed_table
+        load_installed_table()
 
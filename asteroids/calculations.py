@@ -0,0 +1,317 @@
+"""
+Vectorized Impact Effects
+
+The ThreatCalculationService formulas for whole arrays of scenarios at
+once, without the ORM. Inputs broadcast against each other, so a sweep
+can pass axes shaped for an outer product. Arithmetic runs as NumPy array
+operations; with exact=True (the default) the transcendental functions
+(pow, sin, log10) are evaluated element by element with the same libm
+calls the scalar path makes, since NumPy's SIMD versions differ from
+libm in the last bit for a few percent of inputs, and rounding follows
+Python's round(). With exact=False everything is a NumPy ufunc, within
+an ulp or two of the scalar results and several times faster.
+"""
+import hashlib
+import math
+import numpy as np
+
+# Bump whenever a formula or threshold changes; stored assessments computed
+# under another version are recalculated
+CALCULATION_VERSION = '1.1'
+
+TNT_MEGATON_JOULES = 4.184e15
+TNT_KILOTON_JOULES = 4.184e12
+MEGATON_ERGS = 4.184e22
+
+# Largest mass and energy accepted for estimates, above those of a 1000 km
+# body of 20,000 kg/m³ at 100 km/s (the sweep axis limits)
+MAX_MASS_KG = 1e23
+MAX_ENERGY_MEGATONS = 1e18
+
+POPULATION_DENSITY_PER_KM2 = 50
+FATALITY_RATE = 0.3
+INJURY_RATE = 0.5
+
+# (label, energy above MT, diameter above km), checked in order
+RISK_LEVELS = (
+    ('critical', 100000, 1),
+    ('high', 10000, 0.5),
+    ('moderate', 1000, 0.2),
+    ('low', 10, 0.05),
+)
+DEFAULT_RISK_LEVEL = 'minimal'
+
+TSUNAMI_RISKS = (
+    ('extreme', 10000, 1),
+    ('high', 1000, 0.5),
+    ('moderate', 100, 0.2),
+    ('low', 10, 0.05),
+)
+DEFAULT_TSUNAMI_RISK = 'none'
+
+# (energy above MT, value), checked in order
+DUST_DURATIONS_DAYS = (
+    (100000, 365 * 10),
+    (10000, 365 * 2),
+    (1000, 180),
+    (100, 30),
+)
+DEFAULT_DUST_DURATION_DAYS = 7
+
+TEMPERATURE_CHANGES_C = (
+    (100000, -15.0),
+    (10000, -5.0),
+    (1000, -2.0),
+    (100, -0.5),
+)
+DEFAULT_TEMPERATURE_CHANGE_C = -0.1
+
+# Bulk density (kg/m³) of NEOs below each diameter (km), by the size classes
+# of NEO.size_category: small bodies are mostly monoliths, large ones
+# porous rubble piles
+NEO_DENSITY_CLASSES = (
+    (0.1, 3000),
+    (0.5, 2600),
+    (1.0, 2200),
+)
+DEFAULT_NEO_DENSITY = 2000
+
+# Geometric albedo assumed for diameters from absolute magnitude alone
+DEFAULT_ALBEDO = 0.14
+EARTH_ESCAPE_VELOCITY_KPS = 11.186
+
+# Rounding falls back to round() within this many relative units of a
+# half-way case, comfortably above the error of scaling by 10**ndigits
+ROUND_TIE_MARGIN = 1e-12
+ROUND_EXACT_LIMIT = 2.0 ** 52 / 100
+
+
+def input_hash(*values):
+    """Content hash of calculation inputs together with CALCULATION_VERSION"""
+    payload = ','.join(
+        repr(float(value)) if isinstance(value, (int, float)) and not isinstance(value, bool) else repr(value)
+        for value in values
+    )
+    return hashlib.sha1(f'{CALCULATION_VERSION}:{payload}'.encode()).hexdigest()
+
+
+def _elementwise(function, *arrays):
+    """Apply a scalar math function to every element, as float64"""
+    return np.asarray(np.frompyfunc(function, len(arrays), 1)(*arrays), dtype=np.float64)
+
+
+def _pow(base, exponent, exact):
+    if exact:
+        return _elementwise(math.pow, base, float(exponent))
+    return np.power(base, exponent)
+
+
+def _sin(x, exact):
+    return _elementwise(math.sin, x) if exact else np.sin(x)
+
+
+def _log10(x, exact):
+    return _elementwise(math.log10, x) if exact else np.log10(x)
+
+
+def _radians(degrees):
+    # The same single multiplication as math.radians
+    return degrees * (math.pi / 180.0)
+
+
+def round_half_even(values, ndigits=2):
+    """
+    round(value, ndigits) for every element, bit-identical to Python
+    
+    Python rounds the exact binary value to the nearest decimal (ties to
+    even) and returns the double nearest that decimal; scaled rint agrees
+    except within rounding error of a tie or beyond 2**52, where the
+    elements go through round() itself.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    scale = 10.0 ** ndigits
+    scaled = values * scale
+    
+    with np.errstate(invalid='ignore'):
+        fraction = np.abs(scaled - np.floor(scaled))
+        near_tie = np.abs(fraction - 0.5) < ROUND_TIE_MARGIN * np.maximum(np.abs(scaled), 1.0)
+        fallback = ~(np.abs(values) < ROUND_EXACT_LIMIT) | near_tie
+    
+    result = np.rint(scaled) / scale
+    
+    if fallback.any():
+        result[fallback] = [round(value, ndigits) for value in values[fallback].tolist()]
+    
+    return result
+
+
+def _truncate(values):
+    """int() of every element"""
+    return np.trunc(values).astype(np.int64)
+
+
+def _thresholds(energy_megatons, diameter_km, table, default):
+    conditions = [
+        (energy_megatons > energy) | (diameter_km > diameter)
+        for _, energy, diameter in table
+    ]
+    return np.select(conditions, [label for label, _, _ in table], default=default)
+
+
+def _energy_steps(energy_megatons, table, default):
+    return np.select(
+        [energy_megatons > energy for energy, _ in table],
+        [value for _, value in table],
+        default=default
+    )
+
+
+def magnitude_diameters(absolute_magnitude_h, albedo=DEFAULT_ALBEDO):
+    """Diameters in km from absolute magnitudes at a geometric albedo"""
+    return 1329 / math.sqrt(albedo) * np.power(10.0, -0.2 * np.asarray(absolute_magnitude_h, dtype=np.float64))
+
+
+def neo_densities(diameter_km):
+    """Default bulk densities in kg/m³ by size class"""
+    diameter_km = np.asarray(diameter_km, dtype=np.float64)
+    return np.select(
+        [diameter_km < diameter for diameter, _ in NEO_DENSITY_CLASSES],
+        [density for _, density in NEO_DENSITY_CLASSES],
+        default=DEFAULT_NEO_DENSITY
+    ).astype(np.float64)
+
+
+def impact_velocities(relative_velocity_kps):
+    """Impact speeds in km/s of bodies approaching at a relative speed, accelerated by Earth's gravity"""
+    relative_velocity_kps = np.asarray(relative_velocity_kps, dtype=np.float64)
+    return np.sqrt(relative_velocity_kps ** 2 + EARTH_ESCAPE_VELOCITY_KPS ** 2)
+
+
+def impact_masses(diameter_km, density_kg_m3, mass_kg=None, exact=True):
+    """Spherical masses in kg, or the given mass where it is set (non-zero, not NaN)"""
+    diameter_km = np.asarray(diameter_km, dtype=np.float64)
+    volume_m3 = (4/3) * math.pi * _pow(diameter_km * 1000 / 2, 3, exact)
+    masses = volume_m3 * np.asarray(density_kg_m3, dtype=np.float64)
+    
+    if mass_kg is None:
+        return masses
+    
+    mass_kg = np.asarray(mass_kg, dtype=np.float64)
+    return np.where(np.isnan(mass_kg) | (mass_kg == 0), masses, mass_kg)
+
+
+def kinetic_energies(mass_kg, velocity_mps, exact=True):
+    """Kinetic energies in joules"""
+    return 0.5 * mass_kg * _pow(velocity_mps, 2, exact)
+
+
+def crater_diameters(energy_joules, impact_angle_degrees, exact=True):
+    """Crater diameters in km (simplified Holsapple-Schmidt scaling)"""
+    energy_kt = energy_joules / TNT_KILOTON_JOULES
+    crater_diameter_m = 1.8 * _pow(energy_kt, 0.333, exact) * _sin(_radians(impact_angle_degrees), exact)
+    return crater_diameter_m / 1000
+
+
+def seismic_magnitudes(energy_megatons, exact=True):
+    """Seismic magnitudes, rounded to two decimals"""
+    magnitude = (2/3) * _log10(energy_megatons * MEGATON_ERGS, exact) - 2.9
+    return round_half_even(magnitude) if exact else np.round(magnitude, 2)
+
+
+def risk_levels(energy_megatons, diameter_km):
+    return _thresholds(energy_megatons, diameter_km, RISK_LEVELS, DEFAULT_RISK_LEVEL)
+
+
+def tsunami_risks(energy_megatons, diameter_km, impact_type):
+    """Tsunami risk; always 'none' for impacts that are not in the ocean"""
+    risks = _thresholds(energy_megatons, diameter_km, TSUNAMI_RISKS, DEFAULT_TSUNAMI_RISK)
+    return np.where(np.asarray(impact_type) == 'ocean', risks, DEFAULT_TSUNAMI_RISK)
+
+
+def destruction_radii(energy_megatons, exact=True):
+    """Main destruction radius in km"""
+    return 2.2 * _pow(energy_megatons, 0.33, exact)
+
+
+def destruction_areas(radius_km, exact=True):
+    return math.pi * _pow(radius_km, 2, exact)
+
+
+def casualties(area_km2, affected_population=None):
+    """
+    Estimated (deaths, injuries) from the affected population, by default
+    that of the area at the average population density
+    """
+    if affected_population is None:
+        affected_population = area_km2 * POPULATION_DENSITY_PER_KM2
+    affected_population = _truncate(affected_population)
+    return (
+        _truncate(affected_population * FATALITY_RATE),
+        _truncate(affected_population * INJURY_RATE),
+    )
+
+
+def economic_losses(area_km2, deaths, exact=True):
+    """Economic loss in billions USD: $1M per km² and $10M per death"""
+    total_loss = (area_km2 * 1 + deaths * 10) / 1000
+    return round_half_even(total_loss) if exact else np.round(total_loss, 2)
+
+
+def dust_durations(energy_megatons):
+    """Dust cloud duration in days"""
+    return _energy_steps(energy_megatons, DUST_DURATIONS_DAYS, DEFAULT_DUST_DURATION_DAYS)
+
+
+def temperature_changes(energy_megatons):
+    """Global temperature change in Celsius"""
+    return _energy_steps(energy_megatons, TEMPERATURE_CHANGES_C, DEFAULT_TEMPERATURE_CHANGE_C)
+
+
+def calculate_threats(diameter_km, density_kg_m3, velocity_kps, impact_angle_degrees,
+                      impact_type='land', mass_kg=None, exact=True,
+                      impact_location_lat=None, impact_location_lon=None, population=None):
+    """
+    Impact effects of every scenario in a batch
+    
+    Inputs broadcast to a common shape; mass_kg (optional) is used where
+    it is set, as on ThreatScenario. Casualties come from the population
+    within the destruction radius of the impact locations when a
+    population raster (see asteroids.population) and locations are
+    given, else from the average density. Returns a dict of arrays of
+    that shape keyed like the ThreatAssessment fields, plus mass_kg.
+    """
+    diameter_km, density_kg_m3, velocity_kps, impact_angle_degrees = np.broadcast_arrays(
+        *(np.asarray(values, dtype=np.float64) for values in (
+            diameter_km, density_kg_m3, velocity_kps, impact_angle_degrees
+        ))
+    )
+    
+    masses = impact_masses(diameter_km, density_kg_m3, mass_kg, exact)
+    velocity_mps = velocity_kps * 1000
+    energy_joules = kinetic_energies(masses, velocity_mps, exact)
+    energy_megatons = energy_joules / TNT_MEGATON_JOULES
+    
+    radius_km = destruction_radii(energy_megatons, exact)
+    area_km2 = destruction_areas(radius_km, exact)
+    
+    affected_population = None
+    if population is not None and impact_location_lat is not None and impact_location_lon is not None:
+        affected_population = population.population_within(impact_location_lat, impact_location_lon, radius_km)
+    deaths, injuries = casualties(area_km2, affected_population)
+    
+    return {
+        'mass_kg': np.broadcast_to(masses, diameter_km.shape),
+        'kinetic_energy_megatons': energy_megatons,
+        'crater_diameter_km': crater_diameters(energy_joules, impact_angle_degrees, exact),
+        'seismic_magnitude': seismic_magnitudes(energy_megatons, exact),
+        'overall_risk_level': risk_levels(energy_megatons, diameter_km),
+        'tsunami_risk': np.broadcast_to(
+            tsunami_risks(energy_megatons, diameter_km, impact_type), diameter_km.shape
+        ),
+        'destruction_radius_km': radius_km,
+        'estimated_deaths': deaths,
+        'estimated_injuries': injuries,
+        'economic_loss_billions_usd': economic_losses(area_km2, deaths, exact),
+        'dust_cloud_duration_days': dust_durations(energy_megatons),
+        'global_temperature_change_c': temperature_changes(energy_megatons),
+    }
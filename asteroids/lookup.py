@@ -0,0 +1,334 @@
+"""
+Precomputed Impact Effect Tables
+
+Everything the threat, seismic and climate calculators derive from an
+impact's energy alone is tabulated on a log-spaced energy grid and
+stored as a compact .npy table (a few hundred kB) with a JSON sidecar,
+opened when the app starts. Estimates for arbitrary energies then cost
+one index computation and a weighted sum per column, whatever the models
+behind them.
+
+Each column is interpolated by how it varies with energy:
+    
+    power   linear in log value over log energy, exact for power laws
+            (radii, ground motion, ejecta)
+    log     linear over log energy, exact for magnitudes
+    step    the value at the next grid point up, exact for thresholds
+            on grid energies (every power of ten is one)
+
+and then truncated, rounded or mapped to its labels like the calculator
+output. Rounded magnitudes can differ from the calculators by 0.01, and
+the capped ground acceleration by a fraction of a percent within a grid
+cell of its cap; the build_threat_tables command reports the differences.
+The Modified Mercalli intensity steps on the magnitude, between grid
+energies, so it is not tabulated: the seismic service derives it from
+the looked-up magnitude as the calculator does. Casualties and losses,
+which depend on the impact location, are left to the calculators, from
+the interpolated destruction radius.
+
+Tables are built with the build_threat_tables management command.
+Without an installed table, or with one built for another calculation
+version, a process tabulates the calculators in memory on its first
+estimate; nothing is tabulated at startup.
+"""
+import json
+import math
+import threading
+from pathlib import Path
+import numpy as np
+import logging
+
+from . import calculations
+
+logger = logging.getLogger(__name__)
+
+TABLE_VERSION = 1
+MIN_LOG10_MEGATONS = -6
+MAX_LOG10_MEGATONS = 10
+POINTS_PER_DECADE = 64
+
+# (column, interpolation, output): output is None for floats, 'int' to
+# truncate, a number of decimals to round to, or the labels of codes
+THREAT_COLUMNS = (
+    ('seismic_magnitude', 'log', 2),
+    ('destruction_radius_km', 'power', None),
+    # For vertical impacts; diameters scale with the sine of the angle
+    ('crater_diameter_km', 'power', None),
+    ('dust_cloud_duration_days', 'step', 'int'),
+    ('global_temperature_change_c', 'step', None),
+)
+SEISMIC_COLUMNS = (
+    ('moment_magnitude', 'log', 2),
+    ('richter_scale_equivalent', 'log', 2),
+    ('energy_ergs', 'power', None),
+    ('energy_joules', 'power', None),
+    ('peak_ground_acceleration_g', 'power', None),
+    ('peak_ground_velocity_mps', 'power', None),
+    ('peak_ground_displacement_m', 'power', None),
+    ('felt_radius_km', 'power', None),
+    ('severe_damage_radius_km', 'power', None),
+    ('moderate_damage_radius_km', 'power', None),
+    ('light_damage_radius_km', 'power', None),
+)
+CLIMATE_RISKS = ('moderate', 'high', 'extreme')
+CLIMATE_COLUMNS = (
+    ('dust_ejected_gigatons', 'power', None),
+    ('water_vapor_gigatons', 'power', None),
+    ('sulfur_dioxide_gigatons', 'power', None),
+    ('initial_temperature_drop_c', 'step', None),
+    ('recovery_time_years', 'step', None),
+    ('growing_season_reduction_percent', 'step', None),
+    ('crop_yield_reduction_percent', 'step', None),
+    ('ocean_temperature_drop_c', 'step', None),
+    ('phytoplankton_reduction_percent', 'step', None),
+    ('species_extinction_percent', 'step', None),
+    ('ecosystem_recovery_years', 'step', None),
+    ('food_security_risk', 'step', CLIMATE_RISKS),
+    ('water_security_risk', 'step', CLIMATE_RISKS),
+    ('health_impact_severity', 'step', CLIMATE_RISKS),
+)
+COLUMN_GROUPS = {
+    'threat': THREAT_COLUMNS,
+    'seismic': SEISMIC_COLUMNS,
+    'climate': CLIMATE_COLUMNS,
+}
+
+_table = None
+_table_lock = threading.Lock()
+
+
+def energy_grid(min_log10=MIN_LOG10_MEGATONS, max_log10=MAX_LOG10_MEGATONS,
+                points_per_decade=POINTS_PER_DECADE):
+    """Grid energies in megatons; powers of ten fall exactly on grid points"""
+    steps = np.arange((max_log10 - min_log10) * points_per_decade + 1)
+    return 10.0 ** (min_log10 + steps / points_per_decade)
+
+
+def _encode(values, output):
+    """Numeric column values, labels as their codes"""
+    if isinstance(output, tuple):
+        return [output.index(value) for value in values]
+    return values
+
+
+def tabulate(energies):
+    """(energies, columns) table of every column, in COLUMN_GROUPS order"""
+    from seismic.services import SeismicCalculationService
+    from safety.services import ClimateModelingService
+    
+    energies = np.asarray(energies, dtype=np.float64)
+    radius_km = calculations.destruction_radii(energies)
+    
+    columns = {
+        'seismic_magnitude': calculations.seismic_magnitudes(energies),
+        'destruction_radius_km': radius_km,
+        'crater_diameter_km': calculations.crater_diameters(
+            energies * calculations.TNT_MEGATON_JOULES, 90.0
+        ),
+        'dust_cloud_duration_days': calculations.dust_durations(energies),
+        'global_temperature_change_c': calculations.temperature_changes(energies),
+    }
+    
+    # The seismic and climate calculators are scalar; the grid is small
+    seismic = SeismicCalculationService()
+    climate = ClimateModelingService()
+    rows = [
+        {**seismic.seismic_effects(energy, radius), **climate.climate_effects(energy)}
+        for energy, radius in zip(energies.tolist(), radius_km.tolist())
+    ]
+    for name, _, output in SEISMIC_COLUMNS + CLIMATE_COLUMNS:
+        columns[name] = _encode([row[name] for row in rows], output)
+    
+    return np.column_stack([
+        np.asarray(columns[name], dtype=np.float64)
+        for group in COLUMN_GROUPS.values() for name, _, _ in group
+    ])
+
+
+def _metadata(count, source):
+    return {
+        'version': TABLE_VERSION,
+        'calculation_version': calculations.CALCULATION_VERSION,
+        'min_log10_megatons': MIN_LOG10_MEGATONS,
+        'points_per_decade': POINTS_PER_DECADE,
+        'count': count,
+        'columns': [name for group in COLUMN_GROUPS.values() for name, _, _ in group],
+        'source': source,
+    }
+
+
+def build_table(path):
+    """Tabulate every column and write the .npy table and its JSON sidecar"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    
+    values = tabulate(energy_grid())
+    np.save(path, values)
+    
+    metadata = _metadata(len(values), 'calculators')
+    path.with_suffix('.json').write_text(json.dumps(metadata, indent=2))
+    
+    return metadata
+
+
+class EffectsTable:
+    """An impact effect table, split into its column groups"""
+    
+    def __init__(self, values, metadata):
+        self.values = values
+        self.metadata = metadata
+        self.min_log10 = metadata['min_log10_megatons']
+        self.points_per_decade = metadata['points_per_decade']
+        self.count = metadata['count']
+        self.max_log10 = self.min_log10 + (self.count - 1) / self.points_per_decade
+        self.columns = {name: index for index, name in enumerate(metadata['columns'])}
+        
+        # Power columns are interpolated as logarithms, taken once here
+        self.groups = {}
+        for group, specs in COLUMN_GROUPS.items():
+            indexes = [self.columns[name] for name, _, _ in specs]
+            values = np.array(self.values[:, indexes])
+            power = [kind == 'power' for _, kind, _ in specs]
+            values[:, power] = np.log(values[:, power])
+            self.groups[group] = (specs, values, np.array([kind for _, kind, _ in specs]))
+    
+    @classmethod
+    def load(cls, path):
+        path = Path(path)
+        metadata = json.loads(path.with_suffix('.json').read_text())
+        return cls(np.load(path), metadata)
+    
+    def covers(self, energy_megatons):
+        return energy_megatons > 0 and self.min_log10 <= math.log10(energy_megatons) <= self.max_log10
+    
+    def lookup(self, energy_megatons, group):
+        """
+        Interpolated values of a group's columns at one energy
+        
+        Returns a dict keyed by column, converted like the calculator
+        output. energy_megatons must be covered by the table.
+        """
+        specs, values, kinds = self.groups[group]
+        
+        position = (math.log10(energy_megatons) - self.min_log10) * self.points_per_decade
+        index = min(int(position), self.count - 2)
+        fraction = position - index
+        
+        low, high = values[index], values[index + 1]
+        
+        weights = np.full(len(specs), fraction)
+        weights[kinds == 'step'] = 1.0 if fraction > 0 else 0.0
+        
+        interpolated = low + weights * (high - low)
+        interpolated[kinds == 'power'] = np.exp(interpolated[kinds == 'power'])
+        
+        result = {}
+        for (name, _, output), value in zip(specs, interpolated.tolist()):
+            if output is None:
+                result[name] = value
+            elif output == 'int':
+                result[name] = int(value)
+            elif isinstance(output, tuple):
+                result[name] = output[int(round(value))]
+            else:
+                result[name] = round(value, output)
+        
+        return result
+
+
+def deviations(table, energies):
+    """
+    {column: (energies where the lookup differs, largest difference,
+    largest relative difference)}
+    
+    Compared against the calculators at each energy; labels count as
+    differing when they are not the same label.
+    """
+    exact = tabulate(energies)
+    names = [name for group in COLUMN_GROUPS.values() for name, _, _ in group]
+    interpolated = np.array([
+        [
+            value
+            for group, specs in COLUMN_GROUPS.items()
+            for (name, _, output), value in zip(
+                specs, _encode_row(table.lookup(energy, group), specs)
+            )
+        ]
+        for energy in np.asarray(energies, dtype=np.float64).tolist()
+    ])
+    
+    difference = np.abs(interpolated - exact)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        relative = np.where(difference > 0, difference / np.abs(exact), 0.0)
+    
+    return {
+        name: (
+            int(np.count_nonzero(difference[:, index])),
+            float(np.max(difference[:, index])),
+            float(np.max(relative[:, index])),
+        )
+        for index, name in enumerate(names)
+    }
+
+
+def _encode_row(values, specs):
+    return [
+        output.index(values[name]) if isinstance(output, tuple) else values[name]
+        for name, _, output in specs
+    ]
+
+
+def _compatible(path):
+    """Whether a table exists at path with every column of this calculation version"""
+    sidecar = path.with_suffix('.json')
+    if not path.exists() or not sidecar.exists():
+        return False
+    
+    metadata = json.loads(sidecar.read_text())
+    return (
+        metadata.get('version') == TABLE_VERSION
+        and metadata.get('calculation_version') == calculations.CALCULATION_VERSION
+        and all(name in metadata.get('columns', ()) for group in COLUMN_GROUPS.values() for name, _, _ in group)
+    )
+
+
+def load_installed_table():
+    """
+    Open the installed table for this process if there is a current one
+    
+    Called when the app starts, so estimates need no disk access; never
+    tabulates, which is left to get_table on first use.
+    """
+    global _table
+    
+    from django.conf import settings
+    
+    path = Path(settings.THREAT_TABLE_PATH)
+    with _table_lock:
+        if _table is None and _compatible(path):
+            _table = EffectsTable.load(path)
+
+
+def get_table():
+    """
+    The shared table for this process
+    
+    Without an installed table for the current calculation version, one
+    is tabulated in memory from the calculators on first use.
+    """
+    global _table
+    
+    if _table is None:
+        with _table_lock:
+            if _table is None:
+                from django.conf import settings
+                
+                path = Path(settings.THREAT_TABLE_PATH)
+                if _compatible(path):
+                    _table = EffectsTable.load(path)
+                else:
+                    logger.warning(f"No current threat table at {path}; tabulating the calculators")
+                    values = tabulate(energy_grid())
+                    _table = EffectsTable(values, _metadata(len(values), 'memory'))
+    
+    return _table
@@ -0,0 +1,66 @@
+"""
+Measure database queries per threat assessment recalculation
+"""
+import time
+from django.core.management.base import BaseCommand, CommandError
+from asteroids.models import DestructionZone, ThreatScenario
+from asteroids.services import ThreatCalculationService
+from meteor_madness.instrumentation import QueryCounter
+
+
+class Command(BaseCommand):
+    help = 'Recalculate active scenario assessments and report queries per assessment'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, help='Number of active scenarios (default: all)')
+        parser.add_argument(
+            '--skip-baseline',
+            action='store_true',
+            help='Skip writing the zones with one update_or_create per zone for comparison'
+        )
+    
+    def handle(self, *args, **options):
+        scenarios = list(ThreatScenario.objects.filter(is_active=True)[:options['limit']])
+        if not scenarios:
+            raise CommandError('At least one active scenario is needed')
+        
+        service = ThreatCalculationService()
+        locations = [(scenario.impact_location_lat, scenario.impact_location_lon) for scenario in scenarios]
+        
+        started = time.perf_counter()
+        with QueryCounter() as queries:
+            assessments = service.calculate_scenario_threats(scenarios, raise_errors=True)
+        self._report('Recalculation', queries, len(assessments), time.perf_counter() - started)
+        
+        started = time.perf_counter()
+        with QueryCounter() as queries:
+            service.save_destruction_zones(assessments, locations)
+        self._report('Zones, bulk upsert', queries, len(assessments), time.perf_counter() - started)
+        
+        if not options['skip_baseline']:
+            started = time.perf_counter()
+            with QueryCounter() as queries:
+                self._baseline(service, assessments, locations)
+            self._report('Zones, update_or_create', queries, len(assessments), time.perf_counter() - started)
+    
+    def _report(self, label, queries, count, elapsed):
+        self.stdout.write(
+            f"{label}: {count} assessments, {queries.count} queries "
+            f"({queries.per(count):.1f} per assessment) in {elapsed:.2f}s"
+        )
+    
+    def _baseline(self, service, assessments, locations):
+        """One update_or_create per zone, as zones were written before the bulk upsert"""
+        for zone in service._build_destruction_zones(assessments, locations):
+            DestructionZone.objects.update_or_create(
+                assessment=zone.assessment,
+                zone_type=zone.zone_type,
+                defaults={
+                    'radius_km': zone.radius_km,
+                    'area_km2': zone.area_km2,
+                    'overpressure_psi': zone.overpressure_psi,
+                    'fatality_rate': zone.fatality_rate,
+                    'estimated_casualties': zone.estimated_casualties,
+                    'estimated_injuries': zone.estimated_injuries
+                }
+            )
@@ -0,0 +1,44 @@
+"""
+Build the precomputed impact effect table
+"""
+import time
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from asteroids.lookup import EffectsTable, build_table, deviations, energy_grid
+
+
+class Command(BaseCommand):
+    help = 'Tabulate threat, seismic and climate effects over impact energy for interpolated estimates'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help='Table path (default: THREAT_TABLE_PATH)')
+        parser.add_argument(
+            '--no-check', action='store_true',
+            help='Skip comparing interpolated values with the calculators between grid points'
+        )
+    
+    def handle(self, *args, **options):
+        output = options['output'] or settings.THREAT_TABLE_PATH
+        
+        started = time.perf_counter()
+        metadata = build_table(output)
+        elapsed = time.perf_counter() - started
+        
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {metadata['count']} energies x {len(metadata['columns'])} columns "
+            f"to {output} in {elapsed:.1f}s"
+        ))
+        
+        if options['no_check']:
+            return
+        
+        # Cell midpoints, where interpolation is furthest from the grid
+        grid = energy_grid()
+        midpoints = np.sqrt(grid[1:] * grid[:-1])
+        
+        for column, (differing, largest, relative) in deviations(EffectsTable.load(output), midpoints).items():
+            self.stdout.write(
+                f"  {column:<34} {differing:>5}/{len(midpoints)} differ, "
+                f"by up to {largest:.3g} ({relative:.1e} relative)"
+            )
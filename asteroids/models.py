@@ -137,6 +137,11 @@ class ThreatAssessment(models.Model):
     # System fields
     calculated_at = models.DateTimeField(auto_now=True)
     calculation_version = models.CharField(max_length=20, default='1.0')
+    input_hash = models.CharField(
+        max_length=40,
+        blank=True,
+        help_text="Hash of the inputs and calculation version these values were derived from"
+    )
     
     class Meta:
         db_table = 'threat_assessments'
@@ -192,3 +197,110 @@ class DestructionZone(models.Model):
     def __str__(self):
         return f"{self.zone_type} - {self.radius_km}km radius"
 
+
+
+class UncertaintyRun(models.Model):
+    """
+    Impact effect percentiles of input samples drawn around a scenario
+    """
+    
+    scenario = models.ForeignKey(
+        ThreatScenario,
+        on_delete=models.CASCADE,
+        related_name='uncertainty_runs'
+    )
+    
+    # Run Parameters
+    num_samples = models.IntegerField()
+    seed = models.BigIntegerField(help_text="Root seed; the same seed reproduces the run")
+    input_sigmas = models.JSONField(help_text="1-sigma of each input (of its logarithm, or in degrees)")
+    population_weighted = models.BooleanField(
+        default=False,
+        help_text="Deaths from the population raster around the impact location"
+    )
+    
+    # Results
+    energy_p05_megatons = models.FloatField()
+    energy_p50_megatons = models.FloatField()
+    energy_p95_megatons = models.FloatField()
+    crater_diameter_p05_km = models.FloatField()
+    crater_diameter_p50_km = models.FloatField()
+    crater_diameter_p95_km = models.FloatField()
+    deaths_p05 = models.BigIntegerField()
+    deaths_p50 = models.BigIntegerField()
+    deaths_p95 = models.BigIntegerField()
+    economic_loss_p05_billions_usd = models.FloatField()
+    economic_loss_p50_billions_usd = models.FloatField()
+    economic_loss_p95_billions_usd = models.FloatField()
+    
+    duration_seconds = models.FloatField(default=0)
+    calculated_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'uncertainty_runs'
+        ordering = ['-calculated_at']
+        verbose_name = 'Uncertainty Run'
+        verbose_name_plural = 'Uncertainty Runs'
+    
+    def __str__(self):
+        return f"Uncertainty: {self.scenario.name} ({self.num_samples} samples)"
+
+
+class CalculationJob(models.Model):
+    """
+    A calculation submitted through the API and run on Celery
+    
+    Identical submissions share a params_hash; while one is queued or
+    running, the database lets no second job with that hash exist, so
+    concurrent submissions coalesce onto it.
+    """
+    
+    KIND_CHOICES = [
+        ('threat_assessment', 'Threat Assessment'),
+        ('seismic_analysis', 'Seismic Analysis'),
+    ]
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    ]
+    ACTIVE_STATUSES = ('queued', 'running')
+    
+    kind = models.CharField(max_length=30, choices=KIND_CHOICES)
+    params = models.JSONField()
+    params_hash = models.CharField(max_length=40, db_index=True, help_text="Hash of kind and params")
+    
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued', db_index=True)
+    task_id = models.CharField(max_length=255, blank=True)
+    result_id = models.BigIntegerField(
+        blank=True,
+        null=True,
+        help_text="Id of the assessment or analysis calculated"
+    )
+    error = models.TextField(blank=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    completed_at = models.DateTimeField(blank=True, null=True)
+    
+    class Meta:
+        db_table = 'calculation_jobs'
+        ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['params_hash'],
+                condition=models.Q(status__in=['queued', 'running']),
+                name='unique_active_calculation_job'
+            ),
+        ]
+        verbose_name = 'Calculation Job'
+        verbose_name_plural = 'Calculation Jobs'
+    
+    def __str__(self):
+        return f"{self.get_kind_display()} job {self.id} ({self.status})"
+    
+    @staticmethod
+    def channel_group(job_id):
+        """Channel layer group of a job's subscribers"""
+        return f'calculation_job_{job_id}'
@@ -2,7 +2,14 @@
 Asteroid Threat Assessment Serializers
 """
 from rest_framework import serializers
-from .models import ThreatScenario, ThreatAssessment, DestructionZone
+from rest_framework.reverse import reverse
+from .models import ThreatScenario, ThreatAssessment, DestructionZone, UncertaintyRun, CalculationJob
+
+# Detail view of each job kind's result
+JOB_RESULT_VIEWS = {
+    'threat_assessment': 'threat-assessment-detail',
+    'seismic_analysis': 'seismic-analysis-detail',
+}
 
 
 class DestructionZoneSerializer(serializers.ModelSerializer):
@@ -33,7 +40,7 @@ class ThreatAssessmentSerializer(serializers.ModelSerializer):
             'estimated_deaths', 'estimated_injuries', 'economic_loss_billions_usd',
             'seismic_magnitude', 'tsunami_risk',
             'dust_cloud_duration_days', 'global_temperature_change_c',
-            'destruction_zones', 'calculated_at', 'calculation_version'
+            'destruction_zones', 'calculated_at', 'calculation_version', 'input_hash'
         ]
 
 
@@ -58,3 +65,31 @@ class ThreatScenarioListSerializer(serializers.ModelSerializer):
             'impact_type', 'scenario_type'
         ]
 
+
+
+class UncertaintyRunSerializer(serializers.ModelSerializer):
+    """Serializer for impact effect uncertainty runs"""
+    
+    scenario_name = serializers.CharField(source='scenario.name', read_only=True)
+    
+    class Meta:
+        model = UncertaintyRun
+        fields = '__all__'
+
+
+class CalculationJobSerializer(serializers.ModelSerializer):
+    """Serializer for calculation job status"""
+    
+    result_url = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = CalculationJob
+        fields = [
+            'id', 'kind', 'params', 'status', 'result_id', 'result_url',
+            'error', 'created_at', 'started_at', 'completed_at'
+        ]
+    
+    def get_result_url(self, obj):
+        if obj.result_id is None:
+            return None
+        return reverse(JOB_RESULT_VIEWS[obj.kind], args=[obj.result_id], request=self.context.get('request'))
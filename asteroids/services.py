@@ -1,12 +1,100 @@
 """
 Asteroid Threat Calculation Services
 """
+import json
 import math
-from .models import ThreatAssessment, DestructionZone
+import secrets
+import time
+from datetime import timedelta
+from functools import partial
+import numpy as np
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F, OuterRef, Q, Subquery
+from django.utils import timezone
+from meteor_madness.parallel import map_chunks
+from neos.models import NEO, CloseApproach
+from orbital.models import MonteCarloRun
+from orbital.montecarlo import spawn_chunks
+from . import calculations
+from .lookup import get_table
+from .models import ThreatScenario, ThreatAssessment, DestructionZone, UncertaintyRun, CalculationJob
+from .population import get_raster, raster_signature
+from .sweep import FLOAT_TYPES, grid_shape, sweep_block
+from .uncertainty import INPUT_SIGMAS, RadialPopulation, percentiles, sample_chunk
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Sweeps of at least this many cells are spread across the process pool
+SWEEP_PARALLEL_CELLS = 50000
+SWEEP_BLOCK_CELLS = 20000
+
+UNCERTAINTY_CHUNK_SAMPLES = 100000
+
+# Jobs running this long after a worker started them (past the task's hard
+# time limit), or queued this long after submission, are presumed lost with
+# their worker or broker message and stop absorbing submissions. The queue
+# allowance is long so that a backlog does not fail jobs not yet started.
+CALCULATION_JOB_TIMEOUT_SECONDS = 900
+CALCULATION_JOB_QUEUE_TIMEOUT_SECONDS = 6 * 3600
+
+# Catalogue NEOs are assessed as land impacts at the most probable angle,
+# at this speed when they have no recorded close approach
+NEO_IMPACT_ANGLE_DEGREES = 45
+NEO_IMPACT_TYPE = 'land'
+DEFAULT_NEO_VELOCITY_KPS = 20.0
+NEO_CHUNK_SIZE = 1000
+ASSESSMENT_RESULT_FIELDS = [
+    'overall_risk_level', 'impact_probability',
+    'kinetic_energy_megatons', 'crater_diameter_km', 'destruction_radius_km',
+    'estimated_deaths', 'estimated_injuries', 'economic_loss_billions_usd',
+    'seismic_magnitude', 'tsunami_risk',
+    'dust_cloud_duration_days', 'global_temperature_change_c'
+]
+ASSESSMENT_UPDATE_FIELDS = ASSESSMENT_RESULT_FIELDS + ['calculated_at', 'calculation_version', 'input_hash']
+
+# In increasing radius; each zone's casualties are those of its ring
+DESTRUCTION_ZONES = [
+    {
+        'zone_type': 'total',
+        'overpressure_psi': 20,
+        'fatality_rate': 0.95,
+        'radius_multiplier': 0.5
+    },
+    {
+        'zone_type': 'severe',
+        'overpressure_psi': 10,
+        'fatality_rate': 0.50,
+        'radius_multiplier': 0.75
+    },
+    {
+        'zone_type': 'moderate',
+        'overpressure_psi': 5,
+        'fatality_rate': 0.15,
+        'radius_multiplier': 1.0
+    },
+    {
+        'zone_type': 'light',
+        'overpressure_psi': 2,
+        'fatality_rate': 0.02,
+        'radius_multiplier': 1.5
+    },
+    {
+        'zone_type': 'glass_breakage',
+        'overpressure_psi': 0.5,
+        'fatality_rate': 0.001,
+        'radius_multiplier': 2.5
+    }
+]
+ZONE_UPDATE_FIELDS = [
+    'radius_km', 'area_km2', 'overpressure_psi', 'fatality_rate',
+    'estimated_casualties', 'estimated_injuries'
+]
+ZONE_BATCH_SIZE = 1000
+
 
 class ThreatCalculationService:
     """Service for calculating asteroid threat assessments"""
@@ -14,21 +102,116 @@ class ThreatCalculationService:
     def __init__(self):
         self.GRAVITATIONAL_CONSTANT = 6.67430e-11  # m³/kg/s²
         self.TNT_EQUIVALENT_JOULES = 4.184e15  # 1 megaton TNT in joules
+        self.DEFAULT_IMPACT_PROBABILITY = 0.01  # Without a Monte Carlo estimate
+    
+    def calculate_scenario_threat(self, scenario, force=False):
+        """
+        Calculate complete threat assessment for a scenario
+        
+        Assessments are keyed by a hash of the scenario's inputs and the
+        calculation version: while the stored input_hash matches, the
+        stored assessment is returned as it is (unless force is set), and
+        computed results are memoized in the cache under the hash, so
+        scenarios with the same inputs are computed once.
+        """
+        if not force:
+            existing = self.stored_assessment(scenario)
+            if existing is not None:
+                return existing
+        
+        assessments = self.calculate_scenario_threats([scenario], raise_errors=True)
+        return assessments[0]
+    
+    def calculate_scenario_threats(self, scenarios, raise_errors=False):
+        """
+        Recalculate the assessments of several scenarios
+        
+        Assessments are saved one by one and the destruction zones of all
+        of them in a single upsert. A scenario that fails is logged and
+        left out of the returned assessments, unless raise_errors is set.
+        """
+        assessments = []
+        locations = []
+        
+        for scenario in scenarios:
+            try:
+                assessments.append(self._save_scenario_assessment(scenario))
+                locations.append((scenario.impact_location_lat, scenario.impact_location_lon))
+            except Exception as e:
+                if raise_errors:
+                    raise
+                logger.error(f"Error calculating threat for {scenario.name}: {e}")
+        
+        self.save_destruction_zones(assessments, locations)
+        
+        return assessments
     
-    def calculate_scenario_threat(self, scenario):
-        """Calculate complete threat assessment for a scenario"""
+    def _save_scenario_assessment(self, scenario):
+        """Create or update a scenario's assessment, from the cache when the inputs were seen before"""
+        input_hash = self.scenario_input_hash(scenario)
+        
+        key = f"asteroids:threat:{input_hash}"
+        results = cache.get(key)
+        if results is None:
+            results = self._scenario_results(scenario)
+            cache.set(key, results, timeout=None)
+        
+        assessment, created = ThreatAssessment.objects.update_or_create(
+            scenario=scenario,
+            defaults={
+                **results,
+                'input_hash': input_hash,
+                'calculation_version': calculations.CALCULATION_VERSION,
+            }
+        )
         
+        return assessment
+    
+    def scenario_input_hash(self, scenario):
+        """Hash of everything a scenario's assessment is derived from"""
+        return calculations.input_hash(
+            scenario.diameter_km,
+            scenario.mass_kg,
+            scenario.velocity_kps,
+            scenario.density_kg_m3,
+            scenario.impact_angle_degrees,
+            scenario.impact_type,
+            scenario.impact_location_lat,
+            scenario.impact_location_lon,
+            self._impact_probability(),
+            self._population_signature(scenario.impact_location_lat, scenario.impact_location_lon)
+        )
+    
+    def _population_signature(self, lat, lon):
+        """The population raster used for a location, if any"""
+        if lat is None or lon is None:
+            return None
+        return raster_signature()
+    
+    def stored_assessment(self, scenario):
+        """The scenario's stored assessment if it is current, else None"""
+        return ThreatAssessment.objects.filter(
+            scenario=scenario, input_hash=self.scenario_input_hash(scenario)
+        ).first()
+    
+    def stale_scenarios(self, scenarios):
+        """Scenarios with no assessment, or one derived from other inputs or another version"""
+        stored = dict(
+            ThreatAssessment.objects.filter(scenario__in=scenarios).values_list('scenario_id', 'input_hash')
+        )
+        return [
+            scenario for scenario in scenarios
+            if stored.get(scenario.id) != self.scenario_input_hash(scenario)
+        ]
+    
+    def _scenario_results(self, scenario):
+        """Assessment field values for a scenario, without saving anything"""
         # Calculate mass if not provided
-        if not scenario.mass_kg:
-            volume_m3 = (4/3) * math.pi * ((scenario.diameter_km * 1000 / 2) ** 3)
-            mass_kg = volume_m3 * scenario.density_kg_m3
-        else:
-            mass_kg = scenario.mass_kg
+        mass_kg = self._scenario_mass(scenario)
         
         # Calculate kinetic energy
         velocity_mps = scenario.velocity_kps * 1000
-        kinetic_energy_joules = 0.5 * mass_kg * (velocity_mps ** 2)
-        energy_megatons = kinetic_energy_joules / self.TNT_EQUIVALENT_JOULES
+        energy_megatons = self._scenario_energy(scenario)
         
         # Calculate crater diameter (Holsapple-Schmidt scaling)
         crater_diameter_km = self._calculate_crater_diameter(
@@ -70,29 +253,313 @@ class ThreatCalculationService:
             estimated_deaths
         )
         
-        # Create or update threat assessment
-        assessment, created = ThreatAssessment.objects.update_or_create(
-            scenario=scenario,
-            defaults={
-                'overall_risk_level': risk_level,
-                'impact_probability': 0.01,  # Default low probability
-                'kinetic_energy_megatons': energy_megatons,
-                'crater_diameter_km': crater_diameter_km,
-                'destruction_radius_km': destruction_radius_km,
-                'estimated_deaths': estimated_deaths,
-                'estimated_injuries': estimated_injuries,
-                'economic_loss_billions_usd': economic_loss,
-                'seismic_magnitude': seismic_magnitude,
-                'tsunami_risk': tsunami_risk,
-                'dust_cloud_duration_days': self._estimate_dust_duration(energy_megatons),
-                'global_temperature_change_c': self._estimate_temperature_change(energy_megatons),
-            }
+        return {
+            'overall_risk_level': risk_level,
+            'impact_probability': self._impact_probability(),
+            'kinetic_energy_megatons': energy_megatons,
+            'crater_diameter_km': crater_diameter_km,
+            'destruction_radius_km': destruction_radius_km,
+            'estimated_deaths': estimated_deaths,
+            'estimated_injuries': estimated_injuries,
+            'economic_loss_billions_usd': economic_loss,
+            'seismic_magnitude': seismic_magnitude,
+            'tsunami_risk': tsunami_risk,
+            'dust_cloud_duration_days': self._estimate_dust_duration(energy_megatons),
+            'global_temperature_change_c': self._estimate_temperature_change(energy_megatons),
+        }
+    
+    def calculate_neo_threats(self, neo_ids=None, force=False, chunk_size=NEO_CHUNK_SIZE):
+        """
+        Assess catalogue NEOs in bulk
+        
+        NEOs with no assessment, or one calculated before their data was
+        last synced or under another calculation version (every NEO with
+        force), are processed in id order, chunk_size at a time: the
+        chunk's inputs are read in one query (see _neo_inputs), evaluated
+        with the vectorized calculations, and its assessments and
+        destruction zones upserted in one transaction. An interrupted run
+        loses at most the chunk in progress; the next run picks up the
+        NEOs still outdated.
+        """
+        neos = NEO.objects.all()
+        if neo_ids is not None:
+            neos = neos.filter(id__in=neo_ids)
+        if not force:
+            neos = neos.filter(
+                Q(threat_assessment__isnull=True)
+                | Q(threat_assessment__calculated_at__lt=F('last_synced_at'))
+                | ~Q(threat_assessment__calculation_version=calculations.CALCULATION_VERSION)
+            )
+        
+        rows = neos.annotate(
+            approach_velocity_kps=Subquery(
+                CloseApproach.objects.filter(neo=OuterRef('pk'))
+                .order_by('miss_distance_astronomical')
+                .values('relative_velocity_kps')[:1]
+            ),
+            monte_carlo_probability=Subquery(
+                MonteCarloRun.objects.filter(neo=OuterRef('pk'))
+                .order_by('-calculated_at')
+                .values('impact_probability')[:1]
+            )
+        ).order_by('id').values(
+            'id', 'absolute_magnitude_h', 'estimated_diameter_min_km', 'estimated_diameter_max_km',
+            'approach_velocity_kps', 'monte_carlo_probability'
         )
         
-        # Calculate destruction zones
-        self._calculate_destruction_zones(assessment, energy_megatons)
+        processed = 0
+        last_id = 0
         
-        return assessment
+        while True:
+            chunk = list(rows.filter(id__gt=last_id)[:chunk_size])
+            if not chunk:
+                break
+            
+            inputs = self._neo_inputs(chunk)
+            results = calculations.calculate_threats(
+                inputs['diameter_km'], inputs['density_kg_m3'], inputs['velocity_kps'],
+                NEO_IMPACT_ANGLE_DEGREES, NEO_IMPACT_TYPE
+            )
+            columns = {field: values.tolist() for field, values in results.items()}
+            columns.update({name: values.tolist() for name, values in inputs.items()})
+            
+            assessments = []
+            for index, row in enumerate(chunk):
+                values = {field: column[index] for field, column in columns.items()}
+                assessments.append(ThreatAssessment(
+                    neo_id=row['id'],
+                    **{field: values[field] for field in ASSESSMENT_RESULT_FIELDS},
+                    calculation_version=calculations.CALCULATION_VERSION,
+                    input_hash=calculations.input_hash(
+                        values['diameter_km'], values['density_kg_m3'], values['velocity_kps'],
+                        NEO_IMPACT_ANGLE_DEGREES, NEO_IMPACT_TYPE, values['impact_probability']
+                    )
+                ))
+            
+            with transaction.atomic():
+                ThreatAssessment.objects.bulk_create(
+                    assessments,
+                    update_conflicts=True,
+                    unique_fields=['neo'],
+                    update_fields=ASSESSMENT_UPDATE_FIELDS
+                )
+                self.save_destruction_zones(assessments)
+            
+            processed += len(chunk)
+            last_id = chunk[-1]['id']
+            logger.info(f"NEO threat assessments: {processed} NEOs")
+        
+        return {'neos_processed': processed}
+    
+    def _neo_inputs(self, rows):
+        """
+        Threat calculation inputs of NEO rows, as arrays
+        
+        The diameter is the mean of the NASA estimates, else derived from
+        the absolute magnitude; the density is the default of its size
+        class; the impact speed follows from the relative speed of the
+        NEO's closest recorded approach; and the impact probability is
+        that of its latest Monte Carlo run, as in _impact_probability.
+        """
+        def column(name):
+            return np.array([row[name] for row in rows], dtype=np.float64)
+        
+        diameter_km = (column('estimated_diameter_min_km') + column('estimated_diameter_max_km')) / 2
+        diameter_km = np.where(
+            np.isnan(diameter_km), calculations.magnitude_diameters(column('absolute_magnitude_h')), diameter_km
+        )
+        
+        velocity_kps = column('approach_velocity_kps')
+        velocity_kps = np.where(
+            np.isnan(velocity_kps), DEFAULT_NEO_VELOCITY_KPS, calculations.impact_velocities(velocity_kps)
+        )
+        
+        probability = column('monte_carlo_probability')
+        
+        return {
+            'diameter_km': diameter_km,
+            'density_kg_m3': calculations.neo_densities(diameter_km),
+            'velocity_kps': velocity_kps,
+            'impact_probability': np.where(np.isnan(probability), self.DEFAULT_IMPACT_PROBABILITY, probability),
+        }
+    
+    def estimate_threat(self, diameter_km, velocity_kps, density_kg_m3=2600, impact_angle_degrees=45,
+                        impact_type='land', mass_kg=None, impact_location_lat=None,
+                        impact_location_lon=None, exact=False):
+        """
+        Assessment field values for a hypothetical impact, without saving anything
+        
+        The energy is computed directly and everything derived from it is
+        interpolated from the threat table (see asteroids.lookup); risk
+        levels come from their thresholds, and casualties and losses from
+        the interpolated destruction radius. The values are computed
+        exactly instead when exact is set or the energy lies outside the
+        table. 'source' tells which it was.
+        """
+        scenario = ThreatScenario(
+            diameter_km=diameter_km,
+            velocity_kps=velocity_kps,
+            density_kg_m3=density_kg_m3,
+            impact_angle_degrees=impact_angle_degrees,
+            impact_type=impact_type,
+            mass_kg=mass_kg,
+            impact_location_lat=impact_location_lat,
+            impact_location_lon=impact_location_lon
+        )
+        
+        table = get_table()
+        energy_megatons = self._scenario_energy(scenario)
+        
+        if exact or not table.covers(energy_megatons):
+            return {**self._scenario_results(scenario), 'source': 'exact'}
+        
+        values = table.lookup(energy_megatons, 'threat')
+        values['crater_diameter_km'] *= math.sin(math.radians(impact_angle_degrees))
+        
+        radius_km = values['destruction_radius_km']
+        deaths, injuries = self._estimate_casualties(radius_km, impact_location_lat, impact_location_lon)
+        
+        return {
+            **values,
+            'estimated_deaths': deaths,
+            'estimated_injuries': injuries,
+            'economic_loss_billions_usd': self._estimate_economic_loss(radius_km, deaths),
+            'overall_risk_level': self._determine_risk_level(energy_megatons, diameter_km),
+            'tsunami_risk': self._calculate_tsunami_risk(energy_megatons, diameter_km, impact_type),
+            'impact_probability': self._impact_probability(),
+            'kinetic_energy_megatons': energy_megatons,
+            'source': 'table',
+        }
+    
+    def _scenario_mass(self, scenario):
+        """The scenario's mass, or that of a sphere of its diameter and density"""
+        if not scenario.mass_kg:
+            volume_m3 = (4/3) * math.pi * ((scenario.diameter_km * 1000 / 2) ** 3)
+            return volume_m3 * scenario.density_kg_m3
+        return scenario.mass_kg
+    
+    def _scenario_energy(self, scenario):
+        """Kinetic energy at impact in megatons"""
+        velocity_mps = scenario.velocity_kps * 1000
+        kinetic_energy_joules = 0.5 * self._scenario_mass(scenario) * (velocity_mps ** 2)
+        return kinetic_energy_joules / self.TNT_EQUIVALENT_JOULES
+    
+    def calculate_batch(self, diameter_km, density_kg_m3, velocity_kps, impact_angle_degrees,
+                        impact_type='land', mass_kg=None, exact=True,
+                        impact_location_lat=None, impact_location_lon=None):
+        """
+        Impact effects for arrays of scenario parameters in one vectorized pass
+        
+        Nothing is saved. Returns a dict of arrays keyed like the
+        ThreatAssessment fields, equal to what calculate_scenario_threat
+        stores for each scenario (see asteroids.calculations).
+        """
+        return calculations.calculate_threats(
+            diameter_km, density_kg_m3, velocity_kps, impact_angle_degrees,
+            impact_type=impact_type, mass_kg=mass_kg, exact=exact,
+            impact_location_lat=impact_location_lat,
+            impact_location_lon=impact_location_lon,
+            population=get_raster() if impact_location_lat is not None else None
+        )
+    
+    def sweep(self, axes, fields, exact=True, dtype='float64', workers=None, block_cells=SWEEP_BLOCK_CELLS):
+        """
+        Evaluate a parameter sweep grid block by block
+        
+        axes maps every sweep axis to its values (see asteroids.sweep).
+        Yields (cell offset, columns) for consecutive blocks of
+        block_cells cells, in order; grids of at least
+        SWEEP_PARALLEL_CELLS cells are computed across the process pool.
+        """
+        cells = int(np.prod(grid_shape(axes)))
+        if cells < SWEEP_PARALLEL_CELLS:
+            workers = 1
+        
+        blocks = [
+            (offset, min(block_cells, cells - offset))
+            for offset in range(0, cells, block_cells)
+        ]
+        evaluate = partial(
+            sweep_block, axes=axes, fields=fields, exact=exact, float_type=FLOAT_TYPES[dtype]
+        )
+        
+        yield from map_chunks(evaluate, blocks, workers)
+    
+    def run_uncertainty(self, scenario, num_samples=100000, sigmas=None, seed=None, workers=None,
+                        chunk_size=UNCERTAINTY_CHUNK_SAMPLES):
+        """
+        Percentiles of a scenario's impact effects under input uncertainty
+        
+        Inputs are sampled around the scenario's values with the given
+        1-sigmas (INPUT_SIGMAS by default, see asteroids.uncertainty) and
+        evaluated in chunks across the process pool. The run is stored
+        with its seed, which reproduces it.
+        """
+        sigmas = {**INPUT_SIGMAS, **(sigmas or {})}
+        if seed is None:
+            seed = secrets.randbits(63)
+        
+        nominal = {
+            'diameter_km': scenario.diameter_km,
+            'density_kg_m3': scenario.density_kg_m3,
+            'velocity_kps': scenario.velocity_kps,
+            'impact_angle_degrees': scenario.impact_angle_degrees,
+            'mass_kg': scenario.mass_kg,
+        }
+        
+        profile = None
+        lat, lon = scenario.impact_location_lat, scenario.impact_location_lon
+        raster = get_raster() if lat is not None and lon is not None else None
+        if raster is not None:
+            profile = RadialPopulation.measure(raster, lat, lon)
+        
+        evaluate = partial(sample_chunk, nominal=nominal, sigmas=sigmas, profile=profile)
+        
+        started = time.perf_counter()
+        chunks = []
+        
+        for results in map_chunks(evaluate, spawn_chunks(num_samples, chunk_size, seed), workers):
+            chunks.append(results)
+            logger.info(
+                f"Uncertainty {scenario.name}: {sum(len(chunk['estimated_deaths']) for chunk in chunks)}"
+                f"/{num_samples} samples"
+            )
+        
+        values = percentiles(chunks)
+        energy = values['kinetic_energy_megatons']
+        crater = values['crater_diameter_km']
+        deaths = values['estimated_deaths']
+        loss = values['economic_loss_billions_usd']
+        
+        return UncertaintyRun.objects.create(
+            scenario=scenario,
+            num_samples=num_samples,
+            seed=seed,
+            input_sigmas=sigmas,
+            population_weighted=profile is not None,
+            energy_p05_megatons=energy[5],
+            energy_p50_megatons=energy[50],
+            energy_p95_megatons=energy[95],
+            crater_diameter_p05_km=crater[5],
+            crater_diameter_p50_km=crater[50],
+            crater_diameter_p95_km=crater[95],
+            deaths_p05=int(deaths[5]),
+            deaths_p50=int(deaths[50]),
+            deaths_p95=int(deaths[95]),
+            economic_loss_p05_billions_usd=loss[5],
+            economic_loss_p50_billions_usd=loss[50],
+            economic_loss_p95_billions_usd=loss[95],
+            duration_seconds=time.perf_counter() - started
+        )
+    
+    def _impact_probability(self, neo=None):
+        """Impact probability from the NEO's latest Monte Carlo run, else the default"""
+        if neo is not None:
+            run = neo.monte_carlo_runs.first()
+            if run is not None:
+                return run.impact_probability
+        
+        return self.DEFAULT_IMPACT_PROBABILITY
     
     def _calculate_crater_diameter(self, mass_kg, velocity_mps, density, angle_deg):
         """Calculate crater diameter using scaling laws"""
@@ -119,32 +586,22 @@ class ThreatCalculationService:
     
     def _determine_risk_level(self, energy_megatons, diameter_km):
         """Determine overall risk level"""
-        if energy_megatons > 100000 or diameter_km > 1:
-            return 'critical'
-        elif energy_megatons > 10000 or diameter_km > 0.5:
-            return 'high'
-        elif energy_megatons > 1000 or diameter_km > 0.2:
-            return 'moderate'
-        elif energy_megatons > 10 or diameter_km > 0.05:
-            return 'low'
-        else:
-            return 'minimal'
+        for level, energy_threshold, diameter_threshold in calculations.RISK_LEVELS:
+            if energy_megatons > energy_threshold or diameter_km > diameter_threshold:
+                return level
+        
+        return calculations.DEFAULT_RISK_LEVEL
     
     def _calculate_tsunami_risk(self, energy_megatons, diameter_km, impact_type):
         """Calculate tsunami risk for ocean impacts"""
         if impact_type != 'ocean':
-            return 'none'
-        
-        if energy_megatons > 10000 or diameter_km > 1:
-            return 'extreme'
-        elif energy_megatons > 1000 or diameter_km > 0.5:
-            return 'high'
-        elif energy_megatons > 100 or diameter_km > 0.2:
-            return 'moderate'
-        elif energy_megatons > 10 or diameter_km > 0.05:
-            return 'low'
-        else:
-            return 'none'
+            return calculations.DEFAULT_TSUNAMI_RISK
+        
+        for risk, energy_threshold, diameter_threshold in calculations.TSUNAMI_RISKS:
+            if energy_megatons > energy_threshold or diameter_km > diameter_threshold:
+                return risk
+        
+        return calculations.DEFAULT_TSUNAMI_RISK
     
     def _calculate_destruction_radius(self, energy_megatons):
         """Calculate main destruction radius"""
@@ -153,13 +610,23 @@ class ThreatCalculationService:
         return radius_km
     
     def _estimate_casualties(self, radius_km, lat, lon):
-        """Estimate casualties based on destruction radius"""
-        # Simplified population density model
-        # Average: 50 people per km²
-        area_km2 = math.pi * (radius_km ** 2)
+        """
+        Estimate casualties based on destruction radius
         
-        avg_population_density = 50  # people per km²
-        affected_population = int(area_km2 * avg_population_density)
+        The affected population is integrated from the population raster
+        around the impact location when both are available.
+        """
+        raster = get_raster() if lat is not None and lon is not None else None
+        
+        if raster is not None:
+            affected_population = int(raster.population_within(lat, lon, radius_km))
+        else:
+            # Simplified population density model
+            # Average: 50 people per km²
+            area_km2 = math.pi * (radius_km ** 2)
+            
+            avg_population_density = 50  # people per km²
+            affected_population = int(area_km2 * avg_population_density)
         
         # Assume 30% fatality rate, 50% injury rate
         deaths = int(affected_population * 0.3)
@@ -181,86 +648,218 @@ class ThreatCalculationService:
     
     def _estimate_dust_duration(self, energy_megatons):
         """Estimate dust cloud duration in days"""
-        if energy_megatons > 100000:
-            return 365 * 10  # 10 years
-        elif energy_megatons > 10000:
-            return 365 * 2  # 2 years
-        elif energy_megatons > 1000:
-            return 180  # 6 months
-        elif energy_megatons > 100:
-            return 30  # 1 month
-        else:
-            return 7  # 1 week
+        for energy_threshold, days in calculations.DUST_DURATIONS_DAYS:
+            if energy_megatons > energy_threshold:
+                return days
+        
+        return calculations.DEFAULT_DUST_DURATION_DAYS
     
     def _estimate_temperature_change(self, energy_megatons):
         """Estimate global temperature change in Celsius"""
-        if energy_megatons > 100000:
-            return -15.0
-        elif energy_megatons > 10000:
-            return -5.0
-        elif energy_megatons > 1000:
-            return -2.0
-        elif energy_megatons > 100:
-            return -0.5
-        else:
-            return -0.1
-    
-    def _calculate_destruction_zones(self, assessment, energy_megatons):
-        """Calculate multiple destruction zones"""
-        zones = [
-            {
-                'zone_type': 'total',
-                'overpressure_psi': 20,
-                'fatality_rate': 0.95,
-                'radius_multiplier': 0.5
-            },
-            {
-                'zone_type': 'severe',
-                'overpressure_psi': 10,
-                'fatality_rate': 0.50,
-                'radius_multiplier': 0.75
-            },
-            {
-                'zone_type': 'moderate',
-                'overpressure_psi': 5,
-                'fatality_rate': 0.15,
-                'radius_multiplier': 1.0
-            },
-            {
-                'zone_type': 'light',
-                'overpressure_psi': 2,
-                'fatality_rate': 0.02,
-                'radius_multiplier': 1.5
-            },
-            {
-                'zone_type': 'glass_breakage',
-                'overpressure_psi': 0.5,
-                'fatality_rate': 0.001,
-                'radius_multiplier': 2.5
-            }
-        ]
+        for energy_threshold, change in calculations.TEMPERATURE_CHANGES_C:
+            if energy_megatons > energy_threshold:
+                return change
         
-        base_radius = assessment.destruction_radius_km
+        return calculations.DEFAULT_TEMPERATURE_CHANGE_C
+    
+    def save_destruction_zones(self, assessments, locations=None):
+        """
+        Write the destruction zones of many assessments in one upsert
         
-        for zone_data in zones:
-            radius = base_radius * zone_data['radius_multiplier']
-            area = math.pi * (radius ** 2)
-            
-            # Simplified casualty estimation
-            population = int(area * 50)  # 50 people per km²
-            casualties = int(population * zone_data['fatality_rate'])
-            injuries = int(population * zone_data['fatality_rate'] * 2)
+        locations optionally gives the (lat, lon) impact location of each
+        assessment. All zones are built in memory and inserted with
+        bulk_create(update_conflicts=True) on (assessment, zone_type), so
+        existing zones are overwritten in place.
+        """
+        zones = self._build_destruction_zones(assessments, locations)
+        
+        DestructionZone.objects.bulk_create(
+            zones,
+            batch_size=ZONE_BATCH_SIZE,
+            update_conflicts=True,
+            unique_fields=['assessment', 'zone_type'],
+            update_fields=ZONE_UPDATE_FIELDS
+        )
+        
+        return len(zones)
+    
+    def _build_destruction_zones(self, assessments, locations=None):
+        """Unsaved destruction zones of assessments"""
+        multipliers = np.array([zone_data['radius_multiplier'] for zone_data in DESTRUCTION_ZONES])
+        radii = np.array(
+            [assessment.destruction_radius_km for assessment in assessments], dtype=np.float64
+        ).reshape(-1, 1) * multipliers
+        ring_populations = self._ring_populations(radii, locations)
+        
+        zones = []
+        for assessment, populations in zip(assessments, ring_populations.tolist()):
+            base_radius = assessment.destruction_radius_km
             
-            DestructionZone.objects.update_or_create(
-                assessment=assessment,
-                zone_type=zone_data['zone_type'],
-                defaults={
-                    'radius_km': radius,
-                    'area_km2': area,
-                    'overpressure_psi': zone_data['overpressure_psi'],
-                    'fatality_rate': zone_data['fatality_rate'],
-                    'estimated_casualties': casualties,
-                    'estimated_injuries': injuries
-                }
-            )
+            for zone_data, population in zip(DESTRUCTION_ZONES, populations):
+                radius = base_radius * zone_data['radius_multiplier']
+                area = math.pi * (radius ** 2)
+                
+                # Simplified casualty estimation
+                population = int(population)
+                casualties = int(population * zone_data['fatality_rate'])
+                injuries = int(population * zone_data['fatality_rate'] * 2)
+                
+                zones.append(DestructionZone(
+                    assessment=assessment,
+                    zone_type=zone_data['zone_type'],
+                    radius_km=radius,
+                    area_km2=area,
+                    overpressure_psi=zone_data['overpressure_psi'],
+                    fatality_rate=zone_data['fatality_rate'],
+                    estimated_casualties=casualties,
+                    estimated_injuries=injuries
+                ))
+        
+        return zones
+    
+    def _ring_populations(self, radii, locations=None):
+        """
+        Population of each zone ring beyond the next smaller zone
+        
+        From the population raster for assessments with an impact
+        location, else at 50 people per km².
+        """
+        rings = np.diff(np.pi * radii ** 2, axis=-1, prepend=0.0) * calculations.POPULATION_DENSITY_PER_KM2
+        
+        raster = get_raster() if locations else None
+        if raster is None:
+            return rings
+        
+        located = [
+            index for index, (lat, lon) in enumerate(locations)
+            if lat is not None and lon is not None
+        ]
+        if located:
+            lat, lon = np.array([locations[index] for index in located], dtype=np.float64).T
+            rings[located] = raster.annulus_populations(lat, lon, radii[located])
+        
+        return rings
+
 
+class CalculationJobService:
+    """
+    Calculations submitted as jobs, run on Celery
+    
+    Subscribers to a job over the ws/tracking/ socket are sent its status
+    as it starts and completes.
+    """
+    
+    def submit(self, kind, params):
+        """
+        The active job with this kind and params, or a new queued one
+        
+        Returns (job, created). A submission racing an identical one gets
+        the job that won, even if it has completed in the meantime.
+        """
+        params_hash = calculations.input_hash(kind, json.dumps(params, sort_keys=True))
+        
+        job = CalculationJob.objects.filter(
+            params_hash=params_hash, status__in=CalculationJob.ACTIVE_STATUSES
+        ).first()
+        if job is not None and self._presumed_lost(job):
+            logger.warning(f"Calculation job {job.id} presumed lost while {job.status}")
+            self._complete(job, 'failed', error='Timed out', current=job.status)
+            job = None
+        if job is not None:
+            return job, False
+        
+        try:
+            with transaction.atomic():
+                job = CalculationJob.objects.create(kind=kind, params=params, params_hash=params_hash)
+        except IntegrityError:
+            return CalculationJob.objects.filter(params_hash=params_hash).latest('created_at'), False
+        
+        self._enqueue(job)
+        return job, True
+    
+    def run(self, job_id):
+        """Run a queued job and record its result or error"""
+        started = CalculationJob.objects.filter(id=job_id, status='queued').update(
+            status='running', started_at=timezone.now()
+        )
+        job = CalculationJob.objects.get(id=job_id)
+        if not started:
+            # Redelivered, or given up as lost before a worker took it
+            logger.info(f"Calculation job {job_id} is {job.status}; not running it")
+            return job
+        
+        self.notify(job)
+        
+        try:
+            result_id = getattr(self, f'_run_{job.kind}')(**job.params)
+        except Exception as e:
+            logger.error(f"Calculation job {job.id} failed: {e}")
+            self._complete(job, 'failed', error=str(e))
+        else:
+            self._complete(job, 'succeeded', result_id=result_id)
+        
+        return job
+    
+    def notify(self, job):
+        """Send the job's status to its subscribers"""
+        from .serializers import CalculationJobSerializer
+        
+        channel_layer = get_channel_layer()
+        if channel_layer is None:
+            return
+        
+        try:
+            async_to_sync(channel_layer.group_send)(
+                CalculationJob.channel_group(job.id),
+                {'type': 'job.update', 'data': CalculationJobSerializer(job).data}
+            )
+        except Exception as e:
+            # Pollers still see the status
+            logger.warning(f"Could not notify subscribers of calculation job {job.id}: {e}")
+    
+    def _presumed_lost(self, job):
+        now = timezone.now()
+        if job.status == 'running':
+            return job.started_at < now - timedelta(seconds=CALCULATION_JOB_TIMEOUT_SECONDS)
+        return job.created_at < now - timedelta(seconds=CALCULATION_JOB_QUEUE_TIMEOUT_SECONDS)
+    
+    def _enqueue(self, job):
+        from .tasks import run_calculation_job
+        
+        try:
+            task = run_calculation_job.delay(job.id)
+        except Exception as e:
+            logger.error(f"Could not queue calculation job {job.id}: {e}")
+            self._complete(job, 'failed', error='Could not queue the job', current='queued')
+            return
+        
+        job.task_id = task.id
+        CalculationJob.objects.filter(id=job.id).update(task_id=task.id)
+    
+    def _complete(self, job, status, result_id=None, error='', current='running'):
+        """
+        Record a job's outcome if it is still in the current status
+        
+        A job given up as lost in the meantime keeps its failed status
+        rather than being resurrected by a late worker.
+        """
+        completed = CalculationJob.objects.filter(id=job.id, status=current).update(
+            status=status, result_id=result_id, error=error, completed_at=timezone.now()
+        )
+        job.refresh_from_db()
+        
+        if not completed:
+            logger.warning(f"Calculation job {job.id} is {job.status}; not marking it {status}")
+            return
+        
+        self.notify(job)
+    
+    def _run_threat_assessment(self, scenario_id, force=False):
+        scenario = ThreatScenario.objects.get(id=scenario_id)
+        return ThreatCalculationService().calculate_scenario_threat(scenario, force=force).id
+    
+    def _run_seismic_analysis(self, threat_assessment_id):
+        from seismic.services import SeismicCalculationService
+        
+        assessment = ThreatAssessment.objects.get(id=threat_assessment_id)
+        return SeismicCalculationService().calculate_seismic_impact(assessment).id
@@ -0,0 +1,201 @@
+"""
+Scenario Parameter Sweeps
+
+A sweep evaluates the vectorized threat calculations on the outer
+product of value axes (diameter, velocity, impact angle, density and
+impact type). Cells are numbered in C order over SWEEP_AXES and computed
+in blocks of consecutive cells, so a large grid can be spread across the
+process pool and streamed as blocks complete.
+
+Binary format (little-endian), readable with a DataView and typed arrays:
+    
+    Header
+        magic          4s       b'MMSW'
+        version        uint16
+        reserved       uint16
+        header length  uint32   bytes of JSON that follow
+        JSON header    axes (name -> values, in SWEEP_AXES order), shape,
+                       cell count and fields (name, dtype and, for
+                       categorical fields, labels indexed by the codes)
+    
+    Blocks, in cell order
+        cell offset    uint64
+        cell count     uint32
+        reserved       uint32
+        
+        per field, in header order: cell count values of its dtype
+"""
+import json
+import struct
+import numpy as np
+
+from .calculations import calculate_threats
+
+MAGIC = b'MMSW'
+VERSION = 1
+
+FILE_HEADER = struct.Struct('<4sHHI')
+BLOCK_HEADER = struct.Struct('<QII')
+
+CONTENT_TYPE = 'application/octet-stream'
+
+SWEEP_AXES = ('diameter_km', 'velocity_kps', 'impact_angle_degrees', 'density_kg_m3', 'impact_type')
+IMPACT_TYPES = ('land', 'ocean')
+AXIS_DEFAULTS = {
+    'density_kg_m3': [2600.0],
+    'impact_type': ['land'],
+}
+AXIS_LIMITS = {
+    'diameter_km': (0.001, 1000.0),
+    'velocity_kps': (0.1, 100.0),
+    'impact_angle_degrees': (0.0, 90.0),
+    'density_kg_m3': (100.0, 20000.0),
+}
+MAX_AXIS_POINTS = 10000
+
+# Output columns; categorical ones are sent as uint8 codes into their labels
+FIELD_TYPES = {
+    'mass_kg': np.dtype('<f8'),
+    'kinetic_energy_megatons': np.dtype('<f8'),
+    'crater_diameter_km': np.dtype('<f8'),
+    'seismic_magnitude': np.dtype('<f8'),
+    'overall_risk_level': np.dtype('u1'),
+    'tsunami_risk': np.dtype('u1'),
+    'destruction_radius_km': np.dtype('<f8'),
+    'estimated_deaths': np.dtype('<i8'),
+    'estimated_injuries': np.dtype('<i8'),
+    'economic_loss_billions_usd': np.dtype('<f8'),
+    'dust_cloud_duration_days': np.dtype('<i4'),
+    'global_temperature_change_c': np.dtype('<f8'),
+}
+FIELD_LABELS = {
+    'overall_risk_level': ('minimal', 'low', 'moderate', 'high', 'critical'),
+    'tsunami_risk': ('none', 'low', 'moderate', 'high', 'extreme'),
+}
+FLOAT_TYPES = {
+    'float32': np.dtype('<f4'),
+    'float64': np.dtype('<f8'),
+}
+
+
+def axis_values(name, spec):
+    """
+    Values of one axis from a list or a {start, stop, num, scale} range
+    
+    scale is 'linear' (default) or 'log'. Raises ValueError for values
+    outside the axis limits.
+    """
+    if name == 'impact_type':
+        values = [spec] if isinstance(spec, str) else list(spec)
+        if not values or any(value not in IMPACT_TYPES for value in values):
+            raise ValueError(f"impact_type values must be among: {', '.join(IMPACT_TYPES)}")
+        return np.array(values)
+    
+    try:
+        if isinstance(spec, dict):
+            num = int(spec.get('num', 10))
+            start, stop = float(spec['start']), float(spec['stop'])
+            if not 1 <= num <= MAX_AXIS_POINTS:
+                raise ValueError
+            if spec.get('scale', 'linear') == 'log':
+                if start <= 0 or stop <= 0:
+                    raise ValueError
+                values = np.geomspace(start, stop, num)
+            else:
+                values = np.linspace(start, stop, num)
+        else:
+            values = np.array([float(value) for value in spec], dtype=np.float64)
+    except (KeyError, TypeError, ValueError):
+        raise ValueError(
+            f"{name} must be a list of numbers or start, stop, num (1-{MAX_AXIS_POINTS}) "
+            f"and scale ('linear' or 'log')"
+        )
+    
+    low, high = AXIS_LIMITS[name]
+    if not 1 <= len(values) <= MAX_AXIS_POINTS or not np.all((values >= low) & (values <= high)):
+        raise ValueError(f"{name} needs 1-{MAX_AXIS_POINTS} values between {low:g} and {high:g}")
+    
+    return values
+
+
+def parse_axes(data):
+    """Axis values for every SWEEP_AXES name, with defaults for the optional ones"""
+    axes = {}
+    for name in SWEEP_AXES:
+        spec = data.get(name, AXIS_DEFAULTS.get(name))
+        if spec is None:
+            raise ValueError(f"{name} required")
+        axes[name] = axis_values(name, spec)
+    return axes
+
+
+def grid_shape(axes):
+    return tuple(len(axes[name]) for name in SWEEP_AXES)
+
+
+def encode_columns(results, fields, float_type=FLOAT_TYPES['float64']):
+    """Column arrays in their output dtypes (float_type for float fields)"""
+    columns = {}
+    for field in fields:
+        values = results[field]
+        if field in FIELD_LABELS:
+            codes = np.zeros(values.shape, dtype=FIELD_TYPES[field])
+            for code, label in enumerate(FIELD_LABELS[field]):
+                codes[values == label] = code
+            columns[field] = codes
+        elif FIELD_TYPES[field].kind == 'f':
+            columns[field] = values.astype(float_type)
+        else:
+            columns[field] = values.astype(FIELD_TYPES[field])
+    return columns
+
+
+def sweep_block(block, axes, fields, exact=True, float_type=FLOAT_TYPES['float64']):
+    """Encoded columns of the cells [offset, offset + count) of a sweep grid"""
+    offset, count = block
+    indexes = np.unravel_index(np.arange(offset, offset + count), grid_shape(axes))
+    values = {name: axes[name][index] for name, index in zip(SWEEP_AXES, indexes)}
+    
+    results = calculate_threats(
+        values['diameter_km'], values['density_kg_m3'], values['velocity_kps'],
+        values['impact_angle_degrees'], values['impact_type'], exact=exact
+    )
+    
+    return offset, encode_columns(results, fields, float_type)
+
+
+def field_types(fields, float_type=FLOAT_TYPES['float64']):
+    return {
+        field: float_type if FIELD_TYPES[field].kind == 'f' else FIELD_TYPES[field]
+        for field in fields
+    }
+
+
+def pack_header(axes, fields, float_type=FLOAT_TYPES['float64']):
+    """File header and JSON description of a sweep"""
+    shape = grid_shape(axes)
+    types = field_types(fields, float_type)
+    
+    description = json.dumps({
+        'axes': {name: axes[name].tolist() for name in SWEEP_AXES},
+        'shape': shape,
+        'cells': int(np.prod(shape)),
+        'fields': [
+            {
+                'name': field,
+                'dtype': types[field].str,
+                **({'labels': FIELD_LABELS[field]} if field in FIELD_LABELS else {})
+            }
+            for field in fields
+        ],
+    }).encode()
+    
+    return FILE_HEADER.pack(MAGIC, VERSION, 0, len(description)) + description
+
+
+def pack_block(offset, columns, fields):
+    """One block of cells, its columns in field order"""
+    count = len(columns[fields[0]])
+    return BLOCK_HEADER.pack(offset, count, 0) + b''.join(
+        columns[field].tobytes() for field in fields
+    )
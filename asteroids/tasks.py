@@ -2,8 +2,9 @@
 Celery Tasks for Asteroid Threat Assessments
 """
 from celery import shared_task
+from meteor_madness.instrumentation import QueryCounter
 from .models import ThreatScenario
-from .services import ThreatCalculationService
+from .services import ThreatCalculationService, CalculationJobService
 import logging
 
 logger = logging.getLogger(__name__)
@@ -12,22 +13,94 @@ logger = logging.getLogger(__name__)
 @shared_task
 def calculate_threat_assessments():
     """
-    Calculate threat assessments for all active scenarios
+    Calculate threat assessments for active scenarios whose inputs changed
+    
+    Scenarios whose stored assessment matches their input hash and the
+    calculation version are skipped after a single query.
     """
     logger.info("Starting threat assessment calculations")
     
     service = ThreatCalculationService()
-    scenarios = ThreatScenario.objects.filter(is_active=True)
     
-    processed = 0
-    for scenario in scenarios:
-        try:
-            service.calculate_scenario_threat(scenario)
-            processed += 1
-        except Exception as e:
-            logger.error(f"Error calculating threat for {scenario.name}: {e}")
+    with QueryCounter() as queries:
+        scenarios = list(ThreatScenario.objects.filter(is_active=True))
+        stale = service.stale_scenarios(scenarios)
+        processed = len(service.calculate_scenario_threats(stale))
+    
+    unchanged = len(scenarios) - len(stale)
+    logger.info(
+        f"Processed {processed} threat assessments; {unchanged} unchanged; "
+        f"{queries.count} queries ({queries.per(processed):.1f} per assessment)"
+    )
+    
+    return {'processed': processed, 'unchanged': unchanged}
+
+
+@shared_task
+def calculate_neo_threat_assessments(neo_ids=None, force=False):
+    """
+    Assess the catalogue NEOs synced since their last assessment
+    Queued after each NASA sync
+    """
+    logger.info("Starting NEO threat assessment calculations")
+    
+    service = ThreatCalculationService()
+    
+    with QueryCounter() as queries:
+        result = service.calculate_neo_threats(neo_ids=neo_ids, force=force)
+    
+    processed = result['neos_processed']
+    logger.info(
+        f"Processed {processed} NEO threat assessments; "
+        f"{queries.count} queries ({queries.per(processed):.1f} per assessment)"
+    )
+    
+    return result
+
+
+@shared_task(soft_time_limit=540, time_limit=600)
+def run_calculation_job(job_id):
+    """
+    Run a calculation job submitted through the API
+    """
+    logger.info(f"Starting calculation job {job_id}")
     
-    logger.info(f"Processed {processed} threat assessments")
+    job = CalculationJobService().run(job_id)
     
-    return {'processed': processed}
+    logger.info(f"Calculation job {job_id} {job.status}")
+    
+    return {
+        'job_id': job.id,
+        'status': job.status,
+        'result_id': job.result_id
+    }
+
 
+@shared_task(soft_time_limit=600, time_limit=660)
+def run_uncertainty(scenario_id, num_samples=100000, sigmas=None, seed=None):
+    """
+    Sample a scenario's uncertain inputs and store its impact effect percentiles
+    
+    Evaluated in-process: prefork workers cannot start a process pool, and
+    the largest run (10^6 samples) takes well under a second, while
+    fanning it out would ship every sample through the result backend to
+    get exact percentiles.
+    """
+    logger.info(f"Starting uncertainty run for scenario {scenario_id} with {num_samples} samples")
+    
+    service = ThreatCalculationService()
+    run = service.run_uncertainty(
+        ThreatScenario.objects.get(id=scenario_id),
+        num_samples=num_samples,
+        sigmas=sigmas,
+        seed=seed,
+        workers=1
+    )
+    
+    logger.info(f"Uncertainty run {run.id} completed in {run.duration_seconds:.1f}s")
+    
+    return {
+        'run_id': run.id,
+        'seed': run.seed,
+        'deaths_p50': run.deaths_p50
+    }
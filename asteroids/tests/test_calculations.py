@@ -0,0 +1,53 @@
+"""
+Tests for vectorized threat calculations
+"""
+import math
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from asteroids.models import ThreatScenario
+from asteroids.services import ThreatCalculationService
+
+
+class CalculateBatchTest(SimpleTestCase):
+    """calculate_batch gives exactly what the scalar path stores per scenario"""
+    
+    def setUp(self):
+        rng = np.random.default_rng(1)
+        count = 500
+        self.diameter_km = 10 ** rng.uniform(-3, 1.5, count)
+        self.density_kg_m3 = rng.uniform(1000, 8000, count)
+        self.velocity_kps = rng.uniform(11, 72, count)
+        self.impact_angle_degrees = rng.uniform(0, 90, count)
+        self.impact_type = rng.choice(['land', 'ocean'], count)
+        self.mass_kg = np.where(rng.random(count) < 0.2, 10 ** rng.uniform(3, 15, count), np.nan)
+        self.service = ThreatCalculationService()
+    
+    def scenario(self, index):
+        mass_kg = self.mass_kg[index].item()
+        return ThreatScenario(
+            name=f'Scenario {index}',
+            diameter_km=self.diameter_km[index].item(),
+            density_kg_m3=self.density_kg_m3[index].item(),
+            velocity_kps=self.velocity_kps[index].item(),
+            impact_angle_degrees=self.impact_angle_degrees[index].item(),
+            impact_type=str(self.impact_type[index]),
+            mass_kg=None if math.isnan(mass_kg) else mass_kg
+        )
+    
+    def test_matches_scalar_bit_for_bit(self):
+        batch = self.service.calculate_batch(
+            self.diameter_km, self.density_kg_m3, self.velocity_kps,
+            self.impact_angle_degrees, self.impact_type, mass_kg=self.mass_kg
+        )
+        
+        for index in range(len(self.diameter_km)):
+            expected = self.service._scenario_results(self.scenario(index))
+            for field, values in batch.items():
+                if field not in expected:
+                    continue
+                with self.subTest(index=index, field=field):
+                    value = values[index].item()
+                    self.assertEqual(value, expected[field])
+                    self.assertIs(type(value), type(expected[field]))
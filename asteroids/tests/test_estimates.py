@@ -0,0 +1,70 @@
+"""
+Tests for the threat, seismic and climate estimate endpoints
+"""
+import json
+
+from django.test import TestCase
+
+from asteroids.calculations import MAX_ENERGY_MEGATONS, MAX_MASS_KG
+
+THREAT_URL = '/api/asteroids/scenarios/estimate/'
+SEISMIC_URL = '/api/seismic/analyses/estimate/'
+CLIMATE_URL = '/api/safety/climate-models/estimate/'
+
+
+def reject_constant(name):
+    raise ValueError(f'Non-finite value in response: {name}')
+
+
+class EstimateTest(TestCase):
+    
+    def get_finite(self, url, params):
+        """The decoded response, which must hold no NaN or infinity"""
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return json.loads(response.content, parse_constant=reject_constant)
+    
+    def test_table_and_exact_agree(self):
+        for exact in ('false', 'true'):
+            with self.subTest(exact=exact):
+                result = self.get_finite(THREAT_URL, {'diameter_km': 0.3, 'velocity_kps': 20, 'exact': exact})
+                self.assertEqual(result['source'], 'table' if exact == 'false' else 'exact')
+                self.assertGreater(result['kinetic_energy_megatons'], 0)
+    
+    def test_largest_accepted_inputs_are_finite(self):
+        self.get_finite(THREAT_URL, {
+            'diameter_km': 1000, 'velocity_kps': 100, 'density_kg_m3': 20000, 'impact_angle_degrees': 90
+        })
+        self.get_finite(THREAT_URL, {
+            'diameter_km': 1, 'velocity_kps': 100, 'mass_kg': MAX_MASS_KG,
+            'impact_location_lat': -90, 'impact_location_lon': 180
+        })
+        
+        for exact in ('false', 'true'):
+            self.get_finite(SEISMIC_URL, {'energy_megatons': MAX_ENERGY_MEGATONS, 'exact': exact})
+            self.get_finite(CLIMATE_URL, {'impact_energy_mt': MAX_ENERGY_MEGATONS, 'exact': exact})
+    
+    def test_threat_rejects_unbounded_values(self):
+        for params in (
+            {'diameter_km': 'nan'},
+            {'velocity_kps': 'inf'},
+            {'density_kg_m3': '-inf'},
+            {'mass_kg': -1},
+            {'mass_kg': 0},
+            {'mass_kg': 'nan'},
+            {'mass_kg': 'inf'},
+            {'mass_kg': MAX_MASS_KG * 10},
+            {'impact_location_lat': 91, 'impact_location_lon': 0},
+            {'impact_location_lat': 0, 'impact_location_lon': -180.5},
+            {'impact_location_lat': 'nan', 'impact_location_lon': 0},
+            {'impact_location_lat': 10},
+        ):
+            with self.subTest(params=params):
+                response = self.client.get(THREAT_URL, {'diameter_km': 0.3, 'velocity_kps': 20, **params})
+                self.assertEqual(response.status_code, 400)
+    
+    def test_energy_estimates_reject_unbounded_values(self):
+        for url, name in ((SEISMIC_URL, 'energy_megatons'), (CLIMATE_URL, 'impact_energy_mt')):
+            for value in ('nan', 'inf', '-inf', '1e300', 0, -5, 'ten'):
+                with self.subTest(url=url, value=value):
+                    self.assertEqual(self.client.get(url, {name: value}).status_code, 400)
@@ -0,0 +1,116 @@
+"""
+Tests for the precomputed impact effect tables
+"""
+import json
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+from django.test import SimpleTestCase, override_settings
+
+from asteroids import calculations, lookup
+from asteroids.lookup import (
+    COLUMN_GROUPS, EffectsTable, _compatible, build_table, deviations, energy_grid,
+    load_installed_table, tabulate,
+)
+from seismic.services import SeismicCalculationService
+
+
+class EffectsTableTest(SimpleTestCase):
+    
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.path = Path(cls.directory.name) / 'threat_table.npy'
+        build_table(cls.path)
+        cls.table = EffectsTable.load(cls.path)
+    
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+        super().tearDownClass()
+    
+    def assert_within_documented_differences(self, energies, magnitude=0.0100001, power=1e-9):
+        differences = deviations(self.table, energies)
+        
+        for group in COLUMN_GROUPS.values():
+            for name, kind, _ in group:
+                with self.subTest(column=name):
+                    _, largest, relative = differences[name]
+                    if kind == 'log':
+                        self.assertLessEqual(largest, magnitude)
+                    elif name == 'peak_ground_acceleration_g':
+                        self.assertLess(relative, 0.01)
+                    elif kind == 'power':
+                        self.assertLess(relative, power)
+                    else:
+                        self.assertEqual(largest, 0.0)
+    
+    def test_grid_energies(self):
+        self.assert_within_documented_differences(energy_grid()[::7], magnitude=0.0, power=1e-12)
+    
+    def test_cell_midpoints(self):
+        grid = energy_grid()
+        self.assert_within_documented_differences(np.sqrt(grid[1:] * grid[:-1])[::5])
+    
+    def test_compatibility(self):
+        self.assertTrue(_compatible(self.path))
+        
+        other = Path(self.directory.name) / 'other.npy'
+        np.save(other, np.load(self.path))
+        metadata = json.loads(self.path.with_suffix('.json').read_text())
+        other.with_suffix('.json').write_text(
+            json.dumps({**metadata, 'calculation_version': f'{calculations.CALCULATION_VERSION}-old'})
+        )
+        
+        self.assertFalse(_compatible(other))
+        self.assertFalse(_compatible(Path(self.directory.name) / 'missing.npy'))
+    
+    def test_coverage(self):
+        self.assertTrue(self.table.covers(1e-6))
+        self.assertTrue(self.table.covers(1e10))
+        self.assertFalse(self.table.covers(0.0))
+        self.assertFalse(self.table.covers(1e11))
+        np.testing.assert_array_equal(self.table.values, tabulate(energy_grid()))
+    
+    def test_startup_only_opens_an_installed_table(self):
+        with mock.patch.object(lookup, '_table', None), mock.patch.object(lookup, 'tabulate') as tabulate_mock:
+            with override_settings(THREAT_TABLE_PATH=str(Path(self.directory.name) / 'missing.npy')):
+                load_installed_table()
+                self.assertIsNone(lookup._table)
+            
+            with override_settings(THREAT_TABLE_PATH=str(self.path)):
+                load_installed_table()
+                self.assertEqual(lookup._table.metadata['source'], 'calculators')
+                self.assertIs(lookup.get_table(), lookup._table)
+        
+        tabulate_mock.assert_not_called()
+
+
+class MercalliIntensityTest(SimpleTestCase):
+    
+    def test_intensity_follows_magnitude_between_grid_energies(self):
+        # MMI steps from XI to XII at magnitude 26/3, part way through a grid cell
+        service = SeismicCalculationService()
+        magnitudes = np.linspace(8.55, 8.8, 400)
+        energies = 10 ** (1.5 * (magnitudes + 2.9)) / 4.184e22
+        
+        intensities = set()
+        for energy in energies.tolist():
+            estimate = service.estimate_seismic_impact(energy)
+            exact = service.estimate_seismic_impact(energy, exact=True)
+            
+            self.assertEqual(estimate['source'], 'table')
+            self.assertEqual(
+                estimate['modified_mercalli_intensity'],
+                service._calculate_mmi(estimate['moment_magnitude'])
+            )
+            if estimate['moment_magnitude'] == exact['moment_magnitude']:
+                self.assertEqual(
+                    estimate['modified_mercalli_intensity'], exact['modified_mercalli_intensity'], energy
+                )
+            intensities.add(estimate['modified_mercalli_intensity'])
+        
+        self.assertEqual(intensities, {11, 12})
@@ -0,0 +1,111 @@
+"""
+Tests for bulk threat assessments of catalogue NEOs
+"""
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+
+from asteroids import calculations
+from asteroids.models import DestructionZone, ThreatAssessment, ThreatScenario
+from asteroids.services import (
+    DEFAULT_NEO_VELOCITY_KPS, DESTRUCTION_ZONES, NEO_IMPACT_ANGLE_DEGREES, NEO_IMPACT_TYPE,
+    ThreatCalculationService,
+)
+from meteor_madness.instrumentation import QueryCounter
+from neos.models import NEO, CloseApproach
+
+COMPARED_FIELDS = (
+    'kinetic_energy_megatons', 'crater_diameter_km', 'seismic_magnitude', 'overall_risk_level',
+    'destruction_radius_km', 'estimated_deaths', 'economic_loss_billions_usd',
+)
+
+
+class NEOAssessmentTest(TestCase):
+    
+    def setUp(self):
+        cache.clear()
+        self.service = ThreatCalculationService()
+        self.neos = []
+        for index in range(30):
+            with_diameter = index % 3 != 0
+            neo = NEO.objects.create(
+                neo_reference_id=str(2000 + index),
+                name=f'NEO {index}',
+                absolute_magnitude_h=17.0 + 0.3 * index,
+                estimated_diameter_min_km=0.02 * (index + 1) if with_diameter else None,
+                estimated_diameter_max_km=0.05 * (index + 1) if with_diameter else None
+            )
+            # Two approaches; the closer one sets the impact speed
+            for distance, velocity in ((0.2, 30.0), (0.05, 5.0 + index)):
+                if index % 4 == 0:
+                    break
+                CloseApproach.objects.create(
+                    neo=neo,
+                    close_approach_date=timezone.now().date(),
+                    close_approach_date_full=timezone.now(),
+                    epoch_date_close_approach=0,
+                    relative_velocity_kps=velocity,
+                    relative_velocity_kmph=velocity * 3600,
+                    relative_velocity_mph=velocity * 2237,
+                    miss_distance_astronomical=distance,
+                    miss_distance_lunar=distance * 389,
+                    miss_distance_kilometers=distance * 1.496e8,
+                    miss_distance_miles=distance * 9.296e7
+                )
+            self.neos.append(neo)
+    
+    def expected_inputs(self, index, neo):
+        if neo.estimated_diameter_min_km is None:
+            diameter_km = float(calculations.magnitude_diameters(neo.absolute_magnitude_h))
+        else:
+            diameter_km = (neo.estimated_diameter_min_km + neo.estimated_diameter_max_km) / 2
+        velocity_kps = (
+            DEFAULT_NEO_VELOCITY_KPS if index % 4 == 0
+            else float(calculations.impact_velocities(5.0 + index))
+        )
+        return diameter_km, velocity_kps
+    
+    def test_matches_per_scenario_calculation(self):
+        result = self.service.calculate_neo_threats(chunk_size=7)
+        
+        self.assertEqual(result, {'neos_processed': len(self.neos)})
+        self.assertEqual(DestructionZone.objects.count(), len(self.neos) * len(DESTRUCTION_ZONES))
+        
+        for index, neo in enumerate(self.neos):
+            diameter_km, velocity_kps = self.expected_inputs(index, neo)
+            expected = self.service._scenario_results(ThreatScenario(
+                diameter_km=diameter_km,
+                density_kg_m3=float(calculations.neo_densities(diameter_km)),
+                velocity_kps=velocity_kps,
+                impact_angle_degrees=NEO_IMPACT_ANGLE_DEGREES,
+                impact_type=NEO_IMPACT_TYPE
+            ))
+            assessment = ThreatAssessment.objects.get(neo=neo)
+            
+            for field in COMPARED_FIELDS:
+                with self.subTest(index=index, field=field):
+                    self.assertEqual(getattr(assessment, field), expected[field])
+            self.assertEqual(assessment.impact_probability, self.service.DEFAULT_IMPACT_PROBABILITY)
+    
+    def test_only_outdated_neos_are_reassessed(self):
+        self.service.calculate_neo_threats()
+        
+        self.assertEqual(self.service.calculate_neo_threats(), {'neos_processed': 0})
+        
+        NEO.objects.filter(id__in=[neo.id for neo in self.neos[:4]]).update(
+            last_synced_at=timezone.now() + timedelta(minutes=1)
+        )
+        self.assertEqual(self.service.calculate_neo_threats(), {'neos_processed': 4})
+        self.assertEqual(self.service.calculate_neo_threats(force=True), {'neos_processed': len(self.neos)})
+        self.assertEqual(ThreatAssessment.objects.count(), len(self.neos))
+    
+    def test_queries_do_not_grow_with_neos(self):
+        with QueryCounter() as queries:
+            self.service.calculate_neo_threats(chunk_size=10)
+        
+        # Per chunk: a select, the assessment and zone upserts and the savepoint
+        # around them; then the select that finds nothing left
+        self.assertLessEqual(queries.count, 5 * 3 + 1)
+        self.assertLess(queries.per(len(self.neos)), 1.0)
@@ -0,0 +1,111 @@
+"""
+Tests for population raster lookups
+"""
+import tempfile
+from pathlib import Path
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from asteroids.population import (
+    EARTH_RADIUS_KM, PopulationRaster, build_raster, cell_areas, summed_area_table, synthetic_density,
+)
+
+
+class PopulationRasterTest(SimpleTestCase):
+    
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.directory = tempfile.TemporaryDirectory()
+        density, north, west, cell_deg = synthetic_density(cell_deg=0.5, cities=200, seed=0)
+        path = Path(cls.directory.name) / 'population.npy'
+        build_raster(path, density, north, west, cell_deg)
+        
+        cls.raster = PopulationRaster.load(path)
+        cls.counts = density * cell_areas(north, cell_deg, density.shape[0])[:, None]
+        
+        lat = north - cell_deg * (np.arange(density.shape[0]) + 0.5)
+        lon = west + cell_deg * (np.arange(density.shape[1]) + 0.5)
+        cls.lat, cls.lon = np.meshgrid(np.radians(lat), np.radians(lon), indexing='ij')
+    
+    @classmethod
+    def tearDownClass(cls):
+        del cls.raster
+        cls.directory.cleanup()
+        super().tearDownClass()
+    
+    def brute_force(self, lat, lon, radius_km):
+        """
+        Population of the cells whose centres lie within radius_km
+        
+        Within a few percent of the strip approximation, which differs
+        most where a dense city straddles the edge of the disk.
+        """
+        lat, lon = np.radians(lat), np.radians(lon)
+        cos_angle = (
+            np.sin(lat) * np.sin(self.lat)
+            + np.cos(lat) * np.cos(self.lat) * np.cos(self.lon - lon)
+        )
+        distance = EARTH_RADIUS_KM * np.arccos(np.clip(cos_angle, -1.0, 1.0))
+        return self.counts[distance <= radius_km].sum()
+    
+    def test_metadata_and_whole_grid(self):
+        self.assertEqual(self.raster.metadata['total_population'], self.raster.table[-1, -1])
+        self.assertAlmostEqual(self.raster.table[-1, -1] / self.counts.sum(), 1.0, places=12)
+    
+    def test_rectangles_on_cell_edges_are_exact(self):
+        population = self.raster.rectangle_population(100.0, 130.0, 250.0, 400.0)
+        
+        self.assertAlmostEqual(population / self.counts[100:130, 250:400].sum(), 1.0, places=10)
+    
+    def test_uniform_density_gives_cap_area(self):
+        rows, cols = 360, 720
+        raster = PopulationRaster(
+            np.zeros((rows + 1, cols + 1)),
+            {'north': 90.0, 'west': -180.0, 'cell_deg': 0.5, 'rows': rows, 'cols': cols}
+        )
+        summed_area_table(np.broadcast_to(cell_areas(90.0, 0.5, rows)[:, None], (rows, cols)), out=raster.table)
+        
+        radius_km = np.array([10.0, 500.0, 3000.0, 8000.0])
+        area = 2 * np.pi * EARTH_RADIUS_KM ** 2 * (1 - np.cos(radius_km / EARTH_RADIUS_KM))
+        
+        for lat in (0.0, 45.0, -70.0, 80.0):
+            with self.subTest(lat=lat):
+                np.testing.assert_allclose(raster.population_within(lat, 100.0, radius_km), area, rtol=5e-3)
+    
+    def test_disks_match_cell_sums(self):
+        rng = np.random.default_rng(1)
+        
+        for lat, lon, radius_km in zip(
+            rng.uniform(-50, 60, 12), rng.uniform(-180, 180, 12), [500, 1500, 3000] * 4
+        ):
+            with self.subTest(lat=lat, lon=lon, radius_km=radius_km):
+                expected = self.brute_force(lat, lon, radius_km)
+                population = self.raster.population_within(lat, lon, radius_km)
+                self.assertLess(abs(population / expected - 1.0), 0.05)
+    
+    def test_disks_across_antimeridian_and_pole(self):
+        for lat, lon, radius_km in ((-15.0, 179.5, 2000), (60.0, -179.0, 1500), (80.0, 30.0, 2000)):
+            with self.subTest(lat=lat, lon=lon):
+                expected = self.brute_force(lat, lon, radius_km)
+                population = self.raster.population_within(lat, lon, radius_km)
+                self.assertLess(abs(population / expected - 1.0), 0.05)
+        
+        self.assertAlmostEqual(
+            self.raster.population_within(10.0, 180.0, 800) / self.raster.population_within(10.0, -180.0, 800),
+            1.0, places=10
+        )
+    
+    def test_annuli_add_up_to_disks(self):
+        radii = np.array([[5.0, 20.0, 100.0, 400.0], [1.0, 2.0, 3.0, 4.0]])
+        
+        annuli = self.raster.annulus_populations([35.0, -20.0], [139.0, -45.0], radii)
+        
+        self.assertTrue((annuli >= 0).all())
+        np.testing.assert_allclose(
+            annuli.sum(axis=-1),
+            self.raster.population_within([35.0, -20.0], [139.0, -45.0], radii[:, -1]),
+            rtol=1e-12
+        )
+        self.assertEqual(self.raster.population_within(35.0, 139.0, 0.0), 0.0)
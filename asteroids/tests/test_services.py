@@ -0,0 +1,189 @@
+"""
+Tests for threat assessment memoization and calculation jobs
+"""
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+
+from asteroids.models import CalculationJob, ThreatAssessment, ThreatScenario
+from asteroids.services import (
+    CALCULATION_JOB_QUEUE_TIMEOUT_SECONDS, CALCULATION_JOB_TIMEOUT_SECONDS, CalculationJobService,
+    ThreatCalculationService,
+)
+
+
+class InputHashTest(TestCase):
+    """Assessments are only recalculated when their inputs change"""
+    
+    def setUp(self):
+        cache.clear()
+        self.service = ThreatCalculationService()
+        self.scenario = ThreatScenario.objects.create(
+            name='Test', description='', diameter_km=0.3, velocity_kps=20
+        )
+    
+    def test_unchanged_inputs_are_not_recalculated(self):
+        assessment = self.service.calculate_scenario_threat(self.scenario)
+        
+        with mock.patch.object(ThreatCalculationService, '_scenario_results') as compute:
+            again = self.service.calculate_scenario_threat(self.scenario)
+        
+        compute.assert_not_called()
+        self.assertEqual(again.id, assessment.id)
+        self.assertEqual(again.input_hash, self.service.scenario_input_hash(self.scenario))
+        self.assertEqual(self.service.stale_scenarios([self.scenario]), [])
+    
+    def test_changed_inputs_are_recalculated(self):
+        assessment = self.service.calculate_scenario_threat(self.scenario)
+        
+        self.scenario.diameter_km = 0.6
+        self.scenario.save()
+        self.assertEqual(self.service.stale_scenarios([self.scenario]), [self.scenario])
+        
+        updated = self.service.calculate_scenario_threat(self.scenario)
+        
+        self.assertEqual(updated.id, assessment.id)
+        self.assertNotEqual(updated.input_hash, assessment.input_hash)
+        self.assertGreater(updated.kinetic_energy_megatons, assessment.kinetic_energy_megatons)
+
+
+@mock.patch('asteroids.tasks.run_calculation_job.delay')
+class CalculationJobTest(TestCase):
+    """Identical submissions share one job"""
+    
+    def setUp(self):
+        self.service = CalculationJobService()
+        self.scenario = ThreatScenario.objects.create(
+            name='Test', description='', diameter_km=0.3, velocity_kps=20
+        )
+        self.params = {'scenario_id': self.scenario.id, 'force': False}
+    
+    def test_identical_submissions_coalesce(self, delay):
+        delay.return_value = mock.Mock(id='task-1')
+        
+        job, created = self.service.submit('threat_assessment', self.params)
+        again, created_again = self.service.submit('threat_assessment', dict(reversed(self.params.items())))
+        other, created_other = self.service.submit(
+            'threat_assessment', {**self.params, 'force': True}
+        )
+        
+        self.assertTrue(created)
+        self.assertFalse(created_again)
+        self.assertEqual(again.id, job.id)
+        self.assertTrue(created_other)
+        self.assertNotEqual(other.id, job.id)
+        self.assertEqual(delay.call_count, 2)
+        self.assertEqual(CalculationJob.objects.get(id=job.id).task_id, 'task-1')
+    
+    def test_completed_job_is_not_reused(self, delay):
+        delay.return_value = mock.Mock(id='task-1')
+        
+        job, _ = self.service.submit('threat_assessment', self.params)
+        self.service.run(job.id)
+        again, created = self.service.submit('threat_assessment', self.params)
+        
+        self.assertEqual(CalculationJob.objects.get(id=job.id).status, 'succeeded')
+        self.assertTrue(created)
+        self.assertNotEqual(again.id, job.id)
+    
+    def test_lost_running_job_is_replaced_and_not_resurrected(self, delay):
+        delay.return_value = mock.Mock(id='task-1')
+        job, _ = self.service.submit('threat_assessment', self.params)
+        CalculationJob.objects.filter(id=job.id).update(
+            status='running',
+            started_at=timezone.now() - timedelta(seconds=CALCULATION_JOB_TIMEOUT_SECONDS + 1)
+        )
+        
+        replacement, created = self.service.submit('threat_assessment', self.params)
+        
+        self.assertTrue(created)
+        self.assertNotEqual(replacement.id, job.id)
+        
+        # The lost worker finishing late leaves the job failed
+        job.refresh_from_db()
+        self.service._complete(job, 'succeeded', result_id=1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+        self.assertEqual(job.error, 'Timed out')
+        self.assertIsNone(job.result_id)
+    
+    def test_timeout_runs_from_start_not_submission(self, delay):
+        delay.return_value = mock.Mock(id='task-1')
+        job, _ = self.service.submit('threat_assessment', self.params)
+        CalculationJob.objects.filter(id=job.id).update(
+            status='running',
+            created_at=timezone.now() - timedelta(seconds=CALCULATION_JOB_QUEUE_TIMEOUT_SECONDS - 1),
+            started_at=timezone.now()
+        )
+        
+        again, created = self.service.submit('threat_assessment', self.params)
+        
+        self.assertFalse(created)
+        self.assertEqual(again.id, job.id)
+    
+    def test_lost_job_is_not_run_on_redelivery(self, delay):
+        delay.return_value = mock.Mock(id='task-1')
+        job, _ = self.service.submit('threat_assessment', self.params)
+        CalculationJob.objects.filter(id=job.id).update(
+            created_at=timezone.now() - timedelta(seconds=CALCULATION_JOB_QUEUE_TIMEOUT_SECONDS + 1)
+        )
+        self.service.submit('threat_assessment', self.params)
+        
+        with mock.patch.object(CalculationJobService, '_run_threat_assessment') as run:
+            self.service.run(job.id)
+        
+        run.assert_not_called()
+        self.assertEqual(CalculationJob.objects.get(id=job.id).status, 'failed')
+    
+    def test_errors_and_queue_failures_are_recorded(self, delay):
+        delay.return_value = mock.Mock(id='task-1')
+        job, _ = self.service.submit('threat_assessment', {'scenario_id': 0, 'force': False})
+        self.service.run(job.id)
+        
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+        self.assertTrue(job.error)
+        
+        delay.side_effect = ConnectionError('broker down')
+        unqueued, _ = self.service.submit('threat_assessment', self.params)
+        self.assertEqual(unqueued.status, 'failed')
+        self.assertEqual(unqueued.error, 'Could not queue the job')
+
+
+@mock.patch('asteroids.tasks.run_calculation_job.delay')
+class CalculationJobViewTest(TestCase):
+    
+    def setUp(self):
+        cache.clear()
+        self.scenario = ThreatScenario.objects.create(
+            name='Test', description='', diameter_km=0.3, velocity_kps=20
+        )
+        self.url = f'/api/asteroids/scenarios/{self.scenario.id}/calculate_assessment/'
+    
+    def test_queued_job_is_polled_to_its_result(self, delay):
+        delay.return_value = mock.Mock(id='task-1')
+        
+        response = self.client.post(self.url, {}, content_type='application/json')
+        
+        self.assertEqual(response.status_code, 202)
+        job_id = response.json()['id']
+        self.assertEqual(self.client.get(f'/api/asteroids/jobs/{job_id}/').json()['status'], 'queued')
+        
+        CalculationJobService().run(job_id)
+        job = self.client.get(f'/api/asteroids/jobs/{job_id}/').json()
+        
+        self.assertEqual(job['status'], 'succeeded')
+        self.assertEqual(job['result_id'], ThreatAssessment.objects.get(scenario=self.scenario).id)
+        self.assertTrue(job['result_url'])
+        
+        # The stored assessment is now returned directly
+        self.assertEqual(self.client.post(self.url, {}, content_type='application/json').status_code, 200)
+    
+    def test_sync_calculates_in_the_request(self, delay):
+        response = self.client.post(self.url, {'sync': 'true'}, content_type='application/json')
+        
+        self.assertEqual(response.status_code, 200)
+        delay.assert_not_called()
@@ -0,0 +1,130 @@
+"""
+Tests for parameter sweep grids and their binary format
+"""
+import json
+
+import numpy as np
+from django.test import SimpleTestCase, TestCase
+
+from asteroids.calculations import calculate_threats
+from asteroids.services import ThreatCalculationService
+from asteroids.sweep import BLOCK_HEADER, FILE_HEADER, MAGIC, VERSION, parse_axes
+
+URL = '/api/asteroids/scenarios/sweep/'
+AXES = {
+    'diameter_km': {'start': 0.01, 'stop': 10.0, 'num': 7, 'scale': 'log'},
+    'velocity_kps': [12.0, 20.0, 70.0],
+    'impact_angle_degrees': {'start': 15.0, 'stop': 90.0, 'num': 4},
+    'density_kg_m3': [1500.0, 3000.0],
+    'impact_type': ['land', 'ocean'],
+}
+
+
+def read_sweep(content):
+    """Header description and {field: values} of a binary sweep"""
+    magic, version, _, length = FILE_HEADER.unpack_from(content)
+    assert (magic, version) == (MAGIC, VERSION)
+    offset = FILE_HEADER.size
+    header = json.loads(content[offset:offset + length])
+    offset += length
+    
+    columns = {field['name']: [] for field in header['fields']}
+    expected_cell = 0
+    while offset < len(content):
+        cell, count, _ = BLOCK_HEADER.unpack_from(content, offset)
+        assert cell == expected_cell
+        offset += BLOCK_HEADER.size
+        for field in header['fields']:
+            values = np.frombuffer(content, dtype=field['dtype'], count=count, offset=offset)
+            columns[field['name']].append(values)
+            offset += values.nbytes
+        expected_cell += count
+    
+    return header, {name: np.concatenate(values) for name, values in columns.items()}
+
+
+class SweepServiceTest(SimpleTestCase):
+    
+    def test_block_size_does_not_change_results(self):
+        axes = parse_axes(AXES)
+        fields = ['kinetic_energy_megatons', 'tsunami_risk', 'estimated_deaths']
+        service = ThreatCalculationService()
+        
+        whole = list(service.sweep(axes, fields, workers=1))
+        blocks = list(service.sweep(axes, fields, workers=1, block_cells=17))
+        
+        self.assertEqual(len(whole), 1)
+        self.assertEqual([offset for offset, _ in blocks], list(range(0, 336, 17)))
+        for field in fields:
+            np.testing.assert_array_equal(
+                np.concatenate([columns[field] for _, columns in blocks]), whole[0][1][field]
+            )
+    
+    def test_rejects_values_outside_limits(self):
+        for axes in (
+            {**AXES, 'diameter_km': [0.0]},
+            {**AXES, 'velocity_kps': {'start': 10.0, 'stop': 1000.0}},
+            {**AXES, 'impact_type': ['space']},
+            {**AXES, 'diameter_km': {'start': 1.0, 'stop': 2.0, 'num': 0}},
+        ):
+            with self.assertRaises(ValueError):
+                parse_axes(axes)
+
+
+class SweepViewTest(TestCase):
+    
+    def sweep(self, **data):
+        return self.client.post(URL, {**AXES, **data}, content_type='application/json')
+    
+    def test_binary_matches_calculations_in_c_order(self):
+        response = self.sweep(output='binary')
+        
+        self.assertEqual(response.status_code, 200)
+        header, columns = read_sweep(b''.join(response.streaming_content))
+        self.assertEqual(header['shape'], [7, 3, 4, 2, 2])
+        self.assertEqual(header['cells'], 336)
+        
+        grid = np.meshgrid(*(np.array(header['axes'][name]) for name in (
+            'diameter_km', 'velocity_kps', 'impact_angle_degrees', 'density_kg_m3', 'impact_type'
+        )), indexing='ij')
+        expected = calculate_threats(grid[0], grid[3], grid[1], grid[2], grid[4])
+        
+        np.testing.assert_array_equal(columns['crater_diameter_km'], expected['crater_diameter_km'].ravel())
+        np.testing.assert_array_equal(columns['estimated_deaths'], expected['estimated_deaths'].ravel())
+        
+        labels = next(field['labels'] for field in header['fields'] if field['name'] == 'overall_risk_level')
+        self.assertEqual(
+            np.array(labels)[columns['overall_risk_level']].tolist(),
+            expected['overall_risk_level'].ravel().tolist()
+        )
+    
+    def test_json_matches_binary(self):
+        fields = ['seismic_magnitude', 'tsunami_risk']
+        _, binary = read_sweep(b''.join(self.sweep(output='binary', fields=fields).streaming_content))
+        
+        columns = self.sweep(fields=fields).json()['fields']
+        
+        self.assertEqual(columns['seismic_magnitude'], binary['seismic_magnitude'].tolist())
+        self.assertEqual(
+            columns['tsunami_risk'],
+            np.array(('none', 'low', 'moderate', 'high', 'extreme'))[binary['tsunami_risk']].tolist()
+        )
+    
+    def test_float32_output(self):
+        header, columns = read_sweep(
+            b''.join(self.sweep(output='binary', dtype='float32', fields=['mass_kg']).streaming_content)
+        )
+        
+        self.assertEqual(header['fields'][0]['dtype'], '<f4')
+        self.assertEqual(columns['mass_kg'].dtype, np.float32)
+    
+    def test_rejects_bad_requests(self):
+        for data in (
+            {'output': 'csv'},
+            {'dtype': 'float16'},
+            {'fields': ['not_a_field']},
+            {'exact': 'maybe'},
+            {'diameter_km': {'start': 0.01, 'stop': 1.0, 'num': 10000}},
+        ):
+            with self.subTest(data=data):
+                self.assertEqual(self.sweep(**data).status_code, 400)
@@ -0,0 +1,107 @@
+"""
+Tests for impact effects uncertainty runs
+"""
+import numpy as np
+from django.test import SimpleTestCase, TestCase
+
+from asteroids import calculations
+from asteroids.models import ThreatScenario
+from asteroids.services import ThreatCalculationService
+from asteroids.uncertainty import INPUT_SIGMAS, RadialPopulation, parse_sigmas, percentiles, sample_chunk
+from orbital.montecarlo import spawn_chunks
+
+NOMINAL = {
+    'diameter_km': 0.3,
+    'density_kg_m3': 2600.0,
+    'velocity_kps': 20.0,
+    'impact_angle_degrees': 45.0,
+    'mass_kg': None,
+}
+PERCENTILE_FIELDS = (
+    'energy_p05_megatons', 'energy_p50_megatons', 'energy_p95_megatons',
+    'crater_diameter_p05_km', 'crater_diameter_p95_km', 'deaths_p50', 'deaths_p95',
+)
+
+
+class SampleChunkTest(SimpleTestCase):
+    
+    def test_zero_sigmas_give_the_nominal_effects(self):
+        chunk = sample_chunk(
+            spawn_chunks(10, 10, 0)[0], NOMINAL, dict.fromkeys(INPUT_SIGMAS, 0.0)
+        )
+        expected = calculations.calculate_threats(
+            NOMINAL['diameter_km'], NOMINAL['density_kg_m3'], NOMINAL['velocity_kps'],
+            NOMINAL['impact_angle_degrees'], exact=False
+        )
+        
+        for output in ('kinetic_energy_megatons', 'crater_diameter_km'):
+            np.testing.assert_allclose(chunk[output], float(expected[output]), rtol=1e-12)
+    
+    def test_mass_scales_with_sampled_volume(self):
+        sigmas = {**dict.fromkeys(INPUT_SIGMAS, 0.0), 'diameter_km': 0.3}
+        chunk = spawn_chunks(1000, 1000, 1)[0]
+        
+        spherical = sample_chunk(chunk, NOMINAL, sigmas)
+        heavy = sample_chunk(chunk, {**NOMINAL, 'mass_kg': 1e12}, sigmas)
+        
+        nominal_mass = float(calculations.impact_masses(0.3, 2600.0, exact=False))
+        np.testing.assert_allclose(
+            heavy['kinetic_energy_megatons'],
+            spherical['kinetic_energy_megatons'] * 1e12 / nominal_mass,
+            rtol=1e-12
+        )
+    
+    def test_percentiles_are_ordered(self):
+        chunks = [sample_chunk(chunk, NOMINAL, INPUT_SIGMAS) for chunk in spawn_chunks(5000, 1000, 2)]
+        
+        values = percentiles(chunks)
+        
+        for output, by_percentile in values.items():
+            with self.subTest(output=output):
+                self.assertLessEqual(by_percentile[5], by_percentile[50])
+                self.assertLessEqual(by_percentile[50], by_percentile[95])
+    
+    def test_radial_profile_matches_at_its_radii(self):
+        radii_km = np.geomspace(0.01, 20000.0, 64)
+        profile = RadialPopulation(radii_km, 50.0 * np.pi * radii_km ** 2)
+        
+        np.testing.assert_allclose(profile.population_within(None, None, radii_km), 50.0 * np.pi * radii_km ** 2)
+        self.assertAlmostEqual(profile.population_within(None, None, 0.005) / (50.0 * np.pi * 0.005 ** 2), 1.0)
+        self.assertEqual(profile.population_within(None, None, 0.0), 0.0)
+    
+    def test_parse_sigmas(self):
+        self.assertEqual(parse_sigmas({'velocity_kps': '0.2'}), {**INPUT_SIGMAS, 'velocity_kps': 0.2})
+        
+        for data in ({'mass_kg': 0.1}, {'diameter_km': -0.1}, {'diameter_km': 'nan'}, {'velocity_kps': 5}, [0.1]):
+            with self.subTest(data=data):
+                with self.assertRaises(ValueError):
+                    parse_sigmas(data)
+
+
+class RunUncertaintyTest(TestCase):
+    
+    def setUp(self):
+        self.service = ThreatCalculationService()
+        self.scenario = ThreatScenario.objects.create(
+            name='Test', description='', diameter_km=0.3, velocity_kps=20
+        )
+    
+    def run_uncertainty(self, **kwargs):
+        run = self.service.run_uncertainty(self.scenario, num_samples=5000, chunk_size=1000, **kwargs)
+        return {field: getattr(run, field) for field in PERCENTILE_FIELDS}
+    
+    def test_seed_reproduces_run_whatever_the_workers(self):
+        first = self.run_uncertainty(seed=7, workers=1)
+        
+        self.assertEqual(self.run_uncertainty(seed=7, workers=2), first)
+        self.assertNotEqual(self.run_uncertainty(seed=8, workers=1), first)
+    
+    def test_stored_seed_reproduces_unseeded_run(self):
+        run = self.service.run_uncertainty(self.scenario, num_samples=2000, chunk_size=500, workers=1)
+        
+        again = self.service.run_uncertainty(
+            self.scenario, num_samples=2000, chunk_size=500, seed=run.seed, workers=1
+        )
+        
+        self.assertEqual(again.energy_p50_megatons, run.energy_p50_megatons)
+        self.assertEqual(again.deaths_p95, run.deaths_p95)
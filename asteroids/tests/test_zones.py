@@ -0,0 +1,52 @@
+"""
+Tests for bulk destruction zone upserts
+"""
+from django.core.cache import cache
+from django.test import TestCase
+
+from asteroids.models import DestructionZone, ThreatScenario
+from asteroids.services import DESTRUCTION_ZONES, ThreatCalculationService
+from meteor_madness.instrumentation import QueryCounter
+
+
+class DestructionZoneUpsertTest(TestCase):
+    
+    def setUp(self):
+        cache.clear()
+        self.service = ThreatCalculationService()
+        self.scenarios = [
+            ThreatScenario.objects.create(
+                name=f'Scenario {index}', description='', diameter_km=0.1 * (index + 1), velocity_kps=20
+            )
+            for index in range(10)
+        ]
+    
+    def test_recalculation_updates_zones_in_place(self):
+        assessments = self.service.calculate_scenario_threats(self.scenarios)
+        zone_ids = set(DestructionZone.objects.values_list('id', flat=True))
+        
+        self.assertEqual(len(zone_ids), len(self.scenarios) * len(DESTRUCTION_ZONES))
+        
+        for scenario in self.scenarios:
+            scenario.diameter_km *= 2
+            scenario.save()
+        updated = self.service.calculate_scenario_threats(self.scenarios)
+        
+        self.assertEqual(set(DestructionZone.objects.values_list('id', flat=True)), zone_ids)
+        for before, after in zip(assessments, updated):
+            self.assertGreater(after.destruction_radius_km, before.destruction_radius_km)
+            radii = {zone.zone_type: zone.radius_km for zone in after.destruction_zones.all()}
+            for zone_data in DESTRUCTION_ZONES:
+                self.assertAlmostEqual(
+                    radii[zone_data['zone_type']],
+                    after.destruction_radius_km * zone_data['radius_multiplier']
+                )
+    
+    def test_zones_are_written_in_one_query(self):
+        assessments = self.service.calculate_scenario_threats(self.scenarios)
+        
+        with QueryCounter() as queries:
+            written = self.service.save_destruction_zones(assessments)
+        
+        self.assertEqual(written, len(self.scenarios) * len(DESTRUCTION_ZONES))
+        self.assertEqual(queries.count, 1)
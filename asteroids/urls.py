@@ -3,11 +3,13 @@ Asteroid URLs
 """
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import ThreatScenarioViewSet, ThreatAssessmentViewSet
+from .views import ThreatScenarioViewSet, ThreatAssessmentViewSet, UncertaintyRunViewSet, CalculationJobViewSet
 
 router = DefaultRouter()
 router.register(r'scenarios', ThreatScenarioViewSet, basename='threat-scenario')
 router.register(r'assessments', ThreatAssessmentViewSet, basename='threat-assessment')
+router.register(r'uncertainty-runs', UncertaintyRunViewSet, basename='uncertainty-run')
+router.register(r'jobs', CalculationJobViewSet, basename='calculation-job')
 
 urlpatterns = [
     path('', include(router.urls)),
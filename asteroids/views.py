@@ -1,20 +1,40 @@
 """
 Asteroid Threat Assessment Views
 """
-from rest_framework import viewsets, status
+import numpy as np
+from django.http import StreamingHttpResponse
+from rest_framework import mixins, viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
 from django_filters.rest_framework import DjangoFilterBackend
 
-from .models import ThreatScenario, ThreatAssessment, DestructionZone
+from .calculations import MAX_MASS_KG
+from .models import ThreatScenario, ThreatAssessment, DestructionZone, UncertaintyRun, CalculationJob
 from .serializers import (
     ThreatScenarioSerializer,
     ThreatScenarioListSerializer,
     ThreatAssessmentSerializer,
-    DestructionZoneSerializer
+    DestructionZoneSerializer,
+    UncertaintyRunSerializer,
+    CalculationJobSerializer
 )
-from .services import ThreatCalculationService
+from .services import ThreatCalculationService, CalculationJobService
+from .sweep import (
+    AXIS_LIMITS, CONTENT_TYPE, FIELD_LABELS, FIELD_TYPES, FLOAT_TYPES, IMPACT_TYPES, SWEEP_AXES,
+    grid_shape, pack_block, pack_header, parse_axes
+)
+from .uncertainty import parse_sigmas
+from meteor_madness.params import parse_bool
+
+MAX_SWEEP_CELLS = 2000000
+MAX_JSON_SWEEP_CELLS = 20000
+MAX_UNCERTAINTY_SAMPLES = 1000000
+OPTIONAL_LIMITS = {
+    'mass_kg': (1.0, MAX_MASS_KG),
+    'impact_location_lat': (-90.0, 90.0),
+    'impact_location_lon': (-180.0, 180.0),
+}
 
 
 class ThreatScenarioViewSet(viewsets.ReadOnlyModelViewSet):
@@ -36,15 +56,191 @@ class ThreatScenarioViewSet(viewsets.ReadOnlyModelViewSet):
     
     @action(detail=True, methods=['post'])
     def calculate_assessment(self, request, pk=None):
-        """Calculate threat assessment for a scenario"""
+        """
+        Calculate threat assessment for a scenario
+        
+        The stored assessment is returned while the scenario's inputs are
+        unchanged; pass force to recalculate regardless. Calculations are
+        queued as a job (202, see CalculationJobViewSet) unless sync is
+        set, in which case the assessment is calculated in the request.
+        """
         scenario = self.get_object()
         
+        try:
+            force = parse_bool(request.data.get('force'))
+            sync = parse_bool(request.data.get('sync'))
+        except ValueError:
+            return Response(
+                {'error': 'force and sync must be booleans'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
         service = ThreatCalculationService()
-        assessment = service.calculate_scenario_threat(scenario)
+        assessment = None if force else service.stored_assessment(scenario)
+        
+        if assessment is None and not sync:
+            job, _ = CalculationJobService().submit(
+                'threat_assessment', {'scenario_id': scenario.id, 'force': force}
+            )
+            serializer = CalculationJobSerializer(job, context={'request': request})
+            return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+        
+        if assessment is None:
+            assessment = service.calculate_scenario_threat(scenario, force=force)
         
         serializer = ThreatAssessmentSerializer(assessment)
         return Response(serializer.data)
     
+    @action(detail=False, methods=['post'])
+    def sweep(self, request):
+        """
+        Threat calculations over a grid of scenario parameters
+        
+        Takes diameter_km, velocity_kps and impact_angle_degrees axes, and
+        optionally density_kg_m3 and impact_type, each a list of values or
+        a {start, stop, num, scale} range, plus fields, output ('json' or
+        'binary'), dtype and exact. The result is columnar: one flat array
+        per field over the grid cells in C order of the axes. Binary
+        output is streamed in blocks (layout in asteroids/sweep.py).
+        """
+        data = request.data
+        output = data.get('output', 'json')
+        dtype = data.get('dtype', 'float64')
+        fields = data.get('fields') or list(FIELD_TYPES)
+        
+        try:
+            axes = parse_axes(data)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            exact = parse_bool(data.get('exact'), default=True)
+        except ValueError:
+            return Response({'error': 'exact must be a boolean'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        if isinstance(fields, str) or not set(fields) <= set(FIELD_TYPES):
+            return Response(
+                {'error': f'fields must be a list among: {", ".join(FIELD_TYPES)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if output not in ('json', 'binary') or dtype not in FLOAT_TYPES:
+            return Response(
+                {'error': f'output must be json or binary; dtype one of: {", ".join(FLOAT_TYPES)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        cells = int(np.prod(grid_shape(axes)))
+        max_cells = MAX_JSON_SWEEP_CELLS if output == 'json' else MAX_SWEEP_CELLS
+        if cells > max_cells:
+            return Response(
+                {'error': f'At most {max_cells} cells with output={output} (grid has {cells})'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        service = ThreatCalculationService()
+        blocks = service.sweep(axes, fields, exact=exact, dtype=dtype)
+        
+        if output == 'binary':
+            def stream():
+                yield pack_header(axes, fields, FLOAT_TYPES[dtype])
+                for offset, columns in blocks:
+                    yield pack_block(offset, columns, fields)
+            
+            return StreamingHttpResponse(stream(), content_type=CONTENT_TYPE)
+        
+        columns = {field: [] for field in fields}
+        for _, block in blocks:
+            for field in fields:
+                values = block[field]
+                if field in FIELD_LABELS:
+                    values = np.array(FIELD_LABELS[field])[values]
+                columns[field].extend(values.tolist())
+        
+        return Response({
+            'axes': {name: axes[name].tolist() for name in SWEEP_AXES},
+            'shape': grid_shape(axes),
+            'cells': cells,
+            'fields': columns
+        })
+    
+    @action(detail=False, methods=['get'])
+    def estimate(self, request):
+        """
+        Threat estimate for hypothetical impact parameters, nothing saved
+        
+        Query parameters: diameter_km and velocity_kps, and optionally
+        density_kg_m3, impact_angle_degrees, impact_type, mass_kg,
+        impact_location_lat and impact_location_lon. Values come from the
+        precomputed threat table unless exact is true (see
+        asteroids/lookup.py).
+        """
+        params = request.query_params
+        
+        try:
+            values = {
+                name: float(params.get(name, default))
+                for name, default in (
+                    ('diameter_km', None),
+                    ('velocity_kps', None),
+                    ('density_kg_m3', 2600),
+                    ('impact_angle_degrees', 45),
+                )
+            }
+            optional = {
+                name: float(params[name]) if name in params else None
+                for name in ('mass_kg', 'impact_location_lat', 'impact_location_lon')
+            }
+        except (TypeError, ValueError):
+            return Response(
+                {'error': 'diameter_km and velocity_kps required; parameters must be numeric'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        for name, value in values.items():
+            low, high = AXIS_LIMITS[name]
+            if not low <= value <= high:
+                return Response(
+                    {'error': f'{name} must be between {low:g} and {high:g}'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        
+        for name, value in optional.items():
+            low, high = OPTIONAL_LIMITS[name]
+            if value is not None and not low <= value <= high:
+                return Response(
+                    {'error': f'{name} must be between {low:g} and {high:g}'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        
+        impact_type = params.get('impact_type', 'land')
+        if impact_type not in IMPACT_TYPES:
+            return Response(
+                {'error': f'impact_type must be one of: {", ".join(IMPACT_TYPES)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            exact = parse_bool(params.get('exact'))
+        except ValueError:
+            return Response({'error': 'exact must be a boolean'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        if (optional['impact_location_lat'] is None) != (optional['impact_location_lon'] is None):
+            return Response(
+                {'error': 'impact_location_lat and impact_location_lon go together'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        service = ThreatCalculationService()
+        result = service.estimate_threat(
+            **values,
+            **optional,
+            impact_type=impact_type,
+            exact=exact
+        )
+        
+        return Response(result)
+    
     @action(detail=False, methods=['get'])
     def by_severity(self, request):
         """Get scenarios ordered by severity (energy)"""
@@ -107,3 +303,59 @@ class ThreatAssessmentViewSet(viewsets.ReadOnlyModelViewSet):
         serializer = DestructionZoneSerializer(zones, many=True)
         return Response(serializer.data)
 
+
+
+class UncertaintyRunViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    ViewSet for impact effect uncertainty runs
+    """
+    
+    queryset = UncertaintyRun.objects.select_related('scenario')
+    serializer_class = UncertaintyRunSerializer
+    permission_classes = [AllowAny]
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['scenario']
+    
+    @action(detail=False, methods=['post'])
+    def run(self, request):
+        """Queue an uncertainty run for a scenario"""
+        from .tasks import run_uncertainty
+        
+        scenario_id = request.data.get('scenario_id')
+        
+        if not ThreatScenario.objects.filter(id=scenario_id).exists():
+            return Response({'error': 'Scenario not found'}, status=status.HTTP_404_NOT_FOUND)
+        
+        seed = request.data.get('seed')
+        try:
+            num_samples = int(request.data.get('num_samples', 100000))
+            seed = None if seed is None else int(seed)
+            sigmas = parse_sigmas(request.data.get('sigmas'))
+        except (TypeError, ValueError) as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        if not 1 <= num_samples <= MAX_UNCERTAINTY_SAMPLES or (seed is not None and seed < 0):
+            return Response(
+                {'error': f'num_samples must be between 1 and {MAX_UNCERTAINTY_SAMPLES} and seed non-negative'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        task = run_uncertainty.delay(scenario_id, num_samples=num_samples, sigmas=sigmas, seed=seed)
+        
+        return Response({
+            'message': 'Uncertainty run queued',
+            'task_id': task.id
+        }, status=status.HTTP_202_ACCEPTED)
+
+
+class CalculationJobViewSet(mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """
+    Status of calculation jobs
+    
+    Poll a job here, or send {"type": "subscribe", "job_id": ...} over
+    the ws/tracking/ socket to be sent its status as it changes.
+    """
+    
+    queryset = CalculationJob.objects.all()
+    serializer_class = CalculationJobSerializer
+    permission_classes = [AllowAny]
@@ -0,0 +1,43 @@
+"""
+Database query instrumentation for batch jobs
+"""
+import time
+from django.db import connections
+
+
+class QueryCounter:
+    """
+    Count the queries a block of code runs, and the time spent in them
+    
+    Used as a context manager. Hooks connection.execute_wrapper, so it
+    works with DEBUG off (unlike connection.queries):
+        
+        with QueryCounter() as queries:
+            ...
+        logger.info(f"{queries.count} queries, {queries.per(items):.1f} per item")
+    """
+    
+    def __init__(self, using='default'):
+        self.connection = connections[using]
+        self.count = 0
+        self.seconds = 0.0
+    
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - started
+    
+    def __enter__(self):
+        self._wrapper = self.connection.execute_wrapper(self)
+        self._wrapper.__enter__()
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        return self._wrapper.__exit__(exc_type, exc_value, traceback)
+    
+    def per(self, items):
+        """Queries per item (zero items count as one)"""
+        return self.count / max(items, 1)
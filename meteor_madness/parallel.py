@@ -0,0 +1,41 @@
+"""
+Process pool helpers for CPU-bound batch calculations
+"""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from django.conf import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def map_chunks(func, chunks, workers=None):
+    """
+    Apply func to every chunk, spreading the work across processes
+    
+    Results are yielded in input order as they complete. Falls back to
+    running in-process for a single worker, or when called from a
+    daemonic process (such as a prefork Celery worker), which may not
+    start children of its own.
+    
+    The pool serves management commands and web requests. Celery tasks
+    instead fan their chunks out as subtasks, so the prefork workers
+    themselves are the pool, and call the services with workers=1.
+    """
+    if workers is None:
+        workers = settings.COMPUTE_WORKERS
+    
+    if workers > 1 and multiprocessing.current_process().daemon:
+        logger.warning(
+            "Daemonic process cannot start a pool; computing in-process "
+            "(fan Celery work out as subtasks instead)"
+        )
+        workers = 1
+    
+    if workers <= 1:
+        for chunk in chunks:
+            yield func(chunk)
+        return
+    
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(func, chunks)
@@ -0,0 +1,23 @@
+"""
+Request parameter parsing shared by the API views
+"""
+from rest_framework import serializers
+
+_boolean = serializers.BooleanField()
+
+
+def parse_bool(value, default=False):
+    """
+    Read a boolean request flag the way DRF's BooleanField does
+    
+    Accepts booleans and true/false, yes/no, on/off or 1/0 in any case; a
+    missing or empty value gives default. Anything else raises ValueError,
+    so "false" is never mistaken for a truthy string.
+    """
+    if value is None or value == '':
+        return default
+    
+    try:
+        return _boolean.to_internal_value(value)
+    except serializers.ValidationError:
+        raise ValueError(f"Not a boolean: {value!r}")
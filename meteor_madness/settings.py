@@ -213,6 +213,10 @@ CELERY_BEAT_SCHEDULE = {
         'task': 'asteroids.tasks.calculate_threat_assessments',
         'schedule': timedelta(hours=12),
     },
+    'calculate-trajectories-nightly': {
+        'task': 'orbital.tasks.calculate_all_trajectories',
+        'schedule': timedelta(days=1),
+    },
 }
 
 # Channels Configuration (WebSocket)
@@ -292,4 +296,8 @@ if not DEBUG:
 MAX_NEO_CACHE_AGE = 3600  # 1 hour
 THREAT_ASSESSMENT_CACHE_AGE = 7200  # 2 hours
 CLOSE_APPROACH_DAYS = 7  # Default days for close approach queries
+COMPUTE_WORKERS = config('COMPUTE_WORKERS', default=os.cpu_count() or 1, cast=int)  # Process pool size for batch calculations
 
+EPHEMERIS_TABLE_PATH = config('EPHEMERIS_TABLE_PATH', default=str(BASE_DIR / 'data' / 'body_ephemeris.npy'))  # Built with build_ephemeris_table
+POPULATION_RASTER_PATH = config('POPULATION_RASTER_PATH', default=str(BASE_DIR / 'data' / 'population.npy'))  # Built with build_population_raster
+THREAT_TABLE_PATH = config('THREAT_TABLE_PATH', default=str(BASE_DIR / 'data' / 'threat_table.npy'))  # Built with build_threat_tables
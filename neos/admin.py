@@ -51,7 +51,7 @@ class CloseApproachAdmin(admin.ModelAdmin):
         'neo', 'close_approach_date', 'miss_distance_lunar',
         'relative_velocity_kps', 'is_close'
     ]
-    list_filter = ['orbiting_body', 'close_approach_date']
+    list_filter = ['orbiting_body', 'source', 'close_approach_date']
     search_fields = ['neo__name']
     readonly_fields = ['created_at', 'updated_at']
     date_hierarchy = 'close_approach_date'
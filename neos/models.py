@@ -29,6 +29,11 @@ class NEO(models.Model):
     
     # Orbital Data
     orbital_data = models.JSONField(default=dict, blank=True)
+    orbital_data_hash = models.CharField(
+        max_length=40,
+        blank=True,
+        help_text="SHA-1 of orbital_data, used to detect changed orbit solutions"
+    )
     
     # Additional Information
     nasa_jpl_url = models.URLField(max_length=500, blank=True, null=True)
@@ -113,6 +118,17 @@ class CloseApproach(models.Model):
     # Orbiting Body
     orbiting_body = models.CharField(max_length=50, default="Earth")
     
+    # Data Source
+    source = models.CharField(
+        max_length=20,
+        choices=[
+            ('nasa', 'NASA NeoWs'),
+            ('local', 'Local Prediction')
+        ],
+        default='nasa',
+        db_index=True
+    )
+    
     # System fields
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
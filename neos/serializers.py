@@ -19,7 +19,7 @@ class CloseApproachSerializer(serializers.ModelSerializer):
             'relative_velocity_kps', 'relative_velocity_kmph', 'relative_velocity_mph',
             'miss_distance_astronomical', 'miss_distance_lunar',
             'miss_distance_kilometers', 'miss_distance_miles',
-            'orbiting_body', 'is_close',
+            'orbiting_body', 'source', 'is_close',
             'created_at', 'updated_at'
         ]
         read_only_fields = ['created_at', 'updated_at']
@@ -1,6 +1,8 @@
 """
 NEO Data Services - Integration with NASA APIs
 """
+import hashlib
+import json
 import requests
 from django.conf import settings
 from django.utils import timezone
@@ -72,12 +74,16 @@ class NEODataService:
         neos_created = 0
         neos_updated = 0
         approaches_created = 0
+        changed_neo_ids = []
         
         near_earth_objects = data.get('near_earth_objects', {})
         
         for date_str, neos_list in near_earth_objects.items():
             for neo_data in neos_list:
-                neo, created = self._sync_neo(neo_data)
+                neo, created, orbit_changed = self._sync_neo(neo_data)
+                
+                if orbit_changed:
+                    changed_neo_ids.append(neo.id)
                 
                 if created:
                     neos_created += 1
@@ -93,11 +99,17 @@ class NEODataService:
             'success': True,
             'neos_created': neos_created,
             'neos_updated': neos_updated,
-            'approaches_created': approaches_created
+            'approaches_created': approaches_created,
+            'changed_neo_ids': changed_neo_ids
         }
     
     def _sync_neo(self, neo_data):
-        """Sync individual NEO to database"""
+        """
+        Sync individual NEO to database
+        
+        Returns the NEO, whether it was created, and whether its orbital
+        data differs from what was stored before.
+        """
         neo_id = neo_data['neo_reference_id']
         
         # Extract diameter data
@@ -107,6 +119,10 @@ class NEODataService:
         
         # Extract orbital data if available
         orbital_data = neo_data.get('orbital_data', {})
+        orbital_data_hash = self._orbital_data_hash(orbital_data)
+        previous_hash = NEO.objects.filter(neo_reference_id=neo_id).values_list(
+            'orbital_data_hash', flat=True
+        ).first()
         
         neo, created = NEO.objects.update_or_create(
             neo_reference_id=neo_id,
@@ -122,6 +138,7 @@ class NEODataService:
                 'estimated_diameter_max_m': m_data.get('estimated_diameter_max'),
                 'nasa_jpl_url': neo_data.get('nasa_jpl_url', ''),
                 'orbital_data': orbital_data,
+                'orbital_data_hash': orbital_data_hash,
                 'orbital_period_days': self._safe_float(orbital_data.get('orbital_period')),
                 'perihelion_distance': self._safe_float(orbital_data.get('perihelion_distance')),
                 'aphelion_distance': self._safe_float(orbital_data.get('aphelion_distance')),
@@ -135,7 +152,12 @@ class NEODataService:
             }
         )
         
-        return neo, created
+        return neo, created, previous_hash != orbital_data_hash
+    
+    def _orbital_data_hash(self, orbital_data):
+        """Stable content hash of NASA orbital data"""
+        payload = json.dumps(orbital_data, sort_keys=True, default=str)
+        return hashlib.sha1(payload.encode()).hexdigest()
     
     def _sync_close_approach(self, neo, approach_data):
         """Sync close approach data"""
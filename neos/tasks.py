@@ -27,6 +27,16 @@ def fetch_neo_data():
     # Trigger statistics calculation
     calculate_neo_statistics.delay()
     
+    # Recompute derived orbital data only for NEOs whose orbit changed
+    if result.get('changed_neo_ids'):
+        from orbital.tasks import recompute_orbits
+        recompute_orbits.delay(result['changed_neo_ids'])
+    
+    # Reassess the NEOs synced since their last threat assessment
+    if result.get('success'):
+        from asteroids.tasks import calculate_neo_threat_assessments
+        calculate_neo_threat_assessments.delay()
+    
     return result
 
 
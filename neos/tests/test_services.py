@@ -0,0 +1,63 @@
+"""
+Tests for syncing NEO data from NASA
+"""
+import copy
+from unittest import mock
+
+from django.test import TestCase
+
+from neos.models import NEO
+from neos.services import NEODataService
+
+
+def feed_neo(reference_id, eccentricity='0.2227'):
+    return {
+        'neo_reference_id': reference_id,
+        'name': f'({reference_id})',
+        'is_potentially_hazardous_asteroid': False,
+        'absolute_magnitude_h': 20.5,
+        'estimated_diameter': {},
+        'orbital_data': {
+            'semi_major_axis': '1.458',
+            'eccentricity': eccentricity,
+            'inclination': '10.83',
+            'ascending_node_longitude': '304.3',
+            'perihelion_argument': '178.9',
+            'mean_anomaly': '110.0',
+            'epoch_osculation': '2460600.5',
+        },
+        'close_approach_data': [],
+    }
+
+
+class SyncChangedOrbitsTest(TestCase):
+    
+    def sync(self, *neos):
+        service = NEODataService()
+        feed = {'near_earth_objects': {'2026-10-17': [copy.deepcopy(neo) for neo in neos]}}
+        with mock.patch.object(service, 'fetch_neo_feed', return_value=feed):
+            return service.sync_neo_data()
+    
+    def test_reports_only_changed_orbits(self):
+        first = self.sync(feed_neo('2000433'), feed_neo('3000001'))
+        self.assertEqual(len(first['changed_neo_ids']), 2)
+        
+        unchanged = self.sync(feed_neo('2000433'), feed_neo('3000001'))
+        self.assertEqual(unchanged['changed_neo_ids'], [])
+        self.assertEqual(unchanged['neos_updated'], 2)
+        
+        changed = self.sync(feed_neo('2000433', eccentricity='0.2230'), feed_neo('3000001'))
+        self.assertEqual(
+            changed['changed_neo_ids'],
+            [NEO.objects.get(neo_reference_id='2000433').id]
+        )
+    
+    def test_hash_ignores_key_order(self):
+        service = NEODataService()
+        orbital_data = feed_neo('2000433')['orbital_data']
+        reordered = dict(reversed(list(orbital_data.items())))
+        
+        self.assertEqual(
+            service._orbital_data_hash(orbital_data),
+            service._orbital_data_hash(reordered)
+        )
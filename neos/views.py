@@ -114,7 +114,7 @@ class CloseApproachViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = CloseApproachSerializer
     permission_classes = [AllowAny]
     filter_backends = [DjangoFilterBackend]
-    filterset_fields = ['orbiting_body']
+    filterset_fields = ['orbiting_body', 'source']
     
     @action(detail=False, methods=['get'])
     def upcoming(self, request):
@@ -2,7 +2,7 @@
 Orbital Admin Configuration
 """
 from django.contrib import admin
-from .models import OrbitalElements, TrajectoryPoint
+from .models import OrbitalElements, TrajectoryRun, TrajectoryPoint, Ephemeris, MonteCarloRun
 
 
 @admin.register(OrbitalElements)
@@ -15,6 +15,15 @@ class OrbitalElementsAdmin(admin.ModelAdmin):
     readonly_fields = ['calculated_at']
 
 
+@admin.register(TrajectoryRun)
+class TrajectoryRunAdmin(admin.ModelAdmin):
+    list_display = [
+        'id', 'mode', 'status', 'neo_count', 'point_count', 'ingest_seconds', 'created_at'
+    ]
+    list_filter = ['status', 'mode']
+    readonly_fields = ['created_at', 'retired_at']
+
+
 @admin.register(TrajectoryPoint)
 class TrajectoryPointAdmin(admin.ModelAdmin):
     list_display = [
@@ -22,3 +31,19 @@ class TrajectoryPointAdmin(admin.ModelAdmin):
     ]
     list_filter = ['neo']
 
+
+
+@admin.register(Ephemeris)
+class EphemerisAdmin(admin.ModelAdmin):
+    list_display = [
+        'neo', 'start_jd', 'end_jd', 'num_segments', 'degree'
+    ]
+    readonly_fields = ['calculated_at']
+
+
+@admin.register(MonteCarloRun)
+class MonteCarloRunAdmin(admin.ModelAdmin):
+    list_display = [
+        'neo', 'num_clones', 'impact_probability', 'min_distance_au', 'calculated_at'
+    ]
+    readonly_fields = ['calculated_at']
@@ -0,0 +1,78 @@
+"""
+Binary Trajectory Format
+
+Compact little-endian layout for visualization clients, readable with a
+DataView for the headers and typed arrays for the data:
+    
+    File header (16 bytes)
+        magic          4s       b'MMTJ'
+        version        uint16
+        float size     uint8    4 (float32) or 8 (float64)
+        flags          uint8    bit 0: velocities included
+        object count   uint32
+        reserved       uint32
+    
+    Per object: header (32 bytes) followed by its arrays
+        neo id         int64
+        point count    uint32
+        object flags   uint32   bit 0: explicit date offsets included
+        start jd       float64
+        end jd         float64
+        
+        [date offsets]  count floats, days since start jd
+        positions       count * 3 floats, interleaved x, y, z (AU)
+        [velocities]    count * 3 floats, interleaved (AU/day)
+
+Without explicit date offsets the points are evenly spaced from start jd
+to end jd inclusive.
+"""
+import struct
+import numpy as np
+
+MAGIC = b'MMTJ'
+VERSION = 1
+
+FILE_HEADER = struct.Struct('<4sHBBII')
+OBJECT_HEADER = struct.Struct('<qIIdd')
+
+FLAG_VELOCITIES = 0x1
+FLAG_EXPLICIT_DATES = 0x1
+
+FLOAT_TYPES = {
+    'float32': np.dtype('<f4'),
+    'float64': np.dtype('<f8'),
+}
+
+CONTENT_TYPE = 'application/octet-stream'
+
+
+def pack_trajectories(trajectories, dtype='float32', include_velocities=True):
+    """
+    Pack trajectories into the binary format
+    
+    ``trajectories`` is an iterable of (neo_id, jd, positions, velocities,
+    uniform) tuples, where ``uniform`` marks an evenly spaced date grid.
+    """
+    float_type = FLOAT_TYPES[dtype]
+    trajectories = list(trajectories)
+    
+    flags = FLAG_VELOCITIES if include_velocities else 0
+    parts = [FILE_HEADER.pack(MAGIC, VERSION, float_type.itemsize, flags, len(trajectories), 0)]
+    
+    for neo_id, jd, positions, velocities, uniform in trajectories:
+        jd = np.asarray(jd, dtype=np.float64)
+        start_jd = float(jd[0]) if len(jd) else 0.0
+        end_jd = float(jd[-1]) if len(jd) else 0.0
+        object_flags = 0 if uniform else FLAG_EXPLICIT_DATES
+        
+        parts.append(OBJECT_HEADER.pack(neo_id, len(jd), object_flags, start_jd, end_jd))
+        
+        if not uniform:
+            parts.append((jd - start_jd).astype(float_type).tobytes())
+        
+        parts.append(np.asarray(positions).astype(float_type).tobytes())
+        
+        if include_velocities:
+            parts.append(np.asarray(velocities).astype(float_type).tobytes())
+    
+    return b''.join(parts)
@@ -0,0 +1,404 @@
+"""
+Precomputed Major-Body Ephemerides
+
+Heliocentric ecliptic (J2000) states of Earth, the Moon and Jupiter are tabulated
+at a fixed cadence and stored as a .npy file with a JSON sidecar. The
+table is opened as a read-only memory map, so every gunicorn and Celery
+process on a host shares the same pages, and positions and velocities
+are recovered with vectorized cubic Hermite interpolation.
+
+Tables are built with the build_ephemeris_table management command, from
+a JPL kernel through skyfield or from the analytic mean-element model
+below. Without an installed table the first process to need one
+tabulates the analytic model to the configured path, under a file lock
+so concurrent workers wait for it rather than repeating the work, and
+every process then maps that file.
+"""
+import json
+import os
+import threading
+from pathlib import Path
+import numpy as np
+import logging
+
+from .propagation import kepler_states
+
+try:
+    import fcntl
+except ImportError:  # Windows: concurrent first builds race to the same atomic rename
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+TABLE_VERSION = 2
+BODIES = ('earth', 'moon', 'jupiter')
+
+# Kernel targets for each body
+KERNEL_TARGETS = {
+    'earth': 'earth',
+    'moon': 'moon',
+    'jupiter': 'jupiter barycenter',
+}
+
+# Earth/Moon mass ratio and obliquity of the ecliptic at J2000
+EARTH_MOON_MASS_RATIO = 81.30056
+OBLIQUITY_J2000_DEG = 23.4392911
+EARTH_RADIUS_AU = 6378.137 / 149597870.7
+
+# Default span of the table: 1900-01-01 to 2201-01-01
+DEFAULT_START_JD = 2415020.5
+DEFAULT_END_JD = 2524593.5
+
+_table = None
+_table_lock = threading.Lock()
+
+
+def _centuries(jd):
+    return (np.asarray(jd, dtype=np.float64) - 2451545.0) / 36525.0
+
+
+def _earth_moon_barycenter(jd):
+    """Mean-element EMB position (Standish, valid 3000 BC to 3000 AD)"""
+    T = _centuries(jd)
+    a = 1.00000018 - 0.00000003 * T
+    e = 0.01673163 - 0.00003661 * T
+    inc = -0.00054346 - 0.01337178 * T
+    mean_longitude = 100.46691572 + 35999.37306329 * T
+    perihelion_longitude = 102.93005885 + 0.31795260 * T
+    node = -5.11260389 - 0.24123856 * T
+    
+    positions, _ = kepler_states(
+        a, e, inc, node, perihelion_longitude - node,
+        mean_longitude - perihelion_longitude, jd, jd
+    )
+    return positions
+
+
+def _jupiter(jd):
+    """Mean-element Jupiter position (Standish, valid 3000 BC to 3000 AD)"""
+    T = _centuries(jd)
+    a = 5.20248019 - 0.00002864 * T
+    e = 0.04853590 + 0.00018026 * T
+    inc = 1.29861416 - 0.00322699 * T
+    mean_longitude = 34.33479152 + 3034.90371757 * T
+    perihelion_longitude = 14.27495244 + 0.18199196 * T
+    node = 100.29282654 + 0.13024619 * T
+    
+    # Long-period correction to the mean anomaly
+    correction = (
+        -0.00012452 * T ** 2
+        + 0.06064060 * _cos(38.35125000 * T)
+        - 0.35635438 * _sin(38.35125000 * T)
+    )
+    
+    positions, _ = kepler_states(
+        a, e, inc, node, perihelion_longitude - node,
+        mean_longitude - perihelion_longitude + correction, jd, jd
+    )
+    return positions
+
+
+def _sin(degrees):
+    return np.sin(np.radians(degrees))
+
+
+def _cos(degrees):
+    return np.cos(np.radians(degrees))
+
+
+def _moon_geocentric(jd):
+    """Low-precision lunar position (Astronomical Almanac), about 0.3° accuracy"""
+    T = _centuries(jd)
+    
+    longitude = (
+        218.32 + 481267.881 * T
+        + 6.29 * _sin(135.0 + 477198.87 * T)
+        - 1.27 * _sin(259.3 - 413335.36 * T)
+        + 0.66 * _sin(235.7 + 890534.22 * T)
+        + 0.21 * _sin(269.9 + 954397.74 * T)
+        - 0.19 * _sin(357.5 + 35999.05 * T)
+        - 0.11 * _sin(186.5 + 966404.03 * T)
+    )
+    latitude = (
+        5.13 * _sin(93.3 + 483202.02 * T)
+        + 0.28 * _sin(228.2 + 960400.89 * T)
+        - 0.28 * _sin(318.3 + 6003.15 * T)
+        - 0.17 * _sin(217.6 - 407332.21 * T)
+    )
+    parallax = (
+        0.9508
+        + 0.0518 * _cos(135.0 + 477198.87 * T)
+        + 0.0095 * _cos(259.3 - 413335.36 * T)
+        + 0.0078 * _cos(235.7 + 890534.22 * T)
+        + 0.0028 * _cos(269.9 + 954397.74 * T)
+    )
+    
+    # Ecliptic of date to J2000 by removing general precession in longitude
+    longitude = np.radians(longitude - 1.396971 * T)
+    latitude = np.radians(latitude)
+    distance = EARTH_RADIUS_AU / np.sin(np.radians(parallax))
+    
+    return np.stack([
+        distance * np.cos(latitude) * np.cos(longitude),
+        distance * np.cos(latitude) * np.sin(longitude),
+        distance * np.sin(latitude),
+    ], axis=-1)
+
+
+def _analytic_positions(jd):
+    """Heliocentric positions of every body in BODIES: (..., bodies, 3)"""
+    barycenter = _earth_moon_barycenter(jd)
+    moon = _moon_geocentric(jd)
+    earth = barycenter - moon / (1.0 + EARTH_MOON_MASS_RATIO)
+    return np.stack([earth, earth + moon, _jupiter(jd)], axis=-2)
+
+
+def analytic_states(jd, step_days=0.01):
+    """
+    Heliocentric positions (AU) and velocities (AU/day) from the analytic model
+    
+    Velocities are central differences of the positions.
+    """
+    jd = np.asarray(jd, dtype=np.float64)
+    positions = _analytic_positions(jd)
+    velocities = (
+        _analytic_positions(jd + step_days) - _analytic_positions(jd - step_days)
+    ) / (2.0 * step_days)
+    return positions, velocities
+
+
+def skyfield_states(jd, kernel='de440.bsp'):
+    """
+    Heliocentric positions (AU) and velocities (AU/day) from a JPL kernel
+    
+    Requires skyfield; the kernel is downloaded on first use if missing.
+    """
+    from skyfield.api import load
+    
+    timescale = load.timescale()
+    ephemeris = load(kernel)
+    times = timescale.tdb_jd(np.asarray(jd, dtype=np.float64))
+    sun = ephemeris['sun']
+    
+    positions = []
+    velocities = []
+    for name in BODIES:
+        state = (ephemeris[KERNEL_TARGETS[name]] - sun).at(times)
+        positions.append(state.position.au.T)
+        velocities.append(state.velocity.au_per_d.T)
+    
+    # ICRF (equatorial) to ecliptic J2000
+    epsilon = np.radians(OBLIQUITY_J2000_DEG)
+    rotation = np.array([
+        [1.0, 0.0, 0.0],
+        [0.0, np.cos(epsilon), np.sin(epsilon)],
+        [0.0, -np.sin(epsilon), np.cos(epsilon)],
+    ])
+    
+    positions = np.stack(positions, axis=-2) @ rotation.T
+    velocities = np.stack(velocities, axis=-2) @ rotation.T
+    return positions, velocities
+
+
+def tabulate_states(start_jd, count, step_days=1.0, source='analytic', kernel='de440.bsp',
+                    chunk_size=20000, out=None):
+    """Body states on a fixed grid as a (count, bodies, 6) array"""
+    table = np.empty((count, len(BODIES), 6)) if out is None else out
+    
+    for offset in range(0, count, chunk_size):
+        jd = start_jd + step_days * np.arange(offset, min(offset + chunk_size, count))
+        if source == 'skyfield':
+            positions, velocities = skyfield_states(jd, kernel)
+        else:
+            positions, velocities = analytic_states(jd)
+        table[offset:offset + len(jd), :, :3] = positions
+        table[offset:offset + len(jd), :, 3:] = velocities
+    
+    return table
+
+
+def build_table(path, start_jd, end_jd, step_days=1.0, source='analytic', kernel='de440.bsp'):
+    """
+    Tabulate body states and write the .npy table and its JSON sidecar
+    
+    Both are written under temporary names and renamed into place, so a
+    process opening the table never sees a partial file.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    partial = path.with_name(f'.{path.stem}.{os.getpid()}.npy')
+    
+    count = int(np.floor((end_jd - start_jd) / step_days)) + 1
+    table = np.lib.format.open_memmap(
+        partial, mode='w+', dtype=np.float64, shape=(count, len(BODIES), 6)
+    )
+    tabulate_states(start_jd, count, step_days, source, kernel, out=table)
+    
+    table.flush()
+    del table
+    
+    metadata = {
+        'version': TABLE_VERSION,
+        'bodies': list(BODIES),
+        'start_jd': start_jd,
+        'step_days': step_days,
+        'count': count,
+        'source': source,
+    }
+    partial.with_suffix('.json').write_text(json.dumps(metadata, indent=2))
+    
+    os.replace(partial.with_suffix('.json'), path.with_suffix('.json'))
+    os.replace(partial, path)
+    
+    return metadata
+
+
+class BodyTable:
+    """A body ephemeris table, usually memory-mapped from disk"""
+    
+    def __init__(self, states, metadata):
+        # A plain ndarray view avoids memmap overhead on every lookup
+        self.states = states.view(np.ndarray)
+        self.metadata = metadata
+        self.start_jd = metadata['start_jd']
+        self.step_days = metadata['step_days']
+        self.end_jd = self.start_jd + self.step_days * (len(states) - 1)
+        self.bodies = {name: index for index, name in enumerate(metadata['bodies'])}
+    
+    @classmethod
+    def load(cls, path):
+        path = Path(path)
+        metadata = json.loads(path.with_suffix('.json').read_text())
+        return cls(np.load(path, mmap_mode='r'), metadata)
+    
+    def covers(self, jd):
+        return bool(np.all((jd >= self.start_jd) & (jd <= self.end_jd)))
+    
+    def interpolate(self, body, jd):
+        """
+        Cubic Hermite interpolation of position and velocity
+        
+        ``body`` is a name, giving (..., 3) arrays, or a tuple of names,
+        giving (..., bodies, 3) arrays.
+        """
+        if isinstance(body, str):
+            column = self.bodies[body]
+        else:
+            column = [self.bodies[name] for name in body]
+        h = self.step_days
+        
+        index = np.clip(
+            np.floor((jd - self.start_jd) / h).astype(np.int64), 0, len(self.states) - 2
+        )
+        s = ((jd - self.start_jd) - index * h) / h
+        s = s[..., None] if isinstance(body, str) else s[..., None, None]
+        
+        first = self.states[index][..., column, :]
+        second = self.states[index + 1][..., column, :]
+        p0, v0 = first[..., :3], first[..., 3:] * h
+        p1, v1 = second[..., :3], second[..., 3:] * h
+        
+        s2 = s * s
+        s3 = s2 * s
+        positions = (
+            (2 * s3 - 3 * s2 + 1) * p0 + (s3 - 2 * s2 + s) * v0
+            + (-2 * s3 + 3 * s2) * p1 + (s3 - s2) * v1
+        )
+        velocities = (
+            (6 * s2 - 6 * s) * p0 + (3 * s2 - 4 * s + 1) * v0
+            + (-6 * s2 + 6 * s) * p1 + (3 * s2 - 2 * s) * v1
+        ) / h
+        
+        return positions, velocities
+
+
+def _build_default_table(path):
+    """Tabulate the analytic model to path unless another process already has"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    
+    with open(path.with_suffix('.lock'), 'w') as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        
+        if not path.exists():
+            logger.warning(f"No ephemeris table at {path}; tabulating the analytic model there")
+            build_table(path, DEFAULT_START_JD, DEFAULT_END_JD)
+
+
+def _analytic_table():
+    """The analytic model tabulated in this process's memory"""
+    count = int(DEFAULT_END_JD - DEFAULT_START_JD) + 1
+    return BodyTable(tabulate_states(DEFAULT_START_JD, count), {
+        'version': TABLE_VERSION,
+        'bodies': list(BODIES),
+        'start_jd': DEFAULT_START_JD,
+        'step_days': 1.0,
+        'count': count,
+        'source': 'analytic',
+    })
+
+
+def get_table():
+    """
+    The shared table for this process
+    
+    Without an installed table, the analytic model is tabulated once to
+    EPHEMERIS_TABLE_PATH and mapped from there. Only if that path cannot
+    be written does each process keep its own copy in memory.
+    """
+    global _table
+    
+    if _table is None:
+        with _table_lock:
+            if _table is None:
+                from django.conf import settings
+                
+                path = Path(settings.EPHEMERIS_TABLE_PATH)
+                
+                try:
+                    if not path.exists():
+                        _build_default_table(path)
+                except OSError as e:
+                    logger.error(
+                        f"Could not write an ephemeris table to {path}: {e}; run "
+                        f"build_ephemeris_table. Tabulating the analytic model in memory"
+                    )
+                    _table = _analytic_table()
+                else:
+                    _table = BodyTable.load(path)
+    
+    return _table
+
+
+def body_states(body, jd):
+    """
+    Heliocentric ecliptic position (AU) and velocity (AU/day) of a body
+    
+    ``body`` may also be a tuple of names, adding a bodies axis before
+    the last. Dates outside the table use the analytic model directly.
+    """
+    jd = np.asarray(jd, dtype=np.float64)
+    names = (body,) if isinstance(body, str) else tuple(body)
+    table = get_table()
+    
+    if all(name in table.bodies for name in names) and table.covers(jd):
+        return table.interpolate(body, jd)
+    
+    positions, velocities = analytic_states(jd)
+    column = BODIES.index(body) if isinstance(body, str) else [BODIES.index(name) for name in names]
+    return positions[..., column, :], velocities[..., column, :]
+
+
+def earth_states(jd):
+    """Heliocentric position (AU) and velocity (AU/day) of Earth"""
+    return body_states('earth', jd)
+
+
+def moon_states(jd):
+    """Heliocentric position (AU) and velocity (AU/day) of the Moon"""
+    return body_states('moon', jd)
+
+
+def jupiter_states(jd):
+    """Heliocentric position (AU) and velocity (AU/day) of the Jupiter system barycenter"""
+    return body_states('jupiter', jd)
@@ -0,0 +1,41 @@
+"""
+In-Process LRU Cache
+
+A small thread-safe least-recently-used cache for values that are
+expensive to build and too large or too short-lived for the shared
+cache backend, such as KD-trees and propagated trajectories.
+"""
+import threading
+from collections import OrderedDict
+
+
+class LRUCache:
+    """Thread-safe LRU keyed by any hashable value"""
+    
+    def __init__(self, max_size=8):
+        self.max_size = max_size
+        self._values = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def __len__(self):
+        return len(self._values)
+    
+    def get(self, key, build):
+        """Return the cached value for key, building and storing it when missing"""
+        with self._lock:
+            if key in self._values:
+                self._values.move_to_end(key)
+                return self._values[key]
+        
+        value = build()
+        
+        with self._lock:
+            self._values[key] = value
+            while len(self._values) > self.max_size:
+                self._values.popitem(last=False)
+        
+        return value
+    
+    def clear(self):
+        with self._lock:
+            self._values.clear()
@@ -0,0 +1,96 @@
+"""
+Predictive Close-Approach Screening
+
+Finds minima of geocentric distance for many NEOs over long horizons.
+Every object and Earth are propagated on a coarse shared time grid, in
+windows so memory stays bounded; sampled local minima are then refined
+to the root of the range rate (r · v = 0) by vectorized bisection.
+"""
+import numpy as np
+
+from .bodies import earth_states
+from .propagation import propagate_elements
+
+CLOSE_APPROACH_DTYPE = np.dtype([
+    ('neo_id', np.int64),
+    ('jd', np.float64),
+    ('distance_au', np.float64),
+    ('velocity_au_per_day', np.float64),
+])
+
+
+def geocentric_states(elements, jd):
+    """Geocentric position and velocity of each object at each date"""
+    positions, velocities = propagate_elements(elements, jd)
+    earth_positions, earth_velocities = earth_states(jd)
+    return positions - earth_positions, velocities - earth_velocities
+
+
+def screen_close_approaches(elements, start_jd, end_jd, step_days=1.0, threshold_au=0.05,
+                            window_steps=3650, refine_iterations=40):
+    """
+    Close approaches within threshold_au between start_jd and end_jd
+    
+    Returns a CLOSE_APPROACH_DTYPE array. Minima are only searched at
+    interior grid points, so approaches at the very edges of the horizon
+    are not reported.
+    """
+    elements = np.asarray(elements)
+    num_steps = int(np.ceil((end_jd - start_jd) / step_days)) + 1
+    candidate_objects = []
+    candidate_jd = []
+    
+    for first in range(0, num_steps, window_steps):
+        # One sample of overlap either side makes every step interior exactly once
+        low = max(first - 1, 0)
+        high = min(first + window_steps + 1, num_steps)
+        jd = start_jd + step_days * np.arange(low, high)
+        
+        relative_positions, relative_velocities = geocentric_states(elements, jd)
+        distance = np.linalg.norm(relative_positions, axis=-1)
+        speed = np.linalg.norm(relative_velocities, axis=-1)
+        
+        # The true minimum lies within one step of a sampled minimum
+        interior = distance[:, 1:-1]
+        is_minimum = (
+            (interior < distance[:, :-2]) &
+            (interior <= distance[:, 2:]) &
+            (interior < threshold_au + speed[:, 1:-1] * step_days)
+        )
+        
+        objects, steps = np.nonzero(is_minimum)
+        candidate_objects.append(objects)
+        candidate_jd.append(jd[steps + 1])
+    
+    objects = np.concatenate(candidate_objects)
+    jd = np.concatenate(candidate_jd)
+    
+    if not len(objects):
+        return np.empty(0, dtype=CLOSE_APPROACH_DTYPE)
+    
+    # Bisect the range rate, which goes from negative to positive at a minimum
+    candidates = elements[objects]
+    lower = jd - step_days
+    upper = jd + step_days
+    
+    for _ in range(refine_iterations):
+        middle = (lower + upper) / 2.0
+        relative_positions, relative_velocities = geocentric_states(candidates, middle[:, None])
+        range_rate = np.sum(relative_positions[:, 0] * relative_velocities[:, 0], axis=-1)
+        approaching = range_rate < 0
+        lower = np.where(approaching, middle, lower)
+        upper = np.where(approaching, upper, middle)
+    
+    jd = (lower + upper) / 2.0
+    relative_positions, relative_velocities = geocentric_states(candidates, jd[:, None])
+    distance = np.linalg.norm(relative_positions[:, 0], axis=-1)
+    speed = np.linalg.norm(relative_velocities[:, 0], axis=-1)
+    
+    close = distance < threshold_au
+    result = np.empty(int(close.sum()), dtype=CLOSE_APPROACH_DTYPE)
+    result['neo_id'] = candidates['neo_id'][close]
+    result['jd'] = jd[close]
+    result['distance_au'] = distance[close]
+    result['velocity_au_per_day'] = speed[close]
+    
+    return result
@@ -0,0 +1,111 @@
+"""
+Kinetic Deflection Delta-V
+
+A small impulse applied to a NEO some time before a close approach moves
+it in the target plane (the plane through Earth perpendicular to the
+encounter velocity), changing the miss distance. The displacement is
+linear in the impulse, so it is measured once per lead time for unit
+impulses along the along-track, radial and orbit-normal directions by
+propagating nudged states to the encounter; the impulse that gives a
+target shift in miss distance then follows in closed form.
+"""
+import numpy as np
+
+from .lambert import kepler_universal
+
+# Impulse used to measure the linear response (AU/day, about 1 cm/s)
+PROBE_DELTA_V = 1e-2 * 86400.0 / 149597870700.0
+
+DIRECTIONS = ('along_track', 'radial', 'normal')
+
+
+def local_frame(positions, velocities):
+    """(N, 3, 3) unit vectors along-track, radial and orbit-normal"""
+    along = velocities / np.linalg.norm(velocities, axis=-1, keepdims=True)
+    radial = positions / np.linalg.norm(positions, axis=-1, keepdims=True)
+    normal = np.cross(positions, velocities)
+    normal /= np.linalg.norm(normal, axis=-1, keepdims=True)
+    return np.stack([along, radial, normal], axis=-2)
+
+
+def target_plane_response(positions, velocities, dt, earth_position, earth_velocity):
+    """
+    Nominal miss vector and its response to unit impulses
+    
+    positions and velocities are the (L, 3) NEO states at L deflection
+    dates and dt the (L,) days from each to the encounter. Returns the
+    (L, 3) miss vectors in the target plane and the (L, 3, 3) matrices
+    whose row k is the target-plane displacement per AU/day of impulse
+    along direction k of local_frame.
+    """
+    frame = local_frame(positions, velocities)
+    nominal, nominal_velocity = kepler_universal(positions, velocities, dt)
+    
+    relative_velocity = nominal_velocity - earth_velocity
+    unit = relative_velocity / np.linalg.norm(relative_velocity, axis=-1, keepdims=True)
+    
+    def in_plane(vectors):
+        return vectors - np.sum(vectors * unit[..., None, :], axis=-1, keepdims=True) * unit[..., None, :]
+    
+    miss = in_plane((nominal - earth_position)[..., None, :])[..., 0, :]
+    
+    # All three nudged states of every lead time in one propagation
+    nudged, _ = kepler_universal(
+        np.repeat(positions, 3, axis=0),
+        (velocities[:, None, :] + PROBE_DELTA_V * frame).reshape(-1, 3),
+        np.repeat(dt, 3)
+    )
+    displacement = (nudged.reshape(-1, 3, 3) - nominal[:, None, :]) / PROBE_DELTA_V
+    
+    return miss, in_plane(displacement)
+
+
+def required_impulse(miss, response, shift_au):
+    """
+    Smallest impulse along a response direction that moves the miss
+    distance by shift_au
+    
+    response is the (..., 3) target-plane displacement per unit impulse.
+    Solves |miss + x response| = |miss| + shift_au for the root x of
+    least magnitude; NaN where the direction has no effect.
+    """
+    distance = np.linalg.norm(miss, axis=-1)
+    projection = np.sum(miss * response, axis=-1)
+    gain = np.sum(response ** 2, axis=-1)
+    growth = (distance + shift_au) ** 2 - distance ** 2
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        root = np.sqrt(projection ** 2 + gain * growth)
+        candidates = np.stack([(-projection + root) / gain, (-projection - root) / gain])
+    
+    return np.take_along_axis(candidates, np.argmin(np.abs(candidates), axis=0)[None], axis=0)[0]
+
+
+def required_delta_v(positions, velocities, dt, earth_position, earth_velocity, shift_au):
+    """
+    Impulse needed at each deflection date to move the miss distance by shift_au
+    
+    Returns a dict of (L,) arrays in AU/day: the impulse along each
+    local_frame direction and along the best direction (the response
+    matrix's leading singular vector, the direction that moves the
+    target-plane point furthest per unit impulse), the best direction as
+    (L, 3) along-track, radial and normal components, and the nominal
+    miss distance.
+    """
+    miss, response = target_plane_response(positions, velocities, dt, earth_position, earth_velocity)
+    
+    result = {
+        direction: np.abs(required_impulse(miss, response[:, k], shift_au))
+        for k, direction in enumerate(DIRECTIONS)
+    }
+    
+    _, _, vt = np.linalg.svd(np.swapaxes(response, -1, -2))
+    best_direction = vt[:, 0]
+    best_response = np.einsum('lk,lkc->lc', best_direction, response)
+    best = required_impulse(miss, best_response, shift_au)
+    
+    result['best'] = np.abs(best)
+    result['best_direction'] = best_direction * np.sign(best)[:, None]
+    result['miss_distance_au'] = np.linalg.norm(miss, axis=-1)
+    
+    return result
@@ -0,0 +1,101 @@
+"""
+Derived Orbital Parameters
+
+Period, perihelion and aphelion distances, mean motion, orbit class and
+Tisserand parameter for whole arrays of semi-major axes, eccentricities
+and inclinations at once. Classification is a single np.select over the
+same ordered conditions as the per-object rules.
+"""
+import numpy as np
+
+from .moid import compute_moid
+from .propagation import EARTH_ELEMENTS, JUPITER_ELEMENTS
+
+MOID_ELEMENTS = ('a', 'e', 'i', 'node', 'peri')
+
+# Checked in order; the first matching rule wins
+ORBIT_CLASSES = ('atira', 'aten', 'apollo', 'amor', 'main_belt')
+DEFAULT_ORBIT_CLASS = 'other'
+
+
+def orbital_periods(a):
+    """Orbital periods in days from Kepler's third law (a in AU)"""
+    return np.asarray(a, dtype=np.float64) ** 1.5 * 365.25
+
+
+def classify_orbits(a, e, q, Q):
+    """Orbit class of every object from its semi-major axis and apsides"""
+    a = np.asarray(a, dtype=np.float64)
+    q = np.asarray(q, dtype=np.float64)
+    Q = np.asarray(Q, dtype=np.float64)
+    
+    conditions = [
+        Q < 1.0,
+        (a < 1.0) & (Q >= 1.0),
+        (a >= 1.0) & (q < 1.017) & (q >= 0.983),
+        (a >= 1.0) & (q > 1.017) & (q < 1.3),
+        (a > 2.0) & (a < 3.2),
+    ]
+    
+    return np.select(conditions, ORBIT_CLASSES, default=DEFAULT_ORBIT_CLASS)
+
+
+def tisserand_parameters(a, e, i, planet_a=float(JUPITER_ELEMENTS['a'])):
+    """
+    Tisserand parameter with respect to a planet (Jupiter by default)
+    
+    NaN for unbound orbits, whose term under the square root is negative.
+    """
+    a = np.asarray(a, dtype=np.float64)
+    e = np.asarray(e, dtype=np.float64)
+    
+    with np.errstate(invalid='ignore'):
+        return planet_a / a + 2.0 * np.cos(np.radians(i)) * np.sqrt(a / planet_a * (1.0 - e ** 2))
+
+
+def derived_parameters(a, e, i):
+    """
+    Derived parameters for arrays of a (AU), e and i (degrees)
+    
+    Returns a dict of arrays keyed like the OrbitalElements fields.
+    """
+    a = np.asarray(a, dtype=np.float64)
+    e = np.asarray(e, dtype=np.float64)
+    
+    period = orbital_periods(a)
+    perihelion = a * (1 - e)
+    aphelion = a * (1 + e)
+    
+    with np.errstate(divide='ignore'):
+        mean_motion = np.where(period > 0, 360.0 / period, 0.0)
+    
+    return {
+        'orbital_period_days': period,
+        'perihelion_distance_au': perihelion,
+        'aphelion_distance_au': aphelion,
+        'mean_motion_deg_per_day': mean_motion,
+        'orbit_class': classify_orbits(a, e, perihelion, aphelion),
+        'tisserand_parameter': tisserand_parameters(a, e, i),
+    }
+
+
+def catalogue_moids(elements):
+    """
+    MOIDs with Earth and Jupiter for a structured element array
+    
+    Returns an (N, 2) array; NaN where the orbit is not a bound ellipse.
+    """
+    planets = [
+        tuple(float(planet[name]) for name in MOID_ELEMENTS)
+        for planet in (EARTH_ELEMENTS, JUPITER_ELEMENTS)
+    ]
+    moids = np.full((len(elements), len(planets)), np.nan)
+    
+    for index, record in enumerate(elements):
+        if record['a'] <= 0 or not 0 <= record['e'] < 1:
+            continue
+        
+        orbit = tuple(float(record[name]) for name in MOID_ELEMENTS)
+        moids[index] = [compute_moid(orbit, planet) for planet in planets]
+    
+    return moids
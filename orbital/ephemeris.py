@@ -0,0 +1,169 @@
+"""
+Chebyshev-Compressed Ephemerides
+
+A trajectory is stored as piecewise Chebyshev polynomials: the time span
+is cut into equal segments and each coordinate of each segment is fitted
+with a low-degree Chebyshev series. Positions and velocities can then be
+evaluated at any Julian date without storing individual points.
+
+Fast perihelion passages need shorter segments than the default, so each
+fit is checked against the propagator and objects that miss the position
+tolerance are refitted with the segment length halved.
+"""
+import numpy as np
+from numpy.polynomial import chebyshev
+
+from .propagation import propagate_elements
+
+DEFAULT_SEGMENT_DAYS = 32.0
+DEFAULT_DEGREE = 12
+
+# Maximum position error of a stored ephemeris (~1.5 km) and the shortest
+# segment tried to reach it
+DEFAULT_TOLERANCE_AU = 1e-8
+MIN_SEGMENT_DAYS = 0.25
+
+# Coefficients are stored as little-endian float64 (segment, term, axis)
+COEFFICIENT_DTYPE = np.dtype('<f8')
+
+
+def segment_nodes(degree):
+    """Chebyshev-Gauss nodes on [-1, 1] used for fitting each segment"""
+    count = degree + 1
+    return np.cos(np.pi * (np.arange(count) + 0.5) / count)
+
+
+def check_nodes(degree):
+    """
+    Extrema of the first omitted Chebyshev polynomial on [-1, 1]
+    
+    They interleave the fitting nodes and include the segment ends, and
+    are where the error of a fit at the Chebyshev-Gauss nodes peaks.
+    """
+    count = degree + 1
+    return np.cos(np.pi * np.arange(count + 1) / count)
+
+
+def fit_ephemerides(elements, start_jd, days, segment_days=DEFAULT_SEGMENT_DAYS,
+                    degree=DEFAULT_DEGREE, propagate=propagate_elements):
+    """
+    Fit piecewise Chebyshev coefficients for a structured element array
+    
+    All objects and all segments are propagated in a single array pass and
+    fitted with one shared pseudo-inverse, giving an array of shape
+    (N, segments, degree + 1, 3). ``propagate`` can swap in another
+    propagator with the same contract. Returns the coefficients and the
+    number of segments.
+    """
+    num_segments = max(int(np.ceil(days / segment_days)), 1)
+    nodes = segment_nodes(degree)
+    
+    # Node dates for every segment: (segments, nodes)
+    segment_starts = start_jd + segment_days * np.arange(num_segments)
+    jd = segment_starts[:, None] + (nodes[None, :] + 1.0) * segment_days / 2.0
+    
+    positions, _ = propagate(elements, jd.ravel())
+    positions = positions.reshape(len(elements), num_segments, len(nodes), 3)
+    
+    fit = np.linalg.pinv(chebyshev.chebvander(nodes, degree))
+    coefficients = np.einsum('kn,isnc->iskc', fit, positions)
+    
+    return coefficients, num_segments
+
+
+def fit_errors(coefficients, elements, start_jd, segment_days, propagate=propagate_elements):
+    """
+    Maximum position error (AU) of each object's fit at the check nodes
+    
+    Objects whose propagation fails give NaN.
+    """
+    _, num_segments, num_terms, _ = coefficients.shape
+    nodes = check_nodes(num_terms - 1)
+    
+    segment_starts = start_jd + segment_days * np.arange(num_segments)
+    jd = segment_starts[:, None] + (nodes[None, :] + 1.0) * segment_days / 2.0
+    
+    positions, _ = propagate(elements, jd.ravel())
+    positions = positions.reshape(len(elements), num_segments, len(nodes), 3)
+    
+    fitted = np.einsum('nk,iskc->isnc', chebyshev.chebvander(nodes, num_terms - 1), coefficients)
+    errors = np.linalg.norm(fitted - positions, axis=-1)
+    
+    return errors.reshape(len(elements), -1).max(axis=1)
+
+
+def fit_within_tolerance(elements, start_jd, days, segment_days=DEFAULT_SEGMENT_DAYS,
+                         degree=DEFAULT_DEGREE, propagate=propagate_elements,
+                         tolerance_au=DEFAULT_TOLERANCE_AU, min_segment_days=MIN_SEGMENT_DAYS):
+    """
+    Fit ephemerides, halving the segment length for objects that miss the tolerance
+    
+    Yields (indices, coefficients, num_segments, segment_days, errors)
+    groups, one per segment length used, where indices select the group's
+    objects from elements. Objects still outside the tolerance at
+    min_segment_days are yielded with that fit and their error.
+    """
+    pending = np.arange(len(elements))
+    
+    while len(pending):
+        coefficients, num_segments = fit_ephemerides(
+            elements[pending], start_jd, days, segment_days, degree, propagate
+        )
+        errors = fit_errors(coefficients, elements[pending], start_jd, segment_days, propagate)
+        
+        done = (errors <= tolerance_au) | (segment_days / 2.0 < min_segment_days)
+        if done.any():
+            yield pending[done], coefficients[done], num_segments, segment_days, errors[done]
+        
+        pending = pending[~done]
+        segment_days /= 2.0
+
+
+def pack_coefficients(coefficients):
+    """Serialize one object's coefficients to a binary blob"""
+    return np.ascontiguousarray(coefficients, dtype=COEFFICIENT_DTYPE).tobytes()
+
+
+def unpack_coefficients(blob, num_segments, degree):
+    """Inverse of pack_coefficients"""
+    return np.frombuffer(bytes(blob), dtype=COEFFICIENT_DTYPE).reshape(
+        num_segments, degree + 1, 3
+    )
+
+
+def evaluate_ephemeris(coefficients, start_jd, segment_days, jd):
+    """
+    Evaluate position (AU) and velocity (AU/day) at the given Julian dates
+    
+    Dates outside the fitted span raise ValueError.
+    """
+    jd = np.atleast_1d(np.asarray(jd, dtype=np.float64))
+    num_segments, num_terms, _ = coefficients.shape
+    end_jd = start_jd + num_segments * segment_days
+    
+    if jd.size and (jd.min() < start_jd or jd.max() > end_jd):
+        raise ValueError(
+            f"Julian dates must lie within [{start_jd}, {end_jd}]"
+        )
+    
+    index = np.clip(
+        np.floor((jd - start_jd) / segment_days).astype(np.int64),
+        0, num_segments - 1
+    )
+    x = 2.0 * (jd - start_jd - index * segment_days) / segment_days - 1.0
+    
+    # T_k(x) and dT_k/dx by the three-term recurrence: (dates, terms)
+    T = np.empty((len(jd), num_terms))
+    dT = np.empty((len(jd), num_terms))
+    T[:, 0], dT[:, 0] = 1.0, 0.0
+    if num_terms > 1:
+        T[:, 1], dT[:, 1] = x, 1.0
+    for k in range(2, num_terms):
+        T[:, k] = 2.0 * x * T[:, k - 1] - T[:, k - 2]
+        dT[:, k] = 2.0 * T[:, k - 1] + 2.0 * x * dT[:, k - 1] - dT[:, k - 2]
+    
+    segment_coefficients = coefficients[index]
+    positions = np.einsum('mk,mkc->mc', T, segment_coefficients)
+    velocities = np.einsum('mk,mkc->mc', dT, segment_coefficients) * (2.0 / segment_days)
+    
+    return positions, velocities
@@ -0,0 +1,218 @@
+"""
+Universal-Variable Lambert Solver
+
+Lambert's problem asks for the conic that joins two positions in a given
+time of flight. It is solved here for zero-revolution transfers with the
+universal variable psi (Bate, Mueller & White; Vallado), by bisection on
+psi, which is slower than Newton's method per cell but converges for
+every cell of a whole array in the same fixed number of array passes.
+The same Stumpff functions propagate a state vector over any time span.
+"""
+import numpy as np
+
+from .propagation import GM_SUN
+
+# Bracket for zero-revolution transfers: mildly hyperbolic up to one full revolution
+PSI_LOW = -4.0 * np.pi
+PSI_HIGH = 4.0 * np.pi ** 2
+
+
+def stumpff(z):
+    """Stumpff functions C(z) and S(z), with series near zero"""
+    z = np.asarray(z, dtype=np.float64)
+    small = np.abs(z) < 1e-3
+    safe = np.where(small, 1.0, z)
+    root = np.sqrt(np.abs(safe))
+    
+    with np.errstate(over='ignore', invalid='ignore'):
+        c = np.where(
+            safe > 0,
+            (1.0 - np.cos(root)) / safe,
+            (np.cosh(root) - 1.0) / -safe
+        )
+        s = np.where(
+            safe > 0,
+            (root - np.sin(root)) / root ** 3,
+            (np.sinh(root) - root) / root ** 3
+        )
+    
+    c = np.where(small, 1 / 2 - z / 24 + z ** 2 / 720, c)
+    s = np.where(small, 1 / 6 - z / 120 + z ** 2 / 5040, s)
+    
+    return c, s
+
+
+def kepler_universal(positions, velocities, dt, mu=GM_SUN, tol=1e-12, max_iter=100):
+    """
+    Propagate (N, 3) states by dt days (scalar or (N,)) on two-body orbits
+    
+    The universal Kepler equation is monotonic in the universal anomaly
+    chi (its derivative is the radius), so every cell keeps a bracket on
+    its root and takes Newton steps only while they stay inside it,
+    bisecting otherwise. Bound orbits are first reduced to less than one
+    period, which bounds the bracket by a full turn. The Lagrange f and g
+    coefficients then give the new states; cells that do not converge
+    within max_iter iterations are NaN.
+    """
+    r0 = np.asarray(positions, dtype=np.float64)
+    v0 = np.asarray(velocities, dtype=np.float64)
+    dt = np.broadcast_to(np.asarray(dt, dtype=np.float64), r0.shape[:-1])
+    
+    r0_norm = np.linalg.norm(r0, axis=-1)
+    radial_speed = np.sum(r0 * v0, axis=-1) / r0_norm
+    alpha = 2.0 / r0_norm - np.sum(v0 ** 2, axis=-1) / mu
+    sqrt_mu = np.sqrt(mu)
+    sigma = r0_norm * radial_speed / sqrt_mu
+    
+    # Whole periods change nothing on a bound orbit
+    bound = alpha > 0
+    safe_alpha = np.where(bound, alpha, 1.0)
+    full_turn = 2.0 * np.pi / np.sqrt(safe_alpha)
+    dt = np.where(bound, np.mod(dt, full_turn / (sqrt_mu * safe_alpha)), dt)
+    
+    def kepler(chi):
+        """Residual of the universal Kepler equation and its derivative"""
+        z = alpha * chi ** 2
+        c, s = stumpff(z)
+        with np.errstate(invalid='ignore'):
+            residual = (
+                sigma * chi ** 2 * c + (1.0 - alpha * r0_norm) * chi ** 3 * s
+                + r0_norm * chi - sqrt_mu * dt
+            )
+            radius = sigma * chi * (1.0 - z * s) + (1.0 - alpha * r0_norm) * chi ** 2 * c + r0_norm
+        return residual, radius
+    
+    # Unbound orbits: double the bracket outwards from zero until it holds the root
+    edge = np.where(bound, full_turn, sqrt_mu * dt / r0_norm)
+    for _ in range(max_iter):
+        residual, _ = kepler(edge)
+        short = ~bound & (residual * np.sign(dt) < 0)
+        if not short.any():
+            break
+        edge = np.where(short, 2.0 * edge, edge)
+    
+    low = np.where(dt < 0, edge, 0.0)
+    high = np.where(dt < 0, 0.0, edge)
+    
+    chi = np.clip(np.where(bound, sqrt_mu * alpha * dt, 0.5 * (low + high)), low, high)
+    converged = np.zeros(dt.shape, dtype=bool)
+    
+    for _ in range(max_iter):
+        residual, radius = kepler(chi)
+        low = np.where(residual < 0, chi, low)
+        high = np.where(residual > 0, chi, high)
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            newton = chi - residual / radius
+        new_chi = np.where((newton >= low) & (newton <= high), newton, 0.5 * (low + high))
+        
+        step = np.abs(new_chi - chi)
+        chi = new_chi
+        converged = np.isfinite(residual) & (step <= tol * np.maximum(np.abs(chi), 1.0))
+        if converged.all():
+            break
+    
+    z = alpha * chi ** 2
+    c, s = stumpff(z)
+    
+    f = 1.0 - chi ** 2 / r0_norm * c
+    g = dt - chi ** 3 * s / sqrt_mu
+    r = f[..., None] * r0 + g[..., None] * v0
+    r_norm = np.linalg.norm(r, axis=-1)
+    
+    f_dot = sqrt_mu / (r_norm * r0_norm) * (alpha * chi ** 3 * s - chi)
+    g_dot = 1.0 - chi ** 2 / r_norm * c
+    v = f_dot[..., None] * r0 + g_dot[..., None] * v0
+    
+    r[~converged] = np.nan
+    v[~converged] = np.nan
+    
+    return r, v
+
+
+def solve_lambert(r1, r2, tof, mu=GM_SUN, prograde=True, iterations=80, rtol=1e-8):
+    """
+    Zero-revolution Lambert transfers between (N, 3) position arrays
+    
+    tof is in days (scalar or (N,)). The transfer direction is the one
+    with the same sense of motion as the planets (or the opposite when
+    prograde is False). Returns the departure and arrival velocities as
+    (N, 3) arrays, NaN for cells with no converged solution (non-positive
+    time of flight, a 180 degree transfer, or a too hyperbolic one).
+    """
+    r1 = np.asarray(r1, dtype=np.float64)
+    r2 = np.asarray(r2, dtype=np.float64)
+    tof = np.broadcast_to(np.asarray(tof, dtype=np.float64), r1.shape[:-1])
+    
+    r1_norm = np.linalg.norm(r1, axis=-1)
+    r2_norm = np.linalg.norm(r2, axis=-1)
+    cos_dnu = np.sum(r1 * r2, axis=-1) / (r1_norm * r2_norm)
+    
+    # The long way round is taken when the short way would go against the motion
+    angular_z = np.cross(r1, r2)[..., 2]
+    long_way = angular_z < 0 if prograde else angular_z >= 0
+    A = np.where(long_way, -1.0, 1.0) * np.sqrt(r1_norm * r2_norm * (1.0 + cos_dnu))
+    
+    sqrt_mu = np.sqrt(mu)
+    low = np.full(tof.shape, PSI_LOW)
+    high = np.full(tof.shape, PSI_HIGH)
+    
+    def time_of_flight(psi):
+        c2, c3 = stumpff(psi)
+        y = r1_norm + r2_norm + A * (psi * c3 - 1.0) / np.sqrt(c2)
+        with np.errstate(invalid='ignore'):
+            chi = np.sqrt(y / c2)
+            dt = (chi ** 3 * c3 + A * np.sqrt(y)) / sqrt_mu
+        # y < 0 only happens at low psi, where the flight is too short
+        return np.where(y < 0, -np.inf, dt), y
+    
+    for _ in range(iterations):
+        psi = 0.5 * (low + high)
+        dt, _ = time_of_flight(psi)
+        too_short = dt <= tof
+        low = np.where(too_short, psi, low)
+        high = np.where(too_short, high, psi)
+    
+    psi = 0.5 * (low + high)
+    dt, y = time_of_flight(psi)
+    converged = (tof > 0) & (np.abs(A) > 1e-12) & (y > 0) & (np.abs(dt - tof) <= rtol * tof)
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        f = 1.0 - y / r1_norm
+        g = A * np.sqrt(y / mu)
+        g_dot = 1.0 - y / r2_norm
+        
+        v1 = (r2 - f[..., None] * r1) / g[..., None]
+        v2 = (g_dot[..., None] * r2 - r1) / g[..., None]
+    
+    v1[~converged] = np.nan
+    v2[~converged] = np.nan
+    
+    return v1, v2
+
+
+def porkchop_chunk(departures, arrival_jd, arrival_positions, arrival_velocities):
+    """
+    Departure C3 and arrival excess speed for a block of porkchop rows
+    
+    departures is a (departure_jd, positions, velocities) tuple of a
+    block of D departure dates; every departure is paired with all A
+    arrivals. Returns (D, A) arrays of C3 (AU²/day²) and arrival v-infinity
+    (AU/day), NaN where the cell has no transfer.
+    """
+    departure_jd, departure_positions, departure_velocities = departures
+    shape = (len(departure_jd), len(arrival_jd))
+    
+    r1 = np.broadcast_to(departure_positions[:, None], shape + (3,)).reshape(-1, 3)
+    r2 = np.broadcast_to(arrival_positions[None, :], shape + (3,)).reshape(-1, 3)
+    tof = (arrival_jd[None, :] - departure_jd[:, None]).ravel()
+    
+    v1, v2 = solve_lambert(r1, r2, tof)
+    
+    departure_excess = v1.reshape(shape + (3,)) - departure_velocities[:, None]
+    arrival_excess = v2.reshape(shape + (3,)) - arrival_velocities[None, :]
+    
+    return (
+        np.sum(departure_excess ** 2, axis=-1),
+        np.linalg.norm(arrival_excess, axis=-1),
+    )
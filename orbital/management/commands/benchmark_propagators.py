@@ -0,0 +1,53 @@
+"""
+Compare two-body and N-body propagation on stored orbital elements
+"""
+import time
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from orbital.nbody import propagate_nbody
+from orbital.propagation import datetime_to_jd, propagate_elements
+from orbital.services import OrbitalMechanicsService
+
+
+class Command(BaseCommand):
+    help = 'Time two-body and N-body propagation on the same NEOs and report how far they diverge'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--neo-ids', type=int, nargs='+', help='Restrict to these NEO ids')
+        parser.add_argument('--limit', type=int, default=200, help='Maximum number of NEOs')
+        parser.add_argument('--start-jd', type=float, help='Start of the time grid (default: now)')
+        parser.add_argument('--days', type=float, default=3652.5, help='Length of the time grid in days')
+        parser.add_argument('--num-points', type=int, default=100, help='Points per trajectory')
+    
+    def handle(self, *args, **options):
+        service = OrbitalMechanicsService()
+        elements = service._load_elements(options['neo_ids'])[:options['limit']]
+        
+        if not len(elements):
+            raise CommandError('No orbital elements to propagate')
+        
+        start_jd = options['start_jd'] or datetime_to_jd(timezone.now())
+        jd = start_jd + np.linspace(0, options['days'], options['num_points'])
+        
+        started = time.perf_counter()
+        two_body, _ = propagate_elements(elements, jd)
+        two_body_seconds = time.perf_counter() - started
+        
+        started = time.perf_counter()
+        nbody, _ = propagate_nbody(elements, jd)
+        nbody_seconds = time.perf_counter() - started
+        
+        divergence_km = np.linalg.norm(nbody - two_body, axis=-1)[:, -1] * service.AU_KM
+        
+        self.stdout.write(f"{len(elements)} NEOs, {len(jd)} points over {options['days']:g} days")
+        self.stdout.write(
+            f"two_body: {two_body_seconds:.3f}s ({len(elements) / two_body_seconds:.0f} NEOs/s)"
+        )
+        self.stdout.write(
+            f"nbody:    {nbody_seconds:.3f}s ({len(elements) / nbody_seconds:.0f} NEOs/s)"
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Divergence at end: median {np.median(divergence_km):,.0f} km, "
+            f"max {divergence_km.max():,.0f} km"
+        ))
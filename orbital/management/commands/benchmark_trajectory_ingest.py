@@ -0,0 +1,112 @@
+"""
+Measure trajectory point ingest throughput
+"""
+import time
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from neos.models import NEO
+from orbital.models import TrajectoryPoint, TrajectoryRun
+from orbital.storage import TABLE, TrajectoryWriter, is_partitioned, partition_name, retire_runs
+
+
+class Command(BaseCommand):
+    help = 'Ingest synthetic trajectory points as a throwaway run and report points per second'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--points', type=int, default=10000000, help='Total points to ingest')
+        parser.add_argument('--points-per-neo', type=int, default=1000, help='Points per trajectory')
+        parser.add_argument('--chunk-neos', type=int, default=1000, help='NEOs per write')
+        parser.add_argument(
+            '--baseline-points',
+            type=int,
+            default=200000,
+            help='Points to insert and delete with plain bulk_create for comparison (0 to skip)'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+    
+    def handle(self, *args, **options):
+        points_per_neo = options['points_per_neo']
+        num_neos = max(options['points'] // points_per_neo, 1)
+        
+        # Real ids so the benchmark also works where foreign keys are enforced
+        neo_ids = np.array(NEO.objects.values_list('id', flat=True)[:num_neos], dtype=np.int64)
+        if not len(neo_ids):
+            raise CommandError('At least one NEO is needed')
+        neo_ids = np.resize(neo_ids, num_neos)
+        
+        rng = np.random.default_rng(options['seed'])
+        jd = 2460000.5 + np.arange(points_per_neo, dtype=np.float64)
+        chunk_neos = options['chunk_neos']
+        positions = rng.standard_normal((chunk_neos, points_per_neo, 3))
+        velocities = 0.01 * rng.standard_normal((chunk_neos, points_per_neo, 3))
+        
+        self.stdout.write(
+            f"{num_neos * points_per_neo:,} points ({num_neos} trajectories of {points_per_neo}), "
+            f"{'partitioned COPY' if is_partitioned(connection) else 'bulk_create'} ingest"
+        )
+        
+        run = TrajectoryRun.objects.create(mode='benchmark', num_points=points_per_neo)
+        
+        started = time.perf_counter()
+        with TrajectoryWriter(run, current=False) as writer:
+            for offset in range(0, num_neos, chunk_neos):
+                chunk = neo_ids[offset:offset + chunk_neos]
+                writer.write(chunk, jd, positions[:len(chunk)], velocities[:len(chunk)])
+        ingest_seconds = time.perf_counter() - started
+        
+        self.stdout.write(self.style.SUCCESS(
+            f"Ingest: {writer.point_count:,} points in {ingest_seconds:.1f}s "
+            f"({writer.point_count / ingest_seconds:,.0f} points/s)"
+        ))
+        
+        baseline = options['baseline_points']
+        if baseline:
+            self._baseline(neo_ids[0], baseline)
+        
+        started = time.perf_counter()
+        retire_runs()
+        self.stdout.write(f"Retire runs: {time.perf_counter() - started:.2f}s")
+    
+    def _baseline(self, neo_id, count):
+        """
+        Row-by-row bulk_create and delete through the ORM, as before runs
+        
+        The rows go into a throwaway run of their own, deleted by that run
+        alone, which retire_runs then removes like the benchmark run.
+        """
+        run = TrajectoryRun.objects.create(mode='benchmark', num_points=count, status='active')
+        
+        if is_partitioned(connection):
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'CREATE TABLE {partition_name(run.id)} PARTITION OF {TABLE} '
+                    f'FOR VALUES IN ({int(run.id)})'
+                )
+        
+        points = [
+            TrajectoryPoint(
+                neo_id=int(neo_id),
+                run_id=run.id,
+                julian_date=2460000.5 + index,
+                position_x_au=1.0,
+                position_y_au=0.0,
+                position_z_au=0.0,
+                velocity_x_au_per_day=0.0,
+                velocity_y_au_per_day=0.017,
+                velocity_z_au_per_day=0.0,
+                earth_distance_au=0.1
+            )
+            for index in range(count)
+        ]
+        
+        started = time.perf_counter()
+        TrajectoryPoint.objects.bulk_create(points, batch_size=5000)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"Baseline bulk_create: {count:,} points in {elapsed:.1f}s ({count / elapsed:,.0f} points/s)"
+        )
+        
+        started = time.perf_counter()
+        TrajectoryPoint.objects.filter(run=run).delete()
+        self.stdout.write(f"Baseline delete: {time.perf_counter() - started:.1f}s")
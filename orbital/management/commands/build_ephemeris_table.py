@@ -0,0 +1,46 @@
+"""
+Build the memory-mapped major-body ephemeris table
+"""
+import time
+from datetime import datetime, timezone
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from orbital.bodies import build_table
+from orbital.propagation import datetime_to_jd
+
+
+class Command(BaseCommand):
+    help = 'Tabulate heliocentric Earth, Moon and Jupiter states for fast interpolation'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help='Table path (default: EPHEMERIS_TABLE_PATH)')
+        parser.add_argument('--start-year', type=int, default=1900, help='First year covered')
+        parser.add_argument('--end-year', type=int, default=2200, help='Last year covered')
+        parser.add_argument('--step-days', type=float, default=1.0, help='Table cadence in days')
+        parser.add_argument(
+            '--source', choices=['analytic', 'skyfield'], default='analytic',
+            help='Analytic mean-element model or a JPL kernel through skyfield'
+        )
+        parser.add_argument('--kernel', default='de440.bsp', help='JPL kernel used with --source skyfield')
+    
+    def handle(self, *args, **options):
+        output = options['output'] or settings.EPHEMERIS_TABLE_PATH
+        start_jd = datetime_to_jd(datetime(options['start_year'], 1, 1, tzinfo=timezone.utc))
+        end_jd = datetime_to_jd(datetime(options['end_year'] + 1, 1, 1, tzinfo=timezone.utc))
+        
+        started = time.perf_counter()
+        
+        metadata = build_table(
+            output,
+            start_jd,
+            end_jd,
+            step_days=options['step_days'],
+            source=options['source'],
+            kernel=options['kernel']
+        )
+        
+        elapsed = time.perf_counter() - started
+        
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {metadata['count']} epochs from {options['source']} to {output} in {elapsed:.1f}s"
+        ))
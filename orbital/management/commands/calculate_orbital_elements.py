@@ -0,0 +1,32 @@
+"""
+Recalculate orbital elements and derived parameters for the NEO catalogue
+"""
+import time
+from django.core.management.base import BaseCommand
+from orbital.services import OrbitalMechanicsService
+
+
+class Command(BaseCommand):
+    help = 'Bulk-recalculate period, apsides, orbit class, Tisserand parameter and MOIDs'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--neo-ids', type=int, nargs='+', help='Restrict to these NEO ids')
+        parser.add_argument('--force', action='store_true', help='Recalculate unchanged NEOs too')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Rows per bulk upsert')
+        parser.add_argument('--workers', type=int, help='Process pool size for MOIDs (default: COMPUTE_WORKERS)')
+    
+    def handle(self, *args, **options):
+        service = OrbitalMechanicsService()
+        
+        started = time.perf_counter()
+        result = service.calculate_derived_parameters(
+            neo_ids=options['neo_ids'],
+            force=options['force'],
+            chunk_size=options['chunk_size'],
+            workers=options['workers']
+        )
+        elapsed = time.perf_counter() - started
+        
+        self.stdout.write(self.style.SUCCESS(
+            f"Updated {result['neos_changed']} of {result['neos_checked']} NEOs in {elapsed:.1f}s"
+        ))
@@ -0,0 +1,58 @@
+"""
+Batch trajectory calculation for all NEOs
+"""
+import time
+from django.core.management.base import BaseCommand
+from orbital.services import OrbitalMechanicsService
+
+
+class Command(BaseCommand):
+    help = 'Propagate stored orbital elements over a shared time grid and store ephemerides or points'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--neo-ids', type=int, nargs='+', help='Restrict to these NEO ids')
+        parser.add_argument('--start-jd', type=float, help='Start of the time grid (default: now)')
+        parser.add_argument('--days', type=float, default=365.25, help='Length of the time grid in days')
+        parser.add_argument(
+            '--storage', choices=['ephemeris', 'points'], default='ephemeris',
+            help='Store Chebyshev ephemerides or individual trajectory points'
+        )
+        parser.add_argument(
+            '--mode', choices=['two_body', 'nbody'], default='two_body',
+            help='Two-body propagation or integration with Earth, Moon and Jupiter perturbations'
+        )
+        parser.add_argument('--num-points', type=int, default=100, help='Points per trajectory')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='NEOs propagated per array pass')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per INSERT')
+    
+    def handle(self, *args, **options):
+        service = OrbitalMechanicsService()
+        
+        started = time.perf_counter()
+        
+        if options['storage'] == 'points':
+            result = service.calculate_trajectories_batch(
+                neo_ids=options['neo_ids'],
+                start_jd=options['start_jd'],
+                days=options['days'],
+                num_points=options['num_points'],
+                chunk_size=options['chunk_size'],
+                batch_size=options['batch_size'],
+                mode=options['mode']
+            )
+            summary = f"{result['points_created']} points"
+        else:
+            result = service.calculate_ephemerides_batch(
+                neo_ids=options['neo_ids'],
+                start_jd=options['start_jd'],
+                days=options['days'],
+                chunk_size=options['chunk_size'],
+                mode=options['mode']
+            )
+            summary = "ephemerides"
+        
+        elapsed = time.perf_counter() - started
+        
+        self.stdout.write(self.style.SUCCESS(
+            f"Calculated {summary} for {result['neos_processed']} NEOs in {elapsed:.1f}s"
+        ))
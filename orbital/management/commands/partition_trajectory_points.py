@@ -0,0 +1,76 @@
+"""
+Convert trajectory_points into a table list-partitioned by trajectory run
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from orbital.models import TrajectoryRun
+from orbital.storage import ID_SEQUENCE, TABLE, is_partitioned, partition_name
+
+
+class Command(BaseCommand):
+    help = 'Partition trajectory_points by run (PostgreSQL only); run once after migrate'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--discard-existing',
+            action='store_true',
+            help='Drop existing points instead of keeping them as a legacy run'
+        )
+    
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Partitioning needs PostgreSQL; other databases use a plain table')
+        
+        if is_partitioned(connection):
+            self.stdout.write('trajectory_points is already partitioned')
+            return
+        
+        with transaction.atomic(), connection.cursor() as cursor:
+            legacy = TrajectoryRun.objects.create(mode='two_body', num_points=0)
+            legacy_table = partition_name(legacy.id)
+            
+            cursor.execute(f'ALTER TABLE {TABLE} RENAME TO {legacy_table}')
+            cursor.execute(
+                f'CREATE TABLE {TABLE} (LIKE {legacy_table} INCLUDING DEFAULTS) '
+                f'PARTITION BY LIST (run_id)'
+            )
+            
+            # Partitions are loaded as standalone tables, so ids come from a
+            # plain sequence default rather than the parent's identity
+            cursor.execute(f'CREATE SEQUENCE {ID_SEQUENCE} OWNED BY {TABLE}.id')
+            cursor.execute(
+                f"SELECT setval('{ID_SEQUENCE}', COALESCE(MAX(id), 0) + 1, false) FROM {legacy_table}"
+            )
+            cursor.execute(f"ALTER TABLE {TABLE} ALTER COLUMN id SET DEFAULT nextval('{ID_SEQUENCE}')")
+            
+            cursor.execute(f'CREATE INDEX {TABLE}_id_idx ON {TABLE} (id)')
+            cursor.execute(f'CREATE INDEX {TABLE}_neo_jd_idx ON {TABLE} (neo_id, julian_date)')
+            cursor.execute(f'CREATE INDEX {TABLE}_jd_idx ON {TABLE} (julian_date)')
+            
+            if options['discard_existing']:
+                cursor.execute(f'DROP TABLE {legacy_table}')
+                legacy.delete()
+                self.stdout.write(self.style.SUCCESS('Partitioned trajectory_points; existing points dropped'))
+                return
+            
+            # Existing points become one run, current for every NEO that has points
+            cursor.execute(f'UPDATE {legacy_table} SET run_id = %s', [legacy.id])
+            cursor.execute(
+                f'ALTER TABLE {TABLE} ATTACH PARTITION {legacy_table} FOR VALUES IN ({int(legacy.id)})'
+            )
+            cursor.execute(
+                f'UPDATE orbital_elements SET trajectory_run_id = %s '
+                f'WHERE neo_id IN (SELECT DISTINCT neo_id FROM {legacy_table})',
+                [legacy.id]
+            )
+            cursor.execute(f'SELECT COUNT(*), COUNT(DISTINCT neo_id) FROM {legacy_table}')
+            point_count, neo_count = cursor.fetchone()
+            
+            legacy.status = 'active'
+            legacy.point_count = point_count
+            legacy.neo_count = neo_count
+            legacy.save(update_fields=['status', 'point_count', 'neo_count'])
+        
+        self.stdout.write(self.style.SUCCESS(
+            f'Partitioned trajectory_points; {point_count} existing points kept as run {legacy.id}'
+        ))
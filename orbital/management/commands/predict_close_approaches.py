@@ -0,0 +1,39 @@
+"""
+Predict close approaches for the NEO catalogue
+"""
+import time
+from django.core.management.base import BaseCommand
+from orbital.services import OrbitalMechanicsService
+
+
+class Command(BaseCommand):
+    help = 'Screen stored orbital elements for close approaches to Earth and store local predictions'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--neo-ids', type=int, nargs='+', help='Restrict to these NEO ids')
+        parser.add_argument('--years', type=float, default=10, help='Horizon in years')
+        parser.add_argument('--start-jd', type=float, help='Start of the horizon (default: now)')
+        parser.add_argument('--step-days', type=float, default=1.0, help='Coarse screening step')
+        parser.add_argument('--threshold-au', type=float, default=0.05, help='Maximum miss distance to store')
+        parser.add_argument('--chunk-size', type=int, default=64, help='NEOs per worker task')
+        parser.add_argument('--workers', type=int, help='Process pool size (default: COMPUTE_WORKERS)')
+    
+    def handle(self, *args, **options):
+        service = OrbitalMechanicsService()
+        
+        started = time.perf_counter()
+        result = service.predict_close_approaches(
+            neo_ids=options['neo_ids'],
+            years=options['years'],
+            start_jd=options['start_jd'],
+            step_days=options['step_days'],
+            threshold_au=options['threshold_au'],
+            chunk_size=options['chunk_size'],
+            workers=options['workers']
+        )
+        elapsed = time.perf_counter() - started
+        
+        self.stdout.write(self.style.SUCCESS(
+            f"Predicted {result['approaches_created']} close approaches for "
+            f"{result['neos_processed']} NEOs in {elapsed:.1f}s"
+        ))
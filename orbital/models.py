@@ -48,6 +48,26 @@ class OrbitalElements(models.Model):
         blank=True
     )
     
+    # Change Detection
+    source_hash = models.CharField(
+        max_length=40,
+        blank=True,
+        help_text="Hash of the input elements these values were derived from"
+    )
+    trajectory_hash = models.CharField(
+        max_length=40,
+        blank=True,
+        help_text="Hash of the inputs of the stored trajectory points"
+    )
+    trajectory_run = models.ForeignKey(
+        'TrajectoryRun',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        help_text="Run holding the current trajectory points"
+    )
+    
     calculated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
@@ -59,12 +79,66 @@ class OrbitalElements(models.Model):
         return f"Orbital Elements: {self.neo.name}"
 
 
+class TrajectoryRun(models.Model):
+    """
+    One computation of trajectory points
+    
+    On PostgreSQL each run's points live in their own partition of
+    trajectory_points, which is dropped as a whole once no NEO's current
+    trajectory belongs to the run.
+    """
+    
+    STATUS_CHOICES = [
+        ('ingesting', 'Ingesting'),
+        ('active', 'Active'),
+        ('retired', 'Retired'),
+        ('failed', 'Failed'),
+    ]
+    
+    mode = models.CharField(max_length=20, default='two_body')
+    start_jd = models.FloatField(blank=True, null=True)
+    days = models.FloatField(blank=True, null=True)
+    num_points = models.IntegerField(help_text="Points per NEO")
+    
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='ingesting', db_index=True)
+    neo_count = models.IntegerField(default=0)
+    point_count = models.BigIntegerField(default=0)
+    ingest_seconds = models.FloatField(blank=True, null=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    retired_at = models.DateTimeField(blank=True, null=True)
+    
+    class Meta:
+        db_table = 'trajectory_runs'
+        ordering = ['-created_at']
+        verbose_name = 'Trajectory Run'
+        verbose_name_plural = 'Trajectory Runs'
+    
+    def __str__(self):
+        return f"Trajectory run {self.id} ({self.status}, {self.point_count} points)"
+
+
+class TrajectoryPointQuerySet(models.QuerySet):
+    
+    def current(self):
+        """Points of each NEO's current trajectory run"""
+        return self.filter(run_id=models.F('neo__orbital_elements__trajectory_run_id'))
+
+
 class TrajectoryPoint(models.Model):
     """
     Calculated trajectory points for visualization
     """
     
     neo = models.ForeignKey(NEO, on_delete=models.CASCADE, related_name='trajectory_points')
+    run = models.ForeignKey(
+        TrajectoryRun,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        null=True,
+        related_name='points',
+        help_text="Partition key; points are removed with their run"
+    )
     
     # Julian Date
     julian_date = models.FloatField(db_index=True)
@@ -84,6 +158,8 @@ class TrajectoryPoint(models.Model):
     
     calculated_at = models.DateTimeField(auto_now_add=True)
     
+    objects = TrajectoryPointQuerySet.as_manager()
+    
     class Meta:
         db_table = 'trajectory_points'
         ordering = ['julian_date']
@@ -96,3 +172,71 @@ class TrajectoryPoint(models.Model):
     def __str__(self):
         return f"{self.neo.name} @ JD {self.julian_date}"
 
+
+
+class Ephemeris(models.Model):
+    """
+    Piecewise Chebyshev ephemeris, a compact alternative to trajectory points
+    """
+    
+    neo = models.OneToOneField(NEO, on_delete=models.CASCADE, related_name='ephemeris')
+    
+    # Time Span
+    start_jd = models.FloatField(help_text="Start of the fitted span in Julian Date")
+    end_jd = models.FloatField(help_text="End of the fitted span in Julian Date")
+    segment_days = models.FloatField()
+    num_segments = models.IntegerField()
+    degree = models.IntegerField(help_text="Chebyshev degree per segment")
+    
+    # Little-endian float64 array of shape (segments, degree + 1, 3), AU
+    coefficients = models.BinaryField()
+    
+    calculated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'ephemerides'
+        verbose_name = 'Ephemeris'
+        verbose_name_plural = 'Ephemerides'
+    
+    def __str__(self):
+        return f"Ephemeris: {self.neo.name} JD {self.start_jd}-{self.end_jd}"
+
+
+class MonteCarloRun(models.Model):
+    """
+    Close-approach statistics of a clone cloud sampled around the nominal orbit
+    """
+    
+    neo = models.ForeignKey(NEO, on_delete=models.CASCADE, related_name='monte_carlo_runs')
+    
+    # Run Parameters
+    num_clones = models.IntegerField()
+    seed = models.BigIntegerField(help_text="Root seed; the same seed reproduces the run")
+    start_jd = models.FloatField()
+    end_jd = models.FloatField()
+    step_days = models.FloatField()
+    threshold_au = models.FloatField(help_text="Approaches farther than this are not resolved")
+    element_sigmas = models.JSONField(help_text="1-sigma a, e, i, node, peri, M")
+    
+    # Results
+    impacts = models.IntegerField(default=0)
+    impact_probability = models.FloatField(default=0)
+    approaches = models.IntegerField(default=0, help_text="Clones passing within the threshold")
+    min_distance_au = models.FloatField(blank=True, null=True)
+    mean_distance_au = models.FloatField(blank=True, null=True, help_text="Among approaching clones")
+    distance_p05_au = models.FloatField(blank=True, null=True)
+    distance_p50_au = models.FloatField(blank=True, null=True)
+    distance_p95_au = models.FloatField(blank=True, null=True)
+    distance_histogram = models.JSONField(default=dict, help_text="Clone counts per log10(AU) bin")
+    
+    duration_seconds = models.FloatField(default=0)
+    calculated_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'monte_carlo_runs'
+        ordering = ['-calculated_at']
+        verbose_name = 'Monte Carlo Run'
+        verbose_name_plural = 'Monte Carlo Runs'
+    
+    def __str__(self):
+        return f"Monte Carlo: {self.neo.name} ({self.num_clones} clones)"
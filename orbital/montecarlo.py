@@ -0,0 +1,203 @@
+"""
+Monte Carlo Orbit Uncertainty
+
+A cloud of clones is drawn around the nominal elements and screened for
+close approaches to Earth like any other batch of objects. Clones are
+generated and screened in chunks, each from its own spawned seed, so a
+run is reproducible whatever the number of workers, and each chunk is
+reduced to a fixed-size ApproachStatistics before the next is started,
+so memory does not grow with the number of clones.
+"""
+import numpy as np
+
+from .close_approach import screen_close_approaches
+from .propagation import ELEMENT_DTYPE, GAUSS_K
+
+CLONE_FIELDS = ('a', 'e', 'i', 'node', 'peri', 'M')
+
+# Along-track runoff after a decade (arcsec) for MPC uncertainty parameters 0-9
+CONDITION_RUNOFF_ARCSEC = (1.0, 4.4, 19.6, 86.5, 382.0, 1692.0, 7488.0, 33121.0, 146502.0, 648000.0)
+DEFAULT_CONDITION_CODE = 5
+
+# JPL small-body database names for explicit 1-sigma uncertainties
+SIGMA_KEYS = ('sigma_a', 'sigma_e', 'sigma_i', 'sigma_om', 'sigma_w', 'sigma_ma')
+
+EARTH_RADIUS_AU = 6378.137 / 149597870.7
+EARTH_ESCAPE_VELOCITY_AU_PER_DAY = 11.186 * 86400.0 / 149597870.7
+
+# Closest-approach histogram: log10(AU) bins from 1e-6 AU up to the threshold
+HISTOGRAM_BINS = 120
+HISTOGRAM_MIN_LOG10_AU = -6.0
+
+# Clones per chunk; each chunk draws from its own spawned seed, so runs depend on it
+CHUNK_CLONES = 2000
+
+
+def condition_sigmas(a, condition_code=DEFAULT_CONDITION_CODE):
+    """
+    Approximate 1-sigma element uncertainties from an MPC uncertainty parameter
+    
+    The semi-major axis uncertainty is the one whose mean-motion error
+    accumulates the parameter's along-track runoff over a decade; the
+    other elements get the same fractional uncertainty (in radians for
+    angles). Returns sigmas in CLONE_FIELDS order and units.
+    """
+    code = int(np.clip(condition_code, 0, len(CONDITION_RUNOFF_ARCSEC) - 1))
+    runoff = np.radians(CONDITION_RUNOFF_ARCSEC[code] / 3600.0)
+    mean_motion = GAUSS_K / a ** 1.5
+    
+    fraction = runoff / (1.5 * mean_motion * 3652.5)
+    angle = np.degrees(fraction)
+    
+    return np.array([a * fraction, fraction, angle, angle, angle, angle])
+
+
+def sample_clones(nominal, sigmas, count, rng):
+    """Draw clones with independent normal element errors around a nominal record"""
+    clones = np.empty(count, dtype=ELEMENT_DTYPE)
+    clones['neo_id'] = np.arange(count)
+    clones['epoch'] = nominal['epoch']
+    
+    for name, sigma in zip(CLONE_FIELDS, sigmas):
+        clones[name] = nominal[name] + sigma * rng.standard_normal(count)
+    
+    # Keep every clone a bound orbit
+    clones['a'] = np.maximum(clones['a'], 1e-3)
+    clones['e'] = np.clip(clones['e'], 0.0, 0.999)
+    
+    return clones
+
+
+def capture_radius_au(velocity_au_per_day):
+    """Earth's radius enlarged by gravitational focusing at a given encounter speed"""
+    ratio = EARTH_ESCAPE_VELOCITY_AU_PER_DAY / np.maximum(velocity_au_per_day, 1e-12)
+    return EARTH_RADIUS_AU * np.sqrt(1.0 + ratio ** 2)
+
+
+class ApproachStatistics:
+    """Mergeable summary of the closest approach of each clone"""
+    
+    def __init__(self, threshold_au):
+        self.threshold_au = threshold_au
+        self.clones = 0
+        self.impacts = 0
+        self.approaches = 0
+        self.min_distance_au = np.inf
+        self.distance_sum_au = 0.0
+        self.counts = np.zeros(HISTOGRAM_BINS, dtype=np.int64)
+    
+    @property
+    def edges(self):
+        return np.linspace(HISTOGRAM_MIN_LOG10_AU, np.log10(self.threshold_au), HISTOGRAM_BINS + 1)
+    
+    def add(self, clones, approaches):
+        """Fold in the close approaches found for a batch of clones"""
+        self.clones += len(clones)
+        
+        if not len(approaches):
+            return
+        
+        index = np.searchsorted(clones['neo_id'], approaches['neo_id'])
+        closest = np.full(len(clones), np.inf)
+        np.minimum.at(closest, index, approaches['distance_au'])
+        
+        hits = approaches['distance_au'] < capture_radius_au(approaches['velocity_au_per_day'])
+        impacted = np.zeros(len(clones), dtype=bool)
+        np.logical_or.at(impacted, index, hits)
+        
+        closest = closest[np.isfinite(closest)]
+        self.impacts += int(impacted.sum())
+        self.approaches += len(closest)
+        self.min_distance_au = min(self.min_distance_au, float(closest.min()))
+        self.distance_sum_au += float(closest.sum())
+        
+        bins = np.searchsorted(self.edges, np.log10(closest), side='right') - 1
+        np.add.at(self.counts, np.clip(bins, 0, HISTOGRAM_BINS - 1), 1)
+    
+    def merge(self, other):
+        self.clones += other.clones
+        self.impacts += other.impacts
+        self.approaches += other.approaches
+        self.min_distance_au = min(self.min_distance_au, other.min_distance_au)
+        self.distance_sum_au += other.distance_sum_au
+        self.counts += other.counts
+        return self
+    
+    def to_dict(self):
+        """JSON-safe form, for passing between Celery tasks"""
+        return {
+            'threshold_au': self.threshold_au,
+            'clones': self.clones,
+            'impacts': self.impacts,
+            'approaches': self.approaches,
+            'min_distance_au': self.min_distance_au if self.approaches else None,
+            'distance_sum_au': self.distance_sum_au,
+            'counts': self.counts.tolist()
+        }
+    
+    @classmethod
+    def from_dict(cls, data):
+        statistics = cls(data['threshold_au'])
+        statistics.clones = data['clones']
+        statistics.impacts = data['impacts']
+        statistics.approaches = data['approaches']
+        if data['min_distance_au'] is not None:
+            statistics.min_distance_au = data['min_distance_au']
+        statistics.distance_sum_au = data['distance_sum_au']
+        statistics.counts = np.array(data['counts'], dtype=np.int64)
+        return statistics
+    
+    @property
+    def impact_probability(self):
+        return self.impacts / self.clones if self.clones else 0.0
+    
+    def percentile(self, q):
+        """
+        Closest-approach distance below which q percent of all clones fall
+        
+        Interpolated within histogram bins; None when that distance lies
+        beyond the threshold.
+        """
+        target = q / 100.0 * self.clones
+        cumulative = np.cumsum(self.counts)
+        
+        if not self.clones or cumulative[-1] < target:
+            return None
+        
+        index = int(np.searchsorted(cumulative, target))
+        below = cumulative[index - 1] if index else 0
+        fraction = (target - below) / self.counts[index] if self.counts[index] else 0.0
+        edges = self.edges
+        
+        return float(10 ** (edges[index] + fraction * (edges[index + 1] - edges[index])))
+
+
+def spawn_chunks(num_clones, chunk_size, seed):
+    """Split a run into (seed sequence, count) chunks"""
+    counts = [
+        min(chunk_size, num_clones - offset)
+        for offset in range(0, num_clones, chunk_size)
+    ]
+    seeds = np.random.SeedSequence(seed).spawn(len(counts))
+    return list(zip(seeds, counts))
+
+
+def clone_chunk_statistics(chunk, nominal, sigmas, start_jd, end_jd, step_days, threshold_au,
+                           window_steps=365):
+    """Sample and screen one chunk of clones, reduced to ApproachStatistics"""
+    seed, count = chunk
+    clones = sample_clones(nominal, sigmas, count, np.random.default_rng(seed))
+    
+    approaches = screen_close_approaches(
+        clones,
+        start_jd,
+        end_jd,
+        step_days=step_days,
+        threshold_au=threshold_au,
+        window_steps=window_steps
+    )
+    
+    statistics = ApproachStatistics(threshold_au)
+    statistics.add(clones, approaches)
+    
+    return statistics
@@ -0,0 +1,181 @@
+"""
+N-Body Propagation
+
+NEOs are integrated as massless test particles in the heliocentric
+ecliptic frame under the Sun and the perturbations of Earth, the Moon
+and Jupiter, whose positions come from the body ephemeris table. All
+objects sharing an epoch are advanced together as one (N, 6) state array
+by an adaptive Dormand-Prince 5(4) integrator. The step size is shared
+within an array, so objects are integrated in chunks and a single close
+encounter only slows down its own chunk.
+"""
+import numpy as np
+
+from .bodies import body_states
+from .propagation import ELEMENT_DTYPE, GM_SUN, kepler_states
+
+# Masses relative to the Sun (DE440)
+MASS_RATIOS = {
+    'earth': 1.0 / 332946.0487,
+    'moon': 1.0 / (332946.0487 * 81.30056),
+    'jupiter': 1.0 / 1047.348644,
+}
+DEFAULT_PERTURBERS = ('earth', 'moon', 'jupiter')
+
+# Dormand-Prince 5(4) tableau; the last row of A is the 5th-order solution
+DP_C = (0.0, 1 / 5, 3 / 10, 4 / 5, 8 / 9, 1.0, 1.0)
+DP_A = (
+    (),
+    (1 / 5,),
+    (3 / 40, 9 / 40),
+    (44 / 45, -56 / 15, 32 / 9),
+    (19372 / 6561, -25360 / 2187, 64448 / 6561, -212 / 729),
+    (9017 / 3168, -355 / 33, 46732 / 5247, 49 / 176, -5103 / 18656),
+    (35 / 384, 0.0, 500 / 1113, 125 / 192, -2187 / 6784, 11 / 84),
+)
+DP_ERROR = (
+    35 / 384 - 5179 / 57600,
+    0.0,
+    500 / 1113 - 7571 / 16695,
+    125 / 192 - 393 / 640,
+    -2187 / 6784 + 92097 / 339200,
+    11 / 84 - 187 / 2100,
+    -1 / 40,
+)
+
+
+def accelerations(jd, positions, perturbers=DEFAULT_PERTURBERS):
+    """Heliocentric accelerations (AU/day²) of test particles at one date"""
+    result = -GM_SUN * positions / np.sum(positions ** 2, axis=-1, keepdims=True) ** 1.5
+    
+    if perturbers:
+        body_positions, _ = body_states(tuple(perturbers), jd)
+        masses = GM_SUN * np.array([MASS_RATIOS[body] for body in perturbers])
+        
+        for body_position, gm in zip(body_positions, masses):
+            offset = body_position - positions
+            
+            # Direct pull on the particle minus the pull on the Sun (indirect term)
+            result += gm * (
+                offset / np.sum(offset ** 2, axis=-1, keepdims=True) ** 1.5
+                - body_position / np.sum(body_position ** 2) ** 1.5
+            )
+    
+    return result
+
+
+def _derivative(jd, states, perturbers):
+    return np.concatenate(
+        [states[:, 3:], accelerations(jd, states[:, :3], perturbers)], axis=1
+    )
+
+
+def _error_norm(error, states, new_states, rtol, atol):
+    """Largest scaled error over particles, positions and velocities scaled separately"""
+    norms = []
+    for part in (slice(0, 3), slice(3, 6)):
+        size = np.maximum(
+            np.linalg.norm(states[:, part], axis=-1),
+            np.linalg.norm(new_states[:, part], axis=-1)
+        )
+        norms.append(np.linalg.norm(error[:, part], axis=-1) / (atol + rtol * size))
+    return float(np.max(norms)) if len(states) else 0.0
+
+
+def integrate(states, start_jd, jd, rtol=1e-9, atol=1e-14, perturbers=DEFAULT_PERTURBERS,
+              initial_step=1.0, max_steps=1000000):
+    """
+    Integrate (N, 6) heliocentric states from start_jd to every date in jd
+    
+    Dates before start_jd are reached by integrating backwards. Output
+    dates are hit exactly by shortening the step that would pass them.
+    Returns an (N, T, 6) array.
+    """
+    states = np.asarray(states, dtype=np.float64)
+    jd = np.asarray(jd, dtype=np.float64)
+    result = np.empty((len(states), len(jd), 6))
+    
+    forward = np.nonzero(jd >= start_jd)[0]
+    backward = np.nonzero(jd < start_jd)[0]
+    
+    for direction, targets in (
+        (1.0, forward[np.argsort(jd[forward], kind='stable')]),
+        (-1.0, backward[np.argsort(-jd[backward], kind='stable')]),
+    ):
+        t = start_jd
+        y = states.copy()
+        step = initial_step
+        k1 = _derivative(t, y, perturbers)
+        steps = 0
+        
+        for index in targets:
+            target = jd[index]
+            
+            while t != target:
+                remaining = abs(target - t)
+                clipped = step >= remaining
+                h = direction * min(step, remaining)
+                
+                k = [k1]
+                for stage in range(1, 7):
+                    increment = sum(a * kj for a, kj in zip(DP_A[stage], k) if a)
+                    k.append(_derivative(t + DP_C[stage] * h, y + h * increment, perturbers))
+                
+                # The last stage is evaluated at the new state (first same as last)
+                new_y = y + h * sum(a * kj for a, kj in zip(DP_A[6], k) if a)
+                error = h * sum(e * kj for e, kj in zip(DP_ERROR, k) if e)
+                error_norm = _error_norm(error, y, new_y, rtol, atol)
+                
+                factor = 5.0 if error_norm == 0 else min(5.0, max(0.2, 0.9 * error_norm ** -0.2))
+                
+                if error_norm <= 1.0:
+                    t = target if clipped else t + h
+                    y = new_y
+                    k1 = k[6]
+                    step = max(step, abs(h) * factor) if clipped else abs(h) * factor
+                else:
+                    step = abs(h) * factor
+                
+                steps += 1
+                if steps > max_steps:
+                    raise RuntimeError(f"N-body integration exceeded {max_steps} steps")
+            
+            result[:, index] = y
+    
+    return result
+
+
+def propagate_nbody(elements, jd, chunk_size=256, **options):
+    """
+    Propagate a structured array of elements with planetary perturbations
+    
+    Same contract as propagation.propagate_elements for a shared (T,)
+    grid of Julian dates: returns a pair of (N, T, 3) arrays. The
+    osculating elements give each object's initial state at its epoch.
+    """
+    elements = np.asarray(elements, dtype=ELEMENT_DTYPE)
+    jd = np.asarray(jd, dtype=np.float64)
+    
+    if jd.ndim != 1:
+        raise ValueError("N-body propagation needs a shared (T,) grid of Julian dates")
+    
+    positions = np.empty((len(elements), len(jd), 3))
+    velocities = np.empty((len(elements), len(jd), 3))
+    
+    for epoch in np.unique(elements['epoch']):
+        members = np.nonzero(elements['epoch'] == epoch)[0]
+        
+        for offset in range(0, len(members), chunk_size):
+            chunk = members[offset:offset + chunk_size]
+            group = elements[chunk]
+            
+            r0, v0 = kepler_states(
+                group['a'], group['e'], group['i'], group['node'], group['peri'],
+                group['M'], group['epoch'], epoch
+            )
+            states = integrate(np.concatenate([r0, v0], axis=1), epoch, jd, **options)
+            
+            positions[chunk] = states[..., :3]
+            velocities[chunk] = states[..., 3:]
+    
+    return positions, velocities
@@ -2,7 +2,7 @@
 Orbital Serializers
 """
 from rest_framework import serializers
-from .models import OrbitalElements, TrajectoryPoint
+from .models import OrbitalElements, TrajectoryPoint, MonteCarloRun
 
 
 class OrbitalElementsSerializer(serializers.ModelSerializer):
@@ -23,3 +23,11 @@ class TrajectoryPointSerializer(serializers.ModelSerializer):
             'earth_distance_au'
         ]
 
+
+
+class MonteCarloRunSerializer(serializers.ModelSerializer):
+    neo_name = serializers.CharField(source='neo.name', read_only=True)
+    
+    class Meta:
+        model = MonteCarloRun
+        fields = '__all__'
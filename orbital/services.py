@@ -1,13 +1,89 @@
 """
 Orbital Mechanics Services
 """
-import math
+import secrets
+import time
 import numpy as np
-from .models import OrbitalElements, TrajectoryPoint
+from functools import partial
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Max
+from django.utils import timezone
+from asteroids.models import ThreatAssessment
+from meteor_madness.parallel import map_chunks
+from neos.models import NEO, CloseApproach
+from .models import (
+    OrbitalElements,
+    TrajectoryPoint,
+    TrajectoryRun,
+    Ephemeris,
+    MonteCarloRun,
+)
+from .bodies import earth_states
+from .close_approach import screen_close_approaches
+from .ephemeris import (
+    DEFAULT_DEGREE,
+    DEFAULT_SEGMENT_DAYS,
+    DEFAULT_TOLERANCE_AU,
+    evaluate_ephemeris,
+    fit_within_tolerance,
+    pack_coefficients,
+    unpack_coefficients,
+)
+from .derived import (
+    MOID_ELEMENTS,
+    catalogue_moids,
+    classify_orbits,
+    derived_parameters,
+    orbital_periods,
+)
+from .deflection import DIRECTIONS, required_delta_v
+from .lambert import porkchop_chunk
+from .moid import compute_moid
+from .nbody import propagate_nbody
+from .montecarlo import (
+    CHUNK_CLONES,
+    DEFAULT_CONDITION_CODE,
+    HISTOGRAM_MIN_LOG10_AU,
+    SIGMA_KEYS,
+    ApproachStatistics,
+    clone_chunk_statistics,
+    condition_sigmas,
+    spawn_chunks,
+)
+from .cache import LRUCache
+from .spatial import PositionIndex
+from .storage import TrajectoryWriter
+from .propagation import (
+    EARTH_ELEMENTS,
+    GAUSS_K,
+    JUPITER_ELEMENTS,
+    adaptive_eccentric_anomalies,
+    datetime_to_jd,
+    elements_from_rows,
+    elements_hash,
+    jd_to_datetime,
+    propagate_elements,
+)
 import logging
 
 logger = logging.getLogger(__name__)
 
+PROPAGATION_MODES = ('two_body', 'nbody')
+
+# Per-process KD-trees over catalogue positions, one per epoch bucket
+_position_indexes = LRUCache(max_size=8)
+
+# Porkchop grids this large are solved across the process pool, in blocks
+PORKCHOP_PARALLEL_CELLS = 20000
+PORKCHOP_CHUNK_CELLS = 10000
+
+# Closest approach searched for when no deflection target is given
+DEFLECTION_SCREEN_AU = 0.2
+
+# Per-process trajectories evaluated on demand, keyed by elements and grid
+_evaluated_trajectories = LRUCache(max_size=128)
+
 
 class OrbitalMechanicsService:
     """Service for orbital mechanics calculations"""
@@ -17,26 +93,29 @@ class OrbitalMechanicsService:
         self.G = 6.67430e-11  # gravitational constant
         self.M_SUN = 1.989e30  # kg
         self.EARTH_ORBIT_RADIUS = 1.0  # AU
+        self.DEFAULT_EPOCH_JD = 2459000.5
+        self.AU_KM = 149597870.7
+        self.LUNAR_DISTANCE_KM = 384400.0
+        self.KM_PER_MILE = 1.609344
     
-    def calculate_orbital_elements(self, neo):
-        """Calculate detailed orbital elements"""
-        
-        # Get basic orbital data
-        a = neo.semi_major_axis or 1.0
-        e = neo.eccentricity or 0.0
-        i = neo.inclination or 0.0
+    def calculate_orbital_elements(self, neo, force=False):
+        """
+        Calculate detailed orbital elements
         
-        # Calculate derived parameters
-        period_days = self._calculate_period(a)
-        perihelion = a * (1 - e)
-        aphelion = a * (1 + e)
-        mean_motion = 360.0 / period_days if period_days > 0 else 0
+        When the input elements hash to the stored source_hash the stored
+        elements are returned as they are, unless force is set.
+        """
+        a, e, i, node, peri, mean_anomaly, epoch = self._element_inputs(neo)
+        source_hash = elements_hash(a, e, i, node, peri, mean_anomaly, epoch)
         
-        # Calculate MOID (simplified)
-        moid = self._calculate_moid(a, e)
+        if not force:
+            existing = OrbitalElements.objects.filter(neo=neo, source_hash=source_hash).first()
+            if existing is not None:
+                return existing
         
-        # Determine orbit class
-        orbit_class = self._classify_orbit(a, e, perihelion, aphelion)
+        derived = self._derived_fields(derived_parameters([a], [e], [i]), 0)
+        moid = self._calculate_moid(a, e, i, node, peri)
+        moid_jupiter = self._calculate_moid(a, e, i, node, peri, planet=JUPITER_ELEMENTS)
         
         # Create or update orbital elements
         elements, created = OrbitalElements.objects.update_or_create(
@@ -45,112 +124,925 @@ class OrbitalMechanicsService:
                 'semi_major_axis_au': a,
                 'eccentricity': e,
                 'inclination_deg': i,
-                'longitude_ascending_node_deg': 0,  # Placeholder
-                'argument_perihelion_deg': 0,  # Placeholder
-                'mean_anomaly_deg': 0,  # Placeholder
-                'epoch_jd': 2459000.5,  # Placeholder epoch
-                'orbital_period_days': period_days,
-                'perihelion_distance_au': perihelion,
-                'aphelion_distance_au': aphelion,
-                'mean_motion_deg_per_day': mean_motion,
+                'longitude_ascending_node_deg': node,
+                'argument_perihelion_deg': peri,
+                'mean_anomaly_deg': mean_anomaly,
+                'epoch_jd': epoch,
+                **derived,
                 'moid_au': moid,
-                'orbit_class': orbit_class
+                'moid_jupiter_au': moid_jupiter,
+                'source_hash': source_hash
             }
         )
         
         return elements
     
-    def calculate_trajectory(self, neo, num_points=100):
-        """Calculate trajectory points for visualization"""
+    def calculate_derived_parameters(self, neo_ids=None, force=False, chunk_size=1000,
+                                     moid_chunk_size=64, workers=None):
+        """
+        Recalculate orbital elements and derived parameters for many NEOs
         
-        elements = self.calculate_orbital_elements(neo)
+        The NEO table is read with values_list and period, apsides, mean
+        motion, orbit class and Tisserand parameter are computed as arrays.
+        Only NEOs whose input hash changed (or that lack a Tisserand
+        parameter) are written, unless force is set; their Earth and
+        Jupiter MOIDs come from the MOID cache or are solved across the
+        process pool, and the rows are upserted in chunks.
+        """
+        queryset = NEO.objects.order_by('id')
+        if neo_ids is not None:
+            queryset = queryset.filter(id__in=neo_ids)
         
-        # Clear old trajectory points
-        TrajectoryPoint.objects.filter(neo=neo).delete()
+        rows = list(queryset.values_list(
+            'id', 'semi_major_axis', 'eccentricity', 'inclination', 'orbital_data'
+        ))
+        stored = {
+            neo_id: (source_hash, tisserand)
+            for neo_id, source_hash, tisserand in OrbitalElements.objects.filter(
+                neo_id__in=[row[0] for row in rows]
+            ).values_list('neo_id', 'source_hash', 'tisserand_parameter')
+        }
         
-        # Calculate points along orbit
-        trajectory_points = []
+        changed_ids = []
+        inputs = []
+        hashes = []
+        for neo_id, a, e, i, orbital_data in rows:
+            values = self._element_values(a, e, i, orbital_data)
+            source_hash = elements_hash(*values)
+            stored_hash, tisserand = stored.get(neo_id, (None, None))
+            
+            if force or source_hash != stored_hash or tisserand is None:
+                changed_ids.append(neo_id)
+                inputs.append(values)
+                hashes.append(source_hash)
+        
+        elements = elements_from_rows(
+            (neo_id, *values) for neo_id, values in zip(changed_ids, inputs)
+        )
+        derived = derived_parameters(elements['a'], elements['e'], elements['i'])
         
-        for i in range(num_points):
-            # Mean anomaly from 0 to 360 degrees
-            mean_anomaly = (i / num_points) * 360
+        moids = self._catalogue_moids(elements, moid_chunk_size, workers)
+        
+        for offset in range(0, len(elements), chunk_size):
+            orbital_elements = [
+                OrbitalElements(
+                    neo_id=int(record['neo_id']),
+                    semi_major_axis_au=float(record['a']),
+                    eccentricity=float(record['e']),
+                    inclination_deg=float(record['i']),
+                    longitude_ascending_node_deg=float(record['node']),
+                    argument_perihelion_deg=float(record['peri']),
+                    mean_anomaly_deg=float(record['M']),
+                    epoch_jd=float(record['epoch']),
+                    moid_au=self._finite(moids[index, 0]),
+                    moid_jupiter_au=self._finite(moids[index, 1]),
+                    source_hash=hashes[index],
+                    **self._derived_fields(derived, index)
+                )
+                for index, record in enumerate(
+                    elements[offset:offset + chunk_size], start=offset
+                )
+            ]
             
-            # Calculate position (simplified 2D circular orbit)
-            theta = math.radians(mean_anomaly)
-            r = elements.semi_major_axis_au * (1 - elements.eccentricity ** 2) / \
-                (1 + elements.eccentricity * math.cos(theta))
+            OrbitalElements.objects.bulk_create(
+                orbital_elements,
+                update_conflicts=True,
+                unique_fields=['neo'],
+                update_fields=[
+                    'semi_major_axis_au', 'eccentricity', 'inclination_deg',
+                    'longitude_ascending_node_deg', 'argument_perihelion_deg',
+                    'mean_anomaly_deg', 'epoch_jd', 'orbital_period_days',
+                    'perihelion_distance_au', 'aphelion_distance_au',
+                    'mean_motion_deg_per_day', 'moid_au', 'moid_jupiter_au',
+                    'tisserand_parameter', 'orbit_class', 'source_hash', 'calculated_at'
+                ]
+            )
             
-            x = r * math.cos(theta)
-            y = r * math.sin(theta)
-            z = 0  # Simplified - ignore inclination
+            logger.info(
+                f"Derived parameters: {offset + len(orbital_elements)}/{len(elements)} NEOs"
+            )
+        
+        return {
+            'neos_checked': len(rows),
+            'neos_changed': len(changed_ids),
+            'changed_neo_ids': changed_ids
+        }
+    
+    def recompute_orbits(self, neo_ids, workers=None):
+        """
+        Refresh derived orbital data for NEOs whose inputs may have changed
+        
+        Elements and MOID are recalculated only where the input hash differs
+        from the stored one; ephemerides and predicted close approaches are
+        then refreshed for those NEOs alone.
+        """
+        result = self.calculate_derived_parameters(neo_ids=neo_ids, workers=workers)
+        changed = result['changed_neo_ids']
+        
+        if changed:
+            self.calculate_ephemerides_batch(neo_ids=changed)
+            self.predict_close_approaches(neo_ids=changed, workers=workers)
+        
+        return {
+            'neos_checked': result['neos_checked'],
+            'neos_changed': result['neos_changed']
+        }
+    
+    def calculate_trajectories_batch(self, neo_ids=None, start_jd=None, days=365.25,
+                                     num_points=100, chunk_size=1000, batch_size=5000,
+                                     mode='two_body'):
+        """
+        Calculate trajectories for many NEOs in one array pass
+        
+        Elements are loaded into a structured array and propagated over a
+        shared time grid as an (N, T, 3) computation, one chunk of NEOs at
+        a time so memory stays bounded. All points are ingested into one
+        new TrajectoryRun, which becomes current for every NEO at once when
+        ingest completes; the nightly task then retires runs left without
+        NEOs. mode selects two-body ('two_body') or perturbed ('nbody')
+        propagation.
+        """
+        elements = self._load_elements(neo_ids)
+        
+        if start_jd is None:
+            start_jd = datetime_to_jd(timezone.now())
+        
+        jd = start_jd + np.arange(num_points) / num_points * days
+        
+        run = TrajectoryRun.objects.create(
+            mode=mode,
+            start_jd=start_jd,
+            days=days,
+            num_points=num_points
+        )
+        
+        # Points on a shared grid no longer match any per-NEO trajectory hash
+        with TrajectoryWriter(run, element_updates={'trajectory_hash': ''},
+                              batch_size=batch_size) as writer:
+            for offset in range(0, len(elements), chunk_size):
+                chunk = elements[offset:offset + chunk_size]
+                positions, velocities = self._propagate(chunk, jd, mode)
+                writer.write(chunk['neo_id'], jd, positions, velocities)
+                
+                logger.info(
+                    f"Batch trajectories: {offset + len(chunk)}/{len(elements)} NEOs"
+                )
+        
+        return {
+            'run_id': run.id,
+            'neos_processed': len(writer.neo_ids),
+            'points_created': writer.point_count,
+            'start_jd': start_jd,
+            'days': days
+        }
+    
+    def calculate_ephemerides_batch(self, neo_ids=None, start_jd=None, days=365.25,
+                                    segment_days=DEFAULT_SEGMENT_DAYS, degree=DEFAULT_DEGREE,
+                                    chunk_size=1000, mode='two_body',
+                                    tolerance_au=DEFAULT_TOLERANCE_AU):
+        """
+        Fit Chebyshev ephemerides for many NEOs in one array pass
+        
+        Each NEO gets a single Ephemeris row holding its coefficients as a
+        binary blob, upserted in chunks. segment_days is halved per NEO
+        until the fit is within tolerance_au of the propagator, so fast
+        perihelion passages get shorter segments. mode selects two-body
+        ('two_body') or perturbed ('nbody') propagation.
+        """
+        elements = self._load_elements(neo_ids)
+        
+        if start_jd is None:
+            start_jd = datetime_to_jd(timezone.now())
+        
+        processed = 0
+        outside_tolerance = 0
+        
+        for offset in range(0, len(elements), chunk_size):
+            chunk = elements[offset:offset + chunk_size]
+            ephemerides = []
             
-            # Simplified velocity
-            v_mag = math.sqrt(self.G * self.M_SUN / (r * self.AU))
-            v_x = -v_mag * math.sin(theta) / self.AU * 86400  # AU/day
-            v_y = v_mag * math.cos(theta) / self.AU * 86400
-            v_z = 0
+            groups = fit_within_tolerance(
+                chunk, start_jd, days, segment_days, degree,
+                propagate=partial(self._propagate, mode=mode),
+                tolerance_au=tolerance_au
+            )
             
-            # Earth distance (simplified)
-            earth_dist = math.sqrt(x**2 + y**2 + z**2)
+            for indices, coefficients, num_segments, fitted_days, errors in groups:
+                outside_tolerance += int(np.count_nonzero(~(errors <= tolerance_au)))
+                
+                ephemerides.extend(
+                    Ephemeris(
+                        neo_id=neo_id,
+                        start_jd=start_jd,
+                        end_jd=start_jd + num_segments * fitted_days,
+                        segment_days=fitted_days,
+                        num_segments=num_segments,
+                        degree=degree,
+                        coefficients=pack_coefficients(coefficients[index])
+                    )
+                    for index, neo_id in enumerate(chunk['neo_id'][indices].tolist())
+                )
             
-            # Julian date (simplified)
-            jd = elements.epoch_jd + (i / num_points) * elements.orbital_period_days
+            Ephemeris.objects.bulk_create(
+                ephemerides,
+                update_conflicts=True,
+                unique_fields=['neo'],
+                update_fields=[
+                    'start_jd', 'end_jd', 'segment_days', 'num_segments',
+                    'degree', 'coefficients', 'calculated_at'
+                ]
+            )
             
-            point = TrajectoryPoint(
-                neo=neo,
-                julian_date=jd,
-                position_x_au=x,
-                position_y_au=y,
-                position_z_au=z,
-                velocity_x_au_per_day=v_x,
-                velocity_y_au_per_day=v_y,
-                velocity_z_au_per_day=v_z,
-                earth_distance_au=earth_dist
+            processed += len(chunk)
+            logger.info(f"Batch ephemerides: {processed}/{len(elements)} NEOs")
+        
+        if outside_tolerance:
+            logger.warning(
+                f"Batch ephemerides: {outside_tolerance} NEOs exceed {tolerance_au} AU "
+                f"at the shortest segment length"
             )
+        
+        return {
+            'neos_processed': processed,
+            'outside_tolerance': outside_tolerance,
+            'start_jd': start_jd,
+            'days': days
+        }
+    
+    def predict_close_approaches(self, neo_ids=None, years=10, start_jd=None, step_days=1.0,
+                                 threshold_au=0.05, chunk_size=64, workers=None):
+        """
+        Predict close approaches to Earth from stored orbital elements
+        
+        NEOs are screened in chunks across a process pool; each chunk's
+        earlier local predictions inside the horizon are replaced by the
+        new ones as results arrive, so memory stays bounded by the chunk
+        size. NASA-sourced rows are never touched.
+        """
+        elements = self._load_elements(neo_ids)
+        
+        if start_jd is None:
+            start_jd = datetime_to_jd(timezone.now())
+        end_jd = start_jd + years * 365.25
+        
+        chunks = [
+            elements[offset:offset + chunk_size]
+            for offset in range(0, len(elements), chunk_size)
+        ]
+        screen = partial(
+            screen_close_approaches,
+            start_jd=start_jd,
+            end_jd=end_jd,
+            step_days=step_days,
+            threshold_au=threshold_au
+        )
+        
+        processed = 0
+        approaches_created = 0
+        
+        for chunk, approaches in zip(chunks, map_chunks(screen, chunks, workers)):
+            rows = [self._close_approach_row(approach) for approach in approaches]
+            
+            with transaction.atomic():
+                CloseApproach.objects.filter(
+                    neo_id__in=chunk['neo_id'].tolist(),
+                    source='local',
+                    close_approach_date_full__gte=jd_to_datetime(start_jd),
+                    close_approach_date_full__lte=jd_to_datetime(end_jd)
+                ).delete()
+                CloseApproach.objects.bulk_create(rows, ignore_conflicts=True)
+            
+            processed += len(chunk)
+            approaches_created += len(rows)
+            logger.info(f"Close-approach screening: {processed}/{len(elements)} NEOs")
+        
+        return {
+            'neos_processed': processed,
+            'approaches_created': approaches_created,
+            'start_jd': start_jd,
+            'end_jd': end_jd
+        }
+    
+    def run_monte_carlo(self, neo, num_clones=100000, years=10, start_jd=None, step_days=1.0,
+                        threshold_au=0.05, chunk_size=CHUNK_CLONES, seed=None,
+                        workers=None):
+        """
+        Estimate close-approach distances and impact probability from a clone cloud
+        
+        Clones are drawn around the stored elements with 1-sigma errors from
+        the NASA orbital data (explicit sigmas, else the orbit uncertainty
+        parameter), screened in chunks across a process pool and aggregated
+        as results arrive. The run is stored and the NEO's threat
+        assessment, if any, takes its impact probability.
+        """
+        nominal, sigmas = self.clone_inputs(neo)
+        
+        if start_jd is None:
+            start_jd = datetime_to_jd(timezone.now())
+        end_jd = start_jd + years * 365.25
+        if seed is None:
+            seed = secrets.randbits(63)
+        
+        screen = partial(
+            clone_chunk_statistics,
+            nominal=nominal,
+            sigmas=sigmas,
+            start_jd=start_jd,
+            end_jd=end_jd,
+            step_days=step_days,
+            threshold_au=threshold_au
+        )
+        
+        started = time.perf_counter()
+        statistics = ApproachStatistics(threshold_au)
+        
+        for chunk_statistics in map_chunks(screen, spawn_chunks(num_clones, chunk_size, seed), workers):
+            statistics.merge(chunk_statistics)
+            logger.info(f"Monte Carlo {neo.name}: {statistics.clones}/{num_clones} clones")
+        
+        return self.store_monte_carlo_run(
+            neo, statistics, seed, start_jd, end_jd, step_days,
+            duration_seconds=time.perf_counter() - started
+        )
+    
+    def monte_carlo_chunk(self, neo, index, num_clones, start_jd, end_jd, seed, step_days=1.0,
+                          threshold_au=0.05, chunk_size=CHUNK_CLONES):
+        """
+        Screen chunk number index of a Monte Carlo run on its own
+        
+        The chunk's seed is spawned exactly as run_monte_carlo spawns it, so
+        a run split across Celery subtasks draws the same clones.
+        """
+        nominal, sigmas = self.clone_inputs(neo)
+        
+        return clone_chunk_statistics(
+            spawn_chunks(num_clones, chunk_size, seed)[index],
+            nominal=nominal,
+            sigmas=sigmas,
+            start_jd=start_jd,
+            end_jd=end_jd,
+            step_days=step_days,
+            threshold_au=threshold_au
+        )
+    
+    def store_monte_carlo_run(self, neo, statistics, seed, start_jd, end_jd, step_days,
+                              duration_seconds):
+        """
+        Store merged clone statistics as a MonteCarloRun
+        
+        The NEO's threat assessment, if any, takes its impact probability.
+        """
+        _, sigmas = self.clone_inputs(neo)
+        
+        run = MonteCarloRun.objects.create(
+            neo=neo,
+            num_clones=statistics.clones,
+            seed=seed,
+            start_jd=start_jd,
+            end_jd=end_jd,
+            step_days=step_days,
+            threshold_au=statistics.threshold_au,
+            element_sigmas=sigmas.tolist(),
+            impacts=statistics.impacts,
+            impact_probability=statistics.impact_probability,
+            approaches=statistics.approaches,
+            min_distance_au=statistics.min_distance_au if statistics.approaches else None,
+            mean_distance_au=(
+                statistics.distance_sum_au / statistics.approaches if statistics.approaches else None
+            ),
+            distance_p05_au=statistics.percentile(5),
+            distance_p50_au=statistics.percentile(50),
+            distance_p95_au=statistics.percentile(95),
+            distance_histogram={
+                'min_log10_au': HISTOGRAM_MIN_LOG10_AU,
+                'max_log10_au': float(np.log10(statistics.threshold_au)),
+                'counts': statistics.counts.tolist()
+            },
+            duration_seconds=duration_seconds
+        )
+        
+        ThreatAssessment.objects.filter(neo=neo).update(
+            impact_probability=run.impact_probability
+        )
+        
+        return run
+    
+    def clone_inputs(self, neo):
+        """Nominal elements and 1-sigma uncertainties to draw a NEO's clones from"""
+        elements = self._load_elements([neo.id])
+        
+        if not len(elements):
+            raise ValueError(f"No valid orbital elements for NEO {neo.id}")
+        
+        nominal = elements[0]
+        return nominal, self._element_sigmas(neo, float(nominal['a']))
+    
+    def _element_sigmas(self, neo, a):
+        """1-sigma element uncertainties for a NEO, in montecarlo.CLONE_FIELDS order"""
+        orbital_data = neo.orbital_data or {}
+        sigmas = [self._orbital_value(orbital_data, key, None) for key in SIGMA_KEYS]
+        
+        if None not in sigmas:
+            return np.array(sigmas)
+        
+        condition_code = self._orbital_value(orbital_data, 'orbit_uncertainty', DEFAULT_CONDITION_CODE)
+        return condition_sigmas(a, condition_code)
+    
+    def _close_approach_row(self, approach):
+        """Build an unsaved locally derived CloseApproach"""
+        moment = jd_to_datetime(float(approach['jd']))
+        distance_km = float(approach['distance_au']) * self.AU_KM
+        velocity_kps = float(approach['velocity_au_per_day']) * self.AU_KM / 86400.0
+        
+        return CloseApproach(
+            neo_id=int(approach['neo_id']),
+            close_approach_date=moment.date(),
+            close_approach_date_full=moment,
+            epoch_date_close_approach=int(moment.timestamp() * 1000),
+            relative_velocity_kps=velocity_kps,
+            relative_velocity_kmph=velocity_kps * 3600,
+            relative_velocity_mph=velocity_kps * 3600 / self.KM_PER_MILE,
+            miss_distance_astronomical=float(approach['distance_au']),
+            miss_distance_lunar=distance_km / self.LUNAR_DISTANCE_KM,
+            miss_distance_kilometers=distance_km,
+            miss_distance_miles=distance_km / self.KM_PER_MILE,
+            orbiting_body='Earth',
+            source='local'
+        )
+    
+    def sample_ephemeris(self, ephemeris, start_jd=None, end_jd=None, num_points=100):
+        """Evaluate a stored ephemeris on a uniform grid of Julian dates"""
+        coefficients = unpack_coefficients(
+            ephemeris.coefficients,
+            ephemeris.num_segments,
+            ephemeris.degree
+        )
+        
+        start_jd = ephemeris.start_jd if start_jd is None else start_jd
+        end_jd = ephemeris.end_jd if end_jd is None else end_jd
+        
+        jd = np.linspace(start_jd, end_jd, num_points)
+        positions, velocities = evaluate_ephemeris(
+            coefficients, ephemeris.start_jd, ephemeris.segment_days, jd
+        )
+        
+        return jd, positions, velocities
+    
+    def load_trajectories(self, neo_ids, start_jd=None, end_jd=None, num_points=100):
+        """
+        Collect trajectories for many NEOs with a fixed number of queries
+        
+        NEOs with an ephemeris are sampled on a uniform grid; the rest fall
+        back to their stored trajectory points. Returns (neo_id, jd,
+        positions, velocities, uniform) tuples in the order requested.
+        """
+        trajectories = {}
+        
+        for ephemeris in Ephemeris.objects.filter(neo_id__in=neo_ids):
+            jd, positions, velocities = self.sample_ephemeris(
+                ephemeris, start_jd, end_jd, num_points
+            )
+            trajectories[ephemeris.neo_id] = (
+                ephemeris.neo_id, jd, positions, velocities, True
+            )
+        
+        missing = [neo_id for neo_id in neo_ids if neo_id not in trajectories]
+        
+        if missing:
+            points = TrajectoryPoint.objects.current().filter(neo_id__in=missing)
+            if start_jd is not None:
+                points = points.filter(julian_date__gte=start_jd)
+            if end_jd is not None:
+                points = points.filter(julian_date__lte=end_jd)
+            
+            rows = np.array(list(points.order_by('neo_id', 'julian_date').values_list(
+                'neo_id', 'julian_date',
+                'position_x_au', 'position_y_au', 'position_z_au',
+                'velocity_x_au_per_day', 'velocity_y_au_per_day', 'velocity_z_au_per_day'
+            )), dtype=np.float64).reshape(-1, 8)
+            
+            neo_column = rows[:, 0].astype(np.int64)
+            unique_ids, starts = np.unique(neo_column, return_index=True)
+            
+            for neo_id, block in zip(unique_ids.tolist(), np.split(rows, starts[1:])):
+                trajectories[neo_id] = (neo_id, block[:, 1], block[:, 2:5], block[:, 5:8], False)
+        
+        return [trajectories[neo_id] for neo_id in neo_ids if neo_id in trajectories]
+    
+    def adaptive_trajectories(self, neo_ids, max_error_au, max_points=5000):
+        """
+        Sample one orbit per NEO with curvature-adaptive point density
+        
+        Points are placed so the polyline drawn through them never strays
+        more than max_error_au from the true orbit. Returns (neo_id, jd,
+        positions, velocities, uniform) tuples ordered by time from epoch.
+        """
+        trajectories = []
+        
+        for record in self._load_elements(neo_ids):
+            a, e = float(record['a']), float(record['e'])
             
-            trajectory_points.append(point)
+            E = adaptive_eccentric_anomalies(a, e, max_error_au, max_points=max_points)
+            mean_anomaly = E - e * np.sin(E)
+            
+            # Time after epoch at which each point is reached
+            offset = np.remainder(mean_anomaly - np.radians(record['M']), 2 * np.pi)
+            jd = np.sort(record['epoch'] + offset / (GAUSS_K / a ** 1.5))
+            
+            positions, velocities = propagate_elements(record[None], jd)
+            trajectories.append(
+                (int(record['neo_id']), jd, positions[0], velocities[0], False)
+            )
+        
+        return trajectories
+    
+    def evaluate_trajectory(self, elements=None, neo=None, start_jd=None, end_jd=None,
+                            num_points=100, mode='two_body', max_days=None):
+        """
+        Propagate one orbit in memory without reading or writing trajectory rows
+        
+        elements is an (a, e, i, node, peri, M, epoch) tuple; when a NEO is
+        given instead its current input elements are used. The range
+        defaults to one orbital period from 0h UTC today. Results are kept
+        in a per-process LRU keyed by the element hash, range, resolution
+        and mode, so hot orbits are not propagated twice. Ranges longer
+        than max_days raise ValueError. Returns the element hash and
+        read-only (jd, positions, velocities) arrays.
+        """
+        if elements is None:
+            elements = self._element_inputs(neo)
+        
+        a, e = elements[0], elements[1]
+        if a <= 0 or not 0 <= e < 1:
+            raise ValueError("Elements must describe an elliptical orbit (a > 0, 0 <= e < 1)")
+        
+        if mode not in PROPAGATION_MODES:
+            raise ValueError(f"mode must be one of: {', '.join(PROPAGATION_MODES)}")
+        
+        if start_jd is None:
+            start_jd = np.floor(datetime_to_jd(timezone.now()) - 0.5) + 0.5
+        if end_jd is None:
+            end_jd = start_jd + self._calculate_period(a)
+        
+        if end_jd < start_jd:
+            raise ValueError("end_jd must not be before start_jd")
+        
+        if max_days is not None and end_jd - start_jd > max_days:
+            raise ValueError(f"The range may span at most {max_days} days")
+        
+        source_hash = elements_hash(*elements)
+        key = (source_hash, float(start_jd), float(end_jd), int(num_points), mode)
+        
+        def build():
+            jd = np.linspace(start_jd, end_jd, num_points)
+            positions, velocities = self._propagate(
+                elements_from_rows([(0, *elements)]), jd, mode
+            )
+            arrays = (jd, positions[0], velocities[0])
+            for array in arrays:
+                array.setflags(write=False)
+            return arrays
+        
+        return source_hash, _evaluated_trajectories.get(key, build)
+    
+    def position_index(self, jd, bucket_days=1.0):
+        """
+        Spatial index of the catalogue for the epoch bucket containing jd
+        
+        Indexes are cached per bucket and rebuilt when orbital elements are
+        added or recalculated.
+        """
+        bucket_jd = round(jd / bucket_days) * bucket_days
+        catalogue = OrbitalElements.objects.aggregate(
+            count=Count('id'), updated=Max('calculated_at')
+        )
+        key = (bucket_jd, catalogue['count'], catalogue['updated'])
+        
+        return _position_indexes.get(
+            key, lambda: PositionIndex(self._load_elements(), bucket_jd)
+        )
+    
+    def nearby_objects(self, center, jd, radius_au=None, k=None):
+        """
+        Objects near a heliocentric point at a Julian date
+        
+        Returns every object within radius_au, or the k nearest, ordered
+        by distance.
+        """
+        index = self.position_index(jd)
+        
+        if k is not None:
+            matches = index.nearest(center, k, jd)
+        else:
+            matches = index.within(center, radius_au, jd)
         
-        # Bulk create
-        TrajectoryPoint.objects.bulk_create(trajectory_points)
+        names = dict(
+            NEO.objects.filter(id__in=matches['neo_id'].tolist()).values_list('id', 'name')
+        )
         
-        return len(trajectory_points)
+        return [
+            {
+                'neo_id': neo_id,
+                'name': names.get(neo_id),
+                'distance_au': distance,
+                'distance_km': distance * self.AU_KM,
+                'position_x_au': position[0],
+                'position_y_au': position[1],
+                'position_z_au': position[2]
+            }
+            for neo_id, distance, position in zip(
+                matches['neo_id'].tolist(),
+                matches['distance_au'].tolist(),
+                matches['position'].tolist()
+            )
+        ]
+    
+    def porkchop(self, neo, departure_jd, arrival_jd, workers=None, rows_per_chunk=None):
+        """
+        Earth-to-NEO transfer grid over departure and arrival dates
+        
+        Every (departure, arrival) cell is a zero-revolution Lambert
+        transfer from Earth to the NEO's stored orbit. Grids of at least
+        PORKCHOP_PARALLEL_CELLS cells are split into blocks of departure
+        rows across the process pool. Returns C3 (km²/s²) and arrival
+        v-infinity (km/s) as (departures, arrivals) arrays, NaN where no
+        transfer exists.
+        """
+        elements = self._stored_elements(neo)
+        departure_jd = np.asarray(departure_jd, dtype=np.float64)
+        arrival_jd = np.asarray(arrival_jd, dtype=np.float64)
+        
+        earth_positions, earth_velocities = earth_states(departure_jd)
+        positions, velocities = propagate_elements(elements, arrival_jd)
+        
+        cells = len(departure_jd) * len(arrival_jd)
+        if cells < PORKCHOP_PARALLEL_CELLS:
+            workers = 1
+        if rows_per_chunk is None:
+            rows_per_chunk = max(PORKCHOP_CHUNK_CELLS // max(len(arrival_jd), 1), 1)
+        
+        chunks = [
+            (
+                departure_jd[offset:offset + rows_per_chunk],
+                earth_positions[offset:offset + rows_per_chunk],
+                earth_velocities[offset:offset + rows_per_chunk]
+            )
+            for offset in range(0, len(departure_jd), rows_per_chunk)
+        ]
+        solve = partial(
+            porkchop_chunk,
+            arrival_jd=arrival_jd,
+            arrival_positions=positions[0],
+            arrival_velocities=velocities[0]
+        )
+        
+        c3, v_inf = (
+            np.concatenate(blocks) for blocks in zip(*map_chunks(solve, chunks, workers))
+        )
+        km_per_second = self.AU_KM / 86400.0
+        
+        return c3 * km_per_second ** 2, v_inf * km_per_second
+    
+    def deflection_delta_v(self, neo, shift_km, lead_times_days, approach_jd=None, years=10):
+        """
+        Impulse needed to move a close approach's miss distance by shift_km
+        
+        The approach defaults to the closest one within
+        DEFLECTION_SCREEN_AU predicted from the stored elements over the
+        next years. For each lead time (days before the approach) the
+        impulse is given along-track, radial, orbit-normal and in the most
+        effective direction, in m/s.
+        """
+        elements = self._stored_elements(neo)
+        
+        if approach_jd is None:
+            start_jd = datetime_to_jd(timezone.now())
+            approaches = screen_close_approaches(
+                elements, start_jd, start_jd + years * 365.25,
+                threshold_au=DEFLECTION_SCREEN_AU
+            )
+            if not len(approaches):
+                raise ValueError(
+                    f"No approach within {DEFLECTION_SCREEN_AU} AU in the next {years:g} years; "
+                    f"pass approach_jd"
+                )
+            approach_jd = float(approaches['jd'][np.argmin(approaches['distance_au'])])
+        
+        lead_times = np.asarray(lead_times_days, dtype=np.float64)
+        positions, velocities = propagate_elements(elements, approach_jd - lead_times)
+        earth_position, earth_velocity = earth_states(np.array([approach_jd]))
+        
+        result = required_delta_v(
+            positions[0], velocities[0], lead_times,
+            earth_position[0], earth_velocity[0], shift_km / self.AU_KM
+        )
+        meters_per_second = self.AU_KM * 1000.0 / 86400.0
+        
+        return {
+            'approach_jd': approach_jd,
+            'miss_distance_km': self._finite(result['miss_distance_au'][0] * self.AU_KM),
+            'shift_km': shift_km,
+            'deflections': [
+                {
+                    'lead_time_days': lead_time,
+                    'deflection_jd': approach_jd - lead_time,
+                    **{
+                        f'{direction}_m_per_s': self._finite(result[direction][index] * meters_per_second)
+                        for direction in (*DIRECTIONS, 'best')
+                    },
+                    'best_direction': (
+                        dict(zip(DIRECTIONS, result['best_direction'][index].tolist()))
+                        if np.isfinite(result['best_direction'][index]).all() else None
+                    )
+                }
+                for index, lead_time in enumerate(lead_times.tolist())
+            ]
+        }
+    
+    def _stored_elements(self, neo):
+        """Structured elements of one NEO, calculated first if not stored"""
+        elements = self._load_elements([neo.id])
+        
+        if not len(elements):
+            self.calculate_orbital_elements(neo)
+            elements = self._load_elements([neo.id])
+        
+        if not len(elements):
+            raise ValueError("NEO has no elliptical orbital elements")
+        
+        return elements
+    
+    def _propagate(self, elements, jd, mode='two_body'):
+        """Propagate elements with the two-body or N-body model"""
+        if mode == 'nbody':
+            return propagate_nbody(elements, jd)
+        
+        if mode != 'two_body':
+            raise ValueError(f"mode must be one of: {', '.join(PROPAGATION_MODES)}")
+        
+        return propagate_elements(elements, jd)
+    
+    def format_state_vectors(self, jd, positions, velocities):
+        """Lay out state vectors like TrajectoryPointSerializer output"""
+        
+        earth_positions, _ = earth_states(jd)
+        earth_distances = np.linalg.norm(positions - earth_positions, axis=-1)
+        
+        rows = zip(
+            jd.tolist(),
+            positions.tolist(),
+            velocities.tolist(),
+            earth_distances.tolist()
+        )
+        
+        return [
+            {
+                'julian_date': julian_date,
+                'position_x_au': position[0],
+                'position_y_au': position[1],
+                'position_z_au': position[2],
+                'velocity_x_au_per_day': velocity[0],
+                'velocity_y_au_per_day': velocity[1],
+                'velocity_z_au_per_day': velocity[2],
+                'earth_distance_au': earth_distance
+            }
+            for julian_date, position, velocity, earth_distance in rows
+        ]
+    
+    def _load_elements(self, neo_ids=None):
+        """Load stored orbital elements into a structured array"""
+        queryset = OrbitalElements.objects.filter(
+            semi_major_axis_au__gt=0,
+            eccentricity__gte=0,
+            eccentricity__lt=1
+        )
+        
+        if neo_ids is not None:
+            queryset = queryset.filter(neo_id__in=neo_ids)
+        
+        rows = queryset.order_by('neo_id').values_list(
+            'neo_id',
+            'semi_major_axis_au',
+            'eccentricity',
+            'inclination_deg',
+            'longitude_ascending_node_deg',
+            'argument_perihelion_deg',
+            'mean_anomaly_deg',
+            'epoch_jd'
+        )
+        
+        return elements_from_rows(rows)
+    
+    def _element_inputs(self, neo):
+        """Keplerian elements (a, e, i, node, peri, M, epoch) a NEO's derived data is based on"""
+        return self._element_values(
+            neo.semi_major_axis, neo.eccentricity, neo.inclination, neo.orbital_data
+        )
+    
+    def _element_values(self, a, e, i, orbital_data):
+        """Element inputs from NEO column values, with the defaults for missing data"""
+        orbital_data = orbital_data or {}
+        
+        return (
+            a or 1.0,
+            e or 0.0,
+            i or 0.0,
+            self._orbital_value(orbital_data, 'ascending_node_longitude', 0.0),
+            self._orbital_value(orbital_data, 'perihelion_argument', 0.0),
+            self._orbital_value(orbital_data, 'mean_anomaly', 0.0),
+            self._orbital_value(orbital_data, 'epoch_osculation', self.DEFAULT_EPOCH_JD)
+        )
+    
+    def _derived_fields(self, derived, index):
+        """OrbitalElements field values for one object of a derived_parameters result"""
+        return {
+            key: str(values[index]) if key == 'orbit_class' else self._finite(values[index])
+            for key, values in derived.items()
+        }
+    
+    def _finite(self, value):
+        """Python float, or None for NaN and infinities"""
+        value = float(value)
+        return value if np.isfinite(value) else None
+    
+    def _orbital_value(self, orbital_data, key, default):
+        """Read a float from NASA orbital data, falling back to a default"""
+        try:
+            return float(orbital_data[key])
+        except (KeyError, TypeError, ValueError):
+            return default
     
     def _calculate_period(self, semi_major_axis_au):
         """Calculate orbital period using Kepler's third law"""
-        # P² = a³ (when a is in AU and P is in years)
-        period_years = semi_major_axis_au ** 1.5
-        period_days = period_years * 365.25
-        return period_days
-    
-    def _calculate_moid(self, a, e):
-        """Calculate Minimum Orbit Intersection Distance (simplified)"""
-        perihelion = a * (1 - e)
-        aphelion = a * (1 + e)
-        
-        # Simplified MOID calculation
-        if perihelion > self.EARTH_ORBIT_RADIUS:
-            moid = perihelion - self.EARTH_ORBIT_RADIUS
-        elif aphelion < self.EARTH_ORBIT_RADIUS:
-            moid = self.EARTH_ORBIT_RADIUS - aphelion
-        else:
-            moid = 0.0
+        return float(orbital_periods(semi_major_axis_au))
+    
+    def _catalogue_moids(self, elements, chunk_size=64, workers=None):
+        """
+        Earth and Jupiter MOIDs for a structured element array, through the MOID cache
+        
+        Cached MOIDs are read in one get_many; only the orbits missing one
+        are solved, across the process pool, and their results stored in
+        one set_many, under the keys _calculate_moid uses. Returns an
+        (N, 2) array, NaN where the orbit is not a bound ellipse.
+        """
+        planets = (EARTH_ELEMENTS, JUPITER_ELEMENTS)
+        keys = [
+            [
+                self._moid_key(tuple(float(record[name]) for name in MOID_ELEMENTS), planet)
+                for planet in planets
+            ]
+            for record in elements
+        ]
+        cached = cache.get_many([key for pair in keys for key in pair])
+        
+        moids = np.full((len(elements), len(planets)), np.nan)
+        missing = []
+        for index, pair in enumerate(keys):
+            if all(key in cached for key in pair):
+                moids[index] = [cached[key] for key in pair]
+            else:
+                missing.append(index)
         
-        return abs(moid)
+        solve = elements[missing]
+        chunks = [solve[offset:offset + chunk_size] for offset in range(0, len(solve), chunk_size)]
+        if chunks:
+            moids[missing] = np.concatenate(list(map_chunks(catalogue_moids, chunks, workers)))
+        
+        cache.set_many({
+            key: float(moid)
+            for index in missing
+            for key, moid in zip(keys[index], moids[index])
+            if np.isfinite(moid)
+        }, timeout=None)
+        
+        return moids
+    
+    def _moid_key(self, orbit, planet):
+        """Cache key of the MOID between an (a, e, i, node, peri) orbit and a planet"""
+        planet = tuple(float(planet[name]) for name in MOID_ELEMENTS)
+        return f"orbital:moid:{elements_hash(*orbit, *planet)}"
+    
+    def _calculate_moid(self, a, e, i=0.0, node=0.0, peri=0.0, planet=EARTH_ELEMENTS):
+        """
+        Calculate Minimum Orbit Intersection Distance with Earth (or another planet)
+        
+        Results are memoized in the cache under a hash of both orbits'
+        shape elements, so an unchanged orbit is never solved twice.
+        """
+        if a <= 0 or not 0 <= e < 1:
+            return None
+        
+        key = self._moid_key((a, e, i, node, peri), planet)
+        planet = tuple(float(planet[name]) for name in MOID_ELEMENTS)
+        
+        moid = cache.get(key)
+        if moid is None:
+            moid = compute_moid((a, e, i, node, peri), planet)
+            cache.set(key, moid, timeout=None)
+        
+        return moid
     
     def _classify_orbit(self, a, e, q, Q):
         """Classify orbit type"""
         # q = perihelion, Q = aphelion
-        
-        if Q < 1.0:
-            return 'atira'
-        elif a < 1.0 and Q >= 1.0:
-            return 'aten'
-        elif a >= 1.0 and q < 1.017 and q >= 0.983:
-            return 'apollo'
-        elif a >= 1.0 and q > 1.017 and q < 1.3:
-            return 'amor'
-        elif a > 2.0 and a < 3.2:
-            return 'main_belt'
-        else:
-            return 'other'
-
+        return str(classify_orbits(a, e, q, Q))
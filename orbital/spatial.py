@@ -0,0 +1,86 @@
+"""
+Spatial Index Over Propagated Positions
+
+The catalogue is propagated to the centre of an epoch bucket and its
+heliocentric positions are put in a KD-tree. A query at any date inside
+the bucket widens its search by the furthest any object can travel in
+the time between, then propagates only those candidates to the exact
+date, so results are exact while the tree is shared by every query in
+the bucket.
+"""
+import numpy as np
+from scipy.spatial import cKDTree
+
+from .propagation import GAUSS_K, propagate_elements
+
+NEARBY_DTYPE = np.dtype([
+    ('neo_id', np.int64),
+    ('distance_au', np.float64),
+    ('position', np.float64, (3,)),
+])
+
+# The tree compares squared distances, which can round past a radius that
+# the exact distance meets, so search radii are widened by this fraction
+SEARCH_MARGIN = 1e-9
+
+
+class PositionIndex:
+    """KD-tree over the positions of a structured element array at one epoch"""
+    
+    def __init__(self, elements, epoch_jd):
+        self.elements = np.asarray(elements)
+        self.epoch_jd = epoch_jd
+        
+        positions, _ = propagate_elements(self.elements, np.array([epoch_jd]))
+        self.tree = cKDTree(positions[:, 0])
+        
+        # Heliocentric speed peaks at perihelion, bounding every object's motion
+        a = self.elements['a']
+        e = self.elements['e']
+        perihelion_speed = GAUSS_K * np.sqrt((1 + e) / (a * (1 - e)))
+        self.max_speed = float(perihelion_speed.max()) if len(a) else 0.0
+    
+    def __len__(self):
+        return len(self.elements)
+    
+    def within(self, center, radius_au, jd):
+        """Objects within radius_au of center at jd, nearest first"""
+        slack = self.max_speed * abs(jd - self.epoch_jd)
+        candidates = self.tree.query_ball_point(center, (radius_au + slack) * (1 + SEARCH_MARGIN))
+        return self._exact(center, np.asarray(candidates, dtype=np.int64), jd, radius_au)
+    
+    def nearest(self, center, k, jd):
+        """The k objects nearest to center at jd, nearest first"""
+        k = min(k, len(self))
+        
+        if k == 0:
+            return np.empty(0, dtype=NEARBY_DTYPE)
+        
+        # The k-th nearest at jd is no further than the k-th nearest at the
+        # epoch plus the slack, and got there from at most another slack away
+        slack = self.max_speed * abs(jd - self.epoch_jd)
+        distances, _ = self.tree.query(center, k)
+        bound = (float(np.max(distances)) + 2 * slack) * (1 + SEARCH_MARGIN)
+        candidates = self.tree.query_ball_point(center, bound)
+        
+        return self._exact(center, np.asarray(candidates, dtype=np.int64), jd)[:k]
+    
+    def _exact(self, center, candidates, jd, radius_au=np.inf):
+        """Propagate candidates to jd and keep those within radius_au"""
+        if not len(candidates):
+            return np.empty(0, dtype=NEARBY_DTYPE)
+        
+        positions, _ = propagate_elements(self.elements[candidates], np.array([jd]))
+        positions = positions[:, 0]
+        distances = np.linalg.norm(positions - center, axis=-1)
+        
+        keep = distances <= radius_au
+        order = np.argsort(distances[keep], kind='stable')
+        
+        result = np.empty(len(order), dtype=NEARBY_DTYPE)
+        result['neo_id'] = self.elements['neo_id'][candidates][keep][order]
+        result['distance_au'] = distances[keep][order]
+        result['position'] = positions[keep][order]
+        
+        return result
+
@@ -0,0 +1,321 @@
+"""
+Trajectory Point Storage
+
+Trajectory points are append-only and grouped into runs. On PostgreSQL,
+once trajectory_points has been converted with the
+partition_trajectory_points command, it is list-partitioned by run: a
+run's points are COPYed in binary form into a standalone table, which is
+attached as a partition when the run is complete, and a run that is no
+longer current for any NEO is detached and dropped rather than deleted
+row by row. Other databases keep a plain table written with bulk_create.
+"""
+import io
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+import numpy as np
+from django.db import DatabaseError, connections, transaction
+from django.utils import timezone
+
+from .bodies import earth_states
+from .models import OrbitalElements, TrajectoryPoint, TrajectoryRun
+import logging
+
+logger = logging.getLogger(__name__)
+
+TABLE = TrajectoryPoint._meta.db_table
+ID_SEQUENCE = 'trajectory_point_ids'
+
+# Columns sent by COPY, in order; id comes from the sequence default
+COPY_COLUMNS = (
+    'neo_id', 'run_id', 'julian_date',
+    'position_x_au', 'position_y_au', 'position_z_au',
+    'velocity_x_au_per_day', 'velocity_y_au_per_day', 'velocity_z_au_per_day',
+    'earth_distance_au', 'calculated_at',
+)
+COPY_TYPES = {
+    'integer': '>i4',
+    'bigint': '>i8',
+    'double precision': '>f8',
+    'timestamp with time zone': '>i8',
+}
+COPY_HEADER = b'PGCOPY\n\xff\r\n\x00' + np.array([0, 0], dtype='>i4').tobytes()
+COPY_TRAILER = np.array([-1], dtype='>i2').tobytes()
+POSTGRES_EPOCH = datetime(2000, 1, 1, tzinfo=dt_timezone.utc)
+
+UPDATE_CHUNK_SIZE = 5000
+
+
+def partition_name(run_id):
+    return f'{TABLE}_run_{int(run_id)}'
+
+
+def is_partitioned(connection):
+    """Whether trajectory_points is a partitioned PostgreSQL table"""
+    if connection.vendor != 'postgresql':
+        return False
+    
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)",
+            [TABLE]
+        )
+        return cursor.fetchone() is not None
+
+
+def copy_record_dtype(connection):
+    """Structured dtype of one binary COPY tuple, field lengths included"""
+    fields = [('field_count', '>i2')]
+    
+    for column in COPY_COLUMNS:
+        field = TrajectoryPoint._meta.get_field(column.removesuffix('_id'))
+        fields.append((f'{column}_length', '>i4'))
+        fields.append((column, COPY_TYPES[field.db_type(connection)]))
+    
+    return np.dtype(fields)
+
+
+def pack_copy_rows(dtype, neo_ids, run_id, jd, positions, velocities, earth_distances, calculated_at):
+    """Encode points as PostgreSQL binary COPY tuples in one array pass"""
+    count = positions.shape[0] * positions.shape[1]
+    rows = np.empty(count, dtype=dtype)
+    
+    rows['field_count'] = len(COPY_COLUMNS)
+    for column in COPY_COLUMNS:
+        rows[f'{column}_length'] = dtype[column].itemsize
+    
+    rows['neo_id'] = np.repeat(neo_ids, positions.shape[1])
+    rows['run_id'] = run_id
+    rows['julian_date'] = np.broadcast_to(jd, positions.shape[:2]).ravel()
+    
+    for axis, name in enumerate('xyz'):
+        rows[f'position_{name}_au'] = positions[..., axis].ravel()
+        rows[f'velocity_{name}_au_per_day'] = velocities[..., axis].ravel()
+    
+    rows['earth_distance_au'] = earth_distances.ravel()
+    rows['calculated_at'] = (calculated_at - POSTGRES_EPOCH) // timedelta(microseconds=1)
+    
+    return rows.tobytes()
+
+
+class TrajectoryWriter:
+    """
+    Ingest the points of one TrajectoryRun
+    
+    Used as a context manager: points written inside the block become the
+    current trajectories of their NEOs together, when the block exits
+    without an error (or are only stored, with current=False). On an error
+    the run is discarded.
+    """
+    
+    def __init__(self, run, element_updates=None, current=True, using='default', batch_size=5000):
+        self.run = run
+        self.element_updates = element_updates or {}
+        self.current = current
+        self.connection = connections[using]
+        self.using = using
+        self.batch_size = batch_size
+        self.partitioned = is_partitioned(self.connection)
+        self.table = partition_name(run.id)
+        self.neo_ids = []
+        self.point_count = 0
+    
+    def __enter__(self):
+        self.started = time.perf_counter()
+        self.calculated_at = timezone.now()
+        
+        if self.partitioned:
+            self.copy_dtype = copy_record_dtype(self.connection)
+            with self.connection.cursor() as cursor:
+                cursor.execute(f'CREATE TABLE {self.table} (LIKE {TABLE} INCLUDING DEFAULTS)')
+        
+        return self
+    
+    def write(self, neo_ids, jd, positions, velocities):
+        """
+        Add the points of N NEOs sampled on a shared (T,) grid of dates
+        
+        positions and velocities are (N, T, 3) arrays.
+        """
+        neo_ids = np.asarray(neo_ids, dtype=np.int64)
+        jd = np.asarray(jd, dtype=np.float64)
+        
+        earth_positions, _ = earth_states(jd)
+        earth_distances = np.linalg.norm(positions - earth_positions, axis=-1)
+        
+        if self.partitioned:
+            payload = pack_copy_rows(
+                self.copy_dtype, neo_ids, self.run.id, jd, positions, velocities,
+                earth_distances, self.calculated_at
+            )
+            columns = ', '.join(COPY_COLUMNS)
+            with self.connection.cursor() as cursor:
+                cursor.copy_expert(
+                    f'COPY {self.table} ({columns}) FROM STDIN WITH (FORMAT binary)',
+                    io.BytesIO(COPY_HEADER + payload + COPY_TRAILER)
+                )
+        else:
+            TrajectoryPoint.objects.using(self.using).bulk_create(
+                self._build_points(neo_ids, jd, positions, velocities, earth_distances),
+                batch_size=self.batch_size
+            )
+        
+        self.neo_ids.extend(neo_ids.tolist())
+        self.point_count += positions.shape[0] * positions.shape[1]
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None:
+            self._discard()
+            return False
+        
+        self._publish()
+        return False
+    
+    def _build_points(self, neo_ids, jd, positions, velocities, earth_distances):
+        jd = np.broadcast_to(jd, positions.shape[:2])
+        
+        return [
+            TrajectoryPoint(
+                neo_id=neo_id,
+                run_id=self.run.id,
+                julian_date=julian_date,
+                position_x_au=position[0],
+                position_y_au=position[1],
+                position_z_au=position[2],
+                velocity_x_au_per_day=velocity[0],
+                velocity_y_au_per_day=velocity[1],
+                velocity_z_au_per_day=velocity[2],
+                earth_distance_au=earth_distance
+            )
+            for neo_id, dates, object_positions, object_velocities, distances in zip(
+                neo_ids.tolist(), jd.tolist(), positions.tolist(),
+                velocities.tolist(), earth_distances.tolist()
+            )
+            for julian_date, position, velocity, earth_distance in zip(
+                dates, object_positions, object_velocities, distances
+            )
+        ]
+    
+    def _publish(self):
+        """Attach the run's partition and make it current for its NEOs"""
+        with transaction.atomic(using=self.using):
+            if self.partitioned:
+                with self.connection.cursor() as cursor:
+                    cursor.execute(
+                        f'ALTER TABLE {TABLE} ATTACH PARTITION {self.table} '
+                        f'FOR VALUES IN ({int(self.run.id)})'
+                    )
+            
+            neo_ids = self.neo_ids if self.current else []
+            for offset in range(0, len(neo_ids), UPDATE_CHUNK_SIZE):
+                OrbitalElements.objects.using(self.using).filter(
+                    neo_id__in=neo_ids[offset:offset + UPDATE_CHUNK_SIZE]
+                ).update(trajectory_run=self.run, **self.element_updates)
+            
+            self.run.status = 'active'
+            self.run.neo_count = len(self.neo_ids)
+            self.run.point_count = self.point_count
+            self.run.ingest_seconds = time.perf_counter() - self.started
+            self.run.save(update_fields=['status', 'neo_count', 'point_count', 'ingest_seconds'])
+        
+        logger.info(
+            f"Trajectory run {self.run.id}: {self.point_count} points in "
+            f"{self.run.ingest_seconds:.1f}s"
+        )
+    
+    def _discard(self):
+        if self.partitioned:
+            with self.connection.cursor() as cursor:
+                cursor.execute(f'DROP TABLE IF EXISTS {self.table}')
+        else:
+            TrajectoryPoint.objects.using(self.using).filter(run=self.run).delete()
+        
+        self.run.status = 'failed'
+        self.run.save(update_fields=['status'])
+
+
+def retire_runs(using='default'):
+    """
+    Remove the points of every run no NEO's current trajectory belongs to
+    
+    Run by the nightly trajectory task. Each stale run is claimed with
+    SELECT ... FOR UPDATE SKIP LOCKED and marked retired in a short
+    transaction, so concurrent callers never retire the same run. Its
+    partition is then detached with DETACH PARTITION ... CONCURRENTLY,
+    which does not block readers of trajectory_points but cannot run in a
+    transaction block, and dropped. Without partitioning the rows are
+    deleted. Returns the number of runs retired.
+    """
+    connection = connections[using]
+    partitioned = is_partitioned(connection)
+    
+    if partitioned and connection.in_atomic_block:
+        raise transaction.TransactionManagementError(
+            "retire_runs detaches partitions concurrently and cannot run in a transaction"
+        )
+    
+    stale = TrajectoryRun.objects.using(using).filter(status='active').exclude(
+        id__in=OrbitalElements.objects.using(using).filter(
+            trajectory_run__isnull=False
+        ).values('trajectory_run_id')
+    )
+    
+    retired = 0
+    while True:
+        with transaction.atomic(using=using):
+            run = stale.select_for_update(skip_locked=True).first()
+            if run is None:
+                break
+            
+            if not partitioned:
+                TrajectoryPoint.objects.using(using).filter(run=run).delete()
+            
+            run.status = 'retired'
+            run.retired_at = timezone.now()
+            run.save(update_fields=['status', 'retired_at'])
+        
+        retired += 1
+    
+    if partitioned:
+        drop_retired_partitions(connection, using)
+    
+    if retired:
+        logger.info(f"Retired {retired} trajectory runs")
+    
+    return retired
+
+
+def drop_retired_partitions(connection, using='default'):
+    """
+    Detach and drop the partition tables left behind by retired runs
+    
+    Also finishes detaches interrupted part-way. A partition that fails is
+    logged and left for the next call.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname, i.inhdetachpending FROM pg_class c "
+            "LEFT JOIN pg_inherits i ON i.inhrelid = c.oid "
+            "WHERE c.relkind = 'r' AND c.relname ~ %s",
+            [f'^{TABLE}_run_[0-9]+$']
+        )
+        tables = {
+            int(name.rsplit('_', 1)[1]): pending
+            for name, pending in cursor.fetchall()
+        }
+    
+    retired_ids = TrajectoryRun.objects.using(using).filter(
+        id__in=list(tables), status='retired'
+    ).values_list('id', flat=True)
+    
+    for run_id in retired_ids:
+        table = partition_name(run_id)
+        pending = tables[run_id]
+        
+        try:
+            with connection.cursor() as cursor:
+                if pending is not None:
+                    detach = 'FINALIZE' if pending else 'CONCURRENTLY'
+                    cursor.execute(f'ALTER TABLE {TABLE} DETACH PARTITION {table} {detach}')
+                cursor.execute(f'DROP TABLE {table}')
+        except DatabaseError as e:
+            logger.warning(f"Could not drop partition {table}: {e}")
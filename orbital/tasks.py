@@ -0,0 +1,269 @@
+"""
+Celery Tasks for Orbital Calculations
+"""
+from celery import chord, shared_task
+from django.utils import timezone
+from .models import OrbitalElements
+from .montecarlo import CHUNK_CLONES, ApproachStatistics, spawn_chunks
+from .services import OrbitalMechanicsService
+from .storage import retire_runs
+from .propagation import datetime_to_jd
+import logging
+import secrets
+import time
+
+logger = logging.getLogger(__name__)
+
+# NEOs per subtask when a catalogue-wide calculation is fanned out
+TASK_BATCH_NEOS = 512
+
+
+def _batches(ids, size=TASK_BATCH_NEOS):
+    """Split ids into lists of at most size"""
+    ids = list(ids)
+    return [ids[offset:offset + size] for offset in range(0, len(ids), size)]
+
+
+@shared_task
+def calculate_all_trajectories(num_points=100, days=365.25, start_jd=None, storage='ephemeris',
+                               mode='two_body'):
+    """
+    Recompute trajectories for every NEO with orbital elements
+    Runs nightly
+    
+    storage='ephemeris' stores compact Chebyshev ephemerides,
+    storage='points' stores individual trajectory points, after which
+    runs no NEO's current trajectory belongs to are retired.
+    mode='nbody' adds Earth, Moon and Jupiter perturbations.
+    """
+    logger.info(f"Starting batch trajectory calculation ({storage}, {mode})")
+    
+    service = OrbitalMechanicsService()
+    
+    if storage == 'points':
+        result = service.calculate_trajectories_batch(
+            start_jd=start_jd,
+            days=days,
+            num_points=num_points,
+            mode=mode
+        )
+        result['runs_retired'] = retire_runs()
+    else:
+        result = service.calculate_ephemerides_batch(
+            start_jd=start_jd,
+            days=days,
+            mode=mode
+        )
+    
+    logger.info(f"Batch trajectory calculation completed: {result}")
+    
+    return result
+
+
+@shared_task(bind=True)
+def predict_close_approaches(self, years=10, step_days=1.0, threshold_au=0.05):
+    """
+    Predict close approaches for every NEO from its orbital elements
+    
+    Prefork workers are daemonic and cannot start a process pool, so the
+    catalogue is split into batches screened by a chord of subtasks that
+    spreads across the workers; the callback adds up the counts.
+    """
+    start_jd = datetime_to_jd(timezone.now())
+    batches = _batches(
+        OrbitalElements.objects.order_by('neo_id').values_list('neo_id', flat=True)
+    )
+    
+    logger.info(
+        f"Starting close-approach prediction over {years} years in {len(batches)} batches"
+    )
+    
+    if not batches:
+        return {
+            'neos_processed': 0,
+            'approaches_created': 0,
+            'start_jd': start_jd,
+            'end_jd': start_jd + years * 365.25
+        }
+    
+    return self.replace(chord(
+        [
+            predict_close_approaches_batch.s(
+                batch,
+                years=years,
+                start_jd=start_jd,
+                step_days=step_days,
+                threshold_au=threshold_au
+            )
+            for batch in batches
+        ],
+        merge_batch_results.s(summed=['neos_processed', 'approaches_created'])
+    ))
+
+
+@shared_task(soft_time_limit=600, time_limit=660)
+def predict_close_approaches_batch(neo_ids, years=10, start_jd=None, step_days=1.0,
+                                   threshold_au=0.05):
+    """
+    Predict close approaches for one batch of NEOs, in-process
+    """
+    service = OrbitalMechanicsService()
+    return service.predict_close_approaches(
+        neo_ids=neo_ids,
+        years=years,
+        start_jd=start_jd,
+        step_days=step_days,
+        threshold_au=threshold_au,
+        workers=1
+    )
+
+
+@shared_task
+def merge_batch_results(results, summed):
+    """
+    Combine the results of a fanned-out task, adding up the summed keys
+    """
+    merged = dict(results[0])
+    for result in results[1:]:
+        for key in summed:
+            merged[key] += result[key]
+    
+    logger.info(f"Batched calculation completed: {merged}")
+    
+    return merged
+
+
+@shared_task(bind=True)
+def recompute_orbits(self, neo_ids):
+    """
+    Refresh derived orbital data for NEOs whose orbital data changed
+    Queued after each NASA sync
+    
+    The NEOs are split into batches recomputed by a chord of subtasks, so
+    MOID solving and close-approach screening spread across the workers.
+    """
+    batches = _batches(neo_ids)
+    
+    logger.info(f"Recomputing orbits for {len(neo_ids)} changed NEOs in {len(batches)} batches")
+    
+    if not batches:
+        return {'neos_checked': 0, 'neos_changed': 0}
+    
+    return self.replace(chord(
+        [recompute_orbits_batch.s(batch) for batch in batches],
+        merge_batch_results.s(summed=['neos_checked', 'neos_changed'])
+    ))
+
+
+@shared_task(soft_time_limit=600, time_limit=660)
+def recompute_orbits_batch(neo_ids):
+    """
+    Refresh derived orbital data for one batch of NEOs, in-process
+    """
+    service = OrbitalMechanicsService()
+    return service.recompute_orbits(neo_ids, workers=1)
+
+
+@shared_task(bind=True)
+def run_monte_carlo(self, neo_id, num_clones=100000, years=10, step_days=1.0, threshold_au=0.05,
+                    seed=None):
+    """
+    Propagate a clone cloud for one NEO and store its impact statistics
+    
+    The clone chunks are screened by a chord of subtasks spread across the
+    workers; the callback merges their statistics and stores the run.
+    """
+    from neos.models import NEO
+    
+    neo = NEO.objects.get(id=neo_id)
+    OrbitalMechanicsService().clone_inputs(neo)  # fail fast without valid elements
+    
+    start_jd = datetime_to_jd(timezone.now())
+    end_jd = start_jd + years * 365.25
+    if seed is None:
+        seed = secrets.randbits(63)
+    chunks = len(spawn_chunks(num_clones, CHUNK_CLONES, seed))
+    
+    logger.info(
+        f"Starting Monte Carlo run for NEO {neo_id} with {num_clones} clones in {chunks} chunks"
+    )
+    
+    return self.replace(chord(
+        [
+            run_monte_carlo_chunk.s(
+                neo_id,
+                index,
+                num_clones=num_clones,
+                start_jd=start_jd,
+                end_jd=end_jd,
+                seed=seed,
+                step_days=step_days,
+                threshold_au=threshold_au,
+                chunk_size=CHUNK_CLONES
+            )
+            for index in range(chunks)
+        ],
+        store_monte_carlo_run.s(
+            neo_id,
+            seed=seed,
+            start_jd=start_jd,
+            end_jd=end_jd,
+            step_days=step_days,
+            started=time.time()
+        )
+    ))
+
+
+@shared_task(soft_time_limit=600, time_limit=660)
+def run_monte_carlo_chunk(neo_id, index, num_clones, start_jd, end_jd, seed, step_days=1.0,
+                          threshold_au=0.05, chunk_size=CHUNK_CLONES):
+    """
+    Screen one chunk of a Monte Carlo run, in-process
+    """
+    from neos.models import NEO
+    
+    service = OrbitalMechanicsService()
+    statistics = service.monte_carlo_chunk(
+        NEO.objects.get(id=neo_id),
+        index,
+        num_clones=num_clones,
+        start_jd=start_jd,
+        end_jd=end_jd,
+        seed=seed,
+        step_days=step_days,
+        threshold_au=threshold_au,
+        chunk_size=chunk_size
+    )
+    
+    return statistics.to_dict()
+
+
+@shared_task
+def store_monte_carlo_run(results, neo_id, seed, start_jd, end_jd, step_days, started):
+    """
+    Merge the chunk statistics of a Monte Carlo run and store it
+    """
+    from neos.models import NEO
+    
+    statistics = ApproachStatistics.from_dict(results[0])
+    for result in results[1:]:
+        statistics.merge(ApproachStatistics.from_dict(result))
+    
+    service = OrbitalMechanicsService()
+    run = service.store_monte_carlo_run(
+        NEO.objects.get(id=neo_id),
+        statistics,
+        seed,
+        start_jd,
+        end_jd,
+        step_days,
+        duration_seconds=time.time() - started
+    )
+    
+    logger.info(f"Monte Carlo run {run.id} completed in {run.duration_seconds:.1f}s")
+    
+    return {
+        'run_id': run.id,
+        'impact_probability': run.impact_probability,
+        'approaches': run.approaches
+    }
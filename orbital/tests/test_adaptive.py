@@ -0,0 +1,80 @@
+"""
+Tests for curvature-adaptive orbit sampling
+"""
+import numpy as np
+from django.test import SimpleTestCase, TestCase
+
+from orbital.propagation import adaptive_eccentric_anomalies, propagate_elements
+from orbital.services import OrbitalMechanicsService
+
+from .utils import create_neo
+
+ORBITS = ((1.0, 0.0), (1.458, 0.2227), (0.6, 0.97), (1.1, 0.9), (17.8, 0.99))
+
+
+def chord_error(points, arcs):
+    """Largest distance from sampled arcs (points, samples, dims) to their chords"""
+    start, end = points[:-1, None, :], points[1:, None, :]
+    direction = end - start
+    along = np.einsum('psd,psd->ps', arcs - start, direction) / np.einsum(
+        'psd,psd->ps', direction, direction
+    )
+    nearest = start + np.clip(along, 0.0, 1.0)[..., None] * direction
+    return np.linalg.norm(arcs - nearest, axis=-1).max()
+
+
+def ellipse(a, e, E):
+    return np.stack([a * (np.cos(E) - e), a * np.sqrt(1.0 - e ** 2) * np.sin(E)], axis=-1)
+
+
+class AdaptiveEccentricAnomaliesTest(SimpleTestCase):
+    
+    def test_chord_error_within_tolerance(self):
+        for a, e in ORBITS:
+            for max_error_au in (1e-2, 1e-3, 1e-4):
+                with self.subTest(a=a, e=e, max_error_au=max_error_au):
+                    E = np.append(
+                        adaptive_eccentric_anomalies(a, e, max_error_au, max_points=10 ** 6),
+                        2 * np.pi
+                    )
+                    arcs = E[:-1, None] + np.linspace(0.0, 1.0, 64) * np.diff(E)[:, None]
+                    
+                    error = chord_error(ellipse(a, e, E), ellipse(a, e, arcs))
+                    
+                    self.assertLessEqual(error, max_error_au)
+                    self.assertGreater(error, 0.25 * max_error_au)
+    
+    def test_points_crowd_around_apsides(self):
+        E = adaptive_eccentric_anomalies(1.1, 0.9, 1e-4)
+        spacing = np.linalg.norm(np.diff(ellipse(1.1, 0.9, E), axis=0), axis=1)
+        
+        # Chord lengths scale as curvature^-1/2: (b/a)^3/2 from apsides to minor axis
+        side = spacing[np.argmin(np.abs(E[:-1] - np.pi / 2))]
+        aphelion = spacing[np.argmin(np.abs(E[:-1] - np.pi))]
+        self.assertLess(spacing[0], 0.4 * side)
+        self.assertLess(aphelion, 0.4 * side)
+    
+    def test_point_limits(self):
+        self.assertEqual(len(adaptive_eccentric_anomalies(1.0, 0.1, 10.0)), 16)
+        self.assertEqual(len(adaptive_eccentric_anomalies(1.0, 0.1, 1e-9, max_points=300)), 300)
+
+
+class AdaptiveTrajectoriesTest(TestCase):
+    
+    def test_polyline_within_tolerance(self):
+        neo = create_neo(0, 1.1, 0.9, 25.0, node=80.0, peri=140.0, mean_anomaly=33.0)
+        service = OrbitalMechanicsService()
+        service.calculate_derived_parameters(workers=1)
+        max_error_au = 1e-3
+        
+        [(neo_id, jd, positions, _, uniform)] = service.adaptive_trajectories([neo.id], max_error_au)
+        
+        self.assertEqual(neo_id, neo.id)
+        self.assertFalse(uniform)
+        self.assertTrue((np.diff(jd) > 0).all())
+        
+        arcs_jd = jd[:-1, None] + np.linspace(0.0, 1.0, 64) * np.diff(jd)[:, None]
+        arcs, _ = propagate_elements(service._load_elements([neo.id]), arcs_jd.ravel())
+        
+        error = chord_error(positions, arcs[0].reshape(len(jd) - 1, 64, 3))
+        self.assertLessEqual(error, max_error_au)
@@ -0,0 +1,51 @@
+"""
+Tests for fleet-wide batch trajectory computation
+"""
+import numpy as np
+from django.test import TestCase
+
+from orbital.models import OrbitalElements, TrajectoryPoint, TrajectoryRun
+from orbital.propagation import propagate_elements
+from orbital.services import OrbitalMechanicsService
+
+from .utils import create_neos
+
+
+class CalculateTrajectoriesBatchTest(TestCase):
+    
+    def setUp(self):
+        self.neos = create_neos(7)
+        self.service = OrbitalMechanicsService()
+        self.service.calculate_derived_parameters(workers=1)
+    
+    def test_points_match_per_object_propagation(self):
+        result = self.service.calculate_trajectories_batch(
+            start_jd=2460700.5, days=300.0, num_points=12, chunk_size=3
+        )
+        
+        self.assertEqual(result['neos_processed'], 7)
+        self.assertEqual(result['points_created'], 7 * 12)
+        
+        elements = self.service._load_elements()
+        jd = 2460700.5 + np.arange(12) / 12 * 300.0
+        positions, velocities = propagate_elements(elements, jd)
+        
+        for index, neo_id in enumerate(elements['neo_id'].tolist()):
+            points = TrajectoryPoint.objects.current().filter(neo_id=neo_id).order_by('julian_date')
+            stored = np.array(list(points.values_list(
+                'position_x_au', 'position_y_au', 'position_z_au',
+                'velocity_x_au_per_day', 'velocity_y_au_per_day', 'velocity_z_au_per_day'
+            )))
+            np.testing.assert_allclose(stored[:, :3], positions[index], rtol=0, atol=1e-12)
+            np.testing.assert_allclose(stored[:, 3:], velocities[index], rtol=0, atol=1e-12)
+    
+    def test_new_run_becomes_current_for_every_neo(self):
+        first = self.service.calculate_trajectories_batch(num_points=4)
+        second = self.service.calculate_trajectories_batch(num_points=4)
+        
+        self.assertEqual(
+            set(OrbitalElements.objects.values_list('trajectory_run_id', flat=True)),
+            {second['run_id']}
+        )
+        self.assertEqual(TrajectoryRun.objects.get(id=first['run_id']).status, 'active')
+        self.assertEqual(TrajectoryPoint.objects.current().count(), 7 * 4)
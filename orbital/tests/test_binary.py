@@ -0,0 +1,126 @@
+"""
+Tests for the binary trajectory format
+"""
+import numpy as np
+from django.test import SimpleTestCase, TestCase
+
+from orbital.binary import (
+    CONTENT_TYPE,
+    FILE_HEADER,
+    FLAG_EXPLICIT_DATES,
+    FLAG_VELOCITIES,
+    MAGIC,
+    OBJECT_HEADER,
+    VERSION,
+    pack_trajectories,
+)
+from orbital.services import OrbitalMechanicsService
+
+from .utils import create_neos
+
+
+def read_trajectories(payload):
+    """Parse a payload the way a client would, following the documented layout"""
+    magic, version, float_size, flags, count, _ = FILE_HEADER.unpack_from(payload, 0)
+    assert (magic, version) == (MAGIC, VERSION)
+    
+    float_type = np.dtype(f'<f{float_size}')
+    offset = FILE_HEADER.size
+    trajectories = []
+    
+    for _ in range(count):
+        neo_id, points, object_flags, start_jd, end_jd = OBJECT_HEADER.unpack_from(payload, offset)
+        offset += OBJECT_HEADER.size
+        
+        def read(length):
+            nonlocal offset
+            values = np.frombuffer(payload, dtype=float_type, count=length, offset=offset)
+            offset += length * float_type.itemsize
+            return values
+        
+        if object_flags & FLAG_EXPLICIT_DATES:
+            jd = start_jd + read(points).astype(np.float64)
+        else:
+            jd = np.linspace(start_jd, end_jd, points)
+        
+        positions = read(points * 3).reshape(points, 3)
+        velocities = read(points * 3).reshape(points, 3) if flags & FLAG_VELOCITIES else None
+        trajectories.append((neo_id, jd, positions, velocities))
+    
+    assert offset == len(payload)
+    return trajectories
+
+
+def trajectory(neo_id, points, uniform):
+    rng = np.random.default_rng(neo_id)
+    if uniform:
+        jd = np.linspace(2460600.5, 2460965.75, points)
+    else:
+        jd = 2460600.5 + np.sort(rng.uniform(0.0, 365.25, points))
+    return neo_id, jd, rng.normal(size=(points, 3)), rng.normal(size=(points, 3)) * 0.01, uniform
+
+
+class PackTrajectoriesTest(SimpleTestCase):
+    
+    def setUp(self):
+        self.trajectories = [trajectory(7, 50, True), trajectory(2 ** 40, 33, False)]
+    
+    def test_float64_round_trip(self):
+        parsed = read_trajectories(pack_trajectories(self.trajectories, 'float64'))
+        
+        self.assertEqual(len(parsed), 2)
+        for (neo_id, jd, positions, velocities, _), result in zip(self.trajectories, parsed):
+            self.assertEqual(result[0], neo_id)
+            np.testing.assert_allclose(result[1], jd, rtol=0, atol=1e-8)
+            np.testing.assert_array_equal(result[2], positions)
+            np.testing.assert_array_equal(result[3], velocities)
+    
+    def test_float32_round_trip(self):
+        parsed = read_trajectories(pack_trajectories(self.trajectories, 'float32'))
+        
+        for (_, jd, positions, velocities, _), result in zip(self.trajectories, parsed):
+            # Date offsets from start jd keep float32 precision well below a minute
+            np.testing.assert_allclose(result[1], jd, rtol=0, atol=1e-4)
+            np.testing.assert_allclose(result[2], positions, rtol=1e-6)
+            np.testing.assert_allclose(result[3], velocities, rtol=1e-6)
+    
+    def test_without_velocities(self):
+        payload = pack_trajectories(self.trajectories, 'float32', include_velocities=False)
+        parsed = read_trajectories(payload)
+        
+        self.assertIsNone(parsed[0][3])
+        self.assertEqual(
+            len(payload),
+            FILE_HEADER.size + 2 * OBJECT_HEADER.size + 4 * (50 * 3 + 33 * 4)
+        )
+    
+    def test_empty(self):
+        self.assertEqual(read_trajectories(pack_trajectories([])), [])
+
+
+class BinaryEndpointTest(TestCase):
+    
+    def test_matches_sampled_ephemerides(self):
+        neos = create_neos(3)
+        service = OrbitalMechanicsService()
+        service.calculate_derived_parameters(workers=1)
+        service.calculate_ephemerides_batch(start_jd=2460600.5, days=365.25)
+        neo_ids = [neo.id for neo in neos]
+        
+        response = self.client.get('/api/orbital/trajectories/binary/', {
+            'neo_ids': ','.join(map(str, neo_ids)),
+            'num_points': 20,
+            'dtype': 'float64'
+        })
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], CONTENT_TYPE)
+        
+        parsed = read_trajectories(response.content)
+        expected = service.load_trajectories(neo_ids, num_points=20)
+        
+        self.assertEqual([result[0] for result in parsed], neo_ids)
+        for (_, jd, positions, velocities, _), result in zip(expected, parsed):
+            np.testing.assert_allclose(result[1], jd, rtol=0, atol=1e-8)
+            np.testing.assert_array_equal(result[2], positions)
+            np.testing.assert_array_equal(result[3], velocities)
@@ -0,0 +1,97 @@
+"""
+Tests for the major-body ephemeris table
+"""
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+from django.test import SimpleTestCase, override_settings
+
+from orbital import bodies
+from orbital.bodies import BODIES, BodyTable, analytic_states, body_states, build_table
+
+# Largest interpolation error of a one-day table of the analytic model (AU, AU/day)
+TOLERANCE = {'earth': (1e-9, 1e-8), 'moon': (1e-7, 1e-6), 'jupiter': (1e-10, 1e-9)}
+
+
+class BodyTableTest(SimpleTestCase):
+    
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = Path(directory.name) / 'bodies.npy'
+        self.metadata = build_table(self.path, 2460000.5, 2462000.5)
+        self.table = BodyTable.load(self.path)
+        self.jd = np.random.default_rng(1).uniform(2460000.5, 2462000.5, 2000)
+    
+    def test_interpolation_matches_model(self):
+        positions, velocities = analytic_states(self.jd)
+        
+        for column, body in enumerate(BODIES):
+            with self.subTest(body=body):
+                table_positions, table_velocities = self.table.interpolate(body, self.jd)
+                position_tolerance, velocity_tolerance = TOLERANCE[body]
+                self.assertLess(np.abs(table_positions - positions[:, column]).max(), position_tolerance)
+                self.assertLess(np.abs(table_velocities - velocities[:, column]).max(), velocity_tolerance)
+    
+    def test_grid_points_are_exact(self):
+        jd = 2460000.5 + np.arange(0, 2001, 97)
+        positions, velocities = self.table.interpolate(BODIES, jd)
+        
+        np.testing.assert_allclose(positions, self.table.states[::97, :, :3], rtol=0, atol=1e-15)
+        np.testing.assert_allclose(velocities, self.table.states[::97, :, 3:], rtol=0, atol=1e-15)
+    
+    def test_build_leaves_no_temporary_files(self):
+        self.assertEqual(
+            sorted(path.name for path in self.path.parent.iterdir()),
+            ['bodies.json', 'bodies.npy']
+        )
+        self.assertEqual(self.metadata['count'], 2001)
+    
+    def test_body_states_uses_table_then_model(self):
+        with mock.patch('orbital.bodies.get_table', return_value=self.table):
+            inside, _ = body_states('moon', self.jd)
+            outside, _ = body_states('moon', np.array([2470000.5]))
+        
+        np.testing.assert_array_equal(inside, self.table.interpolate('moon', self.jd)[0])
+        np.testing.assert_array_equal(outside, analytic_states(np.array([2470000.5]))[0][:, 1])
+
+
+class GetTableTest(SimpleTestCase):
+    
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        
+        patcher = mock.patch('orbital.bodies._table', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+    
+    def test_tabulates_once_to_configured_path(self):
+        path = self.directory / 'body_ephemeris.npy'
+        
+        with override_settings(EPHEMERIS_TABLE_PATH=str(path)), \
+                mock.patch('orbital.bodies.build_table', wraps=build_table) as build:
+            table = bodies.get_table()
+            
+            # A second process finds the file and maps it
+            bodies._table = None
+            again = bodies.get_table()
+        
+        build.assert_called_once()
+        self.assertTrue(path.exists())
+        self.assertIsInstance(np.load(path, mmap_mode='r'), np.memmap)
+        np.testing.assert_array_equal(again.states[:10], table.states[:10])
+    
+    def test_unwritable_path_falls_back_to_memory(self):
+        blocker = self.directory / 'file'
+        blocker.write_text('')
+        
+        with override_settings(EPHEMERIS_TABLE_PATH=str(blocker / 'body_ephemeris.npy')), \
+                self.assertLogs('orbital.bodies', 'ERROR'):
+            table = bodies.get_table()
+        
+        self.assertEqual(table.metadata['source'], 'analytic')
+        self.assertEqual(table.start_jd, bodies.DEFAULT_START_JD)
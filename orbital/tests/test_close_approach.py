@@ -0,0 +1,82 @@
+"""
+Tests for predictive close-approach screening
+"""
+import numpy as np
+from django.test import SimpleTestCase
+
+from orbital.close_approach import geocentric_states, screen_close_approaches
+from orbital.propagation import ELEMENT_DTYPE
+
+START_JD = 2460600.5
+END_JD = START_JD + 3652.5
+THRESHOLD_AU = 0.05
+
+
+def earth_like_orbits(count, seed=3):
+    rng = np.random.default_rng(seed)
+    elements = np.zeros(count, dtype=ELEMENT_DTYPE)
+    elements['neo_id'] = 100 + np.arange(count)
+    elements['epoch'] = START_JD
+    elements['a'] = rng.uniform(0.9, 1.15, count)
+    elements['e'] = rng.uniform(0.02, 0.3, count)
+    elements['i'] = rng.uniform(0.0, 8.0, count)
+    for name in ('node', 'peri', 'M'):
+        elements[name] = rng.uniform(0.0, 360.0, count)
+    return elements
+
+
+class ScreenCloseApproachesTest(SimpleTestCase):
+    
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.elements = earth_like_orbits(30)
+        cls.approaches = screen_close_approaches(
+            cls.elements, START_JD, END_JD, threshold_au=THRESHOLD_AU
+        )
+    
+    def test_matches_dense_sampling(self):
+        jd = np.arange(START_JD, END_JD, 0.02)
+        positions, _ = geocentric_states(self.elements, jd)
+        distance = np.linalg.norm(positions, axis=-1)
+        
+        interior = distance[:, 1:-1]
+        objects, steps = np.nonzero(
+            (interior < distance[:, :-2]) & (interior <= distance[:, 2:]) & (interior < THRESHOLD_AU)
+        )
+        
+        self.assertGreater(len(objects), 0)
+        self.assertEqual(len(self.approaches), len(objects))
+        
+        for index, step in zip(objects, steps):
+            found = self.approaches[
+                (self.approaches['neo_id'] == self.elements['neo_id'][index]) &
+                (np.abs(self.approaches['jd'] - jd[step + 1]) < 0.02)
+            ]
+            self.assertEqual(len(found), 1)
+            
+            # Bisection lands on the true minimum, at or below every sample
+            self.assertLessEqual(found['distance_au'][0], distance[index, step + 1] + 1e-15)
+            self.assertAlmostEqual(found['distance_au'][0], distance[index, step + 1], delta=1e-6)
+    
+    def test_range_rate_vanishes(self):
+        by_id = {int(neo_id): index for index, neo_id in enumerate(self.elements['neo_id'])}
+        
+        for approach in self.approaches:
+            record = self.elements[by_id[int(approach['neo_id'])]][None]
+            positions, velocities = geocentric_states(record, np.array([approach['jd']]))
+            range_rate = np.dot(positions[0, 0], velocities[0, 0]) / approach['distance_au']
+            self.assertLess(abs(range_rate), 1e-9)
+    
+    def test_independent_of_window(self):
+        windowed = screen_close_approaches(
+            self.elements, START_JD, END_JD, threshold_au=THRESHOLD_AU, window_steps=50
+        )
+        
+        order = np.lexsort((self.approaches['jd'], self.approaches['neo_id']))
+        windowed_order = np.lexsort((windowed['jd'], windowed['neo_id']))
+        np.testing.assert_array_equal(windowed[windowed_order], self.approaches[order])
+    
+    def test_nothing_within_tiny_threshold(self):
+        approaches = screen_close_approaches(self.elements, START_JD, END_JD, threshold_au=1e-4)
+        self.assertEqual(len(approaches), 0)
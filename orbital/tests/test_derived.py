@@ -0,0 +1,102 @@
+"""
+Tests for bulk derived orbital parameters
+"""
+import math
+
+import numpy as np
+from django.test import SimpleTestCase, TestCase
+
+from orbital.derived import classify_orbits, derived_parameters
+from orbital.models import OrbitalElements
+from orbital.services import OrbitalMechanicsService
+
+from .utils import create_neo, create_neos
+
+# 433 Eros (a, e, i, node, peri); JPL lists an Earth MOID of about 0.149 AU
+EROS = (1.458, 0.2227, 10.83, 304.3, 178.9)
+EROS_MOID_AU = 0.149
+
+
+def classify(a, q, Q):
+    """The per-object classification rules the array version replaces"""
+    if Q < 1.0:
+        return 'atira'
+    elif a < 1.0 and Q >= 1.0:
+        return 'aten'
+    elif a >= 1.0 and q < 1.017 and q >= 0.983:
+        return 'apollo'
+    elif a >= 1.0 and q > 1.017 and q < 1.3:
+        return 'amor'
+    elif a > 2.0 and a < 3.2:
+        return 'main_belt'
+    else:
+        return 'other'
+
+
+class DerivedParametersTest(SimpleTestCase):
+    
+    def setUp(self):
+        rng = np.random.default_rng(13)
+        self.a = rng.uniform(0.5, 4.0, 2000)
+        self.e = rng.uniform(0.0, 0.99, 2000)
+        self.i = rng.uniform(0.0, 60.0, 2000)
+    
+    def test_classes_match_scalar_rules(self):
+        q, Q = self.a * (1 - self.e), self.a * (1 + self.e)
+        
+        classes = classify_orbits(self.a, self.e, q, Q)
+        
+        expected = [classify(*values) for values in zip(self.a, q, Q)]
+        self.assertEqual(classes.tolist(), expected)
+        self.assertGreater(len(set(expected)), 4)
+    
+    def test_parameters_match_scalar_formulas(self):
+        derived = derived_parameters(self.a, self.e, self.i)
+        
+        for index in range(0, 2000, 97):
+            a, e, i = self.a[index], self.e[index], self.i[index]
+            period = a ** 1.5 * 365.25
+            
+            self.assertAlmostEqual(derived['orbital_period_days'][index], period, places=9)
+            self.assertAlmostEqual(derived['perihelion_distance_au'][index], a * (1 - e), places=12)
+            self.assertAlmostEqual(derived['aphelion_distance_au'][index], a * (1 + e), places=12)
+            self.assertAlmostEqual(derived['mean_motion_deg_per_day'][index], 360.0 / period, places=12)
+            self.assertAlmostEqual(
+                derived['tisserand_parameter'][index],
+                5.2026 / a + 2 * math.cos(math.radians(i)) * math.sqrt(a / 5.2026 * (1 - e ** 2)),
+                delta=1e-3
+            )
+    
+    def test_unbound_orbit_has_no_tisserand(self):
+        derived = derived_parameters([1.2], [1.3], [5.0])
+        self.assertTrue(np.isnan(derived['tisserand_parameter'][0]))
+
+
+class CalculateDerivedParametersTest(TestCase):
+    
+    def test_eros(self):
+        a, e, i, node, peri = EROS
+        neo = create_neo(433, a, e, i, node=node, peri=peri)
+        
+        result = OrbitalMechanicsService().calculate_derived_parameters(workers=1)
+        
+        self.assertEqual(result['changed_neo_ids'], [neo.id])
+        elements = OrbitalElements.objects.get(neo=neo)
+        self.assertAlmostEqual(elements.moid_au, EROS_MOID_AU, delta=0.002)
+        self.assertAlmostEqual(elements.orbital_period_days, 643.2, delta=1.0)
+        self.assertEqual(elements.orbit_class, 'amor')
+    
+    def test_bulk_matches_per_object(self):
+        neos = create_neos(6)
+        service = OrbitalMechanicsService()
+        service.calculate_derived_parameters(workers=1)
+        bulk = {elements.neo_id: elements for elements in OrbitalElements.objects.all()}
+        
+        for neo in neos:
+            single = service.calculate_orbital_elements(neo, force=True)
+            stored = bulk[neo.id]
+            
+            for field in ('orbital_period_days', 'perihelion_distance_au', 'aphelion_distance_au',
+                          'mean_motion_deg_per_day', 'tisserand_parameter', 'moid_au',
+                          'moid_jupiter_au', 'source_hash', 'orbit_class'):
+                self.assertEqual(getattr(stored, field), getattr(single, field), field)
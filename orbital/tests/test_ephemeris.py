@@ -0,0 +1,125 @@
+"""
+Tests for Chebyshev-compressed ephemerides
+"""
+import numpy as np
+from django.test import SimpleTestCase, TestCase
+
+from orbital.ephemeris import (
+    DEFAULT_SEGMENT_DAYS,
+    DEFAULT_TOLERANCE_AU,
+    evaluate_ephemeris,
+    fit_ephemerides,
+    fit_within_tolerance,
+    pack_coefficients,
+    unpack_coefficients,
+)
+from orbital.models import Ephemeris
+from orbital.propagation import ELEMENT_DTYPE, propagate_elements
+from orbital.services import OrbitalMechanicsService
+
+from .utils import create_neo
+
+START_JD = 2460600.5
+DAYS = 365.25
+
+# (a, e, i): Eros, an Aten, and fast perihelion passages that need short segments
+ORBITS = ((1.458, 0.2227, 10.83), (0.6, 0.5, 5.0), (1.1, 0.9, 10.0), (1.0, 0.97, 20.0))
+
+
+def orbit_elements():
+    elements = np.zeros(len(ORBITS), dtype=ELEMENT_DTYPE)
+    elements['neo_id'] = np.arange(len(ORBITS))
+    elements['epoch'] = START_JD
+    elements['a'], elements['e'], elements['i'] = np.array(ORBITS).T
+    elements['node'] = [304.3, 30.0, 120.0, 250.0]
+    elements['peri'] = [178.9, 60.0, 200.0, 10.0]
+    return elements
+
+
+def max_error(coefficients, elements, segment_days):
+    """Largest position and velocity error over a dense grid"""
+    jd = np.linspace(START_JD, START_JD + DAYS, 20001)
+    positions, velocities = evaluate_ephemeris(coefficients, START_JD, segment_days, jd)
+    expected_positions, expected_velocities = propagate_elements(elements, jd)
+    return (
+        np.abs(positions - expected_positions[0]).max(),
+        np.abs(velocities - expected_velocities[0]).max()
+    )
+
+
+class FitWithinToleranceTest(SimpleTestCase):
+    
+    def test_error_bound(self):
+        elements = orbit_elements()
+        fitted = 0
+        
+        for indices, coefficients, _, segment_days, errors in fit_within_tolerance(
+            elements, START_JD, DAYS
+        ):
+            self.assertTrue((errors <= DEFAULT_TOLERANCE_AU).all())
+            
+            for index, object_coefficients in zip(indices, coefficients):
+                position_error, velocity_error = max_error(
+                    object_coefficients, elements[index:index + 1], segment_days
+                )
+                self.assertLess(position_error, DEFAULT_TOLERANCE_AU)
+                self.assertLess(velocity_error, 1e-6)
+                fitted += 1
+        
+        self.assertEqual(fitted, len(ORBITS))
+    
+    def test_only_fast_orbits_are_refitted(self):
+        segment_days = {
+            int(index): days
+            for indices, _, _, days, _ in fit_within_tolerance(orbit_elements(), START_JD, DAYS)
+            for index in indices
+        }
+        
+        self.assertEqual(segment_days[0], DEFAULT_SEGMENT_DAYS)
+        self.assertLess(segment_days[2], DEFAULT_SEGMENT_DAYS)
+        self.assertLess(segment_days[3], segment_days[2])
+    
+    def test_default_segments_miss_fast_perihelion(self):
+        elements = orbit_elements()[2:3]
+        coefficients, _ = fit_ephemerides(elements, START_JD, DAYS)
+        position_error, _ = max_error(coefficients[0], elements, DEFAULT_SEGMENT_DAYS)
+        self.assertGreater(position_error, DEFAULT_TOLERANCE_AU)
+
+
+class EphemerisFormatTest(SimpleTestCase):
+    
+    def test_pack_round_trip(self):
+        coefficients, num_segments = fit_ephemerides(orbit_elements()[:1], START_JD, DAYS)
+        
+        unpacked = unpack_coefficients(pack_coefficients(coefficients[0]), num_segments, 12)
+        
+        np.testing.assert_array_equal(unpacked, coefficients[0])
+    
+    def test_outside_span(self):
+        coefficients, num_segments = fit_ephemerides(orbit_elements()[:1], START_JD, DAYS)
+        end_jd = START_JD + num_segments * DEFAULT_SEGMENT_DAYS
+        
+        for jd in (START_JD - 1.0, end_jd + 1.0):
+            with self.assertRaises(ValueError):
+                evaluate_ephemeris(coefficients[0], START_JD, DEFAULT_SEGMENT_DAYS, jd)
+
+
+class EphemeridesBatchTest(TestCase):
+    
+    def test_stores_refitted_segments(self):
+        create_neo(0, *ORBITS[0])
+        fast = create_neo(1, *ORBITS[2])
+        service = OrbitalMechanicsService()
+        service.calculate_derived_parameters(workers=1)
+        
+        result = service.calculate_ephemerides_batch(start_jd=START_JD, days=DAYS)
+        
+        self.assertEqual(result['neos_processed'], 2)
+        self.assertEqual(result['outside_tolerance'], 0)
+        
+        ephemeris = Ephemeris.objects.get(neo=fast)
+        self.assertLess(ephemeris.segment_days, DEFAULT_SEGMENT_DAYS)
+        
+        jd, positions, _ = service.sample_ephemeris(ephemeris, num_points=500)
+        expected, _ = propagate_elements(service._load_elements([fast.id]), jd)
+        self.assertLess(np.abs(positions - expected[0]).max(), DEFAULT_TOLERANCE_AU)
@@ -0,0 +1,94 @@
+"""
+Tests for on-demand trajectory evaluation
+"""
+import numpy as np
+from django.test import TestCase
+
+from orbital.models import TrajectoryPoint, TrajectoryRun
+from orbital.propagation import elements_from_rows, propagate_elements
+from orbital.views import MAX_NBODY_EVALUATE_DAYS
+
+from .utils import create_neo
+
+URL = '/api/orbital/trajectories/evaluate/'
+CALCULATE_URL = '/api/orbital/trajectories/calculate/'
+ELEMENTS = {'a': 1.5, 'e': 0.2, 'i': 5.0, 'node': 10.0, 'peri': 20.0, 'M': 30.0, 'epoch': 2460000.5}
+
+
+class EvaluateTest(TestCase):
+    
+    def evaluate(self, **data):
+        return self.client.post(URL, data, content_type='application/json')
+    
+    def test_matches_propagation_and_stores_nothing(self):
+        response = self.evaluate(
+            elements=ELEMENTS, start_jd=2460800.5, end_jd=2461165.75, num_points=50
+        )
+        
+        self.assertEqual(response.status_code, 200)
+        points = response.json()['points']
+        self.assertEqual(len(points), 50)
+        
+        record = elements_from_rows([(0, *ELEMENTS.values())])
+        positions, _ = propagate_elements(record, np.linspace(2460800.5, 2461165.75, 50))
+        self.assertAlmostEqual(points[-1]['position_x_au'], positions[0, -1, 0], places=12)
+        self.assertFalse(TrajectoryPoint.objects.exists())
+    
+    def test_rejects_non_finite_values(self):
+        for data in (
+            {'start_jd': 'nan'},
+            {'start_jd': '-inf'},
+            {'end_jd': 'inf'},
+            {'elements': {**ELEMENTS, 'a': 'nan'}},
+            {'elements': {**ELEMENTS, 'epoch': 'inf'}},
+        ):
+            with self.subTest(data=data):
+                response = self.evaluate(**{'elements': ELEMENTS, **data})
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('finite', response.json()['error'])
+    
+    def test_nbody_span_is_capped(self):
+        span = {'start_jd': 2460800.5, 'num_points': 10}
+        
+        too_long = self.evaluate(
+            elements=ELEMENTS, mode='nbody', end_jd=2460800.5 + MAX_NBODY_EVALUATE_DAYS + 1, **span
+        )
+        two_body = self.evaluate(
+            elements=ELEMENTS, mode='two_body', end_jd=2460800.5 + MAX_NBODY_EVALUATE_DAYS + 1, **span
+        )
+        
+        self.assertEqual(too_long.status_code, 400)
+        self.assertEqual(two_body.status_code, 200)
+    
+    def test_num_points_range(self):
+        for num_points in (0, 10001, 'many'):
+            with self.subTest(num_points=num_points):
+                response = self.evaluate(elements=ELEMENTS, num_points=num_points)
+                self.assertEqual(response.status_code, 400)
+
+
+class CalculateTest(TestCase):
+    
+    def test_stores_nothing(self):
+        neo = create_neo(0, 1.458, 0.2227, 10.83)
+        
+        response = self.client.post(
+            CALCULATE_URL, {'neo_id': neo.id, 'num_points': 25}, content_type='application/json'
+        )
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['points_calculated'], 25)
+        self.assertFalse(TrajectoryPoint.objects.exists())
+        self.assertFalse(TrajectoryRun.objects.exists())
+    
+    def test_validation(self):
+        neo = create_neo(0, 1.458, 0.2227, 10.83)
+        
+        for data, code in (
+            ({'neo_id': neo.id, 'num_points': 0}, 400),
+            ({'neo_id': neo.id, 'mode': 'relativistic'}, 400),
+            ({'neo_id': neo.id + 1}, 404),
+        ):
+            with self.subTest(data=data):
+                response = self.client.post(CALCULATE_URL, data, content_type='application/json')
+                self.assertEqual(response.status_code, code)
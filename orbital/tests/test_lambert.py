@@ -0,0 +1,189 @@
+"""
+Tests for universal-variable propagation, Lambert transfers and deflection
+"""
+import numpy as np
+from django.test import SimpleTestCase, TestCase
+
+from orbital.deflection import required_impulse, target_plane_response
+from orbital.lambert import kepler_universal, solve_lambert
+from orbital.propagation import GM_SUN, kepler_states
+from orbital.views import MAX_DEFLECTION_YEARS
+
+from .utils import create_neo
+
+EPOCH_JD = 2460600.5
+URL = '/api/orbital/deflection/delta_v/'
+
+
+def random_orbits(count, e_low, e_high, seed=0, max_inclination=60.0):
+    rng = np.random.default_rng(seed)
+    return (
+        rng.uniform(0.5, 5.0, count),
+        rng.uniform(e_low, e_high, count),
+        rng.uniform(0.0, max_inclination, count),
+        rng.uniform(0.0, 360.0, count),
+        rng.uniform(0.0, 360.0, count),
+        rng.uniform(0.0, 360.0, count),
+    )
+
+
+class KeplerUniversalTest(SimpleTestCase):
+    
+    def assert_matches_kepler(self, orbit, dt, rtol):
+        r0, v0 = kepler_states(*orbit, EPOCH_JD, EPOCH_JD)
+        expected_r, expected_v = kepler_states(*orbit, EPOCH_JD, EPOCH_JD + dt)
+        
+        r, v = kepler_universal(r0, v0, dt)
+        
+        position_error = np.linalg.norm(r - expected_r, axis=-1) / np.linalg.norm(expected_r, axis=-1)
+        velocity_error = np.linalg.norm(v - expected_v, axis=-1) / np.linalg.norm(expected_v, axis=-1)
+        self.assertLess(position_error.max(), rtol)
+        self.assertLess(velocity_error.max(), rtol)
+    
+    def test_highly_eccentric_orbits(self):
+        # Plain Newton iteration diverged here, by up to 1e15 AU
+        orbit = random_orbits(3000, 0.9, 0.995)
+        
+        for dt in (1.0, 100.0, 1000.0, 3650.0):
+            with self.subTest(dt=dt):
+                self.assert_matches_kepler(orbit, dt, 1e-9)
+    
+    def test_backwards_and_long_spans(self):
+        orbit = random_orbits(2000, 0.0, 0.9, seed=1)
+        
+        for dt in (-500.0, -1.0, 0.0, 36525.0):
+            with self.subTest(dt=dt):
+                self.assert_matches_kepler(orbit, dt, 1e-9)
+    
+    def test_per_state_dt(self):
+        orbit = random_orbits(50, 0.0, 0.99, seed=2)
+        dt = np.linspace(-3000.0, 3000.0, 50)
+        r0, v0 = kepler_states(*orbit, EPOCH_JD, EPOCH_JD)
+        
+        r, _ = kepler_universal(r0, v0, dt)
+        
+        for index in range(0, 50, 7):
+            expected, _ = kepler_states(
+                *(values[index:index + 1] for values in orbit), EPOCH_JD, EPOCH_JD + dt[index]
+            )
+            np.testing.assert_allclose(r[index], expected[0], rtol=1e-9, atol=1e-12)
+    
+    def test_hyperbolic_conserves_integrals(self):
+        r0 = np.array([[1.0, 0.0, 0.0], [1.0, 0.0, 0.0], [0.3, 0.9, 0.1]])
+        v0 = np.array([[0.0, 0.03, 0.0], [0.0, -0.025, 0.01], [-0.02, 0.015, 0.004]])
+        
+        for dt in (10.0, -10.0, 300.0):
+            with self.subTest(dt=dt):
+                r, v = kepler_universal(r0, v0, dt)
+                
+                energy0 = 0.5 * np.sum(v0 ** 2, axis=-1) - GM_SUN / np.linalg.norm(r0, axis=-1)
+                energy = 0.5 * np.sum(v ** 2, axis=-1) - GM_SUN / np.linalg.norm(r, axis=-1)
+                np.testing.assert_allclose(energy, energy0, rtol=1e-10)
+                np.testing.assert_allclose(np.cross(r, v), np.cross(r0, v0), rtol=1e-10, atol=1e-16)
+    
+    def test_unconverged_cells_are_nan(self):
+        r0, v0 = kepler_states(*random_orbits(20, 0.9, 0.99, seed=3), EPOCH_JD, EPOCH_JD)
+        
+        r, v = kepler_universal(r0, v0, 1000.0, max_iter=2)
+        
+        self.assertTrue(np.isnan(r).any())
+        self.assertTrue((np.isnan(r).all(axis=-1) == np.isnan(v).all(axis=-1)).all())
+
+
+class SolveLambertTest(SimpleTestCase):
+    
+    def setUp(self):
+        a, e, i, node, peri, M = random_orbits(500, 0.0, 0.8, seed=4, max_inclination=80.0)
+        self.orbit = (a, e, i, node, peri, M)
+        self.r1, self.v1 = kepler_states(*self.orbit, EPOCH_JD, EPOCH_JD)
+        
+        # Well short of a full revolution, and clear of 180 degree transfers
+        period = 2 * np.pi * np.sqrt(a ** 3 / GM_SUN)
+        self.tof = np.random.default_rng(5).uniform(0.05, 0.9, 500) * period
+        self.r2, self.v2 = kepler_universal(self.r1, self.v1, self.tof)
+        
+        cos_angle = np.sum(self.r1 * self.r2, axis=-1) / (
+            np.linalg.norm(self.r1, axis=-1) * np.linalg.norm(self.r2, axis=-1)
+        )
+        self.clear = cos_angle > -0.99
+    
+    def test_recovers_velocities(self):
+        v1, v2 = solve_lambert(self.r1, self.r2, self.tof)
+        
+        self.assertGreater(self.clear.sum(), 400)
+        np.testing.assert_allclose(v1[self.clear], self.v1[self.clear], rtol=1e-5, atol=1e-9)
+        np.testing.assert_allclose(v2[self.clear], self.v2[self.clear], rtol=1e-5, atol=1e-9)
+    
+    def test_no_transfer_is_nan(self):
+        tof = self.tof.copy()
+        tof[:5] = [0.0, -10.0, 0.0, -1.0, 0.0]
+        
+        v1, v2 = solve_lambert(self.r1, self.r2, tof)
+        
+        self.assertTrue(np.isnan(v1[:5]).all())
+        self.assertTrue(np.isnan(v2[:5]).all())
+
+
+class DeflectionTest(SimpleTestCase):
+    
+    def test_required_impulse_meets_shift(self):
+        rng = np.random.default_rng(6)
+        miss = rng.normal(scale=1e-3, size=(100, 3))
+        response = rng.normal(scale=10.0, size=(100, 3))
+        
+        impulse = required_impulse(miss, response, 1e-4)
+        
+        shifted = np.linalg.norm(miss + impulse[:, None] * response, axis=-1)
+        np.testing.assert_allclose(shifted, np.linalg.norm(miss, axis=-1) + 1e-4, rtol=1e-9)
+    
+    def test_response_of_eccentric_orbit_is_finite(self):
+        orbit = (1.1, 0.95, 10.0, 30.0, 40.0, 200.0)
+        lead_times = np.array([30.0, 365.0, 3652.0])
+        approach_jd = EPOCH_JD + 4000.0
+        
+        positions, velocities = kepler_states(*orbit, EPOCH_JD, approach_jd - lead_times)
+        target, target_velocity = kepler_states(*orbit, EPOCH_JD, approach_jd)
+        # Offset across an encounter velocity along y, so it lies in the target plane
+        earth_position = target + np.array([0.01, 0.0, 0.0])
+        earth_velocity = target_velocity - np.array([0.0, 0.01, 0.0])
+        
+        miss, response = target_plane_response(
+            positions, velocities, lead_times, earth_position, earth_velocity
+        )
+        
+        self.assertTrue(np.isfinite(miss).all())
+        self.assertTrue(np.isfinite(response).all())
+        np.testing.assert_allclose(np.linalg.norm(miss, axis=-1), 0.01, rtol=1e-8)
+
+
+class DeltaVViewTest(TestCase):
+    
+    def setUp(self):
+        self.neo = create_neo(1, a=1.1, e=0.95, i=10.0, node=30.0, peri=40.0, mean_anomaly=200.0)
+    
+    def delta_v(self, **data):
+        return self.client.post(
+            URL, {'neo_id': self.neo.id, 'shift_km': 10000.0, **data}, content_type='application/json'
+        )
+    
+    def test_eccentric_orbit_gives_finite_impulses(self):
+        response = self.delta_v(approach_jd=EPOCH_JD + 4000.0, lead_times_days=[30.0, 365.0, 3652.0])
+        
+        self.assertEqual(response.status_code, 200)
+        for deflection in response.json()['deflections']:
+            self.assertTrue(np.isfinite(deflection['best_m_per_s']))
+            self.assertIsNotNone(deflection['best_direction'])
+    
+    def test_rejects_unbounded_values(self):
+        for data in (
+            {'years': MAX_DEFLECTION_YEARS * 10},
+            {'years': 'inf'},
+            {'years': 0},
+            {'shift_km': 'nan'},
+            {'approach_jd': 'inf'},
+            {'lead_times_days': [365.0, 'nan']},
+            {'lead_times_days': [-1.0]},
+            {'lead_times_days': []},
+        ):
+            with self.subTest(data=data):
+                self.assertEqual(self.delta_v(**data).status_code, 400)
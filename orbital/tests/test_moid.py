@@ -0,0 +1,78 @@
+"""
+Tests for minimum orbit intersection distances
+"""
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+
+from orbital.derived import catalogue_moids
+from orbital.models import OrbitalElements
+from orbital.moid import compute_moid
+from orbital.propagation import EARTH_ELEMENTS
+from orbital.services import OrbitalMechanicsService
+
+from .utils import create_neo, create_neos
+
+EARTH = tuple(float(EARTH_ELEMENTS[name]) for name in ('a', 'e', 'i', 'node', 'peri'))
+
+# 433 Eros (a, e, i, node, peri); JPL lists an Earth MOID of about 0.149 AU
+EROS = (1.458, 0.2227, 10.83, 304.3, 178.9)
+EROS_MOID_AU = 0.149
+
+
+class ComputeMoidTest(SimpleTestCase):
+    
+    def test_eros(self):
+        self.assertAlmostEqual(compute_moid(EROS, EARTH), EROS_MOID_AU, delta=0.002)
+    
+    def test_coplanar_circles(self):
+        self.assertAlmostEqual(compute_moid((1.5, 0, 0, 0, 0), (1, 0, 0, 0, 0)), 0.5, places=9)
+    
+    def test_crossing_orbits(self):
+        # Coplanar ellipse whose perihelion lies inside Earth's orbit and aphelion outside
+        self.assertAlmostEqual(compute_moid((1.2, 0.3, 0, 0, 0), (1, 0, 0, 0, 0)), 0.0, places=8)
+    
+    def test_symmetric(self):
+        self.assertAlmostEqual(compute_moid(EROS, EARTH), compute_moid(EARTH, EROS), places=9)
+
+
+class MoidCacheTest(TestCase):
+    """The bulk pass and the per-object path share the MOID cache"""
+    
+    def setUp(self):
+        cache.clear()
+        self.service = OrbitalMechanicsService()
+        self.neos = create_neos(5)
+    
+    def test_bulk_pass_warms_per_object_cache(self):
+        self.service.calculate_derived_parameters(workers=1)
+        stored = dict(OrbitalElements.objects.values_list('neo_id', 'moid_au'))
+        
+        with mock.patch('orbital.services.compute_moid') as solve:
+            for neo in self.neos:
+                elements = self.service.calculate_orbital_elements(neo, force=True)
+                self.assertEqual(elements.moid_au, stored[neo.id])
+        
+        solve.assert_not_called()
+    
+    def test_bulk_pass_reuses_cached_moids(self):
+        self.service.calculate_derived_parameters(workers=1)
+        stored = dict(OrbitalElements.objects.values_list('neo_id', 'moid_au'))
+        
+        with mock.patch('orbital.services.catalogue_moids') as solve:
+            self.service.calculate_derived_parameters(force=True, workers=1)
+        
+        solve.assert_not_called()
+        self.assertEqual(dict(OrbitalElements.objects.values_list('neo_id', 'moid_au')), stored)
+    
+    def test_only_uncached_orbits_are_solved(self):
+        self.service.calculate_derived_parameters(workers=1)
+        new = create_neo(99, a=1.3, e=0.4, i=12.0, node=80.0, peri=15.0)
+        
+        with mock.patch('orbital.services.catalogue_moids', wraps=catalogue_moids) as solve:
+            self.service.calculate_derived_parameters(force=True, workers=1)
+        
+        solved = [int(neo_id) for call in solve.call_args_list for neo_id in call.args[0]['neo_id']]
+        self.assertEqual(solved, [new.id])
+
@@ -0,0 +1,144 @@
+"""
+Tests for Monte Carlo orbit uncertainty runs
+"""
+import json
+import time
+
+import numpy as np
+from django.test import SimpleTestCase, TestCase
+
+from orbital.close_approach import CLOSE_APPROACH_DTYPE
+from orbital.models import MonteCarloRun
+from orbital.montecarlo import ApproachStatistics
+from orbital.propagation import ELEMENT_DTYPE
+from orbital.services import OrbitalMechanicsService
+from orbital.tasks import run_monte_carlo_chunk, store_monte_carlo_run
+
+from .utils import create_neo
+
+# Passes about 0.01 AU from Earth around JD 2462084
+START_JD = 2462060.5
+END_JD = START_JD + 0.2 * 365.25
+
+
+def synthetic_batch(first_id, count, rng):
+    clones = np.zeros(count, dtype=ELEMENT_DTYPE)
+    clones['neo_id'] = first_id + np.arange(count)
+    
+    # Two approaches for some clones, none for others
+    ids = rng.choice(clones['neo_id'], size=count, replace=True)
+    approaches = np.zeros(len(ids), dtype=CLOSE_APPROACH_DTYPE)
+    approaches['neo_id'] = np.sort(ids)
+    approaches['distance_au'] = 10 ** rng.uniform(-5.5, -1.4, len(ids))
+    approaches['velocity_au_per_day'] = rng.uniform(0.001, 0.02, len(ids))
+    return clones, approaches
+
+
+class ApproachStatisticsTest(SimpleTestCase):
+    
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        self.batches = [synthetic_batch(first, 400, rng) for first in (0, 400, 800)]
+    
+    def test_dict_round_trip(self):
+        statistics = ApproachStatistics(0.05)
+        statistics.add(*self.batches[0])
+        
+        restored = ApproachStatistics.from_dict(json.loads(json.dumps(statistics.to_dict())))
+        
+        self.assertEqual(restored.to_dict(), statistics.to_dict())
+        self.assertEqual(restored.percentile(50), statistics.percentile(50))
+    
+    def test_empty_round_trip(self):
+        restored = ApproachStatistics.from_dict(json.loads(json.dumps(ApproachStatistics(0.05).to_dict())))
+        
+        self.assertEqual(restored.min_distance_au, np.inf)
+        self.assertEqual(restored.impact_probability, 0.0)
+        self.assertIsNone(restored.percentile(50))
+    
+    def test_merge_matches_single_pass(self):
+        single = ApproachStatistics(0.05)
+        single.add(
+            np.concatenate([clones for clones, _ in self.batches]),
+            np.concatenate([approaches for _, approaches in self.batches])
+        )
+        
+        merged = ApproachStatistics(0.05)
+        for clones, approaches in reversed(self.batches):
+            chunk = ApproachStatistics(0.05)
+            chunk.add(clones, approaches)
+            merged.merge(chunk)
+        
+        self.assertEqual(merged.clones, single.clones)
+        self.assertEqual(merged.impacts, single.impacts)
+        self.assertEqual(merged.approaches, single.approaches)
+        self.assertEqual(merged.min_distance_au, single.min_distance_au)
+        self.assertAlmostEqual(merged.distance_sum_au, single.distance_sum_au, places=12)
+        np.testing.assert_array_equal(merged.counts, single.counts)
+    
+    def test_percentile_within_histogram(self):
+        statistics = ApproachStatistics(0.05)
+        statistics.add(*self.batches[0])
+        
+        closest = np.minimum.reduceat(
+            self.batches[0][1]['distance_au'],
+            np.unique(self.batches[0][1]['neo_id'], return_index=True)[1]
+        )
+        median = statistics.percentile(50 * len(closest) / statistics.clones)
+        
+        # Interpolation within a bin stays within one log10 bin of the sample median
+        bin_width = 10 ** (np.log10(0.05) + 6.0) / 120
+        self.assertAlmostEqual(np.log10(median), np.log10(np.median(closest)), delta=bin_width)
+
+
+class MonteCarloRunTest(TestCase):
+    
+    def setUp(self):
+        self.neo = create_neo(
+            0, 0.9284, 0.0812, 4.99, node=45.15, peri=205.76, mean_anomaly=317.23,
+            orbital_data={'orbit_uncertainty': '8'}
+        )
+        self.service = OrbitalMechanicsService()
+        self.service.calculate_derived_parameters(workers=1)
+        self.options = {'start_jd': START_JD, 'end_jd': END_JD, 'seed': 42, 'step_days': 1.0}
+    
+    def test_chord_chunks_match_in_process_run(self):
+        run = self.service.run_monte_carlo(
+            self.neo, num_clones=5000, years=0.2, start_jd=START_JD, chunk_size=1000,
+            seed=42, workers=1
+        )
+        
+        results = [
+            run_monte_carlo_chunk(self.neo.id, index, 5000, chunk_size=1000, **self.options)
+            for index in range(5)
+        ]
+        stored = store_monte_carlo_run(results, self.neo.id, started=time.time(), **self.options)
+        fanned = MonteCarloRun.objects.get(id=stored['run_id'])
+        
+        self.assertGreater(run.approaches, 0)
+        for field in ('num_clones', 'impacts', 'approaches', 'min_distance_au',
+                      'distance_p05_au', 'distance_p50_au', 'distance_histogram'):
+            self.assertEqual(getattr(fanned, field), getattr(run, field), field)
+        self.assertAlmostEqual(fanned.mean_distance_au, run.mean_distance_au, places=12)
+    
+    def test_reproducible_across_workers(self):
+        runs = [
+            self.service.run_monte_carlo(
+                self.neo, num_clones=3000, years=0.2, start_jd=START_JD, chunk_size=1000,
+                seed=7, workers=workers
+            )
+            for workers in (1, 2)
+        ]
+        
+        self.assertEqual(runs[0].approaches, runs[1].approaches)
+        self.assertEqual(runs[0].distance_histogram, runs[1].distance_histogram)
+    
+    def test_seed_changes_clones(self):
+        first, second = (
+            self.service.run_monte_carlo(
+                self.neo, num_clones=2000, years=0.2, start_jd=START_JD, seed=seed, workers=1
+            )
+            for seed in (1, 2)
+        )
+        
+        self.assertNotEqual(first.distance_histogram, second.distance_histogram)
@@ -0,0 +1,73 @@
+"""
+Tests for N-body propagation
+"""
+import numpy as np
+from django.test import SimpleTestCase
+
+from orbital.nbody import propagate_nbody
+from orbital.propagation import elements_from_rows, propagate_elements
+
+# Two epochs, forward and backward dates, and one fast perihelion passage
+ELEMENTS = elements_from_rows([
+    (1, 1.458, 0.2227, 10.83, 304.3, 178.9, 0.0, 2460600.5),
+    (2, 0.9224, 0.1914, 3.339, 203.96, 126.6, 45.0, 2460600.5),
+    (3, 1.1, 0.9, 10.0, 30.0, 40.0, 200.0, 2460400.5),
+    (4, 2.7, 0.75, 40.0, 10.0, 300.0, 200.0, 2460500.5),
+])
+JD = 2460600.5 + np.array([500.0, -300.0, 0.0, 1000.0, 37.3])
+
+
+class TwoBodyLimitTest(SimpleTestCase):
+    """Without perturbers the integrator must reproduce Kepler propagation"""
+    
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.expected = propagate_elements(ELEMENTS, JD)
+    
+    def test_default_tolerance(self):
+        positions, velocities = propagate_nbody(ELEMENTS, JD, perturbers=())
+        
+        self.assertLess(np.abs(positions - self.expected[0]).max(), 1e-7)
+        self.assertLess(np.abs(velocities - self.expected[1]).max(), 1e-8)
+    
+    def test_converges_with_tolerance(self):
+        positions, _ = propagate_nbody(ELEMENTS, JD, perturbers=(), rtol=1e-12, atol=1e-16)
+        self.assertLess(np.abs(positions - self.expected[0]).max(), 2e-10)
+    
+    def test_date_order_does_not_matter(self):
+        order = np.argsort(JD)
+        positions, _ = propagate_nbody(ELEMENTS, JD, perturbers=())
+        sorted_positions, _ = propagate_nbody(ELEMENTS, JD[order], perturbers=())
+        
+        np.testing.assert_array_equal(sorted_positions, positions[:, order])
+    
+    def test_chunking(self):
+        positions, _ = propagate_nbody(ELEMENTS, JD, perturbers=())
+        chunked, _ = propagate_nbody(ELEMENTS, JD, chunk_size=1, perturbers=())
+        self.assertLess(np.abs(chunked - positions).max(), 1e-7)
+    
+    def test_needs_shared_grid(self):
+        with self.assertRaises(ValueError):
+            propagate_nbody(ELEMENTS, np.tile(JD, (len(ELEMENTS), 1)))
+
+
+class PerturbationTest(SimpleTestCase):
+    
+    def test_perturbations_are_small_but_present(self):
+        two_body, _ = propagate_elements(ELEMENTS, JD)
+        positions, _ = propagate_nbody(ELEMENTS, JD)
+        
+        drift = np.linalg.norm(positions - two_body, axis=-1).max(axis=1)
+        
+        # Well above the integration error, well below the orbit scale
+        self.assertTrue((drift > 1e-5).all(), drift)
+        self.assertTrue((drift < 0.01).all(), drift)
+    
+    def test_epoch_state_unperturbed(self):
+        epoch = ELEMENTS[:2]
+        positions, velocities = propagate_nbody(epoch, np.array([2460600.5]))
+        expected_positions, expected_velocities = propagate_elements(epoch, np.array([2460600.5]))
+        
+        np.testing.assert_allclose(positions, expected_positions, rtol=0, atol=1e-15)
+        np.testing.assert_allclose(velocities, expected_velocities, rtol=0, atol=1e-15)
@@ -0,0 +1,50 @@
+"""
+Tests for vectorized Kepler propagation
+"""
+import numpy as np
+from django.test import SimpleTestCase
+
+from orbital.propagation import GM_SUN, elements_from_rows, propagate_elements
+
+
+class KeplerPropagationTest(SimpleTestCase):
+    """Two-body propagation conserves the orbit's energy and angular momentum"""
+    
+    def setUp(self):
+        self.elements = elements_from_rows([
+            (1, 1.458, 0.2227, 10.83, 304.3, 178.9, 0.0, 2460600.5),
+            (2, 0.9224, 0.1914, 3.339, 203.96, 126.6, 45.0, 2460600.5),
+            (3, 2.7, 0.75, 40.0, 10.0, 300.0, 200.0, 2451545.0),
+        ])
+        self.jd = 2460600.5 + np.linspace(-2000.0, 4000.0, 997)
+        self.positions, self.velocities = propagate_elements(self.elements, self.jd)
+    
+    def test_shapes(self):
+        self.assertEqual(self.positions.shape, (3, len(self.jd), 3))
+        self.assertEqual(self.velocities.shape, (3, len(self.jd), 3))
+    
+    def test_energy_conserved(self):
+        r = np.linalg.norm(self.positions, axis=-1)
+        v = np.linalg.norm(self.velocities, axis=-1)
+        energy = 0.5 * v ** 2 - GM_SUN / r
+        expected = -GM_SUN / (2 * self.elements['a'])
+        
+        np.testing.assert_allclose(energy, np.broadcast_to(expected[:, None], energy.shape), rtol=1e-10)
+    
+    def test_angular_momentum_conserved(self):
+        h = np.cross(self.positions, self.velocities)
+        a, e = self.elements['a'], self.elements['e']
+        expected = np.sqrt(GM_SUN * a * (1 - e ** 2))
+        
+        np.testing.assert_allclose(
+            np.linalg.norm(h, axis=-1), np.broadcast_to(expected[:, None], h.shape[:2]), rtol=1e-10
+        )
+        # The orbital plane does not precess
+        direction = h / np.linalg.norm(h, axis=-1, keepdims=True)
+        np.testing.assert_allclose(direction, np.broadcast_to(direction[:, :1], direction.shape), atol=1e-12)
+    
+    def test_inclination_matches_elements(self):
+        h = np.cross(self.positions[:, 0], self.velocities[:, 0])
+        inclination = np.degrees(np.arccos(h[:, 2] / np.linalg.norm(h, axis=-1)))
+        
+        np.testing.assert_allclose(inclination, self.elements['i'], atol=1e-9)
@@ -0,0 +1,62 @@
+"""
+Tests for incremental orbital recomputation
+"""
+from unittest import mock
+
+from django.test import TestCase
+
+from neos.models import NEO
+from orbital.models import Ephemeris, OrbitalElements
+from orbital.services import OrbitalMechanicsService
+
+from .utils import create_neos
+
+
+class RecomputeOrbitsTest(TestCase):
+    
+    def setUp(self):
+        self.neos = create_neos(4)
+        self.service = OrbitalMechanicsService()
+        self.service.recompute_orbits([neo.id for neo in self.neos], workers=1)
+    
+    def test_unchanged_inputs_skip_everything(self):
+        calculated_at = dict(OrbitalElements.objects.values_list('neo_id', 'calculated_at'))
+        
+        with mock.patch.object(self.service, 'calculate_ephemerides_batch') as ephemerides, \
+                mock.patch.object(self.service, 'predict_close_approaches') as approaches:
+            result = self.service.recompute_orbits([neo.id for neo in self.neos], workers=1)
+        
+        self.assertEqual(result, {'neos_checked': 4, 'neos_changed': 0})
+        ephemerides.assert_not_called()
+        approaches.assert_not_called()
+        self.assertEqual(
+            dict(OrbitalElements.objects.values_list('neo_id', 'calculated_at')), calculated_at
+        )
+    
+    def test_only_changed_neo_is_recomputed(self):
+        neo = self.neos[2]
+        neo.orbital_data = {**neo.orbital_data, 'eccentricity': '0.4'}
+        neo.save()
+        NEO.objects.filter(id=neo.id).update(eccentricity=0.4)
+        
+        with mock.patch.object(self.service, 'predict_close_approaches') as approaches:
+            result = self.service.recompute_orbits([n.id for n in self.neos], workers=1)
+        
+        self.assertEqual(result, {'neos_checked': 4, 'neos_changed': 1})
+        approaches.assert_called_once_with(neo_ids=[neo.id], workers=1)
+        self.assertEqual(OrbitalElements.objects.get(neo=neo).eccentricity, 0.4)
+        self.assertEqual(Ephemeris.objects.count(), 4)
+    
+    def test_single_neo_returns_stored_elements(self):
+        stored = OrbitalElements.objects.get(neo=self.neos[0])
+        
+        with mock.patch.object(self.service, '_calculate_moid') as moid:
+            elements = self.service.calculate_orbital_elements(self.neos[0])
+        
+        moid.assert_not_called()
+        self.assertEqual(elements.calculated_at, stored.calculated_at)
+        
+        with mock.patch.object(self.service, '_calculate_moid', return_value=0.25):
+            forced = self.service.calculate_orbital_elements(self.neos[0], force=True)
+        
+        self.assertEqual(forced.moid_au, 0.25)
@@ -0,0 +1,77 @@
+"""
+Tests for the spatial index over propagated positions
+"""
+import numpy as np
+from django.test import SimpleTestCase
+
+from orbital.propagation import ELEMENT_DTYPE, propagate_elements
+from orbital.spatial import PositionIndex
+
+EPOCH_JD = 2460600.5
+
+
+def catalogue(count, seed=11):
+    rng = np.random.default_rng(seed)
+    elements = np.zeros(count, dtype=ELEMENT_DTYPE)
+    elements['neo_id'] = rng.permutation(count) + 1
+    elements['epoch'] = EPOCH_JD - rng.uniform(0.0, 1000.0, count)
+    elements['a'] = rng.uniform(0.7, 3.5, count)
+    elements['e'] = rng.uniform(0.0, 0.95, count)
+    elements['i'] = rng.uniform(0.0, 40.0, count)
+    for name in ('node', 'peri', 'M'):
+        elements[name] = rng.uniform(0.0, 360.0, count)
+    return elements
+
+
+class PositionIndexTest(SimpleTestCase):
+    
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.elements = catalogue(3000)
+        cls.index = PositionIndex(cls.elements, EPOCH_JD)
+        cls.centers = np.random.default_rng(5).normal(scale=1.2, size=(6, 3))
+    
+    def brute_force(self, center, jd):
+        positions, _ = propagate_elements(self.elements, np.array([jd]))
+        distances = np.linalg.norm(positions[:, 0] - center, axis=-1)
+        order = np.argsort(distances, kind='stable')
+        return self.elements['neo_id'][order], distances[order]
+    
+    def test_within_matches_brute_force(self):
+        for jd in (EPOCH_JD, EPOCH_JD + 0.4, EPOCH_JD - 3.0):
+            for center in self.centers:
+                with self.subTest(jd=jd, center=center):
+                    neo_ids, distances = self.brute_force(center, jd)
+                    expected = distances <= 0.3
+                    
+                    result = self.index.within(center, 0.3, jd)
+                    
+                    np.testing.assert_array_equal(result['neo_id'], neo_ids[expected])
+                    np.testing.assert_allclose(result['distance_au'], distances[expected], rtol=1e-12)
+    
+    def test_nearest_matches_brute_force(self):
+        for jd in (EPOCH_JD, EPOCH_JD + 0.4, EPOCH_JD + 5.0):
+            for center in self.centers:
+                with self.subTest(jd=jd, center=center):
+                    neo_ids, distances = self.brute_force(center, jd)
+                    
+                    result = self.index.nearest(center, 25, jd)
+                    
+                    np.testing.assert_array_equal(result['neo_id'], neo_ids[:25])
+                    np.testing.assert_allclose(result['distance_au'], distances[:25], rtol=1e-12)
+    
+    def test_positions_at_query_date(self):
+        result = self.index.nearest(self.centers[0], 3, EPOCH_JD + 0.4)
+        
+        by_id = {int(neo_id): index for index, neo_id in enumerate(self.elements['neo_id'])}
+        records = self.elements[[by_id[int(neo_id)] for neo_id in result['neo_id']]]
+        positions, _ = propagate_elements(records, np.array([EPOCH_JD + 0.4]))
+        
+        np.testing.assert_allclose(result['position'], positions[:, 0], rtol=1e-12)
+    
+    def test_limits(self):
+        self.assertEqual(len(self.index.nearest(self.centers[0], 10 ** 6, EPOCH_JD)), 3000)
+        empty = PositionIndex(self.elements[:0], EPOCH_JD)
+        self.assertEqual(len(empty.nearest(self.centers[0], 5, EPOCH_JD)), 0)
+        self.assertEqual(len(self.index.within(np.array([50.0, 0.0, 0.0]), 0.1, EPOCH_JD)), 0)
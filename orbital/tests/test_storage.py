@@ -0,0 +1,153 @@
+"""
+Tests for trajectory run storage
+"""
+import struct
+from datetime import datetime, timezone as dt_timezone
+from io import StringIO
+from types import SimpleNamespace
+
+import numpy as np
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+
+from orbital.models import TrajectoryPoint, TrajectoryRun
+from orbital.services import OrbitalMechanicsService
+from orbital.storage import (
+    COPY_COLUMNS,
+    POSTGRES_EPOCH,
+    TrajectoryWriter,
+    copy_record_dtype,
+    pack_copy_rows,
+    retire_runs,
+)
+
+from .utils import create_neo
+
+
+class PostgresTypes:
+    """Just enough of a PostgreSQL connection for Field.db_type"""
+    
+    vendor = 'postgresql'
+    data_types = {
+        'AutoField': 'integer',
+        'BigAutoField': 'bigint',
+        'IntegerField': 'integer',
+        'BigIntegerField': 'bigint',
+        'FloatField': 'double precision',
+        'DateTimeField': 'timestamp with time zone',
+    }
+    ops = SimpleNamespace(quote_name=lambda name: f'"{name}"')
+
+
+def unpack_copy_tuple(payload, offset):
+    """Decode one binary COPY tuple by the PostgreSQL wire layout"""
+    (field_count,) = struct.unpack_from('>h', payload, offset)
+    offset += 2
+    fields = []
+    
+    for _ in range(field_count):
+        (length,) = struct.unpack_from('>i', payload, offset)
+        offset += 4
+        fields.append(payload[offset:offset + length])
+        offset += length
+    
+    return fields, offset
+
+
+class PackCopyRowsTest(SimpleTestCase):
+    """pack_copy_rows encodes the layout COPY ... WITH (FORMAT binary) reads"""
+    
+    def test_round_trip(self):
+        dtype = copy_record_dtype(PostgresTypes())
+        rng = np.random.default_rng(7)
+        neo_ids = np.array([3, 11])
+        jd = 2460600.5 + np.arange(4) * 0.25
+        positions = rng.normal(size=(2, 4, 3))
+        velocities = rng.normal(size=(2, 4, 3)) * 0.01
+        earth_distances = rng.uniform(0.01, 3.0, size=(2, 4))
+        calculated_at = datetime(2026, 10, 16, 12, 30, 15, 250000, tzinfo=dt_timezone.utc)
+        
+        payload = pack_copy_rows(
+            dtype, neo_ids, 42, jd, positions, velocities, earth_distances, calculated_at
+        )
+        
+        self.assertEqual(len(payload), 8 * dtype.itemsize)
+        
+        offset = 0
+        for index, (object_index, step) in enumerate(np.ndindex(2, 4)):
+            fields, offset = unpack_copy_tuple(payload, offset)
+            values = dict(zip(COPY_COLUMNS, fields))
+            
+            self.assertEqual(len(fields), len(COPY_COLUMNS))
+            self.assertEqual(struct.unpack('>q', values['neo_id'])[0], neo_ids[object_index])
+            self.assertEqual(struct.unpack('>q', values['run_id'])[0], 42)
+            self.assertEqual(struct.unpack('>d', values['julian_date'])[0], jd[step])
+            for axis, name in enumerate('xyz'):
+                self.assertEqual(
+                    struct.unpack('>d', values[f'position_{name}_au'])[0],
+                    positions[object_index, step, axis]
+                )
+                self.assertEqual(
+                    struct.unpack('>d', values[f'velocity_{name}_au_per_day'])[0],
+                    velocities[object_index, step, axis]
+                )
+            self.assertEqual(
+                struct.unpack('>d', values['earth_distance_au'])[0],
+                earth_distances[object_index, step]
+            )
+            microseconds = struct.unpack('>q', values['calculated_at'])[0]
+            self.assertEqual(
+                microseconds, int((calculated_at - POSTGRES_EPOCH).total_seconds() * 1e6)
+            )
+        
+        self.assertEqual(offset, len(payload))
+
+
+class RetireRunsTest(TestCase):
+    """Without partitioning, retired runs lose their rows and keep their record"""
+    
+    def setUp(self):
+        self.neo = create_neo(0, 1.5, 0.2, 5.0)
+        OrbitalMechanicsService().calculate_derived_parameters(workers=1)
+    
+    def write_run(self, current=True):
+        run = TrajectoryRun.objects.create(num_points=3)
+        jd = 2460600.5 + np.arange(3)
+        with TrajectoryWriter(run, current=current) as writer:
+            writer.write(np.array([self.neo.id]), jd, np.ones((1, 3, 3)), np.zeros((1, 3, 3)))
+        run.refresh_from_db()
+        return run
+    
+    def test_retires_superseded_runs_only(self):
+        old = self.write_run()
+        new = self.write_run()
+        
+        self.assertEqual(retire_runs(), 1)
+        
+        old.refresh_from_db()
+        new.refresh_from_db()
+        self.assertEqual(old.status, 'retired')
+        self.assertIsNotNone(old.retired_at)
+        self.assertEqual(new.status, 'active')
+        self.assertFalse(TrajectoryPoint.objects.filter(run=old).exists())
+        self.assertEqual(TrajectoryPoint.objects.filter(run=new).count(), 3)
+    
+    def test_nothing_to_retire(self):
+        self.write_run()
+        
+        self.assertEqual(retire_runs(), 0)
+        self.assertEqual(retire_runs(), 0)
+    
+    def test_benchmark_leaves_other_runs(self):
+        current = self.write_run()
+        
+        call_command(
+            'benchmark_trajectory_ingest', points=400, points_per_neo=100, chunk_neos=2,
+            baseline_points=50, stdout=StringIO()
+        )
+        
+        benchmark_runs = TrajectoryRun.objects.filter(mode='benchmark')
+        self.assertEqual(benchmark_runs.count(), 2)
+        self.assertEqual(set(benchmark_runs.values_list('status', flat=True)), {'retired'})
+        self.assertEqual(set(TrajectoryPoint.objects.values_list('run', flat=True)), {current.id})
+        self.assertEqual(TrajectoryPoint.objects.count(), 3)
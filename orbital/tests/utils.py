@@ -0,0 +1,43 @@
+"""
+Shared fixtures for the orbital tests
+"""
+from neos.models import NEO
+
+
+def create_neo(index, a, e, i, node=0.0, peri=0.0, mean_anomaly=0.0, epoch=2460600.5, **fields):
+    """A NEO whose orbital data describes the given elements"""
+    return NEO.objects.create(
+        neo_reference_id=str(1000 + index),
+        name=f'Test {index}',
+        absolute_magnitude_h=fields.pop('absolute_magnitude_h', 20.0),
+        semi_major_axis=a,
+        eccentricity=e,
+        inclination=i,
+        orbital_data={
+            'semi_major_axis': str(a),
+            'eccentricity': str(e),
+            'inclination': str(i),
+            'ascending_node_longitude': str(node),
+            'perihelion_argument': str(peri),
+            'mean_anomaly': str(mean_anomaly),
+            'epoch_osculation': str(epoch),
+            **fields.pop('orbital_data', {}),
+        },
+        **fields
+    )
+
+
+def create_neos(count):
+    """A spread of NEO orbits, from Atira to outer main belt"""
+    return [
+        create_neo(
+            index,
+            a=0.8 + 0.25 * index,
+            e=(0.05 + 0.13 * index) % 0.9,
+            i=(3.0 + 7.0 * index) % 40,
+            node=(40.0 * index) % 360,
+            peri=(75.0 * index) % 360,
+            mean_anomaly=(110.0 * index) % 360
+        )
+        for index in range(count)
+    ]
@@ -3,11 +3,20 @@ Orbital URLs
 """
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import OrbitalElementsViewSet, TrajectoryViewSet
+from .views import (
+    OrbitalElementsViewSet,
+    TrajectoryViewSet,
+    NearbyViewSet,
+    MonteCarloRunViewSet,
+    DeflectionViewSet
+)
 
 router = DefaultRouter()
 router.register(r'elements', OrbitalElementsViewSet, basename='orbital-elements')
 router.register(r'trajectories', TrajectoryViewSet, basename='trajectory')
+router.register(r'nearby', NearbyViewSet, basename='nearby')
+router.register(r'monte-carlo', MonteCarloRunViewSet, basename='monte-carlo')
+router.register(r'deflection', DeflectionViewSet, basename='deflection')
 
 urlpatterns = [
     path('', include(router.urls)),
@@ -1,15 +1,50 @@
 """
 Orbital Views
 """
+import math
+import numpy as np
+from django.http import HttpResponse
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
 
-from .models import OrbitalElements, TrajectoryPoint
-from .serializers import OrbitalElementsSerializer, TrajectoryPointSerializer
-from .services import OrbitalMechanicsService
+from django.utils import timezone
+from .binary import CONTENT_TYPE, FLOAT_TYPES, pack_trajectories
+from .bodies import earth_states
+from .propagation import datetime_to_jd
+from .models import OrbitalElements, TrajectoryPoint, Ephemeris, MonteCarloRun
+from .serializers import (
+    OrbitalElementsSerializer,
+    TrajectoryPointSerializer,
+    MonteCarloRunSerializer,
+)
+from .services import PROPAGATION_MODES, OrbitalMechanicsService
 from neos.models import NEO
+from meteor_madness.params import parse_bool
+
+MAX_SAMPLED_POINTS = 10000
+MAX_BINARY_NEOS = 5000
+
+# Chord error at zoom level 0; every zoom level halves it
+ADAPTIVE_BASE_ERROR_AU = 0.05
+MAX_ZOOM = 20
+
+MAX_NEAREST = 1000
+
+EVALUATE_ELEMENTS = ('a', 'e', 'i', 'node', 'peri', 'M', 'epoch')
+MAX_EVALUATE_DAYS = 36525.0
+
+# Integration cost grows with span and eccentricity (an e = 0.97 orbit takes
+# seconds per year); longer perturbed runs belong to the batch tasks
+MAX_NBODY_EVALUATE_DAYS = 730.5
+
+MAX_CLONES = 1000000
+
+MAX_PORKCHOP_CELLS = 250000
+MAX_LEAD_TIMES = 100
+DEFAULT_LEAD_TIMES_DAYS = [30, 90, 180, 365, 730, 1826, 3652]
+MAX_DEFLECTION_YEARS = 100
 
 
 class OrbitalElementsViewSet(viewsets.ReadOnlyModelViewSet):
@@ -43,13 +78,19 @@ class TrajectoryViewSet(viewsets.ReadOnlyModelViewSet):
     ViewSet for trajectory points
     """
     
-    queryset = TrajectoryPoint.objects.all()
+    queryset = TrajectoryPoint.objects.current()
     serializer_class = TrajectoryPointSerializer
     permission_classes = [AllowAny]
     
     @action(detail=False, methods=['get'])
     def for_neo(self, request):
-        """Get trajectory points for a specific NEO"""
+        """
+        Get trajectory points for a specific NEO
+        
+        When the NEO has a stored ephemeris it is sampled at the requested
+        resolution (start_jd, end_jd, num_points); otherwise the stored
+        trajectory points are returned.
+        """
         neo_id = request.query_params.get('neo_id')
         
         if not neo_id:
@@ -58,27 +99,573 @@ class TrajectoryViewSet(viewsets.ReadOnlyModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
+        ephemeris = Ephemeris.objects.filter(neo_id=neo_id).first()
+        
+        if ephemeris is not None:
+            return self._sample_ephemeris(request, ephemeris)
+        
         points = self.queryset.filter(neo_id=neo_id)
         serializer = self.get_serializer(points, many=True)
         
         return Response(serializer.data)
     
+    @action(detail=False, methods=['get'])
+    def binary(self, request):
+        """
+        Get trajectories for one or many NEOs as packed typed arrays
+        
+        See orbital/binary.py for the layout. Query parameters: neo_ids
+        (comma separated), start_jd, end_jd, num_points, dtype (float32 or
+        float64) and velocities (true/false).
+        """
+        params = request.query_params
+        
+        try:
+            neo_ids = [int(value) for value in params.get('neo_ids', '').split(',') if value]
+            start_jd = float(params['start_jd']) if 'start_jd' in params else None
+            end_jd = float(params['end_jd']) if 'end_jd' in params else None
+            num_points = int(params.get('num_points', 100))
+        except ValueError:
+            return Response(
+                {'error': 'neo_ids, start_jd, end_jd and num_points must be numeric'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        dtype = params.get('dtype', 'float32')
+        
+        try:
+            include_velocities = parse_bool(params.get('velocities'), default=True)
+        except ValueError:
+            return Response({'error': 'velocities must be a boolean'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        if not neo_ids:
+            return Response(
+                {'error': 'neo_ids required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if len(neo_ids) > MAX_BINARY_NEOS:
+            return Response(
+                {'error': f'At most {MAX_BINARY_NEOS} neo_ids per request'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if dtype not in FLOAT_TYPES:
+            return Response(
+                {'error': f'dtype must be one of: {", ".join(FLOAT_TYPES)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if not 1 <= num_points <= MAX_SAMPLED_POINTS:
+            return Response(
+                {'error': f'num_points must be between 1 and {MAX_SAMPLED_POINTS}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        service = OrbitalMechanicsService()
+        
+        try:
+            trajectories = service.load_trajectories(neo_ids, start_jd, end_jd, num_points)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        payload = pack_trajectories(trajectories, dtype, include_velocities)
+        
+        return HttpResponse(payload, content_type=CONTENT_TYPE)
+    
+    @action(detail=False, methods=['get'])
+    def adaptive(self, request):
+        """
+        Get level-of-detail orbits with curvature-adaptive point density
+        
+        Query parameters: neo_ids (comma separated), zoom (0-20) or
+        max_error_au, max_points, and output (json or binary, with dtype).
+        """
+        params = request.query_params
+        
+        try:
+            neo_ids = [int(value) for value in params.get('neo_ids', '').split(',') if value]
+            max_points = int(params.get('max_points', MAX_SAMPLED_POINTS))
+            if 'max_error_au' in params:
+                max_error_au = float(params['max_error_au'])
+            else:
+                zoom = int(params.get('zoom', 0))
+                if not 0 <= zoom <= MAX_ZOOM:
+                    raise ValueError
+                max_error_au = ADAPTIVE_BASE_ERROR_AU / 2 ** zoom
+        except ValueError:
+            return Response(
+                {'error': f'neo_ids, max_points and max_error_au must be numeric; zoom must be 0-{MAX_ZOOM}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if not neo_ids:
+            return Response(
+                {'error': 'neo_ids required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if len(neo_ids) > MAX_BINARY_NEOS:
+            return Response(
+                {'error': f'At most {MAX_BINARY_NEOS} neo_ids per request'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if max_error_au <= 0 or not 1 <= max_points <= MAX_SAMPLED_POINTS:
+            return Response(
+                {'error': f'max_error_au must be positive and max_points between 1 and {MAX_SAMPLED_POINTS}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        service = OrbitalMechanicsService()
+        trajectories = service.adaptive_trajectories(neo_ids, max_error_au, max_points)
+        
+        if params.get('output') == 'binary':
+            dtype = params.get('dtype', 'float32')
+            if dtype not in FLOAT_TYPES:
+                return Response(
+                    {'error': f'dtype must be one of: {", ".join(FLOAT_TYPES)}'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            payload = pack_trajectories(trajectories, dtype)
+            return HttpResponse(payload, content_type=CONTENT_TYPE)
+        
+        return Response([
+            {
+                'neo_id': neo_id,
+                'max_error_au': max_error_au,
+                'points': service.format_state_vectors(jd, positions, velocities)
+            }
+            for neo_id, jd, positions, velocities, _ in trajectories
+        ])
+    
+    def _sample_ephemeris(self, request, ephemeris):
+        """Sample a stored ephemeris according to the query parameters"""
+        params = request.query_params
+        
+        try:
+            start_jd = float(params.get('start_jd', ephemeris.start_jd))
+            end_jd = float(params.get('end_jd', ephemeris.end_jd))
+            num_points = int(params.get('num_points', 100))
+        except ValueError:
+            return Response(
+                {'error': 'start_jd, end_jd and num_points must be numeric'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if not 1 <= num_points <= MAX_SAMPLED_POINTS:
+            return Response(
+                {'error': f'num_points must be between 1 and {MAX_SAMPLED_POINTS}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        service = OrbitalMechanicsService()
+        
+        try:
+            jd, positions, velocities = service.sample_ephemeris(
+                ephemeris, start_jd, end_jd, num_points
+            )
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response(service.format_state_vectors(jd, positions, velocities))
+    
+    @action(detail=False, methods=['post'])
+    def evaluate(self, request):
+        """
+        Propagate an orbit on demand without storing trajectory points
+        
+        Takes neo_id or raw elements (a, e, i, node, peri, M, epoch; AU,
+        degrees and Julian date), plus start_jd, end_jd, num_points, mode
+        and output (json or binary, with dtype). Results are cached in
+        memory per element hash, range and resolution.
+        """
+        data = request.data
+        neo_id = data.get('neo_id')
+        raw_elements = data.get('elements')
+        mode = data.get('mode', 'two_body')
+        
+        try:
+            start_jd = float(data['start_jd']) if data.get('start_jd') is not None else None
+            end_jd = float(data['end_jd']) if data.get('end_jd') is not None else None
+            num_points = int(data.get('num_points', 100))
+            if raw_elements is not None:
+                elements = tuple(float(raw_elements[name]) for name in EVALUATE_ELEMENTS)
+        except (KeyError, TypeError, ValueError, AttributeError):
+            return Response(
+                {'error': f'start_jd, end_jd, num_points and elements ({", ".join(EVALUATE_ELEMENTS)}) must be numeric'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if (neo_id is None) == (raw_elements is None):
+            return Response(
+                {'error': 'Provide either neo_id or elements'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        numbers = [value for value in (start_jd, end_jd) if value is not None]
+        if raw_elements is not None:
+            numbers.extend(elements)
+        
+        if not all(math.isfinite(value) for value in numbers):
+            return Response(
+                {'error': 'start_jd, end_jd and elements must be finite'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if not 1 <= num_points <= MAX_SAMPLED_POINTS:
+            return Response(
+                {'error': f'num_points must be between 1 and {MAX_SAMPLED_POINTS}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        service = OrbitalMechanicsService()
+        neo = None
+        
+        if neo_id is not None:
+            try:
+                neo = NEO.objects.get(id=neo_id)
+            except (NEO.DoesNotExist, ValueError):
+                return Response({'error': 'NEO not found'}, status=status.HTTP_404_NOT_FOUND)
+            elements = None
+        
+        try:
+            element_hash, (jd, positions, velocities) = service.evaluate_trajectory(
+                elements, neo, start_jd, end_jd, num_points, mode,
+                max_days=MAX_NBODY_EVALUATE_DAYS if mode == 'nbody' else MAX_EVALUATE_DAYS
+            )
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        if data.get('output') == 'binary':
+            dtype = data.get('dtype', 'float32')
+            if dtype not in FLOAT_TYPES:
+                return Response(
+                    {'error': f'dtype must be one of: {", ".join(FLOAT_TYPES)}'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            payload = pack_trajectories(
+                [(neo.id if neo else 0, jd, positions, velocities, True)], dtype
+            )
+            return HttpResponse(payload, content_type=CONTENT_TYPE)
+        
+        return Response({
+            'neo_id': neo.id if neo else None,
+            'element_hash': element_hash,
+            'mode': mode,
+            'start_jd': float(jd[0]),
+            'end_jd': float(jd[-1]),
+            'num_points': len(jd),
+            'points': service.format_state_vectors(jd, positions, velocities)
+        })
+    
     @action(detail=False, methods=['post'])
     def calculate(self, request):
-        """Calculate trajectory for a NEO"""
+        """
+        Calculate trajectory for a NEO
+        
+        Deprecated: use evaluate, which also returns the points. Propagates
+        one orbital period from today in memory and stores nothing; stored
+        trajectory runs come from the nightly batch task only. mode is
+        two_body (default) or nbody for Earth, Moon and Jupiter
+        perturbations.
+        """
         neo_id = request.data.get('neo_id')
-        num_points = request.data.get('num_points', 100)
+        mode = request.data.get('mode', 'two_body')
+        
+        try:
+            num_points = int(request.data.get('num_points', 100))
+        except (TypeError, ValueError):
+            return Response(
+                {'error': 'num_points must be an integer'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if not 1 <= num_points <= MAX_SAMPLED_POINTS:
+            return Response(
+                {'error': f'num_points must be between 1 and {MAX_SAMPLED_POINTS}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if mode not in PROPAGATION_MODES:
+            return Response(
+                {'error': f'mode must be one of: {", ".join(PROPAGATION_MODES)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
         try:
             neo = NEO.objects.get(id=neo_id)
-        except NEO.DoesNotExist:
+        except (NEO.DoesNotExist, ValueError):
             return Response({'error': 'NEO not found'}, status=status.HTTP_404_NOT_FOUND)
         
         service = OrbitalMechanicsService()
-        count = service.calculate_trajectory(neo, num_points)
+        
+        try:
+            _, (jd, _, _) = service.evaluate_trajectory(
+                neo=neo, num_points=num_points, mode=mode,
+                max_days=MAX_NBODY_EVALUATE_DAYS if mode == 'nbody' else MAX_EVALUATE_DAYS
+            )
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response({
+            'neo_id': neo.id,
+            'mode': mode,
+            'points_calculated': len(jd)
+        })
+
+
+class NearbyViewSet(viewsets.ViewSet):
+    """
+    Objects near Earth, the Sun or a point at a given epoch
+    
+    Query parameters: jd (default now) and center (earth, sun or a
+    heliocentric ecliptic "x,y,z" in AU).
+    """
+    
+    permission_classes = [AllowAny]
+    
+    @action(detail=False, methods=['get'])
+    def within(self, request):
+        """All objects within radius_au of the center"""
+        try:
+            radius_au = float(request.query_params.get('radius_au', 0.05))
+        except ValueError:
+            return Response(
+                {'error': 'radius_au must be numeric'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if radius_au <= 0:
+            return Response(
+                {'error': 'radius_au must be positive'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        return self._query(request, radius_au=radius_au)
+    
+    @action(detail=False, methods=['get'])
+    def nearest(self, request):
+        """The k objects nearest to the center"""
+        try:
+            k = int(request.query_params.get('k', 10))
+        except ValueError:
+            return Response(
+                {'error': 'k must be an integer'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if not 1 <= k <= MAX_NEAREST:
+            return Response(
+                {'error': f'k must be between 1 and {MAX_NEAREST}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        return self._query(request, k=k)
+    
+    def _query(self, request, radius_au=None, k=None):
+        """Resolve the epoch and center, then run the spatial query"""
+        params = request.query_params
+        center = params.get('center', 'earth').lower()
+        
+        try:
+            jd = float(params['jd']) if 'jd' in params else datetime_to_jd(timezone.now())
+            if center == 'earth':
+                position, _ = earth_states(jd)
+            elif center == 'sun':
+                position = [0.0, 0.0, 0.0]
+            else:
+                position = [float(value) for value in center.split(',')]
+                if len(position) != 3:
+                    raise ValueError
+        except ValueError:
+            return Response(
+                {'error': 'jd must be numeric and center one of earth, sun or x,y,z'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        service = OrbitalMechanicsService()
+        results = service.nearby_objects(position, jd, radius_au=radius_au, k=k)
         
         return Response({
-            'neo_id': neo_id,
-            'points_calculated': count
+            'julian_date': jd,
+            'center': center,
+            'center_au': [float(value) for value in position],
+            'count': len(results),
+            'results': results
         })
 
+
+class MonteCarloRunViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    ViewSet for Monte Carlo orbit-uncertainty runs
+    """
+    
+    queryset = MonteCarloRun.objects.select_related('neo')
+    serializer_class = MonteCarloRunSerializer
+    permission_classes = [AllowAny]
+    filterset_fields = ['neo']
+    
+    @action(detail=False, methods=['post'])
+    def run(self, request):
+        """Queue a Monte Carlo run for a NEO"""
+        from .tasks import run_monte_carlo
+        
+        neo_id = request.data.get('neo_id')
+        
+        if not NEO.objects.filter(id=neo_id).exists():
+            return Response({'error': 'NEO not found'}, status=status.HTTP_404_NOT_FOUND)
+        
+        try:
+            num_clones = int(request.data.get('num_clones', 100000))
+            years = float(request.data.get('years', 10))
+        except (TypeError, ValueError):
+            return Response(
+                {'error': 'num_clones and years must be numeric'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if not 1 <= num_clones <= MAX_CLONES or years <= 0:
+            return Response(
+                {'error': f'num_clones must be between 1 and {MAX_CLONES} and years positive'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        task = run_monte_carlo.delay(neo_id, num_clones=num_clones, years=years)
+        
+        return Response({
+            'message': 'Monte Carlo run queued',
+            'task_id': task.id
+        }, status=status.HTTP_202_ACCEPTED)
+
+
+class DeflectionViewSet(viewsets.ViewSet):
+    """
+    Deflection-mission planning: transfer grids and required delta-v
+    """
+    
+    permission_classes = [AllowAny]
+    
+    @action(detail=False, methods=['post'])
+    def porkchop(self, request):
+        """
+        Earth-to-NEO transfer grid (porkchop plot)
+        
+        Takes neo_id, departure_start_jd, departure_end_jd,
+        arrival_start_jd, arrival_end_jd, departure_points and
+        arrival_points. Returns departure C3 (km²/s²) and arrival
+        v-infinity (km/s) per cell, null where no transfer exists.
+        """
+        data = request.data
+        
+        try:
+            departure_jd = np.linspace(
+                float(data['departure_start_jd']),
+                float(data['departure_end_jd']),
+                int(data.get('departure_points', 100))
+            )
+            arrival_jd = np.linspace(
+                float(data['arrival_start_jd']),
+                float(data['arrival_end_jd']),
+                int(data.get('arrival_points', 100))
+            )
+        except (KeyError, TypeError, ValueError):
+            return Response(
+                {'error': 'departure and arrival start/end dates and point counts must be numeric'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if not len(departure_jd) or not len(arrival_jd) or \
+                len(departure_jd) * len(arrival_jd) > MAX_PORKCHOP_CELLS:
+            return Response(
+                {'error': f'The grid must have between 1 and {MAX_PORKCHOP_CELLS} cells'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            neo = NEO.objects.get(id=data.get('neo_id'))
+        except (NEO.DoesNotExist, ValueError):
+            return Response({'error': 'NEO not found'}, status=status.HTTP_404_NOT_FOUND)
+        
+        service = OrbitalMechanicsService()
+        
+        try:
+            c3, v_inf = service.porkchop(neo, departure_jd, arrival_jd)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        # Cheapest cell by departure plus arrival excess speed
+        total = np.sqrt(c3) + v_inf
+        best = None
+        if np.isfinite(total).any():
+            row, column = np.unravel_index(np.nanargmin(total), total.shape)
+            best = {
+                'departure_jd': float(departure_jd[row]),
+                'arrival_jd': float(arrival_jd[column]),
+                'c3_km2_s2': float(c3[row, column]),
+                'arrival_v_inf_km_s': float(v_inf[row, column])
+            }
+        
+        return Response({
+            'neo_id': neo.id,
+            'departure_jd': departure_jd.tolist(),
+            'arrival_jd': arrival_jd.tolist(),
+            'c3_km2_s2': np.where(np.isfinite(c3), c3, None).tolist(),
+            'arrival_v_inf_km_s': np.where(np.isfinite(v_inf), v_inf, None).tolist(),
+            'best': best
+        })
+    
+    @action(detail=False, methods=['post'])
+    def delta_v(self, request):
+        """
+        Impulse needed to shift a close approach's miss distance
+        
+        Takes neo_id, shift_km, optional lead_times_days (days before the
+        approach), approach_jd (default: the closest predicted approach)
+        and years to search for it.
+        """
+        data = request.data
+        
+        try:
+            shift_km = float(data['shift_km'])
+            lead_times = [float(value) for value in data.get('lead_times_days', DEFAULT_LEAD_TIMES_DAYS)]
+            approach_jd = float(data['approach_jd']) if data.get('approach_jd') is not None else None
+            years = float(data.get('years', 10))
+        except (KeyError, TypeError, ValueError):
+            return Response(
+                {'error': 'shift_km, lead_times_days, approach_jd and years must be numeric'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        numbers = [shift_km, years, *lead_times] + ([approach_jd] if approach_jd is not None else [])
+        if not all(math.isfinite(value) for value in numbers):
+            return Response(
+                {'error': 'shift_km, lead_times_days, approach_jd and years must be finite'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if not 1 <= len(lead_times) <= MAX_LEAD_TIMES or min(lead_times) <= 0:
+            return Response(
+                {'error': f'Between 1 and {MAX_LEAD_TIMES} positive lead_times_days required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if not 0 < years <= MAX_DEFLECTION_YEARS:
+            return Response(
+                {'error': f'years must be positive and at most {MAX_DEFLECTION_YEARS}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            neo = NEO.objects.get(id=data.get('neo_id'))
+        except (NEO.DoesNotExist, ValueError):
+            return Response({'error': 'NEO not found'}, status=status.HTTP_404_NOT_FOUND)
+        
+        service = OrbitalMechanicsService()
+        
+        try:
+            result = service.deflection_delta_v(neo, shift_km, lead_times, approach_jd, years)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response({'neo_id': neo.id, **result})
@@ -3,6 +3,7 @@ Safety Services
 """
 import uuid
 from django.conf import settings
+from asteroids.lookup import get_table
 from .models import ChatbotConversation, ResourceAllocation, ClimateImpactModel
 import logging
 
@@ -121,6 +122,28 @@ class ClimateModelingService:
     
     def calculate_climate_impact(self, energy_mt):
         """Calculate climate chain reaction effects"""
+        return ClimateImpactModel.objects.create(
+            impact_energy_mt=energy_mt,
+            **self.climate_effects(energy_mt)
+        )
+    
+    def estimate_climate_impact(self, energy_mt, exact=False):
+        """
+        Climate model field values for an impact energy, from the threat
+        table unless exact is set or the energy lies outside it
+        
+        Nothing is saved; 'source' tells whether the values were
+        interpolated or computed.
+        """
+        table = get_table()
+        
+        if exact or not table.covers(energy_mt):
+            return {**self.climate_effects(energy_mt), 'source': 'exact'}
+        
+        return {**table.lookup(energy_mt, 'climate'), 'source': 'table'}
+    
+    def climate_effects(self, energy_mt):
+        """Climate model field values for an impact energy, without saving anything"""
         
         # Dust ejection (simplified model)
         dust_gigatons = energy_mt ** 0.5 * 0.1
@@ -178,24 +201,20 @@ class ClimateModelingService:
             water_risk = 'moderate'
             health_risk = 'moderate'
         
-        # Save model
-        model = ClimateImpactModel.objects.create(
-            impact_energy_mt=energy_mt,
-            dust_ejected_gigatons=dust_gigatons,
-            water_vapor_gigatons=water_vapor_gigatons,
-            sulfur_dioxide_gigatons=so2_gigatons,
-            initial_temperature_drop_c=temp_drop,
-            recovery_time_years=recovery_years,
-            growing_season_reduction_percent=growing_season_reduction,
-            crop_yield_reduction_percent=crop_yield_reduction,
-            ocean_temperature_drop_c=ocean_temp_drop,
-            phytoplankton_reduction_percent=phytoplankton_reduction,
-            species_extinction_percent=extinction_percent,
-            ecosystem_recovery_years=ecosystem_recovery,
-            food_security_risk=food_risk,
-            water_security_risk=water_risk,
-            health_impact_severity=health_risk
-        )
-        
-        return model
+        return {
+            'dust_ejected_gigatons': dust_gigatons,
+            'water_vapor_gigatons': water_vapor_gigatons,
+            'sulfur_dioxide_gigatons': so2_gigatons,
+            'initial_temperature_drop_c': temp_drop,
+            'recovery_time_years': recovery_years,
+            'growing_season_reduction_percent': growing_season_reduction,
+            'crop_yield_reduction_percent': crop_yield_reduction,
+            'ocean_temperature_drop_c': ocean_temp_drop,
+            'phytoplankton_reduction_percent': phytoplankton_reduction,
+            'species_extinction_percent': extinction_percent,
+            'ecosystem_recovery_years': ecosystem_recovery,
+            'food_security_risk': food_risk,
+            'water_security_risk': water_risk,
+            'health_impact_severity': health_risk,
+        }
 
@@ -23,6 +23,8 @@ from .serializers import (
     ClimateImpactModelSerializer
 )
 from .services import ChatbotService, ResourceCalculationService, ClimateModelingService
+from asteroids.calculations import MAX_ENERGY_MEGATONS
+from meteor_madness.params import parse_bool
 
 
 class EmergencyChecklistViewSet(viewsets.ReadOnlyModelViewSet):
@@ -126,4 +128,36 @@ class ClimateImpactModelViewSet(viewsets.ReadOnlyModelViewSet):
         serializer = self.get_serializer(result)
         
         return Response(serializer.data)
+    
+    @action(detail=False, methods=['get'])
+    def estimate(self, request):
+        """
+        Climate effects of an impact energy, nothing saved
+        
+        Query parameters: impact_energy_mt, and exact to compute rather
+        than interpolate from the threat table.
+        """
+        try:
+            energy_mt = float(request.query_params.get('impact_energy_mt'))
+        except (TypeError, ValueError):
+            energy_mt = 0.0
+        
+        if not 0 < energy_mt <= MAX_ENERGY_MEGATONS:
+            return Response(
+                {'error': f'impact_energy_mt must be a positive number up to {MAX_ENERGY_MEGATONS:g}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            exact = parse_bool(request.query_params.get('exact'))
+        except ValueError:
+            return Response({'error': 'exact must be a boolean'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        service = ClimateModelingService()
+        result = service.estimate_climate_impact(
+            energy_mt,
+            exact=exact
+        )
+        
+        return Response(result)
 
@@ -2,6 +2,8 @@
 Seismic Impact Calculation Services
 """
 import math
+from asteroids import calculations
+from asteroids.lookup import get_table
 from .models import SeismicImpactAnalysis, ShockwaveModel
 import logging
 
@@ -15,48 +17,16 @@ class SeismicCalculationService:
         """Calculate complete seismic impact analysis"""
         
         energy_mt = threat_assessment.kinetic_energy_megatons
-        
-        # Convert energy to different units
-        energy_joules = energy_mt * 4.184e15
-        energy_ergs = energy_joules * 1e7
-        
-        # Calculate moment magnitude
-        moment_magnitude = self._energy_to_magnitude(energy_ergs)
-        richter_equivalent = moment_magnitude  # Simplified
-        
-        # Calculate ground motion parameters
-        pga = self._calculate_pga(energy_mt)
-        pgv = self._calculate_pgv(energy_mt)
-        pgd = self._calculate_pgd(energy_mt)
-        
-        # Calculate intensity
-        mmi = self._calculate_mmi(moment_magnitude)
-        felt_radius = self._calculate_felt_radius(energy_mt)
-        
-        # Calculate damage radii
-        severe_radius = threat_assessment.destruction_radius_km * 0.5
-        moderate_radius = threat_assessment.destruction_radius_km * 1.0
-        light_radius = threat_assessment.destruction_radius_km * 2.0
+        effects = self.seismic_effects(energy_mt, threat_assessment.destruction_radius_km)
         
         # Find comparable earthquake
-        comparable_eq, comparable_mag = self._find_comparable_earthquake(moment_magnitude)
+        comparable_eq, comparable_mag = self._find_comparable_earthquake(effects['moment_magnitude'])
         
         # Create or update analysis
         analysis, created = SeismicImpactAnalysis.objects.update_or_create(
             threat_assessment=threat_assessment,
             defaults={
-                'moment_magnitude': moment_magnitude,
-                'richter_scale_equivalent': richter_equivalent,
-                'energy_ergs': energy_ergs,
-                'energy_joules': energy_joules,
-                'peak_ground_acceleration_g': pga,
-                'peak_ground_velocity_mps': pgv,
-                'peak_ground_displacement_m': pgd,
-                'modified_mercalli_intensity': mmi,
-                'felt_radius_km': felt_radius,
-                'severe_damage_radius_km': severe_radius,
-                'moderate_damage_radius_km': moderate_radius,
-                'light_damage_radius_km': light_radius,
+                **effects,
                 'comparable_earthquake_name': comparable_eq,
                 'comparable_earthquake_magnitude': comparable_mag
             }
@@ -67,6 +37,58 @@ class SeismicCalculationService:
         
         return analysis
     
+    def estimate_seismic_impact(self, energy_mt, exact=False):
+        """
+        Seismic analysis field values for an impact energy, from the threat
+        table unless exact is set or the energy lies outside it
+        
+        Damage radii follow the threat calculations' destruction radius,
+        and the intensity the looked-up magnitude. Nothing is saved;
+        'source' tells whether the values were interpolated or computed.
+        """
+        table = get_table()
+        
+        if exact or not table.covers(energy_mt):
+            destruction_radius_km = float(calculations.destruction_radii(energy_mt))
+            return {**self.seismic_effects(energy_mt, destruction_radius_km), 'source': 'exact'}
+        
+        effects = table.lookup(energy_mt, 'seismic')
+        effects['modified_mercalli_intensity'] = self._calculate_mmi(effects['moment_magnitude'])
+        
+        return {**effects, 'source': 'table'}
+    
+    def seismic_effects(self, energy_mt, destruction_radius_km):
+        """Seismic analysis field values for an impact energy, without saving anything"""
+        
+        # Convert energy to different units
+        energy_joules = energy_mt * 4.184e15
+        energy_ergs = energy_joules * 1e7
+        
+        # Calculate moment magnitude
+        moment_magnitude = self._energy_to_magnitude(energy_ergs)
+        richter_equivalent = moment_magnitude  # Simplified
+        
+        return {
+            'moment_magnitude': moment_magnitude,
+            'richter_scale_equivalent': richter_equivalent,
+            'energy_ergs': energy_ergs,
+            'energy_joules': energy_joules,
+            
+            # Ground motion parameters
+            'peak_ground_acceleration_g': self._calculate_pga(energy_mt),
+            'peak_ground_velocity_mps': self._calculate_pgv(energy_mt),
+            'peak_ground_displacement_m': self._calculate_pgd(energy_mt),
+            
+            # Intensity
+            'modified_mercalli_intensity': self._calculate_mmi(moment_magnitude),
+            'felt_radius_km': self._calculate_felt_radius(energy_mt),
+            
+            # Damage radii
+            'severe_damage_radius_km': destruction_radius_km * 0.5,
+            'moderate_damage_radius_km': destruction_radius_km * 1.0,
+            'light_damage_radius_km': destruction_radius_km * 2.0,
+        }
+    
     def _energy_to_magnitude(self, energy_ergs):
         """Convert energy to seismic magnitude"""
         # M = (2/3) * log10(E) - 2.9
@@ -1,7 +1,7 @@
 """
 Seismic Views
 """
-from rest_framework import viewsets
+from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
@@ -9,6 +9,8 @@ from rest_framework.permissions import AllowAny
 from .models import SeismicImpactAnalysis
 from .serializers import SeismicImpactAnalysisSerializer
 from .services import SeismicCalculationService
+from asteroids.calculations import MAX_ENERGY_MEGATONS
+from meteor_madness.params import parse_bool
 
 
 class SeismicImpactAnalysisViewSet(viewsets.ReadOnlyModelViewSet):
@@ -22,19 +24,69 @@ class SeismicImpactAnalysisViewSet(viewsets.ReadOnlyModelViewSet):
     
     @action(detail=False, methods=['post'])
     def calculate(self, request):
-        """Calculate seismic impact for a threat assessment"""
+        """
+        Calculate seismic impact for a threat assessment
+        
+        Queued as a job (202, polled at /api/asteroids/jobs/{id}/) unless
+        sync is set, in which case the analysis is returned directly.
+        """
         from asteroids.models import ThreatAssessment
+        from asteroids.serializers import CalculationJobSerializer
+        from asteroids.services import CalculationJobService
         
         assessment_id = request.data.get('threat_assessment_id')
         
+        try:
+            sync = parse_bool(request.data.get('sync'))
+        except ValueError:
+            return Response({'error': 'sync must be a boolean'}, status=status.HTTP_400_BAD_REQUEST)
+        
         try:
             assessment = ThreatAssessment.objects.get(id=assessment_id)
         except ThreatAssessment.DoesNotExist:
             return Response({'error': 'Threat assessment not found'}, status=404)
         
+        if not sync:
+            job, _ = CalculationJobService().submit(
+                'seismic_analysis', {'threat_assessment_id': assessment.id}
+            )
+            serializer = CalculationJobSerializer(job, context={'request': request})
+            return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+        
         service = SeismicCalculationService()
         analysis = service.calculate_seismic_impact(assessment)
         
         serializer = self.get_serializer(analysis)
         return Response(serializer.data)
-
+    
+    @action(detail=False, methods=['get'])
+    def estimate(self, request):
+        """
+        Seismic effects of an impact energy, nothing saved
+        
+        Query parameters: energy_megatons, and exact to compute rather
+        than interpolate from the threat table.
+        """
+        try:
+            energy_mt = float(request.query_params.get('energy_megatons'))
+        except (TypeError, ValueError):
+            energy_mt = 0.0
+        
+        if not 0 < energy_mt <= MAX_ENERGY_MEGATONS:
+            return Response(
+                {'error': f'energy_megatons must be a positive number up to {MAX_ENERGY_MEGATONS:g}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            exact = parse_bool(request.query_params.get('exact'))
+        except ValueError:
+            return Response({'error': 'exact must be a boolean'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        service = SeismicCalculationService()
+        result = service.estimate_seismic_impact(
+            energy_mt,
+            exact=exact
+        )
+        
+        return Response(result)
@@ -2,6 +2,7 @@
 WebSocket consumers for real-time tracking
 """
 import json
+from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
 
 
@@ -11,11 +12,14 @@ class TrackingConsumer(AsyncWebsocketConsumer):
     """
     
     async def connect(self):
+        self.job_groups = set()
         await self.channel_layer.group_add("tracking", self.channel_name)
         await self.accept()
     
     async def disconnect(self, close_code):
         await self.channel_layer.group_discard("tracking", self.channel_name)
+        for group in self.job_groups:
+            await self.channel_layer.group_discard(group, self.channel_name)
     
     async def receive(self, text_data):
         data = json.loads(text_data)
@@ -25,12 +29,50 @@ class TrackingConsumer(AsyncWebsocketConsumer):
         
         if message_type == 'subscribe':
             # Subscribe to specific objects
-            pass
+            if isinstance(data.get('job_id'), int):
+                await self.subscribe_job(data['job_id'])
         elif message_type == 'unsubscribe':
             # Unsubscribe from objects
-            pass
+            if isinstance(data.get('job_id'), int):
+                await self.unsubscribe_job(data['job_id'])
+    
+    async def subscribe_job(self, job_id):
+        """Follow a calculation job, starting with its current status"""
+        from asteroids.models import CalculationJob
+        
+        # Joined before reading the status, so no change in between is missed
+        group = CalculationJob.channel_group(job_id)
+        await self.channel_layer.group_add(group, self.channel_name)
+        status = await self.job_status(job_id)
+        
+        if status is None:
+            await self.channel_layer.group_discard(group, self.channel_name)
+            await self.send(text_data=json.dumps({'error': f'Job {job_id} not found'}))
+            return
+        
+        self.job_groups.add(group)
+        await self.send(text_data=json.dumps(status))
+    
+    async def unsubscribe_job(self, job_id):
+        from asteroids.models import CalculationJob
+        
+        group = CalculationJob.channel_group(job_id)
+        if group in self.job_groups:
+            self.job_groups.discard(group)
+            await self.channel_layer.group_discard(group, self.channel_name)
+    
+    @database_sync_to_async
+    def job_status(self, job_id):
+        from asteroids.models import CalculationJob
+        from asteroids.serializers import CalculationJobSerializer
+        
+        job = CalculationJob.objects.filter(id=job_id).first()
+        return CalculationJobSerializer(job).data if job else None
     
     async def tracking_update(self, event):
         """Send tracking update to WebSocket"""
         await self.send(text_data=json.dumps(event['data']))
-
+    
+    async def job_update(self, event):
+        """Send calculation job status to WebSocket"""
+        await self.send(text_data=json.dumps(event['data']))